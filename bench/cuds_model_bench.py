@@ -0,0 +1,41 @@
+from __future__ import print_function
+
+from .util import bench
+from .serialisation_bench import create_model
+from simphony.core.cuba import CUBA
+from simphony.cuds.query import References
+
+
+def count_relations(model):
+    return model.count_of(CUBA.MATERIAL_RELATION)
+
+
+def iter_relations(model):
+    for relation in model.iter(item_type=CUBA.MATERIAL_RELATION):
+        pass
+
+
+def get_by_name(model):
+    return model.get_by_name('material 10')
+
+
+def find_references(model):
+    material = model.get_by_name('material 10')
+    return model.find(
+        CUBA.MATERIAL_RELATION, material=References(material))
+
+
+if __name__ == '__main__':
+    for number in (1000, 4000, 16000):
+        model = create_model(number)
+        for function in (count_relations, iter_relations, get_by_name,
+                         find_references):
+            print(
+                "{} ({} components):".format(
+                    function.__name__, 2 * number - 1),
+                bench(lambda: function(model)))
+        model.create_index(CUBA.MATERIAL)
+        print(
+            "find_references, indexed ({} components):".format(
+                2 * number - 1),
+            bench(lambda: find_references(model)))
@@ -0,0 +1,56 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+from contextlib import closing
+
+from .util import bench
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Particle
+from simphony.io.h5_cuds import FILTER_PROFILES, H5CUDS
+
+
+def create_particles(number=2000):
+    particles = Particles('test')
+    particles.add([
+        Particle(
+            coordinates=(i * 0.1, i * 0.2, i * 0.3),
+            data=DataContainer(MASS=1.0, VELOCITY=(i * 0.5, 0.0, 0.0)))
+        for i in range(number)])
+    return particles
+
+
+def write_file(filename, particles, profile):
+    with closing(H5CUDS.open(filename, 'w', filters=profile)) as handle:
+        handle.add_dataset(particles)
+
+
+def read_file(filename):
+    with closing(H5CUDS.open(filename, 'r')) as handle:
+        dataset = handle.get_dataset('test', cache_size=0)
+        for chunk in dataset.iter_chunks(CUBA.PARTICLE):
+            pass
+
+
+if __name__ == '__main__':
+    particles = create_particles()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for profile in sorted(FILTER_PROFILES):
+            filename = os.path.join(temp_dir, profile + '.cuds')
+            print(
+                "write_file ({}):".format(profile),
+                bench(lambda: write_file(filename, particles, profile),
+                      repeat=3, adjust_runs=False))
+            print(
+                "read_file ({}):".format(profile),
+                bench(lambda: read_file(filename), repeat=3,
+                      adjust_runs=False))
+            print(
+                "file_size ({}): {} bytes".format(
+                    profile, os.path.getsize(filename)))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,41 @@
+from __future__ import print_function
+
+from .util import bench
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.fingerprint import ContentHash
+from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Particle
+
+
+def create_particles(number):
+    particles = Particles('particles')
+    particles.add(
+        Particle(
+            coordinates=(i, 0.5 * i, 0.0),
+            data=DataContainer(MASS=1.0, VELOCITY=(0.0, 1.0, 2.0)))
+        for i in xrange(number))
+    return particles
+
+
+def full_fingerprint(particles):
+    return ContentHash(particles).hexdigest()
+
+
+def update_fingerprint(particles, particle):
+    particle.data[CUBA.MASS] += 1.0
+    particles.update([particle])
+    return particles.fingerprint()
+
+
+if __name__ == '__main__':
+    for number in (10000, 100000):
+        particles = create_particles(number)
+        particle = next(particles.iter(item_type=CUBA.PARTICLE))
+        particles.fingerprint()
+        print(
+            "full_fingerprint ({} particles):".format(number),
+            bench(lambda: full_fingerprint(particles), repeat=3))
+        print(
+            "update_fingerprint ({} particles):".format(number),
+            bench(lambda: update_fingerprint(particles, particle)))
@@ -0,0 +1,52 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from .util import bench
+from .serialisation_bench import create_model
+from simphony.io.model_index import INDEX_EXTENSION, LazyCUDS
+from simphony.io.serialisation import load_CUDS, save_CUDS
+
+
+def load_model(filename):
+    with open(filename, 'r') as handle:
+        model = load_CUDS(handle)
+    return model.get_by_name('relation 1')
+
+
+def open_lazy_model(filename, save_index=True):
+    model = LazyCUDS.open(filename, save_index=save_index)
+    try:
+        return model.get_by_name('relation 1')
+    finally:
+        model.close()
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for number in (2000, 8000):
+            filename = os.path.join(temp_dir, 'model.jsonl')
+            with open(filename, 'w') as handle:
+                save_CUDS(handle, create_model(number), format='jsonl')
+            components = 2 * number - 1
+            print(
+                "load_CUDS and get ({} components):".format(components),
+                bench(lambda: load_model(filename), repeat=3,
+                      adjust_runs=False))
+            print(
+                "LazyCUDS.open and get, index built ({} components):".format(
+                    components),
+                bench(lambda: open_lazy_model(filename, False), repeat=3,
+                      adjust_runs=False))
+            open_lazy_model(filename)
+            print(
+                "LazyCUDS.open and get, index saved ({} components):".format(
+                    components),
+                bench(lambda: open_lazy_model(filename), repeat=3,
+                      adjust_runs=False))
+            os.remove(filename + INDEX_EXTENSION)
+    finally:
+        shutil.rmtree(temp_dir)
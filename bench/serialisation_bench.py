@@ -0,0 +1,52 @@
+from __future__ import print_function
+
+import tempfile
+from contextlib import closing
+
+from .util import bench
+from simphony.cuds import CUDS
+from simphony.cuds.meta.api import Material, MaterialRelation
+from simphony.io.serialisation import FORMATS, load_CUDS, save_CUDS
+
+
+def create_model(number):
+    """ Return a model of number materials and their pairwise relations.
+
+    """
+    model = CUDS(name='bench', description='materials and relations')
+    materials = [
+        Material(name='material {}'.format(i), description='')
+        for i in range(number)]
+    model.add(materials)
+    model.add([
+        MaterialRelation(
+            name='relation {}'.format(i),
+            material=[materials[i], materials[i + 1]])
+        for i in range(number - 1)])
+    return model
+
+
+def save_model(handle, model, format='yaml'):
+    save_CUDS(handle, model, format)
+
+
+def load_model(handle):
+    handle.seek(0)
+    return load_CUDS(handle)
+
+
+if __name__ == '__main__':
+    with closing(tempfile.TemporaryFile()) as handle:
+        for number in (1000, 2000, 4000, 8000):
+            model = create_model(number)
+            for format in FORMATS:
+                print(
+                    "save_CUDS ({} components, {}):".format(
+                        2 * number - 1, format),
+                    bench(lambda: save_model(handle, model, format),
+                          repeat=3, adjust_runs=False))
+                print(
+                    "load_CUDS ({} components, {}):".format(
+                        2 * number - 1, format),
+                    bench(lambda: load_model(handle), repeat=3,
+                          adjust_runs=False))
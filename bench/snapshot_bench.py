@@ -0,0 +1,38 @@
+from __future__ import print_function
+
+from .util import bench
+from .fingerprint_bench import create_particles
+from .serialisation_bench import create_model
+from simphony.core.cuba import CUBA
+
+
+def derive_model(model):
+    return model.derive({'material 10': {CUBA.DESCRIPTION: 'changed'}})
+
+
+def snapshot_particles(particles):
+    return particles.snapshot()
+
+
+def update_snapshot(particles, particle):
+    snapshot = particles.snapshot()
+    snapshot.update([particle])
+    return snapshot
+
+
+if __name__ == '__main__':
+    for number in (1000, 4000, 16000):
+        model = create_model(number)
+        model.add([create_particles(number)])
+        print(
+            "derive_model ({} components):".format(2 * number),
+            bench(lambda: derive_model(model)))
+    for number in (10000, 100000):
+        particles = create_particles(number)
+        particle = next(particles.iter(item_type=CUBA.PARTICLE))
+        print(
+            "snapshot_particles ({} particles):".format(number),
+            bench(lambda: snapshot_particles(particles)))
+        print(
+            "update_snapshot ({} particles):".format(number),
+            bench(lambda: update_snapshot(particles, particle), repeat=3))
@@ -6,16 +6,25 @@ try:
     import tables  # noqa
 except ImportError:
     BENCH_MODULES = [
+        'cuds_model_bench',
         'data_container_bench',
+        'fingerprint_bench',
+        'snapshot_bench',
         'util']
     warnings.warn(
         "Exclude IO related bench module since PyTables is not installed")
 else:
     BENCH_MODULES = [
         'cuds_file_bench',
+        'cuds_model_bench',
         'data_container_bench',
         'data_container_table_bench',
+        'filter_profiles_bench',
+        'fingerprint_bench',
         'indexed_data_container_table_bench',
+        'model_index_bench',
+        'serialisation_bench',
+        'snapshot_bench',
         'util']
 
 
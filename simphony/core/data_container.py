@@ -1,5 +1,10 @@
 from .cuba import CUBA
 
+# The allowed CUBA keys (faster to convert to set for lookup) and the map
+# of the CUBA enum names to the CUBA enums, shared by all the containers
+_CUBA_KEYS = frozenset(CUBA)
+_CUBA_MAPPING = dict(CUBA.__members__)
+
 
 class DataContainer(dict):
     """ A DataContainer instance
@@ -24,12 +29,12 @@ class DataContainer(dict):
         """
         super(DataContainer, self).__init__()
 
-        # These are the allowed CUBA keys (faster to convert to set for lookup)
-        self.restricted_keys = frozenset(CUBA)
+        # These are the allowed CUBA keys
+        self.restricted_keys = _CUBA_KEYS
 
         # Map CUBA enum name to CUBA enum
         # Used by assigning key using keyword name
-        self._restricted_mapping = CUBA.__members__
+        self._restricted_mapping = _CUBA_MAPPING
 
         self.update(*args, **kwargs)
 
@@ -43,6 +48,15 @@ class DataContainer(dict):
             message = "Key {!r} is not in the supported CUBA keywords"
             raise ValueError(message.format(key))
 
+    def __reduce__(self):
+        """ Pickle the container as the class and a plain dictionary.
+
+        The default dict pickling sets the items before the instance
+        attributes are restored.
+
+        """
+        return type(self), (dict(self),)
+
     def update(self, *args, **kwargs):
         self._check_arguments(args, kwargs)
 
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from simphony.core.cuba import CUBA
@@ -147,6 +148,14 @@ class TestDataContainer(unittest.TestCase):
         with self.assertRaises(ValueError):
             container[100] = 29
 
+    def test_pickle(self):
+        container = DataContainer(MASS=2.0, VELOCITY=(1, 0, 0))
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled = pickle.loads(pickle.dumps(container, protocol))
+            self.assertIsInstance(unpickled, DataContainer)
+            self.assertEqual(unpickled, container)
+            unpickled[CUBA.NAME] = 'foo'
+
 
 if __name__ == '__main__':
     unittest.main()
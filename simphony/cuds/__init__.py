@@ -8,6 +8,7 @@ from .lattice_items import LatticeNode
 from .particles import Particles
 from .particles_items import Particle, Bond
 from .cuds import CUDS
+from .query import Equals, Range, References
 from .simulation import Simulation
 from .meta import api
 
@@ -15,4 +16,5 @@ __all__ = [
     'ABCLattice', 'ABCMesh', 'ABCParticles',
     'Mesh', 'Point', 'Element', 'Edge', 'Face', 'Cell',
     'Lattice', 'LatticeNode', 'api',
-    'Particles', 'Particle', 'Bond', 'CUDS', 'Simulation']
+    'Particles', 'Particle', 'Bond', 'CUDS', 'Simulation',
+    'Equals', 'Range', 'References']
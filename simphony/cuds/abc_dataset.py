@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from abc import ABCMeta, abstractmethod
 
+from .fingerprint import ContentHash
+
 
 class ABCDataset(object):
     """Abstract base class for a dataset.
@@ -192,3 +194,39 @@ class ABCDataset(object):
         """Implements the `in` interface. Behaves as the has() method.
         """
         return self.has(item)
+
+    def fingerprint(self):
+        """Returns the content fingerprint of the dataset.
+
+        The fingerprint is a hex string that is equal for datasets with
+        the same name, data and items, independently of the order and
+        the storage of the items (see :class:`~.ContentHash`). The in
+        memory datasets keep the digests of their items and the HDF5
+        datasets the digests of the chunks in the file, and they hash
+        again only the chunks of the items changed since the last call.
+        The other datasets hash all their items on every call.
+
+        Returns
+        -------
+        fingerprint : str
+            The hex digest of the content.
+        """
+        return self._content_hash().hexdigest()
+
+    def chunk_fingerprints(self):
+        """Returns the fingerprints of the chunks of the items.
+
+        Two datasets with different fingerprints differ in the items of
+        the chunks with different fingerprints.
+
+        Returns
+        -------
+        fingerprints : dict
+            The hex digest of each chunk with items by chunk number.
+        """
+        return self._content_hash().chunk_digests()
+
+    def _content_hash(self):
+        """Returns the ContentHash of the items of the dataset.
+        """
+        return ContentHash(self)
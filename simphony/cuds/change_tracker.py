@@ -0,0 +1,176 @@
+""" Dirty tracking of the in-memory containers
+
+This module contains the record of the items that have been added,
+updated or removed in a container since the last time the container
+was synchronised with a file (see ``H5CUDS.sync_dataset``). The record
+starts when the container is stored in or loaded from a file, thus the
+containers that are never stored do not keep it.
+
+"""
+from collections import OrderedDict
+
+import numpy
+
+from ..core import CUBA
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+class ChangeTracker(object):
+    """ The items of a container that changed since the last sync.
+
+    The changes are coalesced per item key:
+
+    - an added item that is updated is still an added item,
+    - an added item that is removed is forgotten,
+    - an updated item that is removed is a removed item,
+    - a removed item that is added again is an updated item with all
+      its fields changed.
+
+    The changed fields of an update are the names of the changed item
+    attributes (e.g. ``'coordinates'``) and the CUBA keys of the changed
+    data values. A field set of ``None`` means that all the fields of the
+    item changed.
+
+    The changes are recorded only after :meth:`start`.
+
+    """
+
+    def __init__(self):
+        # item_type -> OrderedDict(key -> (state, fields))
+        self._changes = {}
+        self._tracking = False
+
+    @property
+    def tracking(self):
+        """ True when the changes are recorded.
+
+        """
+        return self._tracking
+
+    def __len__(self):
+        """ The number of changed items.
+
+        """
+        return sum(len(changes) for changes in self._changes.values())
+
+    def added(self, item_type, key):
+        """ Record that the item has been added.
+
+        """
+        if not self._tracking:
+            return
+        changes = self._changes.setdefault(item_type, OrderedDict())
+        state, fields = changes.get(key, (None, None))
+        if state == REMOVED:
+            changes[key] = (UPDATED, None)
+        else:
+            changes[key] = (ADDED, None)
+
+    def updated(self, item_type, key, fields=None):
+        """ Record that the fields of the item have been updated.
+
+        """
+        if not self._tracking or (fields is not None and len(fields) == 0):
+            return
+        changes = self._changes.setdefault(item_type, OrderedDict())
+        state, current = changes.get(key, (None, frozenset()))
+        if state == ADDED:
+            return
+        if fields is None or current is None:
+            changes[key] = (UPDATED, None)
+        else:
+            changes[key] = (UPDATED, current | frozenset(fields))
+
+    def removed(self, item_type, key):
+        """ Record that the item has been removed.
+
+        """
+        if not self._tracking:
+            return
+        changes = self._changes.setdefault(item_type, OrderedDict())
+        state, _ = changes.pop(key, (None, None))
+        if state != ADDED:
+            changes[key] = (REMOVED, None)
+
+    def keys(self, state, item_type):
+        """ Return the keys of the items of item_type in the given state.
+
+        """
+        changes = self._changes.get(item_type, {})
+        return [
+            key for key, (current, _) in changes.iteritems()
+            if current == state]
+
+    def fields(self, item_type, key):
+        """ Return the changed fields of an updated item.
+
+        """
+        return self._changes[item_type][key][1]
+
+    def updates(self, item_type):
+        """ Return the keys of the updated items grouped by changed fields.
+
+        Returns
+        -------
+        updates : dict
+            Mapping from ``(attributes, data)`` to the keys of the updated
+            items, where ``attributes`` is True when item attributes
+            changed and ``data`` is True when data values changed.
+
+        """
+        updates = {}
+        changes = self._changes.get(item_type, {})
+        for key, (state, fields) in changes.iteritems():
+            if state != UPDATED:
+                continue
+            if fields is None:
+                group = (True, True)
+            else:
+                data = sum(1 for field in fields if isinstance(field, CUBA))
+                group = (data < len(fields), data > 0)
+            updates.setdefault(group, []).append(key)
+        return updates
+
+    def item_types(self):
+        """ Return the item types with changed items.
+
+        """
+        return [
+            item_type for item_type, changes in self._changes.iteritems()
+            if len(changes) > 0]
+
+    def clear(self):
+        """ Forget all the changes.
+
+        """
+        self._changes.clear()
+
+    def start(self):
+        """ Forget all the changes and record the following ones.
+
+        """
+        self._changes.clear()
+        self._tracking = True
+
+    def stop(self):
+        """ Forget all the changes and stop recording.
+
+        """
+        self._changes.clear()
+        self._tracking = False
+
+
+def changed_keys(old, new):
+    """ Return the CUBA keys with different values in two DataContainers.
+
+    """
+    keys = set()
+    for key in set(old) | set(new):
+        if key not in old or key not in new:
+            keys.add(key)
+        elif not numpy.array_equal(old[key], new[key]):
+            keys.add(key)
+    return keys
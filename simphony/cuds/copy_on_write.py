@@ -0,0 +1,76 @@
+""" Copy-on-write snapshots of the in memory datasets
+
+This module contains the mixin of the datasets whose snapshots share the
+item stores of the dataset. The stores are copied by the first of the
+sharing datasets that is modified, thus taking a snapshot does not copy
+the items and a snapshot that is only read never does.
+
+"""
+import abc
+import weakref
+
+
+class CopyOnWriteMixin(object):
+    """ Mixin implementing the ``snapshot()`` of the in memory datasets.
+
+    Classes using the mixin call :meth:`_own` before any modification of
+    their item stores and implement :meth:`_shallow_copy` and
+    :meth:`_copy_stores`.
+
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    # The datasets sharing the item stores, None when not shared
+    _sharing = None
+
+    def snapshot(self):
+        """ Return a snapshot of the dataset.
+
+        The snapshot has the name, the uid, a copy of the data and the
+        items of the dataset. The items are shared until the dataset or
+        the snapshot is modified, then the modified one copies its item
+        stores.
+
+        Returns
+        -------
+        snapshot : ABCDataset
+            A dataset of the same class.
+
+        """
+        if self._sharing is None:
+            self._sharing = weakref.WeakSet([self])
+        snapshot = self._shallow_copy()
+        snapshot._sharing = self._sharing
+        self._sharing.add(snapshot)
+        return snapshot
+
+    @property
+    def is_shared(self):
+        """ True when the items are shared with a snapshot.
+
+        """
+        return self._sharing is not None and len(self._sharing) > 1
+
+    def _own(self):
+        """ Copy the item stores before a modification when they are
+        shared.
+
+        """
+        if self.is_shared:
+            self._sharing.discard(self)
+            self._copy_stores()
+        self._sharing = None
+
+    @abc.abstractmethod
+    def _shallow_copy(self):  # pragma: no cover
+        """ Return a new dataset with the name, the uid and a copy of the
+        data of the dataset, using the same item stores.
+
+        """
+
+    @abc.abstractmethod
+    def _copy_stores(self):  # pragma: no cover
+        """ Replace the item stores with copies.
+
+        """
@@ -3,17 +3,59 @@
 This module contains the classes used to represent a computational model,
 based on SimPhoNy metadata.
 """
+import copy
+import uuid
+
 from .meta import api
-from .utils import map_cuba_key_to_cuds_class
 from .abc_dataset import ABCDataset
+from .fingerprint import model_fingerprint
+from .query import (
+    AttributeIndex, QueryStatistics, is_reference, predicate, predicate_key)
 from ..core import CUBA, DataContainer
 
+# The CUBA keys of the dataset types, iterated together by `CUDS.iter`
+_DATASET_KEYS = (CUBA.PARTICLES, CUBA.LATTICE, CUBA.MESH)
+
+# class -> the CUBA keys of the class and of its parent classes
+_TYPE_KEYS = {}
+
 
 def is_dataset(obj):
     """Check if the object is a dataset."""
     return isinstance(obj, (ABCDataset, api.DataSet))
 
 
+def type_keys(cls):
+    """Return the CUBA keys of a component class and of its parent classes.
+
+    The classes generated from the SimPhoNy metadata follow the ontology
+    hierarchy, thus the keys are the CUBA type of the class and its parent
+    types. The dataset classes also have the ``DATA_SET`` type.
+
+    Parameters
+    ----------
+    cls: type
+        The class of a CUDS component or dataset.
+
+    Returns
+    -------
+    keys: tuple of CUBA
+        The CUBA keys, the key of the class first.
+    """
+    keys = _TYPE_KEYS.get(cls)
+    if keys is None:
+        keys = []
+        for base in cls.__mro__:
+            key = vars(base).get('cuba_key')
+            if key is not None and key not in keys:
+                keys.append(key)
+        if (issubclass(cls, (ABCDataset, api.DataSet)) and
+                CUBA.DATA_SET not in keys):
+            keys.append(CUBA.DATA_SET)
+        keys = _TYPE_KEYS[cls] = tuple(keys)
+    return keys
+
+
 class CUDS(api.CUDS):
     """Common Universal Data Structure, i.e. CUDS computational model.
 
@@ -28,6 +70,11 @@ class CUDS(api.CUDS):
         Name of this CUDS
     description: str
         More information about this CUDS
+
+    The components are indexed by their CUBA type, including the parent
+    types of the ontology hierarchy (see :func:`type_keys`), and by name,
+    thus the type queries take a time proportional to the number of
+    components of the type.
     """
     def __init__(self, name='', description=''):
 
@@ -40,6 +87,18 @@ class CUDS(api.CUDS):
         # Another map to keep a mapping between names and uids
         self._name_uid_map = {}
 
+        # The name each component was indexed with
+        self._uid_name_map = {}
+
+        # CUBA type -> set of the uids of the components of the type
+        self._type_index = {}
+
+        # CUBA key -> AttributeIndex of the values of the key
+        self._attribute_indexes = {}
+
+        # uid -> digest of the component (see `fingerprint`)
+        self._digests = {}
+
         # Call parent
         super(CUDS, self).__init__(name=name, description=description)
 
@@ -71,11 +130,7 @@ class CUDS(api.CUDS):
             # Do not accept items with duplicate names.
             # Components/datasets with no name will be added, however
             # it is not possible to get/remove them with `name`
-            if component.name in self._name_uid_map:
-                raise ValueError('Name clash. Component with uid `%s`'
-                                 ' is already named `%s`'
-                                 % (self._name_uid_map[component.name],
-                                    component.name))
+            self._check_name(component.name, None)
 
             # Make sure datasets have names
             if is_dataset(component):
@@ -84,16 +139,17 @@ class CUDS(api.CUDS):
 
                 # self._dataset_store.add(component)
 
+            # Replace the component with the same uid
+            if component.uid in self._store:
+                self._unindex_component(self._store[component.uid])
+
             # Add the component to the generic store
             self._store[component.uid] = component
 
             # Add the component to the data using its CUBA key
             self._data[component.cuba_key] = component
 
-            # Keep a name:uid map
-            # FIXME: if user changes the name, this will go out of sync
-            if component.name not in (None, ''):
-                self._name_uid_map[component.name] = component.uid
+            self._index_component(component)
 
     def update(self, components):
         """Update existing components with provided ones.
@@ -105,7 +161,8 @@ class CUDS(api.CUDS):
         Raises
         ------
         ValueError :
-            If any object inside the iterable does not exist.
+            If any object inside the iterable does not exist, or if the
+            name of a component is already used by another component.
         """
         for component in components:
             if component.uid not in self._store:
@@ -114,8 +171,11 @@ class CUDS(api.CUDS):
                         name=component.name, uid=component.uid
                     )
                 )
+            self._check_name(component.name, component.uid)
 
+            self._unindex_component(self._store[component.uid])
             self._store[component.uid] = component
+            self._index_component(component)
 
     def get_by_name(self, name):
         """Get the corresponding component from the CUDS computational model.
@@ -141,7 +201,7 @@ class CUDS(api.CUDS):
         if not name:
             raise TypeError('name must be a non empty string.')
 
-        uid = self._name_uid_map.get(name)
+        uid = self._uid_of_name(name)
         return self.get(uid)
 
     def get(self, uid):
@@ -183,15 +243,14 @@ class CUDS(api.CUDS):
         """
         for uid in uids:
             component = self.get(uid)
-            if not component:
+            if component is None:
                 raise KeyError('No component exists for %s' % uid)
 
             # Delete the object from the internal store
             del self._store[uid]
 
             # Delete object key from the mappings
-            if component.name in self._name_uid_map:
-                del self._name_uid_map[component.name]
+            self._unindex_component(component)
 
     # TODO: This should be a query method
     def iter(self, uids=None, item_type=None):
@@ -221,22 +280,16 @@ class CUDS(api.CUDS):
         if uids:
             if not all(uid in self._store for uid in uids):
                 raise KeyError('No object exists for uid')
+            if item_type:
+                indexed = self._type_index.get(_type_key(item_type), ())
+                uids = [uid for uid in uids if uid in indexed]
+        elif item_type:
+            uids = list(self._type_index.get(_type_key(item_type), ()))
         else:
             uids = self._store.keys()
 
-        # Get the equivalent class type for the key
-        if item_type:
-            # FIXME: dirty hack for now
-            if item_type in (CUBA.PARTICLES, CUBA.LATTICE, CUBA.MESH):
-                component_type = ABCDataset
-            else:
-                component_type = map_cuba_key_to_cuds_class(item_type)
-        else:
-            component_type = object
-
         for uid in uids:
-            if isinstance(self._store[uid], component_type):
-                yield self._store[uid]
+            yield self._store[uid]
 
     def has(self, uid):
         """Checks if an object with the given uid already exists
@@ -266,34 +319,207 @@ class CUDS(api.CUDS):
         -------
         True if the type is present, False otherwise.
         """
-        # Get the equivalent class type for the key
-        component_type = map_cuba_key_to_cuds_class(item_type)
-
-        for component in self._store.itervalues():
-            if isinstance(component, component_type):
-                return True
-        return False
+        return len(self._type_index.get(item_type, ())) > 0
 
     def count_of(self, item_type):
-        """Returns an iterator for the components of the given type.
+        """Returns the number of the components of the given type.
 
         Parameters
         ----------
         item_type: CUBA
-            Restricts iteration only to the specified CUBA.
+            The CUBA type, the components of its subtypes are counted.
 
-        Yields
+        Returns
+        -------
+        count: int
+            The number of the components of the given type.
+        """
+        return len(self._type_index.get(item_type, ()))
+
+    def find(self, item_type=None, **predicates):
+        """Return the components of the given type that match the
+        predicates on the values of their CUBA keys.
+
+        Parameters
+        ----------
+        item_type: CUBA, optional
+            Restricts the query to the components of the CUBA type.
+        predicates:
+            The predicates on the values of the CUBA keys, with the
+            names of the keys (e.g. ``density``) as keyword arguments.
+            The values are :class:`~.Equals`, :class:`~.Range` or
+            :class:`~.References` predicates; components, datasets and
+            uids are references (the value is, or is a list that
+            contains, the component) and other values are equality
+            predicates.
+
+        Returns
+        -------
+        components: list
+            The matching components, in no particular order.
+
+        Raises
         ------
-        iterator over the components of the given type
+        ValueError
+            if a keyword argument is not the name of a CUBA key.
+
+        The candidates are selected with the most selective attribute
+        index of the keys of the predicates (see :meth:`create_index`)
+        and :meth:`explain` returns the statistics of the query.
         """
-        # Get the equivalent class type for the key
-        component_type = map_cuba_key_to_cuds_class(item_type)
+        return self._query(item_type, predicates)[0]
+
+    def explain(self, item_type=None, **predicates):
+        """Run a query (see :meth:`find`) and return its statistics.
+
+        Returns
+        -------
+        statistics: QueryStatistics
+            The CUBA key of the attribute index used to select the
+            candidates (None when no index was used), the number of
+            candidate components whose data were read and the number of
+            matching components.
+        """
+        return self._query(item_type, predicates)[1]
+
+    def create_index(self, key):
+        """Build an attribute index of the values of a CUBA key.
 
-        length = 0
-        for component in self._store.itervalues():
-            if isinstance(component, component_type):
-                length += 1
-        return length
+        The index is updated when components are added, updated or
+        removed. The components whose data are modified in place should
+        be updated (see :meth:`update`) to update the index.
+
+        Parameters
+        ----------
+        key: CUBA
+            The CUBA key of the indexed values.
+        """
+        if key in self._attribute_indexes:
+            return
+        index = AttributeIndex(key)
+        for uid, component in self._store.iteritems():
+            index.add(uid, component.data)
+        self._attribute_indexes[key] = index
+
+    def remove_index(self, key):
+        """Remove the attribute index of a CUBA key.
+
+        Raises
+        ------
+        KeyError
+            if there is no index of the key.
+        """
+        del self._attribute_indexes[key]
+
+    def snapshot(self, name=None, description=None):
+        """Return a new model that shares the components of the model.
+
+        Taking a snapshot copies the indexes of the model but not the
+        components. The components are shared, thus they should be
+        replaced (see :meth:`update` and :meth:`derive`) rather than
+        modified in place. The in memory datasets are replaced by their
+        snapshots, which share the items until the dataset or the
+        snapshot is modified (see ``Particles.snapshot``). The datasets
+        without snapshots (e.g. the HDF5 datasets) are shared.
+
+        Parameters
+        ----------
+        name: str, optional
+            The name of the new model, default is the name of the model.
+        description: str, optional
+            The description of the new model, default is the description
+            of the model.
+
+        Returns
+        -------
+        model: CUDS
+            The new model.
+        """
+        model = CUDS(
+            name=self.name if name is None else name,
+            description=(
+                self.description if description is None else description))
+        store = model._store = dict(self._store)
+        for uid in self._type_index.get(CUBA.DATA_SET, ()):
+            dataset = store[uid]
+            if hasattr(dataset, 'snapshot'):
+                store[uid] = dataset.snapshot()
+        for key, value in self._data.iteritems():
+            if store.get(getattr(value, 'uid', None)) is not None:
+                model._data[key] = store[value.uid]
+        model._name_uid_map = dict(self._name_uid_map)
+        model._uid_name_map = dict(self._uid_name_map)
+        model._type_index = {
+            key: set(uids) for key, uids in self._type_index.iteritems()}
+        model._attribute_indexes = {
+            key: index.copy()
+            for key, index in self._attribute_indexes.iteritems()}
+        model._digests = dict(self._digests)
+        return model
+
+    def derive(self, changes=None, name=None, description=None):
+        """Return a snapshot of the model with changed component values.
+
+        The changed components of the new model are copies, the model
+        is not modified. The components that refer to a changed
+        component are copied as well and refer to the copy, thus the
+        models share the components that did not change (see
+        :meth:`snapshot`). The data of a changed dataset is set on the
+        dataset of the new model, thus also on the base model when the
+        dataset is shared.
+
+        Parameters
+        ----------
+        changes: dict, optional
+            The CUBA values to set (a dict or a DataContainer) by
+            component. The components are given by uid, by name or as
+            the components of the model.
+        name: str, optional
+            The name of the new model, default is the name of the model.
+        description: str, optional
+            The description of the new model, default is the description
+            of the model.
+
+        Returns
+        -------
+        model: CUDS
+            The new model.
+
+        Raises
+        ------
+        KeyError
+            if a component is not in the model.
+        ValueError
+            if a changed name is already used by another component.
+
+        Examples
+        --------
+        >>> for density in (7.7, 7.8, 7.9):
+        ...     variant = model.derive({'steel': {CUBA.DENSITY: density}})
+        """
+        model = self.snapshot(name, description)
+        if changes:
+            model._change(changes)
+        return model
+
+    def fingerprint(self):
+        """Return the content fingerprint of the model.
+
+        The fingerprint is a hex string that is equal for models with the
+        same name, description and components, e.g. a model and the model
+        loaded from its file. The digests of the components (by uid, type
+        and data) are kept until the components are updated or removed,
+        thus the components whose data are modified in place should be
+        updated (see :meth:`update`). The datasets keep the digests of
+        their items until the items change (see
+        :meth:`ABCDataset.fingerprint`).
+
+        Returns
+        -------
+        fingerprint: str
+            The hex digest of the content.
+        """
+        return model_fingerprint(self, self._digests)
 
     def __len__(self):
         """Returns the total number of items in the container.
@@ -309,3 +535,190 @@ class CUDS(api.CUDS):
         """Implements the `in` interface. Behaves as the has() method.
         """
         return self.has(item)
+
+    def _index_component(self, component):
+        """Add the component to the type and name indexes."""
+        uid = component.uid
+        for key in type_keys(type(component)):
+            self._type_index.setdefault(key, set()).add(uid)
+        name = component.name
+        if name not in (None, ''):
+            self._name_uid_map[name] = uid
+            self._uid_name_map[uid] = name
+        if self._attribute_indexes:
+            data = component.data
+            for index in self._attribute_indexes.itervalues():
+                index.add(uid, data)
+
+    def _unindex_component(self, component):
+        """Remove the component from the type and name indexes."""
+        uid = component.uid
+        for key in type_keys(type(component)):
+            uids = self._type_index[key]
+            uids.discard(uid)
+            if not uids:
+                del self._type_index[key]
+        name = self._uid_name_map.pop(uid, None)
+        if self._name_uid_map.get(name) == uid:
+            del self._name_uid_map[name]
+        for index in self._attribute_indexes.itervalues():
+            index.remove(uid)
+        self._digests.pop(uid, None)
+
+    def _uid_of_name(self, name, rescan=True):
+        """Return the uid of the component named name or None.
+
+        The names are reindexed when the indexed component was renamed
+        since it was added (or updated), or when the name is not found
+        and rescan is True.
+        """
+        uid = self._name_uid_map.get(name)
+        if uid is not None and self._store[uid].name == name:
+            return uid
+        if uid is not None or rescan:
+            self._reindex_names()
+            uid = self._name_uid_map.get(name)
+        return uid
+
+    def _reindex_names(self):
+        """Rebuild the name index when components have been renamed."""
+        self._name_uid_map = {}
+        self._uid_name_map = {}
+        for uid, component in self._store.iteritems():
+            name = component.name
+            if name not in (None, '') and name not in self._name_uid_map:
+                self._name_uid_map[name] = uid
+                self._uid_name_map[uid] = name
+
+    def _query(self, item_type, predicates):
+        """Return the components matching the predicates and the
+        statistics of the query."""
+        conditions = [
+            (predicate_key(name), predicate(value))
+            for name, value in predicates.items()]
+        candidates = None
+        if item_type:
+            candidates = self._type_index.get(_type_key(item_type), set())
+
+        index_key = None
+        selected = None
+        for key, condition in conditions:
+            index = self._attribute_indexes.get(key)
+            uids = None if index is None else index.lookup(condition)
+            if uids is not None and (
+                    selected is None or len(uids) < len(selected)):
+                index_key = key
+                selected = uids
+        if selected is not None:
+            candidates = (
+                selected if candidates is None else selected & candidates)
+        elif candidates is None:
+            candidates = self._store.keys()
+
+        matches = []
+        for uid in candidates:
+            component = self._store[uid]
+            data = component.data
+            if all(key in data and condition(data[key])
+                   for key, condition in conditions):
+                matches.append(component)
+        return matches, QueryStatistics(
+            index_key, len(candidates), len(matches))
+
+    def _change(self, changes):
+        """Replace the components with copies that have changed values
+        and copy the components that refer to the replaced ones."""
+        replaced = {}
+        for key, values in changes.iteritems():
+            component = self._component_of(key)
+            data = DataContainer(component.data)
+            data.update(values)
+            if is_dataset(component):
+                component.data = data
+            else:
+                replaced[component.uid] = _copy_component(component, data)
+
+        referrers = self._referrers()
+        pending = list(replaced)
+        while pending:
+            for uid in referrers.get(pending.pop(), ()):
+                if uid not in replaced:
+                    component = self._store[uid]
+                    replaced[uid] = _copy_component(
+                        component, DataContainer(component.data))
+                    pending.append(uid)
+        for component in replaced.itervalues():
+            data = component.data
+            component.data = DataContainer({
+                key: _relink(value, replaced)
+                for key, value in data.iteritems()})
+        self.update(replaced.values())
+
+    def _component_of(self, key):
+        """Return the component given by uid, by name or as a component."""
+        if isinstance(key, uuid.UUID):
+            return self.get(key)
+        if is_reference(key):
+            return self.get(key.uid)
+        uid = self._uid_of_name(key)
+        if uid is None:
+            raise KeyError('No component named {!r}'.format(key))
+        return self.get(uid)
+
+    def _referrers(self):
+        """Return the uids of the components that refer to other
+        components by object, by the uid of the referred component."""
+        referrers = {}
+        for uid, component in self._store.iteritems():
+            if is_dataset(component):
+                continue
+            for value in component.data.itervalues():
+                for reference in _references(value):
+                    referrers.setdefault(reference, set()).add(uid)
+        return referrers
+
+    def _check_name(self, name, uid):
+        """Raise a ValueError if another component is named name."""
+        if name in (None, ''):
+            return
+        other = self._uid_of_name(name, rescan=False)
+        if other is not None and other != uid:
+            raise ValueError('Name clash. Component with uid `%s`'
+                             ' is already named `%s`' % (other, name))
+
+
+def _copy_component(component, data):
+    """Return a copy of a component with the data."""
+    component = copy.copy(component)
+    component.data = data
+    return component
+
+
+def _references(value):
+    """Iterate over the uids of the components referred to by object in
+    a value."""
+    if isinstance(value, list):
+        for item in value:
+            for reference in _references(item):
+                yield reference
+    elif is_reference(value) and not isinstance(value, uuid.UUID):
+        yield value.uid
+
+
+def _relink(value, components):
+    """Return the value with the references to the components replaced
+    by the components with the same uid."""
+    if isinstance(value, list):
+        return [_relink(item, components) for item in value]
+    if is_reference(value) and not isinstance(value, uuid.UUID):
+        return components.get(value.uid, value)
+    return value
+
+
+def _type_key(item_type):
+    """Return the indexed CUBA type of the components iterated for the
+    item type."""
+    # FIXME: dirty hack for now, the dataset types iterate all datasets
+    if item_type in _DATASET_KEYS:
+        return CUBA.DATA_SET
+    return item_type
@@ -0,0 +1,376 @@
+""" Content fingerprints of the CUDS models and datasets
+
+This module contains stable content hashes of the datasets and of the
+CUDS models. The items of a dataset are hashed one by one and are
+distributed by uid (by index for the lattice nodes) in a fixed number of
+chunks. The digest of a chunk is the hash of the sorted digests of its
+items and the fingerprint of the dataset is the hash of the attributes
+of the dataset and of the chunk digests. Thus the fingerprint depends
+neither on the order of the items nor on the storage of the dataset, and
+the change of an item changes the digest of one chunk only.
+
+"""
+import binascii
+import hashlib
+import struct
+import uuid
+
+import numpy
+
+from ..core import CUBA
+from ..core.keywords import KEYWORDS
+from .query import is_reference
+
+#: The number of chunks the items of a dataset are distributed in.
+FINGERPRINT_CHUNKS = 1024
+
+# The item types of the datasets
+_ITEM_TYPES = {
+    CUBA.PARTICLES: (CUBA.PARTICLE, CUBA.BOND),
+    CUBA.MESH: (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL),
+    CUBA.LATTICE: (CUBA.NODE,)}
+
+# The item attributes that are hashed besides the uid and the data
+_ITEM_ATTRIBUTES = ('coordinates', 'particles', 'points')
+
+# CUBA key -> (the bytes of the key name, the numeric type of the values)
+_KEY_INFO = {}
+
+
+class ContentHash(object):
+    """ The chunked content hash of a particles, mesh or lattice dataset.
+
+    The item digests are computed on the first request and are kept
+    until the dataset reports the change of an item with
+    :meth:`changed`; then only the chunks of the changed items are hashed
+    again. The fingerprint is combined from the chunk digests on every
+    request, since the data of the dataset can be modified in place.
+
+    """
+
+    def __init__(self, dataset):
+        """ Create the content hash of a dataset.
+
+        Parameters
+        ----------
+        dataset : {ABCParticles, ABCMesh, ABCLattice}
+            The hashed dataset.
+
+        """
+        self._dataset = dataset
+        # chunk -> {item key: item digest}, None before the first request
+        self._items = None
+        # chunk -> chunk digest
+        self._chunks = {}
+        # (item type, item key) of the items changed since the last request
+        self._changed = set()
+
+    def changed(self, item_type, key):
+        """ Record that an item was added, updated or removed.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the item.
+        key : {uuid.UUID, tuple}
+            The uid of the item, or the index of a lattice node.
+
+        """
+        if self._items is not None:
+            self._changed.add((item_type, key))
+
+    def clear(self):
+        """ Forget the item digests, they are computed again on the next
+        request.
+
+        """
+        self._items = None
+        self._chunks = {}
+        self._changed = set()
+
+    def chunk_digests(self):
+        """ Return the hex digests of the chunks that contain items.
+
+        Returns
+        -------
+        digests : dict
+            The hex digest of each chunk by chunk number.
+
+        """
+        self._refresh()
+        return {
+            chunk: binascii.hexlify(digest)
+            for chunk, digest in self._chunks.iteritems()}
+
+    def hexdigest(self):
+        """ Return the fingerprint of the dataset as a hex string.
+
+        """
+        self._refresh()
+        dataset = self._dataset
+        digest = hashlib.sha1()
+        digest.update(_value_bytes(dataset.cuba_key.name))
+        digest.update(_value_bytes(dataset.name))
+        digest.update(_data_bytes(dataset.data))
+        if dataset.cuba_key == CUBA.LATTICE:
+            cell = dataset.primitive_cell
+            digest.update(_value_bytes([
+                _floats(cell.p1), _floats(cell.p2), _floats(cell.p3),
+                int(cell.bravais_lattice), _floats(dataset.origin),
+                list(dataset.size)]))
+        for chunk in sorted(self._chunks):
+            digest.update(struct.pack('<I', chunk))
+            digest.update(self._chunks[chunk])
+        return digest.hexdigest()
+
+    def _refresh(self):
+        """ Hash the items that are not hashed yet and the chunks that
+        changed.
+
+        """
+        if self._items is None:
+            self._items = {}
+            for chunk, key, digest in self._iter_digests():
+                self._items.setdefault(chunk, {})[key] = digest
+            stale = set(self._items)
+        else:
+            stale = set()
+            for item_type, key in self._changed:
+                chunk = self._chunk_of(key)
+                items = self._items.setdefault(chunk, {})
+                items.pop(key, None)
+                item = self._get(key)
+                if item is not None:
+                    items[key] = item_digest(item_type, item)
+                stale.add(chunk)
+        self._changed.clear()
+        for chunk in stale:
+            items = self._items[chunk]
+            if len(items) == 0:
+                del self._items[chunk]
+                self._chunks.pop(chunk, None)
+            else:
+                self._chunks[chunk] = hashlib.sha1(
+                    ''.join(sorted(items.itervalues()))).digest()
+
+    def _iter_digests(self, chunks=None):
+        """ Iterate over the chunk, the key and the digest of the items of
+        the dataset, only of the items in chunks when given.
+
+        """
+        for item_type in _ITEM_TYPES[self._dataset.cuba_key]:
+            for item in self._dataset.iter(item_type=item_type):
+                key = _item_key(item)
+                chunk = self._chunk_of(key)
+                if chunks is None or chunk in chunks:
+                    yield chunk, key, item_digest(item_type, item)
+
+    def _get(self, key):
+        """ Return the item with the key or None when it was removed.
+
+        """
+        try:
+            return self._dataset.get(key)
+        except KeyError:
+            return None
+
+    def _chunk_of(self, key):
+        return chunk_of(key, getattr(self._dataset, 'size', None))
+
+
+def chunk_of(key, size=None):
+    """ Return the chunk of an item.
+
+    Parameters
+    ----------
+    key : {uuid.UUID, tuple}
+        The uid of the item, or the index of a lattice node.
+    size : tuple, optional
+        The size of the lattice of the node.
+
+    """
+    if isinstance(key, uuid.UUID):
+        return int(key.int % FINGERPRINT_CHUNKS)
+    return int(numpy.ravel_multi_index(key, size)) % FINGERPRINT_CHUNKS
+
+
+def fingerprint(obj):
+    """ Return the content fingerprint of a CUDS model, a dataset or a
+    component.
+
+    The fingerprint is a hex string that is equal for objects with equal
+    content, e.g. a model and the model loaded from its file. The
+    components of a model are hashed by uid, type and data, the
+    references to components and datasets by uid, and the datasets by
+    their items (see :class:`ContentHash`). The uid of the model itself
+    is not part of its content.
+
+    Parameters
+    ----------
+    obj : {CUDS, ABCDataset, CUDSComponent}
+        The hashed object.
+
+    """
+    if hasattr(obj, 'fingerprint'):
+        return obj.fingerprint()
+    return binascii.hexlify(_component_digest(obj))
+
+
+def model_fingerprint(model, digests=None):
+    """ Return the content fingerprint of a CUDS model.
+
+    The datasets keep the digests of their items (see
+    :meth:`ABCDataset.fingerprint`).
+
+    Parameters
+    ----------
+    model : CUDS
+        The hashed model.
+    digests : dict, optional
+        The digests of the components by uid, the missing digests are
+        added. Default is to hash all the components.
+
+    """
+    if digests is None:
+        digests = {}
+    digest = hashlib.sha1()
+    digest.update(_value_bytes(model.name))
+    digest.update(_value_bytes(model.description))
+    components = sorted(model.iter(), key=lambda component: component.uid)
+    for component in components:
+        digest.update(component.uid.hex)
+        if hasattr(component, 'fingerprint'):
+            digest.update(binascii.unhexlify(component.fingerprint()))
+        else:
+            component_digest = digests.get(component.uid)
+            if component_digest is None:
+                component_digest = digests[component.uid] = (
+                    _component_digest(component))
+            digest.update(component_digest)
+    return digest.hexdigest()
+
+
+def item_digest(item_type, item):
+    """ Return the digest of an item of a dataset.
+
+    Parameters
+    ----------
+    item_type : CUBA
+        The type of the item.
+    item : {Particle, Bond, Point, Edge, Face, Cell, LatticeNode}
+        The item.
+
+    """
+    digest = hashlib.sha1(item_type.name)
+    digest.update(_value_bytes(_item_key(item)))
+    for name in _ITEM_ATTRIBUTES:
+        value = getattr(item, name, None)
+        if value is not None:
+            if name == 'coordinates':
+                value = _floats(value)
+            digest.update(name)
+            digest.update(_value_bytes(value))
+    digest.update(_data_bytes(item.data))
+    return digest.digest()
+
+
+def _component_digest(component):
+    digest = hashlib.sha1(component.cuba_key.name)
+    digest.update(_data_bytes(component.data))
+    return digest.digest()
+
+
+def _item_key(item):
+    """ Return the uid of an item or the index of a lattice node.
+
+    """
+    uid = getattr(item, 'uid', None)
+    return uid if uid is not None else tuple(item.index)
+
+
+def _floats(value):
+    return numpy.asarray(value, dtype=numpy.float64)
+
+
+def _data_bytes(data):
+    """ Return the canonical bytes of a DataContainer.
+
+    The numeric values are converted to the type of their CUBA keyword,
+    thus e.g. an integer mass is hashed as the float it is stored as.
+
+    """
+    parts = []
+    for key in sorted(data, key=lambda key: key.name):
+        value = data[key]
+        name, dtype = _key_info(key)
+        if dtype is not None and value is not None:
+            value = numpy.asarray(value, dtype=dtype)
+        parts.append(name)
+        parts.append(_value_bytes(value))
+    return struct.pack('<Q', len(data)) + ''.join(parts)
+
+
+def _key_info(key):
+    """ Return the bytes of the name of a CUBA key and the numeric type
+    of its values or None.
+
+    """
+    info = _KEY_INFO.get(key)
+    if info is None:
+        dtype = getattr(KEYWORDS.get(key.name), 'dtype', None)
+        if dtype not in (numpy.float64, numpy.int32):
+            dtype = None
+        info = _KEY_INFO[key] = (_value_bytes(key.name), dtype)
+    return info
+
+
+def _value_bytes(value):
+    """ Return the canonical, type tagged bytes of a value.
+
+    The numbers and the numeric sequences and arrays are hashed as
+    flat little-endian arrays of 64 bit floats or integers, the strings
+    and the sequences of strings as flat arrays of UTF-8 strings, the
+    components and the datasets by uid.
+
+    Raises
+    ------
+    TypeError :
+        If the value cannot be hashed.
+
+    """
+    if value is None:
+        return 'N'
+    if isinstance(value, uuid.UUID):
+        return 'U' + value.hex
+    if is_reference(value):
+        return 'R' + value.uid.hex
+    if isinstance(value, basestring):
+        return _strings_bytes([value])
+    if isinstance(value, numpy.ndarray) and value.dtype.kind in 'SU':
+        return _strings_bytes(numpy.ravel(value).tolist())
+    if (isinstance(value, (list, tuple)) and len(value) > 0 and
+            all(isinstance(item, basestring) for item in value)):
+        return _strings_bytes(value)
+    array = numpy.asarray(value)
+    kind = array.dtype.kind
+    if kind in 'biuf':
+        array = numpy.ravel(array)
+        if kind == 'f':
+            tag, array = 'F', array.astype('<f8')
+        else:
+            tag, array = 'I', array.astype('<i8')
+        return tag + struct.pack('<Q', len(array)) + array.tostring()
+    if isinstance(value, (list, tuple)):
+        return 'L' + struct.pack('<Q', len(value)) + ''.join(
+            _value_bytes(item) for item in value)
+    raise TypeError('Cannot fingerprint the value {!r}'.format(value))
+
+
+def _strings_bytes(strings):
+    parts = [struct.pack('<Q', len(strings))]
+    for string in strings:
+        if isinstance(string, unicode):
+            string = string.encode('utf-8')
+        parts.append(struct.pack('<Q', len(string)))
+        parts.append(string)
+    return 'S' + ''.join(parts)
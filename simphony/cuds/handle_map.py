@@ -0,0 +1,241 @@
+""" Integer handles for uid based containers
+
+This module contains the bidirectional uid <-> handle map used by the
+containers to keep their internal bookkeeping (storage slots and
+connectivity) on dense integers instead of ``uuid.UUID`` objects.
+
+"""
+import numpy
+
+
+class HandleMap(object):
+    """ Bidirectional map between uids and dense integer handles.
+
+    Handles are assigned in increasing order starting from zero the first
+    time a uid is seen. A uid can own a handle without the related item
+    being stored in a container (e.g. a particle that is referenced by a
+    bond but has not been added), thus containers keep track of which
+    handles are occupied separately.
+
+    Each :meth:`acquire` of a uid holds its handle until the matching
+    :meth:`release`. A handle that is no longer held is freed and reused
+    by the next new uid, thus the handles stay dense when items are
+    removed and added.
+
+    """
+
+    def __init__(self):
+        self._handles = {}
+        self._uids = []
+        # handle -> number of holders of the handle
+        self._holds = []
+        # the released handles, reused in LIFO order
+        self._free = []
+
+    def __len__(self):
+        """ The number of handles assigned so far, including the released
+        handles that are not reused yet.
+
+        """
+        return len(self._uids)
+
+    def __contains__(self, uid):
+        return uid in self._handles
+
+    def handle(self, uid):
+        """ Return the handle of a uid.
+
+        Raises
+        ------
+        KeyError :
+            If the uid has not been assigned a handle.
+
+        """
+        return self._handles[uid]
+
+    def uid(self, handle):
+        """ Return the uid of a handle, None for a released handle.
+
+        Raises
+        ------
+        IndexError :
+            If the handle has not been assigned.
+
+        """
+        return self._uids[handle]
+
+    def acquire(self, uid):
+        """ Return the handle of a uid and hold it, assigning a new (or
+        a released) handle if needed.
+
+        """
+        handles = self._handles
+        handle = handles.get(uid)
+        if handle is None:
+            if self._free:
+                handle = self._free.pop()
+                self._uids[handle] = uid
+            else:
+                handle = len(self._uids)
+                self._uids.append(uid)
+                self._holds.append(0)
+            handles[uid] = handle
+        self._holds[handle] += 1
+        return handle
+
+    def acquire_many(self, uids):
+        """ Return an array with the handles of the uids.
+
+        New handles are assigned to uids that are not yet in the map.
+
+        """
+        acquire = self.acquire
+        return numpy.array(
+            [acquire(uid) for uid in uids], dtype=numpy.intp)
+
+    def release(self, handle):
+        """ Drop a hold of a handle, the handle is freed when it is no
+        longer held.
+
+        """
+        holds = self._holds
+        holds[handle] -= 1
+        if holds[handle] == 0:
+            del self._handles[self._uids[handle]]
+            self._uids[handle] = None
+            self._free.append(handle)
+
+    def release_many(self, handles):
+        """ Drop a hold of each handle (see :meth:`release`).
+
+        """
+        release = self.release
+        for handle in handles:
+            release(handle)
+
+    def uids(self, handles):
+        """ Return the list of uids for a sequence of handles.
+
+        """
+        uids = self._uids
+        return [uids[handle] for handle in handles]
+
+    def copy(self):
+        """ Return an independent copy of the map.
+
+        """
+        new = HandleMap()
+        new._handles = self._handles.copy()
+        new._uids = list(self._uids)
+        new._holds = list(self._holds)
+        new._free = list(self._free)
+        return new
+
+
+class HandleStore(object):
+    """ Item storage keyed by uid and laid out by handle.
+
+    The store implements the basic mapping api (``uid -> item``) on top
+    of a list indexed by the item handle. Slots of removed items are left
+    empty (``None``) so that the handles of the remaining items do not
+    change, a stored item holds its handle and the slot is reused once
+    the handle is released (see :class:`HandleMap`).
+
+    Parameters
+    ----------
+    handles : HandleMap, optional
+        The handle map to use. A new map is created when none is given.
+
+    """
+
+    def __init__(self, handles=None):
+        self.handles = HandleMap() if handles is None else handles
+        self._items = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, uid):
+        handle = self.handles._handles.get(uid)
+        return handle is not None and self.get_by_handle(handle) is not None
+
+    def __getitem__(self, uid):
+        item = self.get_by_handle(self.handles.handle(uid))
+        if item is None:
+            raise KeyError(uid)
+        return item
+
+    def __setitem__(self, uid, item):
+        handle = self.handles._handles.get(uid)
+        if handle is None or self.get_by_handle(handle) is None:
+            handle = self.handles.acquire(uid)
+            items = self._items
+            if handle >= len(items):
+                items.extend([None] * (handle + 1 - len(items)))
+            self._count += 1
+        self._items[handle] = item
+
+    def __delitem__(self, uid):
+        handle = self.handles._handles.get(uid)
+        if handle is None or self.get_by_handle(handle) is None:
+            raise KeyError(uid)
+        self._items[handle] = None
+        self._count -= 1
+        self.handles.release(handle)
+
+    def get(self, uid, default=None):
+        """ Return the item stored under uid or default if not stored.
+
+        """
+        handle = self.handles._handles.get(uid)
+        if handle is None:
+            return default
+        item = self.get_by_handle(handle)
+        return default if item is None else item
+
+    def get_by_handle(self, handle):
+        """ Return the item stored under handle or None if the slot is empty.
+
+        """
+        items = self._items
+        if 0 <= handle < len(items):
+            return items[handle]
+        return None
+
+    def iterhandles(self):
+        """ Iterate over the handles of the stored items in handle order.
+
+        """
+        for handle, item in enumerate(self._items):
+            if item is not None:
+                yield handle
+
+    def iteritems(self):
+        """ Iterate over the (uid, item) pairs in handle order.
+
+        """
+        uids = self.handles._uids
+        for handle, item in enumerate(self._items):
+            if item is not None:
+                yield uids[handle], item
+
+    def itervalues(self):
+        """ Iterate over the stored items in handle order.
+
+        """
+        for item in self._items:
+            if item is not None:
+                yield item
+
+    def copy(self):
+        """ Return a copy of the store with a copy of its handle map.
+
+        The stored items are not copied, the containers replace the items
+        instead of modifying them.
+
+        """
+        new = HandleStore(self.handles.copy())
+        new._items = list(self._items)
+        new._count = self._count
+        return new
@@ -4,11 +4,14 @@ import numpy as np
 from ..core import CUBA
 from ..core.data_container import DataContainer
 from .abc_lattice import ABCLattice
+from .change_tracker import ChangeTracker, changed_keys
+from .copy_on_write import CopyOnWriteMixin
+from .fingerprint import ContentHash
 from .lattice_items import LatticeNode
 from .primitive_cell import PrimitiveCell
 
 
-class Lattice(ABCLattice):
+class Lattice(ABCLattice, CopyOnWriteMixin):
     """A Bravais lattice. Stores references to data
     containers (node related data).
 
@@ -24,6 +27,9 @@ class Lattice(ABCLattice):
         lattice origin
     data : DataContainer
         high level CUBA data assigned to lattice
+    changes : ChangeTracker
+        nodes updated since the last sync, recorded once the lattice is
+        stored in or loaded from a file
     """
 
     cuba_key = CUBA.LATTICE
@@ -36,6 +42,8 @@ class Lattice(ABCLattice):
                                 dtype=np.float)
         self._dcs = np.empty(size, dtype=object)
         self._data = DataContainer()
+        self._changes = ChangeTracker()
+        self._content = ContentHash(self)
 
         self._items_count = {
             CUBA.NODE: lambda: self._size
@@ -73,6 +81,35 @@ class Lattice(ABCLattice):
             error_str = "Trying to obtain count a of non-supported item: {}"
             raise ValueError(error_str.format(item_type))
 
+    @property
+    def changes(self):
+        """ The nodes updated since the last sync.
+
+        The changes are recorded once the container is stored in or
+        loaded from a file (see ``H5CUDS.sync_dataset``).
+
+        """
+        return self._changes
+
+    def _content_hash(self):
+        """ The item digests are kept until the items change.
+
+        """
+        return self._content
+
+    def _shallow_copy(self):
+        # an empty lattice, the node array is shared
+        lattice = Lattice(
+            self.name, self._primitive_cell, (0, 0, 0), self._origin)
+        lattice._size = self._size
+        lattice._dcs = self._dcs
+        lattice._data = DataContainer(self._data)
+        lattice._uid = self._uid
+        return lattice
+
+    def _copy_stores(self):
+        self._dcs = self._dcs.copy()
+
     @property
     def size(self):
         return self._size
@@ -117,11 +154,18 @@ class Lattice(ABCLattice):
             to the Lattice
 
         """
+        self._own()
         for node in nodes:
             index = node.index
             if any(value < 0 for value in index):
                 raise IndexError('invalid index: {}'.format(index))
-            self._dcs[index] = DataContainer(node.data)
+            old = self._dcs[index]
+            new = self._dcs[index] = DataContainer(node.data)
+            if self._changes.tracking:
+                self._changes.updated(
+                    CUBA.NODE, tuple(index),
+                    changed_keys({} if old is None else old, new))
+            self._content.changed(CUBA.NODE, tuple(index))
 
     def _iter_nodes(self, indices=None):
         """Get an iterator over the LatticeNodes described by the indices.
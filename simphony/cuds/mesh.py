@@ -6,13 +6,19 @@ and modify a mesh
 """
 import uuid
 
+import numpy
+
 from ..core import data_container as dc
 from ..core import CUBA
 from .abc_mesh import ABCMesh
+from .change_tracker import ChangeTracker, changed_keys
+from .copy_on_write import CopyOnWriteMixin
+from .fingerprint import ContentHash
+from .handle_map import HandleStore
 from .mesh_items import Edge, Face, Cell, Point
 
 
-class Mesh(ABCMesh):
+class Mesh(ABCMesh, CopyOnWriteMixin):
     """ Mesh object to store points and elements.
 
     Stores general mesh information Points and Elements
@@ -38,14 +44,17 @@ class Mesh(ABCMesh):
         name of mesh
     data : Data
         Data relative to the mesh.
-    points : dictionary of Point
+    points : HandleStore of Point
         Points of the mesh.
-    edges : dictionary of Edge
+    edges : HandleStore of (point handles, data) records
         Edges of the mesh.
-    faces : dictionary of Face
+    faces : HandleStore of (point handles, data) records
         Faces of the mesh.
-    cells : dictionary of Cell
+    cells : HandleStore of (point handles, data) records
         Cells of the mesh.
+    changes : ChangeTracker
+        The items added or updated since the last sync, recorded once
+        the mesh is stored in or loaded from a file.
 
     """
 
@@ -54,12 +63,14 @@ class Mesh(ABCMesh):
     def __init__(self, name):
         self.name = name
 
-        self._points = {}
-        self._edges = {}
-        self._faces = {}
-        self._cells = {}
+        self._points = HandleStore()
+        self._edges = HandleStore()
+        self._faces = HandleStore()
+        self._cells = HandleStore()
 
         self._data = dc.DataContainer()
+        self._changes = ChangeTracker()
+        self._content = ContentHash(self)
 
         self._items_count = {
             CUBA.POINT: lambda: self._points,
@@ -74,6 +85,38 @@ class Mesh(ABCMesh):
     def uid(self):
         return self._uid
 
+    @property
+    def changes(self):
+        """ The items added or updated since the last sync.
+
+        The changes are recorded once the container is stored in or
+        loaded from a file (see ``H5CUDS.sync_dataset``).
+
+        """
+        return self._changes
+
+    def _content_hash(self):
+        """ The item digests are kept until the items change.
+
+        """
+        return self._content
+
+    def _shallow_copy(self):
+        mesh = Mesh(self.name)
+        mesh._points = self._points
+        mesh._edges = self._edges
+        mesh._faces = self._faces
+        mesh._cells = self._cells
+        mesh._data = dc.DataContainer(self._data)
+        mesh._uid = self._uid
+        return mesh
+
+    def _copy_stores(self):
+        self._points = self._points.copy()
+        self._edges = self._edges.copy()
+        self._faces = self._faces.copy()
+        self._cells = self._cells.copy()
+
     @property
     def data(self):
         return self._data
@@ -167,7 +210,7 @@ class Mesh(ABCMesh):
 
         """
         if isinstance(uid, uuid.UUID):
-            return Edge.from_edge(self._edges[uid])
+            return self._decode_element(Edge, uid, self._edges[uid])
         else:
             message = 'Expected type for `uid` is uuid.UUID but received {!r}'
             raise TypeError(message.format(type(uid)))
@@ -198,7 +241,7 @@ class Mesh(ABCMesh):
 
         """
         if isinstance(uid, uuid.UUID):
-            return Face.from_face(self._faces[uid])
+            return self._decode_element(Face, uid, self._faces[uid])
         else:
             message = 'Expected type for `uid` is uuid.UUID but received {!r}'
             raise TypeError(message.format(type(uid)))
@@ -229,7 +272,7 @@ class Mesh(ABCMesh):
 
         """
         if isinstance(uid, uuid.UUID):
-            return Cell.from_cell(self._cells[uid])
+            return self._decode_element(Cell, uid, self._cells[uid])
         else:
             message = 'Expected type for `uid` is uuid.UUID but received {!r}'
             raise TypeError(message.format(type(uid)))
@@ -249,6 +292,7 @@ class Mesh(ABCMesh):
             in the mesh.
 
         """
+        self._own()
         rpoints = []
         for point in points:
             if point.uid is None:
@@ -259,6 +303,8 @@ class Mesh(ABCMesh):
                 raise ValueError(err_str.format(point.uid))
 
             self._points[point.uid] = Point.from_point(point)
+            self._changes.added(CUBA.POINT, point.uid)
+            self._content.changed(CUBA.POINT, point.uid)
 
             rpoints.append(point.uid)
         return rpoints
@@ -278,6 +324,7 @@ class Mesh(ABCMesh):
             in the mesh
 
         """
+        self._own()
         redges = []
         for edge in edges:
             if edge.uid is None:
@@ -287,7 +334,9 @@ class Mesh(ABCMesh):
                     edge with uuid: {}"
                 raise ValueError(err_str.format(edge.uid))
 
-            self._edges[edge.uid] = Edge.from_edge(edge)
+            self._edges[edge.uid] = self._encode_element(edge)
+            self._changes.added(CUBA.EDGE, edge.uid)
+            self._content.changed(CUBA.EDGE, edge.uid)
 
             redges.append(edge.uid)
         return redges
@@ -307,6 +356,7 @@ class Mesh(ABCMesh):
             in the mesh
 
         """
+        self._own()
         rfaces = []
         for face in faces:
             if face.uid is None:
@@ -316,7 +366,9 @@ class Mesh(ABCMesh):
                     face with uuid: {}"
                 raise ValueError(err_str.format(face.uid))
 
-            self._faces[face.uid] = Face.from_face(face)
+            self._faces[face.uid] = self._encode_element(face)
+            self._changes.added(CUBA.FACE, face.uid)
+            self._content.changed(CUBA.FACE, face.uid)
 
             rfaces.append(face.uid)
         return rfaces
@@ -336,6 +388,7 @@ class Mesh(ABCMesh):
             in the mesh
 
         """
+        self._own()
         rcells = []
         for cell in cells:
             if cell.uid is None:
@@ -345,7 +398,9 @@ class Mesh(ABCMesh):
                     cell with uuid: {}"
                 raise ValueError(err_str.format(cell.uid))
 
-            self._cells[cell.uid] = Cell.from_cell(cell)
+            self._cells[cell.uid] = self._encode_element(cell)
+            self._changes.added(CUBA.CELL, cell.uid)
+            self._content.changed(CUBA.CELL, cell.uid)
             rcells.append(cell.uid)
         return rcells
 
@@ -367,14 +422,20 @@ class Mesh(ABCMesh):
             If the any point was not found in the mesh
 
         """
+        self._own()
         for point in points:
             if point.uid not in self._points:
                 err_str = "Trying to update a non-existing point with uid: {}"
                 raise ValueError(err_str.format(point.uid))
 
-            point_to_update = self._points[point.uid]
-            point_to_update.data = point.data
-            point_to_update.coordinates = point.coordinates
+            old = self._points[point.uid]
+            new = self._points[point.uid] = Point.from_point(point)
+            if self._changes.tracking:
+                fields = changed_keys(old.data, new.data)
+                if tuple(old.coordinates) != tuple(new.coordinates):
+                    fields.add('coordinates')
+                self._changes.updated(CUBA.POINT, point.uid, fields)
+            self._content.changed(CUBA.POINT, point.uid)
 
     def _update_edges(self, edges):
         """ Updates the information of a set of edges.
@@ -394,14 +455,13 @@ class Mesh(ABCMesh):
             If the any edge was not found in the mesh
 
         """
+        self._own()
         for edge in edges:
             if edge.uid not in self._edges:
                 err_str = "Trying to update a non-existing edge with uid: {}"
                 raise ValueError(err_str.format(edge.uid))
 
-            edge_to_update = self._edges[edge.uid]
-            edge_to_update.data = edge.data
-            edge_to_update.points = edge.points
+            self._update_element(CUBA.EDGE, self._edges, edge)
 
     def _update_faces(self, faces):
         """ Updates the information of a set of faces.
@@ -421,14 +481,13 @@ class Mesh(ABCMesh):
             If the any face was not found in the mesh
 
         """
+        self._own()
         for face in faces:
             if face.uid not in self._faces:
                 err_str = "Trying to update a non-existing face with uid: {}"
                 raise ValueError(err_str.format(face.uid))
 
-            face_to_update = self._faces[face.uid]
-            face_to_update.data = face.data
-            face_to_update.points = face.points
+            self._update_element(CUBA.FACE, self._faces, face)
 
     def _update_cells(self, cells):
         """ Updates the information of a set of cells.
@@ -448,14 +507,13 @@ class Mesh(ABCMesh):
             If the any cell was not found in the mesh
 
         """
+        self._own()
         for cell in cells:
             if cell.uid not in self._cells:
                 err_str = "Trying to update a non-existing cell with uid: {}"
                 raise ValueError(err_str.format(cell.uid))
 
-            cell_to_update = self._cells[cell.uid]
-            cell_to_update.data = cell.data
-            cell_to_update.points = cell.points
+            self._update_element(CUBA.CELL, self._cells, cell)
 
     def _iter_points(self, uids=None):
         """ Returns an iterator over points.
@@ -474,7 +532,7 @@ class Mesh(ABCMesh):
 
         """
         if uids is None:
-            for point in self._points.values():
+            for point in self._points.itervalues():
                 yield Point.from_point(point)
         else:
             for point_uid in uids:
@@ -497,12 +555,7 @@ class Mesh(ABCMesh):
 
         """
 
-        if uids is None:
-            for edge in self._edges.values():
-                yield Edge.from_edge(edge)
-        else:
-            for uid in uids:
-                yield Edge.from_edge(self._edges[uid])
+        return self._iter_elements(Edge, self._edges, uids)
 
     def _iter_faces(self, uids=None):
         """ Returns an iterator over faces.
@@ -520,12 +573,7 @@ class Mesh(ABCMesh):
         face : Face
 
         """
-        if uids is None:
-            for face in self._faces.values():
-                yield Face.from_face(face)
-        else:
-            for uid in uids:
-                yield Face.from_face(self._faces[uid])
+        return self._iter_elements(Face, self._faces, uids)
 
     def _iter_cells(self, uids=None):
         """ Returns an iterator over cells.
@@ -543,12 +591,7 @@ class Mesh(ABCMesh):
         cell : Cell
 
         """
-        if uids is None:
-            for cell in self._cells.values():
-                yield Cell.from_cell(cell)
-        else:
-            for uid in uids:
-                yield Cell.from_cell(self._cells[uid])
+        return self._iter_elements(Cell, self._cells, uids)
 
     def _has_points(self):
         """ Check if the mesh has points
@@ -598,6 +641,158 @@ class Mesh(ABCMesh):
         """
         return len(self._cells) > 0
 
+    # Handle based access
+
+    def get_handles(self, uids, item_type=CUBA.POINT):
+        """ Return the integer handles of the items with the given uids.
+
+        Handles are dense integers assigned by the mesh to every item.
+        They stay fixed while the item is in the mesh and can be used
+        with the other handle based methods for bulk operations that would
+        otherwise need to hash and compare uids.
+
+        Parameters
+        ----------
+        uids : iterable of uuid.UUID
+            uids of the items.
+        item_type : CUBA
+            The type of the items (i.e. CUBA.POINT, CUBA.EDGE, CUBA.FACE
+            or CUBA.CELL).
+
+        Returns
+        -------
+        handles : numpy.ndarray
+            The handles of the items in the same order as the uids.
+
+        Raises
+        ------
+        KeyError :
+            If any of the items is not in the mesh.
+
+        """
+        store = self._get_store(item_type)
+        handle = store.handles.handle
+        handles = []
+        for uid in uids:
+            if uid not in store:
+                raise KeyError(uid)
+            handles.append(handle(uid))
+        return numpy.array(handles, dtype=numpy.intp)
+
+    def get_uids(self, handles, item_type=CUBA.POINT):
+        """ Return the uids of the items with the given handles.
+
+        """
+        return self._get_store(item_type).handles.uids(handles)
+
+    def iter_handles(self, item_type=CUBA.POINT):
+        """ Iterate over the handles of the items of the given type.
+
+        """
+        return self._get_store(item_type).iterhandles()
+
+    def get_coordinates(self, handles=None):
+        """ Return the point coordinates as an (N, 3) array.
+
+        Parameters
+        ----------
+        handles : sequence of int, optional
+            The handles of the points. When not given, the coordinates
+            of all the points are returned in handle order (i.e. the
+            order of ``iter_handles``).
+
+        """
+        store = self._points
+        if handles is None:
+            handles = store.iterhandles()
+        get = store.get_by_handle
+        coordinates = [get(handle).coordinates for handle in handles]
+        return numpy.array(coordinates, dtype=numpy.float64).reshape(-1, 3)
+
+    def get_connectivity(self, item_type):
+        """ Return the element connectivity in compressed sparse row form.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the elements (i.e. CUBA.EDGE, CUBA.FACE or
+            CUBA.CELL).
+
+        Returns
+        -------
+        elements : numpy.ndarray
+            The handles of the elements.
+        offsets : numpy.ndarray
+            Array of length ``len(elements) + 1``. The point handles of
+            ``elements[i]`` are ``points[offsets[i]:offsets[i + 1]]``.
+        points : numpy.ndarray
+            The point handles of all the elements.
+
+        """
+        if item_type == CUBA.POINT:
+            raise ValueError('Points do not have connectivity')
+        store = self._get_store(item_type)
+        elements = numpy.fromiter(store.iterhandles(), dtype=numpy.intp)
+        offsets = numpy.zeros(len(elements) + 1, dtype=numpy.intp)
+        points = []
+        for index, (members, data) in enumerate(store.itervalues()):
+            points.append(members)
+            offsets[index + 1] = offsets[index] + len(members)
+        if points:
+            points = numpy.concatenate(points)
+        else:
+            points = numpy.empty(0, dtype=numpy.intp)
+        return elements, offsets, points
+
+    # Utility methods
+
+    def _get_store(self, item_type):
+        stores = {
+            CUBA.POINT: self._points,
+            CUBA.EDGE: self._edges,
+            CUBA.FACE: self._faces,
+            CUBA.CELL: self._cells}
+        try:
+            return stores[item_type]
+        except KeyError:
+            error_str = "Trying to obtain handles of a non-supported item: {}"
+            raise ValueError(error_str.format(item_type))
+
+    def _encode_element(self, element):
+        """ Convert the element to the internal (point handles, data) record.
+
+        """
+        members = self._points.handles.acquire_many(element.points)
+        return members, dc.DataContainer(element.data)
+
+    def _update_element(self, item_type, store, element):
+        """ Replace the record of an existing element and track the
+        changed fields.
+
+        """
+        old_points, old_data = store[element.uid]
+        record = store[element.uid] = self._encode_element(element)
+        self._points.handles.release_many(old_points)
+        points, data = record
+        if self._changes.tracking:
+            fields = changed_keys(old_data, data)
+            if not numpy.array_equal(old_points, points):
+                fields.add('points')
+            self._changes.updated(item_type, element.uid, fields)
+        self._content.changed(item_type, element.uid)
+
+    def _decode_element(self, factory, uid, record):
+        members, data = record
+        return factory(self._points.handles.uids(members), uid, data)
+
+    def _iter_elements(self, factory, store, uids):
+        if uids is None:
+            for uid, record in store.iteritems():
+                yield self._decode_element(factory, uid, record)
+        else:
+            for uid in uids:
+                yield self._decode_element(factory, uid, store[uid])
+
     def _generate_uuid(self):
         """ Provides a uuid for the object
 
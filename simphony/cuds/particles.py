@@ -1,28 +1,39 @@
 # -*- coding: utf-8 -*-
 import uuid
 
+import numpy
+
 from . import ABCParticles
+from .change_tracker import ChangeTracker, changed_keys
+from .copy_on_write import CopyOnWriteMixin
+from .fingerprint import ContentHash
+from .handle_map import HandleStore
 from .particles_items import Particle, Bond
 from ..core import CUBA
 from ..core.data_container import DataContainer
 
 
-class Particles(ABCParticles):
+class Particles(ABCParticles, CopyOnWriteMixin):
     """Class that represents a container of particles and bonds.
 
     Class provides methods to add particles and bonds, remove them and update
-    them.
+    them. The snapshots of the container (see :meth:`snapshot`) share its
+    particles and bonds until either is modified.
 
     Attributes
     ----------
     name : str
         name of the particle container
-    _particles : dict
+    _particles : HandleStore
         data structure for particles storage
-    _bonds : dict
-        data structure for bonds storage
+    _bonds : HandleStore
+        data structure for bonds storage. The bond members are kept as
+        arrays of particle handles.
     data : DataContainer
         data attributes of the element
+    changes : ChangeTracker
+        the items added, updated or removed since the last sync, recorded
+        once the container is stored in or loaded from a file
 
     """
     cuba_key = CUBA.PARTICLES
@@ -35,10 +46,12 @@ class Particles(ABCParticles):
         name : str
             name of the particle container
         """
-        self._particles = {}
-        self._bonds = {}
+        self._particles = HandleStore()
+        self._bonds = HandleStore()
         self._data = DataContainer()
         self._name = name
+        self._changes = ChangeTracker()
+        self._content = ContentHash(self)
 
         self._items_count = {
             CUBA.PARTICLE: lambda: self._particles,
@@ -59,6 +72,34 @@ class Particles(ABCParticles):
     def uid(self):
         return self._uid
 
+    @property
+    def changes(self):
+        """ The items added, updated or removed since the last sync.
+
+        The changes are recorded once the container is stored in or
+        loaded from a file (see ``H5CUDS.sync_dataset``).
+
+        """
+        return self._changes
+
+    def _content_hash(self):
+        """ The item digests are kept until the items change.
+
+        """
+        return self._content
+
+    def _shallow_copy(self):
+        particles = Particles(self._name)
+        particles._particles = self._particles
+        particles._bonds = self._bonds
+        particles._data = DataContainer(self._data)
+        particles._uid = self._uid
+        return particles
+
+    def _copy_stores(self):
+        self._particles = self._particles.copy()
+        self._bonds = self._bonds.copy()
+
     @property
     def data(self):
         return self._data
@@ -124,10 +165,13 @@ class Particles(ABCParticles):
         >>> particles = Particles(name="foo")
         >>> uids = particles.add_particles(particle_list)
         """
+        self._own()
         uids = []
         for particle in iterable:
             uid = self._add_element(
-                self._particles, particle, clone=Particle.from_particle)
+                self._particles, particle, encode=Particle.from_particle)
+            self._changes.added(CUBA.PARTICLE, uid)
+            self._content.changed(CUBA.PARTICLE, uid)
             uids.append(uid)
         return uids
 
@@ -158,9 +202,12 @@ class Particles(ABCParticles):
         >>> particles = Particles(name="foo")
         >>> particles.add_bond(bonds_list)
         """
+        self._own()
         uids = []
         for bond in iterable:
-            uid = self._add_element(self._bonds, bond, Bond.from_bond)
+            uid = self._add_element(self._bonds, bond, self._encode_bond)
+            self._changes.added(CUBA.BOND, uid)
+            self._content.changed(CUBA.BOND, uid)
             uids.append(uid)
         return uids
 
@@ -189,9 +236,17 @@ class Particles(ABCParticles):
         >>> ... #do whatever you want with the particles
         >>> part_container.update_particles([part1, part2])
         """
+        self._own()
         for particle in iterable:
-            self._update_element(
-                self._particles, particle, clone=Particle.from_particle)
+            old = self._particles.get(particle.uid)
+            new = self._update_element(
+                self._particles, particle, encode=Particle.from_particle)
+            if self._changes.tracking:
+                fields = changed_keys(old.data, new.data)
+                if tuple(old.coordinates) != tuple(new.coordinates):
+                    fields.add('coordinates')
+                self._changes.updated(CUBA.PARTICLE, particle.uid, fields)
+            self._content.changed(CUBA.PARTICLE, particle.uid)
 
     def _update_bonds(self, iterable):
         """Updates a set of bonds from the provided iterable.
@@ -218,8 +273,18 @@ class Particles(ABCParticles):
         >>> ... #do whatever you want with the bonds
         >>> particles.update_bond([bond1, bond2])
         """
+        self._own()
         for bond in iterable:
-            self._update_element(self._bonds, bond, clone=Bond.from_bond)
+            old = self._bonds.get(bond.uid)
+            members, data = self._update_element(
+                self._bonds, bond, self._encode_bond)
+            self._particles.handles.release_many(old[0])
+            if self._changes.tracking:
+                fields = changed_keys(old[1], data)
+                if not numpy.array_equal(old[0], members):
+                    fields.add('particles')
+                self._changes.updated(CUBA.BOND, bond.uid, fields)
+            self._content.changed(CUBA.BOND, bond.uid)
 
     def _get_particle(self, uid):
         """Returns a copy of the particle with the 'particle_id' id.
@@ -254,8 +319,7 @@ class Particles(ABCParticles):
         bond : Bond
             A copy of the internally stored bond info.
         """
-        bond = self._bonds[uid]
-        return Bond.from_bond(bond)
+        return self._decode_bond(uid, self._bonds[uid])
 
     def _remove_particles(self, uids):
         """Remove the particles with the provided uids from the container.
@@ -282,8 +346,11 @@ class Particles(ABCParticles):
         or directly
         >>> particles.remove_particles([uid1, uid2])
         """
+        self._own()
         for uid in uids:
             del self._particles[uid]
+            self._changes.removed(CUBA.PARTICLE, uid)
+            self._content.changed(CUBA.PARTICLE, uid)
 
     def _remove_bonds(self, uids):
         """Remove the bonds with the provided uids.
@@ -305,8 +372,13 @@ class Particles(ABCParticles):
         or
         >>> particles.remove_bonds([uid1, uid2])
         """
+        self._own()
         for uid in uids:
+            members, _ = self._bonds[uid]
             del self._bonds[uid]
+            self._particles.handles.release_many(members)
+            self._changes.removed(CUBA.BOND, uid)
+            self._content.changed(CUBA.BOND, uid)
 
     def _iter_particles(self, uids=None):
         """Generator method for iterating over the particles of the container.
@@ -346,11 +418,10 @@ class Particles(ABCParticles):
                 part_container.update_particles([particle])
         """
         if uids is None:
-            return self._iter_all(
-                self._particles, clone=Particle.from_particle)
+            return self._iter_all(self._particles, self._decode_particle)
         else:
             return self._iter_elements(
-                self._particles, uids, clone=Particle.from_particle)
+                self._particles, uids, self._decode_particle)
 
     def _iter_bonds(self, uids=None):
         """Generator method for iterating over the bonds of the container.
@@ -390,10 +461,9 @@ class Particles(ABCParticles):
                 part_container.update_bond(bond)
         """
         if uids is None:
-            return self._iter_all(self._bonds, clone=Bond.from_bond)
+            return self._iter_all(self._bonds, self._decode_bond)
         else:
-            return self._iter_elements(
-                self._bonds, uids, clone=Bond.from_bond)
+            return self._iter_elements(self._bonds, uids, self._decode_bond)
 
     def _has_particle(self, uid):
         """Checks if a particle with the given uid already exists
@@ -405,36 +475,162 @@ class Particles(ABCParticles):
         in the container."""
         return uid in self._bonds
 
+    # Handle based access ###################################################
+
+    def get_handles(self, uids, item_type=CUBA.PARTICLE):
+        """Return the integer handles of the items with the given uids.
+
+        Handles are dense integers assigned by the container to every
+        item. They stay fixed while the item is in the container and can
+        be used with the other handle based methods for bulk operations
+        that would otherwise need to hash and compare uids.
+
+        Parameters
+        ----------
+        uids : iterable of uuid.UUID
+            the uids of the items.
+        item_type : CUBA
+            The type of the items (CUBA.PARTICLE or CUBA.BOND).
+
+        Returns
+        -------
+        handles : numpy.ndarray
+            The handles of the items in the same order as the uids.
+
+        Raises
+        ------
+        KeyError :
+            If any of the items is not in the container.
+
+        """
+        store = self._get_store(item_type)
+        handle = store.handles.handle
+        handles = []
+        for uid in uids:
+            if uid not in store:
+                raise KeyError(uid)
+            handles.append(handle(uid))
+        return numpy.array(handles, dtype=numpy.intp)
+
+    def get_uids(self, handles, item_type=CUBA.PARTICLE):
+        """Return the uids of the items with the given handles.
+
+        """
+        return self._get_store(item_type).handles.uids(handles)
+
+    def iter_handles(self, item_type=CUBA.PARTICLE):
+        """Iterate over the handles of the items of the given type.
+
+        """
+        return self._get_store(item_type).iterhandles()
+
+    def get_coordinates(self, handles=None):
+        """Return the particle coordinates as an (N, 3) array.
+
+        Parameters
+        ----------
+        handles : sequence of int, optional
+            The handles of the particles. When not given, the coordinates
+            of all the particles are returned in handle order (i.e. the
+            order of ``iter_handles``).
+
+        """
+        store = self._particles
+        if handles is None:
+            handles = store.iterhandles()
+        get = store.get_by_handle
+        coordinates = [get(handle).coordinates for handle in handles]
+        return numpy.array(coordinates, dtype=numpy.float64).reshape(-1, 3)
+
+    def get_bond_connectivity(self):
+        """Return the bond connectivity in compressed sparse row form.
+
+        Returns
+        -------
+        bonds : numpy.ndarray
+            The handles of the bonds.
+        offsets : numpy.ndarray
+            Array of length ``len(bonds) + 1``. The particle handles of
+            ``bonds[i]`` are ``members[offsets[i]:offsets[i + 1]]``.
+        members : numpy.ndarray
+            The particle handles of all the bond members.
+
+        """
+        store = self._bonds
+        bonds = numpy.fromiter(store.iterhandles(), dtype=numpy.intp)
+        offsets = numpy.zeros(len(bonds) + 1, dtype=numpy.intp)
+        members = []
+        for index, (uid, record) in enumerate(store.iteritems()):
+            members.append(record[0])
+            offsets[index + 1] = offsets[index] + len(record[0])
+        if members:
+            members = numpy.concatenate(members)
+        else:
+            members = numpy.empty(0, dtype=numpy.intp)
+        return bonds, offsets, members
+
     # Utility methods ########################################################
 
-    def _iter_elements(self, cur_dict, cur_ids, clone):
+    def _get_store(self, item_type):
+        if item_type == CUBA.PARTICLE:
+            return self._particles
+        elif item_type == CUBA.BOND:
+            return self._bonds
+        else:
+            error_str = "Trying to obtain handles of a non-supported item: {}"
+            raise ValueError(error_str.format(item_type))
+
+    def _decode_particle(self, uid, particle):
+        return Particle.from_particle(particle)
+
+    def _encode_bond(self, bond):
+        """ Convert the bond to the internal (members, data) record.
+
+        """
+        members = self._particles.handles.acquire_many(bond.particles)
+        return members, DataContainer(bond.data)
+
+    def _decode_bond(self, uid, record):
+        members, data = record
+        return Bond(
+            particles=self._particles.handles.uids(members),
+            uid=uuid.UUID(bytes=uid.bytes),
+            data=DataContainer(data))
+
+    def _iter_elements(self, store, cur_ids, decode):
         for cur_id in cur_ids:
-            item = cur_dict[cur_id]
-            yield clone(item)
+            yield decode(cur_id, store[cur_id])
 
-    def _iter_all(self, cur_dict, clone):
-        for cur_element in cur_dict.itervalues():
-            yield clone(cur_element)
+    def _iter_all(self, store, decode):
+        for cur_id, cur_element in store.iteritems():
+            yield decode(cur_id, cur_element)
 
-    def _add_element(self, cur_dict, element, clone):
-        # We check if the current dictionary has the element
+    def _add_element(self, store, element, encode):
+        # We check if the current store has the element
         cur_id = element.uid
         if cur_id is None:
             cur_id = uuid.uuid4()
             element.uid = cur_id
-            cur_dict[cur_id] = clone(element)
+            store[cur_id] = encode(element)
         else:
-            if cur_id not in cur_dict:
-                # Means the element is not in the dict - hence we can add it
-                cur_dict[cur_id] = clone(element)
+            if not isinstance(cur_id, uuid.UUID):
+                message = ('Expected type for `uid` is uuid.UUID but '
+                           'received {!r}')
+                raise AttributeError(message.format(type(cur_id)))
+            # Keep a private copy of the uid
+            cur_id = uuid.UUID(bytes=cur_id.bytes)
+            if cur_id not in store:
+                # Means the element is not in the store - hence we can add it
+                store[cur_id] = encode(element)
             else:
                 message = "Item with id:{} already exists"
                 raise ValueError(message.format(element))
         return cur_id
 
-    def _update_element(self, cur_dict, element, clone):
+    def _update_element(self, store, element, encode):
         uid = element.uid
-        if uid in cur_dict:
-            cur_dict[uid] = clone(element)
+        if uid in store:
+            store[uid] = record = encode(element)
+            return record
         else:
             raise ValueError('id: {} does not exist'.format(uid))
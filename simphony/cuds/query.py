@@ -0,0 +1,289 @@
+""" Attribute queries over the components of a CUDS model
+
+This module contains the predicates of :meth:`CUDS.find` on the values
+of the CUBA keys of the components, and the attribute indexes that
+:meth:`CUDS.create_index` builds to select the candidate components of
+a query without reading the data of every component.
+
+"""
+import bisect
+import numbers
+import uuid
+from collections import namedtuple
+
+import numpy
+
+from ..core import CUBA
+
+#: The statistics of a query (see :meth:`CUDS.explain`).
+QueryStatistics = namedtuple(
+    'QueryStatistics', ['index', 'candidates', 'matches'])
+
+
+class Equals(object):
+    """ The value of the CUBA key equals a value.
+
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, value):
+        expected = _scalar(self.value)
+        value = _scalar(value)
+        if is_reference(expected) or is_reference(value):
+            return (is_reference(expected) and is_reference(value) and
+                    _reference_uid(value) == _reference_uid(expected))
+        if isinstance(expected, numpy.ndarray) or isinstance(
+                value, numpy.ndarray):
+            return numpy.array_equal(value, expected)
+        if isinstance(value, list) and isinstance(expected, list):
+            return (len(value) == len(expected) and
+                    all(Equals(item)(other)
+                        for item, other in zip(expected, value)))
+        return value == expected
+
+    def index_keys(self):
+        """ Return the index keys of the candidates or None when the value
+        cannot be looked up.
+
+        """
+        if isinstance(self.value, (list, tuple)):
+            return None
+        try:
+            keys = index_keys(self.value)
+        except TypeError:
+            return None
+        return keys if len(keys) == 1 else None
+
+    def __repr__(self):
+        return 'Equals({!r})'.format(self.value)
+
+
+class Range(object):
+    """ The value of the CUBA key is a number within the inclusive bounds.
+
+    """
+
+    def __init__(self, minimum=None, maximum=None):
+        """ Describe the range.
+
+        Parameters
+        ----------
+        minimum : number, optional
+            The smallest value, default is no lower bound.
+        maximum : number, optional
+            The largest value, default is no upper bound.
+
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __call__(self, value):
+        value = _scalar(value)
+        if (not isinstance(value, (numbers.Number, numpy.number)) or
+                isinstance(value, bool)):
+            return False
+        return ((self.minimum is None or value >= self.minimum) and
+                (self.maximum is None or value <= self.maximum))
+
+    def __repr__(self):
+        return 'Range({!r}, {!r})'.format(self.minimum, self.maximum)
+
+
+class References(object):
+    """ The value of the CUBA key is, or is a list that contains, a
+    component or a dataset.
+
+    """
+
+    def __init__(self, component):
+        """ Describe the reference.
+
+        Parameters
+        ----------
+        component : {CUDSComponent, ABCDataset, uuid.UUID}
+            The referenced component, or its uid.
+
+        """
+        self.uid = _reference_uid(component)
+
+    def __call__(self, value):
+        items = value if isinstance(value, list) else [value]
+        return any(
+            is_reference(item) and _reference_uid(item) == self.uid
+            for item in items)
+
+    def index_keys(self):
+        return [self.uid]
+
+    def __repr__(self):
+        return 'References({!r})'.format(self.uid)
+
+
+def predicate(value):
+    """ Return the predicate of a value of :meth:`CUDS.find`.
+
+    The predicate objects are returned unchanged, the components, the
+    datasets and the uids are :class:`References` and the other values
+    are :class:`Equals` predicates.
+
+    """
+    if isinstance(value, (Equals, Range, References)):
+        return value
+    if is_reference(value):
+        return References(value)
+    return Equals(value)
+
+
+def predicate_key(name):
+    """ Return the CUBA key of a keyword argument of :meth:`CUDS.find`.
+
+    Raises
+    ------
+    ValueError :
+        If the name is not a CUBA key.
+
+    """
+    try:
+        return CUBA[name.upper()]
+    except KeyError:
+        raise ValueError('Unknown CUBA key {!r}'.format(name))
+
+
+def is_reference(value):
+    """ Return True if the value is a component, a dataset or a uid.
+
+    """
+    return isinstance(value, uuid.UUID) or (
+        hasattr(value, 'cuba_key') and hasattr(value, 'uid'))
+
+
+def index_keys(value):
+    """ Return the keys of a value in an attribute index.
+
+    The components and the datasets are indexed by uid, the items of the
+    lists are indexed separately and the numpy scalars as Python numbers.
+
+    Raises
+    ------
+    TypeError :
+        If the value cannot be indexed.
+
+    """
+    if value is None:
+        return []
+    if is_reference(value):
+        return [_reference_uid(value)]
+    if isinstance(value, list):
+        keys = []
+        for item in value:
+            keys.extend(index_keys(item))
+        return keys
+    value = _scalar(value)
+    if isinstance(value, numpy.ndarray):
+        raise TypeError('Arrays are not indexed')
+    hash(value)
+    return [value]
+
+
+class AttributeIndex(object):
+    """ The uids of the components by the values of a CUBA key.
+
+    The components with values that cannot be indexed (e.g. arrays) are
+    kept apart and are candidates of every lookup.
+
+    """
+
+    def __init__(self, key):
+        self.key = key
+        # index key -> set of uids
+        self._uids = {}
+        # uid -> index keys
+        self._keys = {}
+        # the uids of the components with values that are not indexed
+        self._unindexed = set()
+        # the sorted numeric index keys, None when out of date
+        self._sorted = None
+
+    def add(self, uid, data):
+        """ Index the value of the key in the data of a component.
+
+        """
+        if self.key not in data:
+            return
+        try:
+            keys = index_keys(data[self.key])
+        except TypeError:
+            self._unindexed.add(uid)
+            return
+        keys = set(keys)
+        self._keys[uid] = keys
+        for key in keys:
+            self._uids.setdefault(key, set()).add(uid)
+        self._sorted = None
+
+    def copy(self):
+        """ Return an independent copy of the index.
+
+        """
+        index = AttributeIndex(self.key)
+        index._uids = {
+            key: set(uids) for key, uids in self._uids.iteritems()}
+        index._keys = dict(self._keys)
+        index._unindexed = set(self._unindexed)
+        return index
+
+    def remove(self, uid):
+        """ Remove a component from the index.
+
+        """
+        self._unindexed.discard(uid)
+        for key in self._keys.pop(uid, ()):
+            uids = self._uids[key]
+            uids.discard(uid)
+            if not uids:
+                del self._uids[key]
+        self._sorted = None
+
+    def lookup(self, condition):
+        """ Return the uids of the candidates of a predicate, or None when
+        the predicate cannot use the index.
+
+        """
+        if isinstance(condition, Range):
+            if self._sorted is None:
+                self._sorted = sorted(
+                    key for key in self._uids
+                    if isinstance(key, numbers.Number) and
+                    not isinstance(key, bool))
+            keys = self._sorted
+            start = (0 if condition.minimum is None
+                     else bisect.bisect_left(keys, condition.minimum))
+            stop = (len(keys) if condition.maximum is None
+                    else bisect.bisect_right(keys, condition.maximum))
+            keys = keys[start:stop]
+        else:
+            keys = condition.index_keys()
+            if keys is None:
+                return None
+        uids = set(self._unindexed)
+        for key in keys:
+            uids.update(self._uids.get(key, ()))
+        return uids
+
+
+def _reference_uid(value):
+    return value if isinstance(value, uuid.UUID) else value.uid
+
+
+def _scalar(value):
+    """ Return the numpy scalars and the arrays of one value as Python
+    values.
+
+    """
+    if isinstance(value, numpy.ndarray) and value.shape in ((), (1,)):
+        return value.item()
+    elif isinstance(value, numpy.generic):
+        return value.item()
+    return value
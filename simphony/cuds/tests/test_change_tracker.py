@@ -0,0 +1,129 @@
+import unittest
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.change_tracker import (
+    ADDED, REMOVED, UPDATED, ChangeTracker, changed_keys)
+
+
+class TestChangeTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = ChangeTracker()
+        self.changes.start()
+
+    def test_empty(self):
+        self.assertEqual(len(self.changes), 0)
+        self.assertEqual(self.changes.item_types(), [])
+        self.assertEqual(self.changes.updates(CUBA.PARTICLE), {})
+
+    def test_start_and_stop(self):
+        # given
+        changes = ChangeTracker()
+
+        # when
+        changes.added(CUBA.PARTICLE, 'a')
+        changes.removed(CUBA.PARTICLE, 'b')
+        changes.updated(CUBA.PARTICLE, 'c')
+
+        # then
+        self.assertFalse(changes.tracking)
+        self.assertEqual(len(changes), 0)
+
+        # when
+        changes.start()
+        changes.added(CUBA.PARTICLE, 'a')
+
+        # then
+        self.assertTrue(changes.tracking)
+        self.assertEqual(len(changes), 1)
+
+        # when
+        changes.stop()
+        changes.added(CUBA.PARTICLE, 'b')
+
+        # then
+        self.assertFalse(changes.tracking)
+        self.assertEqual(len(changes), 0)
+
+    def test_added_item_stays_added(self):
+        # when
+        self.changes.added(CUBA.PARTICLE, 'a')
+        self.changes.updated(CUBA.PARTICLE, 'a', {'coordinates'})
+
+        # then
+        self.assertEqual(self.changes.keys(ADDED, CUBA.PARTICLE), ['a'])
+        self.assertEqual(self.changes.keys(UPDATED, CUBA.PARTICLE), [])
+
+    def test_added_and_removed_item_is_forgotten(self):
+        # when
+        self.changes.added(CUBA.PARTICLE, 'a')
+        self.changes.removed(CUBA.PARTICLE, 'a')
+
+        # then
+        self.assertEqual(len(self.changes), 0)
+
+    def test_updated_and_removed_item_is_removed(self):
+        # when
+        self.changes.updated(CUBA.BOND, 'a', {CUBA.MASS})
+        self.changes.removed(CUBA.BOND, 'a')
+
+        # then
+        self.assertEqual(self.changes.keys(REMOVED, CUBA.BOND), ['a'])
+        self.assertEqual(self.changes.updates(CUBA.BOND), {})
+
+    def test_removed_and_added_item_is_updated(self):
+        # when
+        self.changes.removed(CUBA.POINT, 'a')
+        self.changes.added(CUBA.POINT, 'a')
+
+        # then
+        self.assertEqual(self.changes.keys(REMOVED, CUBA.POINT), [])
+        self.assertIsNone(self.changes.fields(CUBA.POINT, 'a'))
+        self.assertEqual(
+            self.changes.updates(CUBA.POINT), {(True, True): ['a']})
+
+    def test_updated_fields_are_merged(self):
+        # when
+        self.changes.updated(CUBA.PARTICLE, 'a', {'coordinates'})
+        self.changes.updated(CUBA.PARTICLE, 'a', {CUBA.MASS})
+        self.changes.updated(CUBA.PARTICLE, 'b', {'coordinates'})
+        self.changes.updated(CUBA.PARTICLE, 'c', {CUBA.MASS})
+        self.changes.updated(CUBA.PARTICLE, 'd', set())
+
+        # then
+        self.assertEqual(
+            self.changes.fields(CUBA.PARTICLE, 'a'),
+            {'coordinates', CUBA.MASS})
+        self.assertEqual(
+            self.changes.updates(CUBA.PARTICLE),
+            {(True, True): ['a'], (True, False): ['b'],
+             (False, True): ['c']})
+
+    def test_clear(self):
+        # given
+        self.changes.added(CUBA.PARTICLE, 'a')
+
+        # when
+        self.changes.clear()
+
+        # then
+        self.assertEqual(len(self.changes), 0)
+
+
+class TestChangedKeys(unittest.TestCase):
+
+    def test_changed_keys(self):
+        # given
+        old = DataContainer(MASS=1.0, VELOCITY=(0, 0, 0), NAME='foo')
+        new = DataContainer(MASS=1.0, VELOCITY=(0, 0, 1), CHARGE=1.0)
+
+        # then
+        self.assertEqual(
+            changed_keys(old, new),
+            {CUBA.VELOCITY, CUBA.NAME, CUBA.CHARGE})
+        self.assertEqual(changed_keys(old, DataContainer(old)), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
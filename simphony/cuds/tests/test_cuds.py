@@ -7,6 +7,7 @@ from simphony.api import CUDS
 from simphony.cuds.meta import api
 from simphony.cuds.particles import Particles
 from simphony.cuds.particles_items import Particle
+from simphony.cuds.query import Equals, Range, References
 
 
 class CUDSTestCase(unittest.TestCase):
@@ -220,6 +221,161 @@ class CUDSTestCase(unittest.TestCase):
 
         self.assertEqual(updated_component.name, 'updated box')
 
+    def test_cuds_update_renamed_component(self):
+        component = api.Box(name='a box')
+        c = CUDS()
+        c.add([component, self.named_cuds_1])
+
+        component.name = 'updated box'
+        c.update([component])
+
+        self.assertIs(c.get_by_name('updated box'), component)
+        self.assertRaises(KeyError, c.get_by_name, 'a box')
+        c.add([api.Box(name='a box')])
+        self.assertRaises(
+            ValueError, c.update, [api.Box(name=self.named_cuds_1.name)])
+        component.name = self.named_cuds_1.name
+        self.assertRaises(ValueError, c.update, [component])
+
+    def test_get_by_name_of_renamed_component(self):
+        c = CUDS()
+        c.add([self.named_cuds_1])
+
+        self.named_cuds_1.name = 'renamed box'
+
+        self.assertIs(c.get_by_name('renamed box'), self.named_cuds_1)
+        self.assertRaises(KeyError, c.get_by_name, 'mybox')
+        c.add([api.Box(name='mybox')])
+
+    def test_type_queries_include_parent_types(self):
+        dataset = Particles('M1')
+        c = CUDS()
+        c.add([self.named_cuds_1, self.named_cuds_2, self.nameless_cuds_1,
+               api.Material(name='steel'), dataset])
+
+        self.assertEqual(c.count_of(CUBA.BOX), 3)
+        self.assertEqual(c.count_of(CUBA.BOUNDARY), 3)
+        self.assertEqual(c.count_of(CUBA.CUDS_COMPONENT), 4)
+        self.assertEqual(c.count_of(CUBA.MATERIAL), 1)
+        self.assertEqual(c.count_of(CUBA.PARTICLES), 1)
+        self.assertEqual(c.count_of(CUBA.DATA_SET), 1)
+        self.assertTrue(c.has_type(CUBA.BOUNDARY))
+        self.assertFalse(c.has_type(CUBA.MESH))
+        self.assertEqual(
+            set(c.iter(item_type=CUBA.BOUNDARY)),
+            {self.named_cuds_1, self.named_cuds_2, self.nameless_cuds_1})
+        self.assertEqual(
+            list(c.iter(uids=[self.named_cuds_1.uid, dataset.uid],
+                        item_type=CUBA.BOX)),
+            [self.named_cuds_1])
+
+        c.remove([self.named_cuds_2.uid, dataset.uid])
+
+        self.assertEqual(c.count_of(CUBA.BOUNDARY), 2)
+        self.assertEqual(list(c.iter(item_type=CUBA.PARTICLES)), [])
+        self.assertFalse(c.has_type(CUBA.DATA_SET))
+
+    def test_add_replaces_component_with_same_uid(self):
+        c = CUDS()
+        c.add([self.named_cuds_1])
+        material = api.Material(name='steel')
+        data = material.data
+        data[CUBA.UID] = self.named_cuds_1.uid
+        material.data = data
+
+        c.add([material])
+
+        self.assertEqual(len(c), 1)
+        self.assertEqual(c.count_of(CUBA.BOX), 0)
+        self.assertEqual(c.count_of(CUBA.MATERIAL), 1)
+        self.assertRaises(KeyError, c.get_by_name, 'mybox')
+        self.assertIs(c.get_by_name('steel'), material)
+
+    def create_materials(self, c):
+        materials = []
+        for i in range(10):
+            material = api.Material(name='material {}'.format(i))
+            data = material.data
+            data[CUBA.DENSITY] = float(i)
+            material.data = data
+            materials.append(material)
+        relations = [
+            api.MaterialRelation(
+                name='relation {}'.format(i), material=materials[i:i + 2])
+            for i in range(9)]
+        c.add(materials + relations)
+        return materials, relations
+
+    def test_find(self):
+        c = CUDS()
+        materials, relations = self.create_materials(c)
+
+        self.assertEqual(
+            set(c.find(CUBA.MATERIAL, density=Range(minimum=7))),
+            set(materials[7:]))
+        self.assertEqual(c.find(density=3.0), [materials[3]])
+        self.assertEqual(
+            c.find(CUBA.MATERIAL, name='material 4', density=4.0),
+            [materials[4]])
+        self.assertEqual(c.find(CUBA.MATERIAL, density=Equals(4.5)), [])
+        self.assertEqual(
+            set(c.find(material=materials[3])), set(relations[2:4]))
+        self.assertEqual(
+            c.find(CUBA.MATERIAL_RELATION,
+                   material=References(materials[0].uid)),
+            [relations[0]])
+        self.assertEqual(len(c.find(CUBA.MATERIAL)), 10)
+        self.assertEqual(c.find(CUBA.BOX, density=1.0), [])
+        self.assertRaises(ValueError, c.find, dencity=1.0)
+
+    def test_find_with_attribute_index(self):
+        c = CUDS()
+        materials, relations = self.create_materials(c)
+
+        self.assertEqual(
+            c.explain(CUBA.MATERIAL, density=Range(2, 3)),
+            (None, 10, 2))
+        self.assertEqual(
+            c.explain(material=materials[3]), (None, 19, 2))
+
+        c.create_index(CUBA.DENSITY)
+        c.create_index(CUBA.MATERIAL)
+
+        self.assertEqual(
+            c.explain(CUBA.MATERIAL, density=Range(2, 3)),
+            (CUBA.DENSITY, 2, 2))
+        self.assertEqual(
+            c.explain(material=materials[3]), (CUBA.MATERIAL, 2, 2))
+        self.assertEqual(
+            set(c.find(CUBA.MATERIAL, density=Range(2, 3))),
+            set(materials[2:4]))
+
+        # the indexes follow the modifications of the model
+        material = api.Material(name='new material')
+        data = material.data
+        data[CUBA.DENSITY] = 2.5
+        material.data = data
+        c.add([material])
+        c.remove([materials[2].uid])
+        data = materials[3].data
+        data[CUBA.DENSITY] = 10.0
+        materials[3].data = data
+        c.update([materials[3]])
+
+        self.assertEqual(
+            c.explain(CUBA.MATERIAL, density=Range(2, 3)),
+            (CUBA.DENSITY, 1, 1))
+        self.assertEqual(
+            c.find(CUBA.MATERIAL, density=Range(2, 3)), [material])
+        self.assertEqual(
+            set(c.find(CUBA.MATERIAL, density=10.0)), {materials[3]})
+
+        c.remove_index(CUBA.DENSITY)
+
+        self.assertEqual(
+            c.explain(CUBA.MATERIAL, density=Range(2, 3)).index, None)
+        self.assertRaises(KeyError, c.remove_index, CUBA.DENSITY)
+
     def test_cuds_update_invalid_component(self):
         component = api.Box(name='a box')
 
@@ -0,0 +1,167 @@
+"""Tests for the content fingerprints of CUDS models and datasets."""
+import unittest
+import uuid
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import CUDS
+from simphony.cuds.fingerprint import ContentHash, fingerprint
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.meta import api
+from simphony.cuds.mesh import Mesh
+from simphony.cuds.mesh_items import Edge, Point
+from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Bond, Particle
+
+
+class FingerprintTestCase(unittest.TestCase):
+    """Tests for the fingerprints of the datasets and the models."""
+
+    def setUp(self):
+        self.particles = [
+            Particle(
+                coordinates=(i, 0, 0), uid=uuid.uuid4(),
+                data=DataContainer(MASS=i, VELOCITY=(1, 2, 3)))
+            for i in range(20)]
+        self.bond = Bond(
+            particles=[particle.uid for particle in self.particles[:3]],
+            uid=uuid.uuid4())
+
+    def create_particles(self, particles, name='particles'):
+        container = Particles(name)
+        container.add(particles)
+        container.add([self.bond])
+        return container
+
+    def test_particles_fingerprint_is_independent_of_order(self):
+        first = self.create_particles(self.particles)
+        second = self.create_particles(self.particles[::-1])
+
+        self.assertEqual(first.fingerprint(), second.fingerprint())
+        self.assertEqual(
+            first.chunk_fingerprints(), second.chunk_fingerprints())
+        self.assertNotEqual(
+            first.fingerprint(),
+            self.create_particles(self.particles, 'other').fingerprint())
+
+    def test_particles_fingerprint_follows_changes(self):
+        container = self.create_particles(self.particles)
+        fingerprint = container.fingerprint()
+
+        # the data of the dataset can be modified in place
+        container.data[CUBA.TEMPERATURE] = 300.0
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+        del container.data[CUBA.TEMPERATURE]
+        self.assertEqual(container.fingerprint(), fingerprint)
+
+        bond = container.get(self.bond.uid)
+        bond.particles = bond.particles[:2]
+        container.update([bond])
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+
+        container.remove([self.bond.uid])
+        container.add([self.bond])
+        self.assertEqual(container.fingerprint(), fingerprint)
+
+    def test_values_are_hashed_as_stored(self):
+        first = Particles('particles')
+        first.add([Particle(
+            coordinates=(1, 2, 3), uid=self.particles[0].uid,
+            data=DataContainer(MASS=1))])
+        second = Particles('particles')
+        second.add([Particle(
+            coordinates=(1.0, 2.0, 3.0), uid=self.particles[0].uid,
+            data=DataContainer(MASS=1.0))])
+
+        self.assertEqual(first.fingerprint(), second.fingerprint())
+
+    def test_mesh_fingerprint(self):
+        mesh = Mesh('mesh')
+        points = mesh.add([Point((0, 0, 0)), Point((1, 1, 1))])
+        empty = Mesh('mesh').fingerprint()
+        fingerprint = mesh.fingerprint()
+
+        mesh.add([Edge(points)])
+
+        self.assertNotEqual(fingerprint, empty)
+        self.assertNotEqual(mesh.fingerprint(), fingerprint)
+        self.assertEqual(mesh.fingerprint(), ContentHash(mesh).hexdigest())
+
+    def test_lattice_fingerprint(self):
+        first = make_cubic_lattice('lattice', 1.0, (3, 4, 5))
+        second = make_cubic_lattice('lattice', 1.0, (3, 4, 5), (1, 0, 0))
+        third = make_cubic_lattice('lattice', 2.0, (3, 4, 5))
+
+        self.assertEqual(
+            first.fingerprint(),
+            make_cubic_lattice('lattice', 1.0, (3, 4, 5)).fingerprint())
+        self.assertNotEqual(first.fingerprint(), second.fingerprint())
+        self.assertNotEqual(first.fingerprint(), third.fingerprint())
+        self.assertEqual(len(first.chunk_fingerprints()), 60)
+
+    def test_model_fingerprint(self):
+        steel = api.Material(name='steel')
+        relation = api.MaterialRelation(name='relation', material=[steel])
+        particles = self.create_particles(self.particles)
+        model = CUDS(name='model')
+        model.add([steel, relation, particles])
+        other = CUDS(name='model')
+        other.add([particles, relation, steel])
+        expected = model.fingerprint()
+
+        self.assertEqual(other.fingerprint(), expected)
+        self.assertEqual(fingerprint(model), expected)
+
+        # the datasets of the model
+        particles.remove([self.particles[0].uid])
+        self.assertNotEqual(model.fingerprint(), expected)
+        particles.add([self.particles[0]])
+        self.assertEqual(model.fingerprint(), expected)
+
+        # the components of the model
+        model.remove([relation.uid])
+        self.assertNotEqual(model.fingerprint(), expected)
+
+    def test_model_keeps_the_component_digests(self):
+        steel = api.Material(name='steel')
+        model = CUDS(name='model')
+        model.add([steel])
+        expected = model.fingerprint()
+        self.assertIn(steel.uid, model._digests)
+
+        data = steel.data
+        data[CUBA.DESCRIPTION] = 'hardened'
+        steel.data = data
+        model.update([steel])
+        self.assertNotEqual(model.fingerprint(), expected)
+
+        snapshot = model.snapshot()
+        self.assertEqual(snapshot.fingerprint(), model.fingerprint())
+        snapshot.remove([steel.uid])
+        self.assertNotIn(steel.uid, snapshot._digests)
+        self.assertIn(steel.uid, model._digests)
+
+    def test_component_fingerprint(self):
+        steel = api.Material(name='steel')
+        iron = api.Material(name='iron')
+        first = api.MaterialRelation(material=[steel])
+        second = api.MaterialRelation(material=[iron])
+        data = second.data
+        data[CUBA.UID] = first.uid
+        second.data = data
+
+        self.assertEqual(fingerprint(steel), fingerprint(steel))
+        self.assertNotEqual(fingerprint(steel), fingerprint(iron))
+        self.assertNotEqual(fingerprint(first), fingerprint(second))
+
+    def test_unsupported_value(self):
+        container = Particles('particles')
+        container.data = DataContainer(NAME='particles')
+        container.data[CUBA.NAME] = object()
+
+        with self.assertRaises(TypeError):
+            container.fingerprint()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import uuid
+
+from numpy.testing import assert_array_equal
+
+from simphony.cuds.handle_map import HandleMap, HandleStore
+
+
+class TestHandleMap(unittest.TestCase):
+
+    def setUp(self):
+        self.uids = [uuid.uuid4() for _ in range(5)]
+
+    def test_acquire_assigns_dense_handles(self):
+        handles = HandleMap()
+        for index, uid in enumerate(self.uids):
+            self.assertEqual(handles.acquire(uid), index)
+        self.assertEqual(len(handles), len(self.uids))
+
+    def test_acquire_is_idempotent(self):
+        handles = HandleMap()
+        handle = handles.acquire(self.uids[0])
+        self.assertEqual(handles.acquire(self.uids[0]), handle)
+        self.assertEqual(len(handles), 1)
+
+    def test_bidirectional_lookup(self):
+        handles = HandleMap()
+        result = handles.acquire_many(self.uids)
+        assert_array_equal(result, range(5))
+        for uid in self.uids:
+            self.assertEqual(handles.uid(handles.handle(uid)), uid)
+        self.assertEqual(handles.uids(result), self.uids)
+        self.assertIn(self.uids[2], handles)
+
+    def test_unknown_uid(self):
+        handles = HandleMap()
+        with self.assertRaises(KeyError):
+            handles.handle(uuid.uuid4())
+        self.assertNotIn(uuid.uuid4(), handles)
+
+    def test_released_handle_is_reused(self):
+        handles = HandleMap()
+        handles.acquire_many(self.uids[:3])
+        handles.acquire(self.uids[1])
+
+        handles.release(1)
+        self.assertEqual(handles.handle(self.uids[1]), 1)
+        handles.release(1)
+
+        self.assertNotIn(self.uids[1], handles)
+        self.assertIsNone(handles.uid(1))
+        self.assertEqual(handles.acquire(self.uids[3]), 1)
+        self.assertEqual(handles.acquire(self.uids[4]), 3)
+        self.assertEqual(len(handles), 4)
+
+    def test_copy_is_independent(self):
+        handles = HandleMap()
+        handles.acquire(self.uids[0])
+        copy = handles.copy()
+        copy.acquire(self.uids[1])
+        self.assertEqual(len(handles), 1)
+        self.assertEqual(len(copy), 2)
+
+
+class TestHandleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.uids = [uuid.uuid4() for _ in range(5)]
+        self.store = HandleStore()
+        for index, uid in enumerate(self.uids):
+            self.store[uid] = index
+
+    def test_mapping_api(self):
+        store = self.store
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store[self.uids[3]], 3)
+        self.assertIn(self.uids[3], store)
+        store[self.uids[3]] = 30
+        self.assertEqual(store[self.uids[3]], 30)
+        self.assertEqual(len(store), 5)
+
+    def test_delete_keeps_handles(self):
+        store = self.store
+        handle = store.handles.handle(self.uids[4])
+        del store[self.uids[1]]
+        self.assertEqual(len(store), 4)
+        self.assertNotIn(self.uids[1], store)
+        self.assertEqual(store.handles.handle(self.uids[4]), handle)
+        self.assertEqual(list(store.iterhandles()), [0, 2, 3, 4])
+        with self.assertRaises(KeyError):
+            store[self.uids[1]]
+        with self.assertRaises(KeyError):
+            del store[self.uids[1]]
+
+    def test_readd_reuses_handle(self):
+        store = self.store
+        del store[self.uids[1]]
+        store[self.uids[1]] = 'a'
+        self.assertEqual(store.handles.handle(self.uids[1]), 1)
+        self.assertEqual(store.get_by_handle(1), 'a')
+
+    def test_delete_and_add_reuses_the_slot(self):
+        store = self.store
+        del store[self.uids[1]]
+        uid = uuid.uuid4()
+        store[uid] = 'a'
+        self.assertEqual(store.handles.handle(uid), 1)
+        self.assertNotIn(self.uids[1], store.handles)
+        self.assertEqual(len(store.handles), 5)
+        self.assertEqual(len(store), 5)
+
+    def test_referenced_handle_is_kept(self):
+        store = self.store
+        store.handles.acquire(self.uids[1])
+        del store[self.uids[1]]
+        store[uuid.uuid4()] = 'a'
+        self.assertEqual(store.handles.handle(self.uids[1]), 1)
+        self.assertEqual(store.handles.handle(store.handles.uid(5)), 5)
+
+    def test_referenced_only_uid(self):
+        store = self.store
+        uid = uuid.uuid4()
+        store.handles.acquire(uid)
+        self.assertNotIn(uid, store)
+        self.assertEqual(len(store), 5)
+        with self.assertRaises(KeyError):
+            store[uid]
+
+    def test_iteration(self):
+        store = self.store
+        self.assertEqual(list(store.itervalues()), range(5))
+        self.assertEqual(
+            list(store.iteritems()), list(zip(self.uids, range(5))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -222,5 +222,22 @@ class TestLatticeFactories(unittest.TestCase):
         assert_array_equal(lattice.origin, (0, 0, 0))
 
 
+class TestLatticeChanges(unittest.TestCase):
+
+    def test_updated_nodes(self):
+        # given
+        lattice = make_cubic_lattice('foo', 1.0, (2, 3, 4))
+        lattice.changes.start()
+        node = lattice.get((1, 2, 3))
+        node.data[CUBA.DENSITY] = 2.0
+
+        # when
+        lattice.update([node, lattice.get((0, 0, 0))])
+
+        # then
+        self.assertEqual(
+            lattice.changes.updates(CUBA.NODE), {(False, True): [(1, 2, 3)]})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,13 @@
 import unittest
+import uuid
+
+from numpy.testing import assert_array_equal
 
 from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.change_tracker import ADDED
 from simphony.cuds.mesh import Mesh
+from simphony.cuds.mesh_items import Point, Cell, Edge
 from simphony.testing.abc_check_mesh import (
     CheckMeshPointOperations, CheckMeshEdgeOperations,
     CheckMeshFaceOperations, CheckMeshCellOperations,
@@ -53,5 +59,84 @@ class TestMeshContainer(CheckMeshContainer, unittest.TestCase):
         return set(CUBA)
 
 
+class TestMeshHandles(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = Mesh(name='foo')
+        self.point_uids = self.mesh.add(
+            [Point(coordinates=(i, 0, 0)) for i in range(5)])
+        self.cell_uids = self.mesh.add([
+            Cell(points=self.point_uids[:4]),
+            Cell(points=self.point_uids[1:])])
+        self.external = uuid.uuid4()
+        self.edge_uids = self.mesh.add(
+            [Edge(points=[self.point_uids[0], self.external])])
+
+    def test_handles_round_trip(self):
+        mesh = self.mesh
+        handles = mesh.get_handles(self.point_uids)
+        assert_array_equal(handles, range(5))
+        self.assertEqual(mesh.get_uids(handles), self.point_uids)
+        handles = mesh.get_handles(self.cell_uids, item_type=CUBA.CELL)
+        self.assertEqual(
+            mesh.get_uids(handles, item_type=CUBA.CELL), self.cell_uids)
+        self.assertEqual(list(mesh.iter_handles(CUBA.CELL)), [0, 1])
+
+    def test_get_coordinates(self):
+        coordinates = self.mesh.get_coordinates()
+        assert_array_equal(coordinates[:, 0], range(5))
+
+    def test_get_connectivity(self):
+        mesh = self.mesh
+        cells, offsets, points = mesh.get_connectivity(CUBA.CELL)
+        assert_array_equal(offsets, [0, 4, 8])
+        assert_array_equal(points, [0, 1, 2, 3, 1, 2, 3, 4])
+        edges, offsets, points = mesh.get_connectivity(CUBA.EDGE)
+        self.assertEqual(
+            mesh.get_uids(points), [self.point_uids[0], self.external])
+        with self.assertRaises(ValueError):
+            mesh.get_connectivity(CUBA.POINT)
+
+    def test_elements_keep_uid_api(self):
+        edge = self.mesh.get(self.edge_uids[0])
+        self.assertEqual(edge.points, [self.point_uids[0], self.external])
+        with self.assertRaises(KeyError):
+            self.mesh.get_handles([self.external])
+
+
+class TestMeshChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = Mesh(name='foo')
+        self.mesh.changes.start()
+        self.point_uids = self.mesh.add(
+            [Point(coordinates=(i, 0, 0)) for i in range(4)])
+        self.cell_uids = self.mesh.add([Cell(points=self.point_uids)])
+
+    def test_added_items(self):
+        changes = self.mesh.changes
+        self.assertEqual(changes.keys(ADDED, CUBA.POINT), self.point_uids)
+        self.assertEqual(changes.keys(ADDED, CUBA.CELL), self.cell_uids)
+
+    def test_updated_fields(self):
+        # given
+        mesh = self.mesh
+        mesh.changes.clear()
+        point = mesh.get(self.point_uids[0])
+        point.data = DataContainer(MASS=1.0)
+        cell = mesh.get(self.cell_uids[0])
+        cell.points = self.point_uids[:3]
+
+        # when
+        mesh.update([point, cell])
+
+        # then
+        changes = mesh.changes
+        self.assertEqual(
+            changes.fields(CUBA.POINT, self.point_uids[0]), {CUBA.MASS})
+        self.assertEqual(
+            changes.fields(CUBA.CELL, self.cell_uids[0]), {'points'})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,13 @@
 import unittest
 import uuid
 
+from numpy.testing import assert_array_equal
+
 from simphony.cuds.particles import Particles
 from simphony.cuds.particles_items import Bond, Particle
 from simphony.core.data_container import DataContainer
 from simphony.core import CUBA
+from simphony.cuds.change_tracker import ADDED, REMOVED
 from simphony.testing.abc_check_particles import (
     CheckManipulatingBonds, CheckAddingParticles,
     CheckAddingBonds, CheckManipulatingParticles,
@@ -107,5 +110,150 @@ class TestParticlesContainer(CheckParticlesContainer, unittest.TestCase):
         return Particles(name=name)
 
 
+class TestParticlesHandles(unittest.TestCase):
+
+    def setUp(self):
+        self.container = Particles(name='foo')
+        self.particles = [
+            Particle(coordinates=(i, i + 0.5, i + 1.0)) for i in range(4)]
+        self.particle_uids = self.container.add(self.particles)
+        self.external = uuid.uuid4()
+        self.bonds = [
+            Bond(particles=self.particle_uids[:2]),
+            Bond(particles=self.particle_uids[1:] + [self.external])]
+        self.bond_uids = self.container.add(self.bonds)
+
+    def test_handles_round_trip(self):
+        container = self.container
+        handles = container.get_handles(self.particle_uids)
+        assert_array_equal(handles, range(4))
+        self.assertEqual(container.get_uids(handles), self.particle_uids)
+        bond_handles = container.get_handles(
+            self.bond_uids, item_type=CUBA.BOND)
+        self.assertEqual(
+            container.get_uids(bond_handles, item_type=CUBA.BOND),
+            self.bond_uids)
+
+    def test_handles_of_missing_item(self):
+        with self.assertRaises(KeyError):
+            self.container.get_handles([self.external])
+        with self.assertRaises(ValueError):
+            self.container.get_handles(self.particle_uids, CUBA.NODE)
+
+    def test_handles_after_remove(self):
+        container = self.container
+        container.remove([self.particle_uids[1]])
+        self.assertEqual(list(container.iter_handles()), [0, 2, 3])
+        assert_array_equal(
+            container.get_handles([self.particle_uids[3]]), [3])
+
+    def test_handles_are_reused(self):
+        container = self.container
+        container.remove([self.particle_uids[0], self.bond_uids[1]])
+
+        # the handle of the external particle is released with the bond,
+        # the handle of a particle referenced by a bond is kept
+        uid, = container.add([Particle(coordinates=(0, 0, 0))])
+        assert_array_equal(container.get_handles([uid]), [4])
+        uid, = container.add([Particle(coordinates=(0, 0, 0))])
+        assert_array_equal(container.get_handles([uid]), [5])
+        self.assertEqual(
+            container.get(self.bond_uids[0]).particles,
+            tuple(self.particle_uids[:2]))
+
+        container.remove([self.bond_uids[0]])
+        uid, = container.add([Particle(coordinates=(0, 0, 0))])
+        assert_array_equal(container.get_handles([uid]), [0])
+        self.assertEqual(len(container._particles.handles), 6)
+
+    def test_get_coordinates(self):
+        coordinates = self.container.get_coordinates()
+        self.assertEqual(coordinates.shape, (4, 3))
+        assert_array_equal(coordinates[2], (2, 2.5, 3.0))
+        assert_array_equal(
+            self.container.get_coordinates([3, 0]),
+            [(3, 3.5, 4.0), (0, 0.5, 1.0)])
+
+    def test_get_bond_connectivity(self):
+        container = self.container
+        bonds, offsets, members = container.get_bond_connectivity()
+        self.assertEqual(
+            container.get_uids(bonds, item_type=CUBA.BOND), self.bond_uids)
+        assert_array_equal(offsets, [0, 2, 6])
+        self.assertEqual(
+            container.get_uids(members),
+            self.particle_uids[:2] + self.particle_uids[1:] + [self.external])
+
+    def test_bonds_keep_uid_api(self):
+        bond = self.container.get(self.bond_uids[1])
+        self.assertEqual(
+            bond.particles, tuple(self.particle_uids[1:] + [self.external]))
+
+
+class TestParticlesChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.container = Particles(name='foo')
+        self.container.changes.start()
+        self.uids = self.container.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(4)])
+        self.bond_uids = self.container.add([
+            Bond(particles=self.uids[:2])])
+
+    def test_added_items(self):
+        changes = self.container.changes
+        self.assertEqual(changes.keys(ADDED, CUBA.PARTICLE), self.uids)
+        self.assertEqual(changes.keys(ADDED, CUBA.BOND), self.bond_uids)
+
+    def test_changes_are_not_recorded_before_start(self):
+        # given
+        container = Particles(name='bar')
+
+        # when
+        uid, = container.add([Particle(coordinates=(0, 0, 0))])
+        container.update([container.get(uid)])
+        container.remove([uid])
+
+        # then
+        self.assertFalse(container.changes.tracking)
+        self.assertEqual(len(container.changes), 0)
+
+    def test_updated_fields(self):
+        # given
+        container = self.container
+        container.changes.clear()
+        first = container.get(self.uids[0])
+        first.coordinates = (1, 1, 1)
+        second = container.get(self.uids[1])
+        second.data[CUBA.MASS] = 10
+        bond = container.get(self.bond_uids[0])
+        bond.particles = self.uids[1:3]
+
+        # when
+        container.update([first, second, container.get(self.uids[2]), bond])
+
+        # then
+        changes = container.changes
+        self.assertEqual(
+            changes.updates(CUBA.PARTICLE),
+            {(True, False): [self.uids[0]], (False, True): [self.uids[1]]})
+        self.assertEqual(
+            changes.fields(CUBA.BOND, self.bond_uids[0]), {'particles'})
+
+    def test_removed_items(self):
+        # given
+        container = self.container
+        container.changes.clear()
+
+        # when
+        container.remove([self.uids[3], self.bond_uids[0]])
+
+        # then
+        changes = container.changes
+        self.assertEqual(changes.keys(REMOVED, CUBA.PARTICLE), [self.uids[3]])
+        self.assertEqual(changes.keys(REMOVED, CUBA.BOND), self.bond_uids)
+
+
 if __name__ == '__main__':
     unittest.main()
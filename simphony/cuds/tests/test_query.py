@@ -0,0 +1,94 @@
+"""Tests for the attribute queries of CUDS."""
+import unittest
+import uuid
+
+import numpy
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.meta import api
+from simphony.cuds.query import (
+    AttributeIndex, Equals, Range, References, predicate, predicate_key)
+
+
+class QueryTestCase(unittest.TestCase):
+    """Tests for the predicates and the attribute indexes."""
+
+    def test_equals(self):
+        material = api.Material(name='steel')
+
+        self.assertTrue(Equals(2.0)(2.0))
+        self.assertTrue(Equals(2.0)(numpy.array([2.0])))
+        self.assertFalse(Equals(2.0)(3.0))
+        self.assertTrue(Equals((1, 2))(numpy.array([1, 2])))
+        self.assertTrue(Equals(material)(material.uid))
+        self.assertFalse(Equals(material)([material]))
+        self.assertTrue(Equals([material])([material]))
+        self.assertFalse(Equals('steel')(material))
+
+    def test_range(self):
+        self.assertTrue(Range(1.0, 2.0)(1.0))
+        self.assertTrue(Range(1.0, 2.0)(numpy.float64(2.0)))
+        self.assertFalse(Range(1.0, 2.0)(2.5))
+        self.assertTrue(Range(maximum=0)(-10))
+        self.assertTrue(Range(minimum=0)(10))
+        self.assertFalse(Range(0, 10)('5'))
+        self.assertFalse(Range(0, 10)([5]))
+        self.assertFalse(Range(0, 10)(True))
+
+    def test_references(self):
+        material = api.Material(name='steel')
+        other = api.Material(name='epoxy')
+
+        self.assertTrue(References(material)(material))
+        self.assertTrue(References(material.uid)([other, material]))
+        self.assertFalse(References(material)([other]))
+        self.assertFalse(References(material)(str(material.uid)))
+
+    def test_predicate(self):
+        material = api.Material(name='steel')
+        uid = uuid.uuid4()
+        condition = Range(1, 2)
+
+        self.assertIs(predicate(condition), condition)
+        self.assertIsInstance(predicate(material), References)
+        self.assertIsInstance(predicate(uid), References)
+        self.assertIsInstance(predicate(1.0), Equals)
+        self.assertEqual(predicate_key('density'), CUBA.DENSITY)
+        self.assertEqual(predicate_key('DENSITY'), CUBA.DENSITY)
+        self.assertRaises(ValueError, predicate_key, 'unknown')
+
+    def test_attribute_index(self):
+        index = AttributeIndex(CUBA.DENSITY)
+        uids = [uuid.uuid4() for _ in range(5)]
+        index.add(uids[0], DataContainer(DENSITY=1.0))
+        index.add(uids[1], DataContainer(DENSITY=2.0))
+        index.add(uids[2], DataContainer(DENSITY=2.0))
+        index.add(uids[3], DataContainer(NAME='no density'))
+        index.add(uids[4], DataContainer(DENSITY=numpy.array([1.0, 2.0])))
+
+        self.assertEqual(index.lookup(Equals(2.0)), set(uids[1:3] + uids[4:]))
+        self.assertEqual(index.lookup(Equals(3.0)), {uids[4]})
+        self.assertEqual(index.lookup(Range(0.5, 1.5)), {uids[0], uids[4]})
+        self.assertEqual(
+            index.lookup(Range(minimum=1.5)), set(uids[1:3] + uids[4:]))
+        self.assertIsNone(index.lookup(Equals([1.0])))
+
+        index.remove(uids[1])
+        index.remove(uids[4])
+
+        self.assertEqual(index.lookup(Range(minimum=1.5)), {uids[2]})
+        self.assertEqual(index.lookup(Equals(1.0)), {uids[0]})
+
+    def test_attribute_index_of_references(self):
+        index = AttributeIndex(CUBA.MATERIAL)
+        materials = [api.Material(name=str(i)) for i in range(3)]
+        relation = uuid.uuid4()
+        index.add(relation, DataContainer(MATERIAL=materials[:2]))
+
+        self.assertEqual(index.lookup(References(materials[1])), {relation})
+        self.assertEqual(index.lookup(References(materials[2])), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+"""Tests for the structural-sharing snapshots of CUDS models and datasets."""
+import gc
+import unittest
+import uuid
+
+import numpy
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import CUDS
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.lattice_items import LatticeNode
+from simphony.cuds.meta import api
+from simphony.cuds.mesh import Mesh
+from simphony.cuds.mesh_items import Edge, Point
+from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Bond, Particle
+
+
+class DatasetSnapshotTestCase(unittest.TestCase):
+    """Tests for the copy-on-write snapshots of the in memory datasets."""
+
+    def setUp(self):
+        self.particles = Particles('particles')
+        self.particles.data = DataContainer(TEMPERATURE=300.0)
+        self.uids = self.particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(5)])
+        self.bond_uids = self.particles.add([Bond(particles=self.uids[:2])])
+
+    def test_snapshot_shares_the_items(self):
+        snapshot = self.particles.snapshot()
+
+        self.assertIsInstance(snapshot, Particles)
+        self.assertEqual(snapshot.name, self.particles.name)
+        self.assertEqual(snapshot.uid, self.particles.uid)
+        self.assertEqual(snapshot.data, self.particles.data)
+        self.assertIs(snapshot._particles, self.particles._particles)
+        self.assertIs(snapshot._bonds, self.particles._bonds)
+        self.assertTrue(snapshot.is_shared)
+        self.assertTrue(self.particles.is_shared)
+        self.assertEqual(snapshot.fingerprint(), self.particles.fingerprint())
+
+    def test_snapshot_data_is_a_copy(self):
+        snapshot = self.particles.snapshot()
+
+        snapshot.data[CUBA.TEMPERATURE] = 400.0
+
+        self.assertEqual(self.particles.data[CUBA.TEMPERATURE], 300.0)
+
+    def test_modified_snapshot_copies_the_items(self):
+        snapshot = self.particles.snapshot()
+        particle = snapshot.get(self.uids[0])
+        particle.data[CUBA.MASS] = 10.0
+
+        snapshot.update([particle])
+        snapshot.remove([self.uids[1]])
+        snapshot.add([Particle(coordinates=(1, 1, 1))])
+
+        self.assertFalse(snapshot.is_shared)
+        self.assertFalse(self.particles.is_shared)
+        self.assertEqual(self.particles.get(self.uids[0]).data[CUBA.MASS], 0)
+        self.assertTrue(self.particles.has(self.uids[1]))
+        self.assertEqual(self.particles.count_of(CUBA.PARTICLE), 5)
+        self.assertEqual(snapshot.count_of(CUBA.PARTICLE), 5)
+        self.assertEqual(snapshot.get(self.uids[0]).data[CUBA.MASS], 10.0)
+        self.assertNotEqual(
+            snapshot.fingerprint(), self.particles.fingerprint())
+
+    def test_modified_dataset_copies_the_items(self):
+        first = self.particles.snapshot()
+        second = self.particles.snapshot()
+
+        self.particles.remove([self.bond_uids[0]])
+
+        self.assertFalse(self.particles.is_shared)
+        self.assertTrue(first.is_shared)
+        self.assertIs(first._bonds, second._bonds)
+        self.assertTrue(first.has(self.bond_uids[0]))
+        self.assertEqual(
+            list(first.get(self.bond_uids[0]).particles), self.uids[:2])
+
+    def test_released_snapshot_is_not_shared(self):
+        snapshot = self.particles.snapshot()
+        self.assertTrue(self.particles.is_shared)
+
+        del snapshot
+        gc.collect()
+
+        self.assertFalse(self.particles.is_shared)
+
+    def test_mesh_snapshot(self):
+        mesh = Mesh('mesh')
+        points = mesh.add([Point((0, 0, 0)), Point((1, 1, 1))])
+        snapshot = mesh.snapshot()
+
+        snapshot.add([Edge(points)])
+        point = mesh.get(points[0])
+        point.coordinates = (2, 2, 2)
+        mesh.update([point])
+
+        self.assertEqual(mesh.count_of(CUBA.EDGE), 0)
+        self.assertEqual(snapshot.count_of(CUBA.EDGE), 1)
+        self.assertEqual(snapshot.get(points[0]).coordinates, (0, 0, 0))
+        self.assertEqual(mesh.get(points[0]).coordinates, (2, 2, 2))
+
+    def test_lattice_snapshot(self):
+        lattice = make_cubic_lattice('lattice', 1.0, (2, 3, 4), (1, 0, 0))
+        lattice.update([LatticeNode((0, 0, 0), DataContainer(MASS=1.0))])
+        snapshot = lattice.snapshot()
+
+        self.assertEqual(snapshot.size, lattice.size)
+        numpy.testing.assert_array_equal(snapshot.origin, lattice.origin)
+        self.assertEqual(snapshot.primitive_cell, lattice.primitive_cell)
+        self.assertEqual(snapshot.fingerprint(), lattice.fingerprint())
+
+        snapshot.update([LatticeNode((0, 0, 0), DataContainer(MASS=2.0))])
+
+        self.assertEqual(lattice.get((0, 0, 0)).data[CUBA.MASS], 1.0)
+        self.assertEqual(snapshot.get((0, 0, 0)).data[CUBA.MASS], 2.0)
+
+
+class ModelSnapshotTestCase(unittest.TestCase):
+    """Tests for the snapshots and the derived models of CUDS."""
+
+    def setUp(self):
+        self.steel = api.Material(name='steel')
+        self.iron = api.Material(name='iron')
+        self.relation = api.MaterialRelation(
+            name='relation', material=[self.steel])
+        self.particles = Particles('particles')
+        self.particles.add([Particle(coordinates=(0, 0, 0))])
+        self.model = CUDS(name='model', description='base')
+        self.model.add(
+            [self.steel, self.iron, self.relation, self.particles])
+
+    def test_snapshot(self):
+        model = self.model
+        snapshot = model.snapshot(name='variant')
+
+        self.assertIsInstance(snapshot, CUDS)
+        self.assertEqual(snapshot.name, 'variant')
+        self.assertEqual(snapshot.description, 'base')
+        self.assertNotEqual(snapshot.uid, model.uid)
+        self.assertEqual(len(snapshot), len(model))
+        self.assertIs(snapshot.get(self.steel.uid), self.steel)
+        self.assertIs(snapshot.get_by_name('relation'), self.relation)
+        self.assertEqual(
+            snapshot.count_of(CUBA.MATERIAL), model.count_of(CUBA.MATERIAL))
+
+        # the datasets are snapshots
+        particles = snapshot.get_by_name('particles')
+        self.assertIsNot(particles, self.particles)
+        self.assertIs(particles._particles, self.particles._particles)
+        self.assertEqual(
+            model.snapshot().fingerprint(), model.fingerprint())
+
+    def test_snapshot_indexes_are_independent(self):
+        self.model.create_index(CUBA.NAME)
+        snapshot = self.model.snapshot()
+        other = api.Material(name='copper')
+
+        snapshot.add([other])
+        snapshot.remove([self.iron.uid])
+
+        self.assertEqual(snapshot.find(name='copper'), [other])
+        self.assertEqual(self.model.find(name='copper'), [])
+        self.assertEqual(self.model.find(name='iron'), [self.iron])
+        self.assertEqual(snapshot.count_of(CUBA.MATERIAL), 2)
+        self.assertEqual(self.model.count_of(CUBA.MATERIAL), 2)
+        self.assertFalse(self.model.has(other.uid))
+
+    def test_derive(self):
+        model = self.model
+        fingerprint = model.fingerprint()
+
+        derived = model.derive(
+            {'steel': {CUBA.DESCRIPTION: 'hardened'}}, name='hardened')
+
+        # the base model is not changed
+        self.assertEqual(model.fingerprint(), fingerprint)
+        self.assertIs(model.get(self.steel.uid), self.steel)
+        self.assertNotEqual(self.steel.description, 'hardened')
+
+        # the changed material and the relation are replaced
+        steel = derived.get(self.steel.uid)
+        relation = derived.get(self.relation.uid)
+        self.assertIsNot(steel, self.steel)
+        self.assertEqual(steel.description, 'hardened')
+        self.assertEqual(steel.name, 'steel')
+        self.assertIsNot(relation, self.relation)
+        self.assertIs(relation.data[CUBA.MATERIAL][0], steel)
+        self.assertIs(self.relation.data[CUBA.MATERIAL][0], self.steel)
+
+        # the other components are shared
+        self.assertIs(derived.get(self.iron.uid), self.iron)
+        self.assertEqual(derived.name, 'hardened')
+        self.assertNotEqual(derived.fingerprint(), fingerprint)
+
+    def test_derive_by_uid_and_by_component(self):
+        derived = self.model.derive({
+            self.iron.uid: {CUBA.NAME: 'cast iron'},
+            self.particles: DataContainer(TEMPERATURE=300.0)})
+
+        self.assertEqual(derived.get_by_name('cast iron').uid, self.iron.uid)
+        self.assertEqual(self.model.get_by_name('iron'), self.iron)
+        particles = derived.get_by_name('particles')
+        self.assertEqual(particles.data[CUBA.TEMPERATURE], 300.0)
+        self.assertNotIn(CUBA.TEMPERATURE, self.particles.data)
+        # the relation does not refer to the changed components
+        self.assertIs(derived.get(self.relation.uid), self.relation)
+
+    def test_derive_without_changes(self):
+        derived = self.model.derive()
+
+        self.assertEqual(derived.fingerprint(), self.model.fingerprint())
+
+    def test_derive_unknown_component(self):
+        with self.assertRaises(KeyError):
+            self.model.derive({'copper': {CUBA.DESCRIPTION: 'soft'}})
+        with self.assertRaises(KeyError):
+            self.model.derive({uuid.uuid4(): {CUBA.DESCRIPTION: 'soft'}})
+
+    def test_derive_name_clash(self):
+        with self.assertRaises(ValueError):
+            self.model.derive({'steel': {CUBA.NAME: 'iron'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,7 +18,7 @@ _TYPE_MAPPINGS = {
 }
 
 
-def create_data_table(class_name, supported_cuba=CUBA):
+def create_data_table(class_name, supported_cuba=CUBA, float_type='float64'):
     ''' Create tables.IsDescription class dynamically given
     a set of supported CUBA IntEnum
 
@@ -30,6 +30,10 @@ def create_data_table(class_name, supported_cuba=CUBA):
     supported_cuba : iterable
         Supported CUBA IntEnum
 
+    float_type : str
+        The storage type of the float values, ``float64`` or
+        ``float32``.
+
     Returns
     -------
     type : tables.IsDescription
@@ -47,6 +51,8 @@ def create_data_table(class_name, supported_cuba=CUBA):
             continue
 
         column_type = _TYPE_MAPPINGS[dtype]
+        if column_type is tables.Float64Col and float_type == 'float32':
+            column_type = tables.Float32Col
 
         column_meta = {'pos': ikey}
 
@@ -94,3 +100,33 @@ class NoUIDRecord(tables.IsDescription):
 
     data = Data()
     mask = tables.BoolCol(pos=1, shape=(len(SUPPORTED_CUBA),))
+
+
+try:
+    with warnings.catch_warnings():
+        # the unsupported keywords have been reported for Data
+        warnings.simplefilter('ignore')
+        Data32 = create_data_table('Data32', CUBA, 'float32')
+except TypeError:
+    class Data32(tables.IsDescription):
+        pass
+
+
+class Record32(tables.IsDescription):
+
+    index = tables.StringCol(itemsize=32, pos=0)
+    data = Data32()
+    mask = tables.BoolCol(pos=1, shape=(len(SUPPORTED_CUBA),))
+
+
+class NoUIDRecord32(tables.IsDescription):
+
+    data = Data32()
+    mask = tables.BoolCol(pos=1, shape=(len(SUPPORTED_CUBA),))
+
+
+#: The records of the data container tables for each float type.
+RECORDS = {'float64': Record, 'float32': Record32}
+
+#: The records of the indexed data container tables for each float type.
+NO_UID_RECORDS = {'float64': NoUIDRecord, 'float32': NoUIDRecord32}
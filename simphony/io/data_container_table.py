@@ -1,14 +1,16 @@
-from collections import MutableMapping
+from collections import MutableMapping, OrderedDict
 import uuid
 
 import numpy
-import tables
 
-from .data_container_description import Record
+from .data_container_description import RECORDS
+from .h5_batch import RowIndex, find_rows, iter_sorted_rows
+from .h5_free_list import CHUNK_SIZE, H5FreeList, compact_table
 from .data_conversion import (convert_from_file_type,
                               convert_to_file_type)
 from ..core import CUBA
 from ..core import DataContainer
+from .h5_precision import FloatPrecision
 
 
 class DataContainerTable(MutableMapping):
@@ -17,6 +19,9 @@ class DataContainerTable(MutableMapping):
     The class implements the Mutable-Mapping api where each DataContainer
     instance is mapped to uuid.
 
+    Deleted rows are kept as tombstones (rows with an empty ``index``)
+    and are reused by later appends, use :meth:`compact` to rebuild the
+    table without them.
 
     """
 
@@ -27,7 +32,8 @@ class DataContainerTable(MutableMapping):
         """
         return self._table is not None
 
-    def __init__(self, root, name='data_containers', record=None):
+    def __init__(self, root, name='data_containers', record=None,
+                 expected_number=None, precision=None):
         """ Create a proxy object for an HDF5 backed data container table.
 
         Parameters
@@ -39,20 +45,31 @@ class DataContainerTable(MutableMapping):
             'data_containers'
         record : table.IsDescription
             The table columns description to use. Default is to use the
-            main data_container record if a new table needs to be created
-            or the already existing record if a table already exists in
-            file.
+            main data_container record (with the float type of the
+            precision) if a new table needs to be created or the already
+            existing record if a table already exists in file.
+        expected_number : int, optional
+            The expected number of rows of a new table, used by PyTables
+            to choose the chunk shape.
+        precision : FloatPrecision, optional
+            The storage precision of the float values. Default is full
+            precision.
 
         """
         handle = root._v_file
         self._parent = parent = root
+        if precision is None:
+            precision = FloatPrecision()
+        self._precision = precision
 
         if hasattr(parent, name):
             self._table = getattr(parent, name)
         else:
             if record is None:
-                record = Record
-            self._table = handle.create_table(parent, name, record)
+                record = RECORDS[precision.float_type]
+            self._table = handle.create_table(
+                parent, name, record, expectedrows=expected_number)
+        self._free = H5FreeList(parent, '{}_free'.format(name))
 
         # Prepare useful mappings
         columns = self._table.cols.data._v_desc._v_colobjects
@@ -81,13 +98,8 @@ class DataContainerTable(MutableMapping):
             The index of the saved row.
 
         """
-        table = self._table
         uid = uuid.uuid4()
-        row = table.row
-        row['index'] = uid.hex
-        self._populate(row, data)
-        row.append()
-        table.flush()
+        self._append(uid, data)
         return uid
 
     def __getitem__(self, uid):
@@ -114,41 +126,152 @@ class DataContainerTable(MutableMapping):
             row._flush_mod_rows()
             return
         else:
-            row = table.row
-            row['index'] = uid.hex
-            self._populate(row, data)
-            row.append()
-            table.flush()
+            self._append(uid, data)
 
     def __delitem__(self, uid):
         """ Delete the row.
 
+        The row is marked as deleted and added to the free rows.
+
         """
         table = self._table
         for row in table.where(
                 'index == value', condvars={'value': uid.hex}):
-            if table.nrows == 1:
-                name = table._v_name
-                record = table.description
-                # pytables due to hdf5 limitations does
-                # not support removing the last row of table
-                # so we delete the table and
-                # create new empty table in this situation
-                table.remove()
-                parent = self._parent
-                self._table = tables.Table(parent, name, record)
-            else:
-                table.remove_row(row.nrow)
+            row['index'] = ''
+            row['mask'] = numpy.zeros(
+                shape=table.coldtypes['mask'].shape, dtype=numpy.bool)
+            row.update()
+            # see https://github.com/PyTables/PyTables/issues/11
+            row._flush_mod_rows()
+            self._free.push(row.nrow)
             break
         else:
             raise KeyError(
                 'Record (id={id}) does not exist'.format(id=uid))
 
+    def set_many(self, items):
+        """ Set the data of many uids at once.
+
+        The existing rows are updated in row order and the new data are
+        stored in free rows or appended, with a single flush. When a uid
+        is repeated the last data is saved.
+
+        Parameters
+        ----------
+        items : iterable of (uuid.UUID, DataContainer)
+            The uid, data pairs to save.
+
+        """
+        items = OrderedDict(items).items()
+        table = self._table
+        rows = find_rows(table, 'index', [uid for uid, _ in items])
+        existing = numpy.flatnonzero(rows >= 0)
+        for row, position in iter_sorted_rows(table, rows[existing]):
+            self._populate(row, items[existing[position]][1])
+            row.update()
+        self._append_many([items[k] for k in numpy.flatnonzero(rows < 0)])
+
+    def remove_many(self, uids):
+        """ Delete the rows of many uids at once.
+
+        Raises
+        ------
+        KeyError :
+            If any of the uids does not exist. No row is deleted.
+
+        """
+        uids = list(uids)
+        table = self._table
+        rows = find_rows(table, 'index', uids)
+        missing = numpy.flatnonzero(rows < 0)
+        if len(missing) > 0:
+            raise KeyError(
+                'Record (id={id}) does not exist'.format(
+                    id=uids[missing[0]]))
+        mask = numpy.zeros(
+            shape=table.coldtypes['mask'].shape, dtype=numpy.bool)
+        for row, _ in iter_sorted_rows(table, rows):
+            row['index'] = ''
+            row['mask'] = mask
+            row.update()
+        self._free.push_many(rows)
+
+    def uid_index(self):
+        """ Return an in-memory index of the uids of the table rows.
+
+        The index can be passed to :meth:`read_many` to avoid reading
+        the uid column for every call.
+
+        """
+        return RowIndex(self._table, 'index')
+
+    def read_many(self, uids, index=None):
+        """ Return the DataContainers of many uids.
+
+        The rows are read from the table in a single operation.
+
+        Parameters
+        ----------
+        uids : sequence of uuid.UUID
+            The uids of the data to read.
+        index : RowIndex, optional
+            The uid index of the table (see :meth:`uid_index`). The
+            uids not found in the index, or found in rows that have
+            been modified since the index was created, are looked up
+            in the table.
+
+        Returns
+        -------
+        datas : list of DataContainer
+            The data of the uids.
+
+        Raises
+        ------
+        KeyError :
+            If any of the uids does not exist.
+
+        """
+        if index is None:
+            index = self.uid_index()
+        rows = index.find(uids)
+        datas = [None] * len(uids)
+        found = numpy.flatnonzero(rows >= 0)
+        if len(found) > 0:
+            records = self._table.read_coordinates(rows[found])
+            for position, record in zip(found, records):
+                if record['index'] == uids[position].hex:
+                    datas[position] = self._retrieve(record)
+        for position, data in enumerate(datas):
+            if data is None:
+                datas[position] = self[uids[position]]
+        return datas
+
     def __len__(self):
-        """ The number of rows in the table.
+        """ The number of (not deleted) rows in the table.
 
         """
-        return self._table.nrows
+        return self._table.nrows - len(self._free)
+
+    def compact(self):
+        """ Rebuild the table without the deleted rows.
+
+        """
+        if len(self._free) > 0:
+            self._table = compact_table(self._table, 'index')
+            self._free.clear()
+
+    @property
+    def rowsize(self):
+        """ The size in bytes of a table row.
+
+        """
+        return self._table.rowsize
+
+    def project(self, keys):
+        """ Remove the values of the CUBA keys not in keys from all rows.
+
+        """
+        project_table(self._table, self._cuba_to_position, keys)
 
     def itersequence(self, sequence):
         """ Iterate over a sequence of row ids.
@@ -162,19 +285,49 @@ class DataContainerTable(MutableMapping):
 
         """
         for row in self._table:
-            yield self._retrieve(row)
+            if row['index']:
+                yield self._retrieve(row)
+
+    def _append(self, uid, data):
+        """ Store the data in a free row or at the end of the table.
+
+        """
+        self._append_many([(uid, data)])
+
+    def _append_many(self, items):
+        """ Store the (uid, data) pairs in free rows or at the end of the
+        table.
+
+        """
+        if len(items) == 0:
+            return
+        table = self._table
+        free = self._free.pop_many(len(items))
+        for row, position in iter_sorted_rows(table, free):
+            uid, data = items[position]
+            row['index'] = uid.hex
+            self._populate(row, data)
+            row.update()
+        row = table.row
+        for uid, data in items[len(free):]:
+            row['index'] = uid.hex
+            self._populate(row, data)
+            row.append()
+        table.flush()
 
     def _populate(self, row, value):
         """ Populate the row from the DataContainer.
 
         """
         positions = self._cuba_to_position
+        encode = self._precision.encode_data
         mask = numpy.zeros(
             shape=self._table.coldtypes['mask'].shape, dtype=numpy.bool)
         data = list(row['data'])
         for key in value:
             if key in positions:
-                data[positions[key]] = convert_to_file_type(value[key], key)
+                data[positions[key]] = encode(
+                    key, convert_to_file_type(value[key], key))
                 mask[positions[key]] = True
 
         row['mask'] = mask
@@ -190,3 +343,37 @@ class DataContainerTable(MutableMapping):
         return DataContainer({
             cuba[index]: convert_from_file_type(data[index], cuba[index])
             for index, valid in enumerate(mask) if valid})
+
+
+def project_table(table, positions, keys, chunk_size=CHUNK_SIZE):
+    """ Keep only the values of the CUBA keys in keys.
+
+    The mask of the other CUBA keys is cleared and their values are
+    reset to zero. The rows are rewritten in chunks.
+
+    Parameters
+    ----------
+    table : tables.Table
+        The data container table with the ``mask`` and ``data`` columns.
+    positions : dict
+        The mapping from the CUBA keys to their column positions.
+    keys : iterable of CUBA
+        The CUBA keys to keep.
+    chunk_size : int
+        The number of rows to rewrite at once.
+
+    """
+    keys = set(keys)
+    dropped = [cuba for cuba in positions if cuba not in keys]
+    if len(dropped) == 0:
+        return
+    columns = [positions[cuba] for cuba in dropped]
+    names = [cuba.name.lower() for cuba in dropped]
+    for start in xrange(0, table.nrows, chunk_size):
+        rows = table.read(start, start + chunk_size)
+        rows['mask'][:, columns] = False
+        data = rows['data']
+        for name in names:
+            data[name] = 0
+        table.modify_rows(start, start + len(rows), rows=rows)
+    table.flush()
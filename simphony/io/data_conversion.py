@@ -1,5 +1,7 @@
 import uuid
 
+import numpy
+
 from ..core.keywords import KEYWORDS
 from ..core import CUBA
 
@@ -45,10 +47,13 @@ def convert_from_file_type(file_value, cuba):
     Returns
     -------
     value :
-        The value which has the type as described in CUBA
+        The value which has the type as described in CUBA, the values
+        stored as 32 bit floats are returned as 64 bit floats.
 
     """
     if KEYWORDS[CUBA(cuba).name].dtype is uuid.UUID:
         return uuid.UUID(hex=file_value, version=4)
+    elif getattr(file_value, 'dtype', None) == numpy.float32:
+        return file_value.astype(numpy.float64)
     else:
         return file_value
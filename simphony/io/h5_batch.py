@@ -0,0 +1,278 @@
+""" Write-behind batching for the HDF5 backed datasets
+
+This module contains the buffer of the pending modifications used by
+the ``batch()`` context of the HDF5 backed datasets and the helpers to
+apply them to the tables as bulk, row ordered writes.
+
+"""
+import abc
+import contextlib
+from collections import OrderedDict
+from itertools import izip
+
+import numpy
+
+ADD = 'add'
+UPDATE = 'update'
+REMOVE = 'remove'
+
+
+def find_rows(table, column, uids):
+    """ Return the rows of the uids in the table.
+
+    The uid column is read once and searched for all the uids, which
+    is much faster than one ``where`` query per uid.
+
+    Parameters
+    ----------
+    table : tables.Table
+        The table to search.
+    column : string
+        The name of the column with the uid hex values.
+    uids : sequence of uuid.UUID
+        The uids to look for.
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        The row of each uid, -1 when the uid is not in the table.
+
+    """
+    if len(uids) == 0 or table.nrows == 0:
+        return numpy.full(len(uids), -1, dtype=numpy.int64)
+    return RowIndex(table, column).find(uids)
+
+
+class RowIndex(object):
+    """ A sorted in-memory index of the uid column of a table.
+
+    The index is a snapshot of the column and is meant for repeated
+    lookups while the table is not modified.
+
+    """
+
+    def __init__(self, table, column):
+        """ Read and sort the uid column.
+
+        Parameters
+        ----------
+        table : tables.Table
+            The table to index.
+        column : string
+            The name of the column with the uid hex values.
+
+        """
+        values = table.col(column)
+        self._order = numpy.argsort(values)
+        self._values = values[self._order]
+
+    def find(self, uids):
+        """ Return the rows of the uids, -1 when a uid is not indexed.
+
+        """
+        keys = numpy.array([uid.hex for uid in uids], dtype='S32')
+        rows = numpy.full(len(keys), -1, dtype=numpy.int64)
+        values = self._values
+        if len(keys) == 0 or len(values) == 0:
+            return rows
+        positions = numpy.searchsorted(values, keys)
+        positions[positions == len(values)] = 0
+        found = values[positions] == keys
+        rows[found] = self._order[positions[found]]
+        return rows
+
+
+def iter_sorted_rows(table, rows):
+    """ Iterate over the table rows in increasing row order.
+
+    Yields
+    ------
+    row : tables.Row
+        The table row.
+    position : int
+        The position of the row number in ``rows``.
+
+    .. note::
+       The modified rows are flushed when the iteration is exhausted.
+
+    """
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    order = numpy.argsort(rows, kind='mergesort')
+    # the table iterator goes first so that it is exhausted (and flushes
+    # the modified rows) before the positions.
+    for row, position in izip(table.itersequence(rows[order]), order):
+        yield row, position
+
+
+class BatchBuffer(object):
+    """ The pending modifications of a dataset batch.
+
+    The operations are keyed by the item uid (or any other key that
+    identifies the item), repeated operations on the same item are
+    coalesced:
+
+    - add or update followed by update keeps the last item.
+    - add followed by remove cancels both operations.
+    - update followed by remove becomes a remove.
+    - remove followed by add becomes an update.
+
+    Items are copied by the datasets before they are buffered.
+
+    """
+
+    def __init__(self):
+        self._pending = OrderedDict()
+        #: The pending container data or None
+        self.data = None
+
+    def __len__(self):
+        return len(self._pending) + (self.data is not None)
+
+    def add(self, item_type, item, key=None):
+        """ Buffer the addition of item.
+
+        Raises
+        ------
+        ValueError :
+            If the item has already been added in the batch.
+
+        """
+        key = item.uid if key is None else key
+        pending = self._pending
+        operation = pending.get(key)
+        if operation is None:
+            pending[key] = (ADD, item_type, item)
+        elif operation[0] == REMOVE:
+            pending[key] = (UPDATE, item_type, item)
+        else:
+            raise ValueError(
+                'Record (id={id}) already exists'.format(id=key))
+
+    def update(self, item_type, item, key=None):
+        """ Buffer the update of item.
+
+        Raises
+        ------
+        ValueError :
+            If the item has been removed in the batch.
+
+        """
+        key = item.uid if key is None else key
+        pending = self._pending
+        operation = pending.get(key)
+        if operation is None:
+            pending[key] = (UPDATE, item_type, item)
+        elif operation[0] == REMOVE:
+            raise ValueError(
+                'Item with id {} does not exist'.format(key))
+        else:
+            pending[key] = (operation[0], item_type, item)
+
+    def remove(self, key, item_type=None):
+        """ Buffer the removal of the item with key.
+
+        The item type can be left unknown (None), the dataset is then
+        expected to resolve it when the batch is applied.
+
+        Raises
+        ------
+        KeyError :
+            If the item has already been removed in the batch.
+
+        """
+        pending = self._pending
+        operation = pending.get(key)
+        if operation is None:
+            pending[key] = (REMOVE, item_type, None)
+        elif operation[0] == REMOVE:
+            raise KeyError('uid {} not found'.format(key))
+        elif operation[0] == ADD:
+            del pending[key]
+        else:
+            pending[key] = (REMOVE, operation[1], None)
+
+    def items(self, operation, item_type):
+        """ Return the buffered items of the operation and item type.
+
+        """
+        return [
+            item for (op, kind, item) in self._pending.itervalues()
+            if op == operation and kind == item_type]
+
+    def keys(self, operation, item_type=None):
+        """ Return the buffered keys of the operation and item type.
+
+        """
+        return [
+            key for key, (op, kind, item) in self._pending.iteritems()
+            if op == operation and (item_type is None or kind == item_type)]
+
+
+class H5BatchMixin(object):
+    """ Mixin implementing the ``batch()`` context of the HDF5 datasets.
+
+    Classes using the mixin check ``self._batch`` in their modification
+    methods, buffer the operations when a batch is active, call
+    :meth:`_sync` before any read access and implement
+    :meth:`_apply_batch` to write the pending operations in bulk.
+
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    _batch = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """ Buffer the modifications of the dataset in the with block.
+
+        Additions, updates and removals are kept in memory, repeated
+        modifications of the same item are coalesced and the result is
+        written when the block exits, using bulk writes in row order
+        and one flush per table.
+
+        Reading from the dataset inside the block first writes the
+        pending modifications. Errors of the buffered operations (e.g.
+        updating a missing item) are raised when the modifications are
+        written. When the block raises an exception the pending
+        modifications are discarded.
+
+        Nested batches are merged with the outer batch.
+
+        Example
+        -------
+        >>> with particles.batch():
+        ...     for particle in particles.iter(item_type=CUBA.PARTICLE):
+        ...         particle.coordinates = move(particle.coordinates)
+        ...         particles.update([particle])
+
+        """
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = BatchBuffer()
+        try:
+            yield self
+        finally:
+            batch, self._batch = self._batch, None
+        if len(batch) > 0:
+            self._apply_batch(batch)
+
+    def _sync(self):
+        """ Write the pending modifications of the active batch.
+
+        """
+        batch = self._batch
+        if batch is not None and len(batch) > 0:
+            self._batch = None
+            try:
+                self._apply_batch(batch)
+            finally:
+                self._batch = BatchBuffer()
+
+    @abc.abstractmethod
+    def _apply_batch(self, batch):
+        """ Write the pending modifications of batch.
+
+        """
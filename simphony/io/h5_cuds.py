@@ -1,15 +1,26 @@
 import tables
 import itertools
+import uuid
 
 from ..core import CUBA
 from ..core.data_container import DataContainer
-from ..cuds import ABCParticles, ABCMesh, ABCLattice
+from ..cuds import (
+    ABCParticles, ABCMesh, ABCLattice, Lattice, Mesh, Particles)
 from .h5_particles import H5Particles
 from .h5_mesh import H5Mesh
 from .h5_lattice import H5Lattice
+from .h5_trajectory import KEYFRAME_INTERVAL, H5Trajectory
 
 H5_FILE_VERSION = 3
 
+#: The named filter profiles of :meth:`H5CUDS.open`.
+FILTER_PROFILES = {
+    'default': tables.Filters(complevel=1, complib='zlib', fletcher32=True),
+    'fast': tables.Filters(complevel=1, complib='blosc:lz4', shuffle=True),
+    'small': tables.Filters(
+        complevel=9, complib='blosc:zstd', shuffle=True, fletcher32=True),
+    'none': tables.Filters(complevel=0, fletcher32=True)}
+
 
 class H5CUDS(object):
     """ Access to CUDS-hdf5 formatted files.
@@ -29,6 +40,8 @@ class H5CUDS(object):
             raise ValueError("File should be a Pytable file")
         self._handle = handle
         self._root = handle.root
+        # name -> preloaded in-memory container
+        self._preloaded = {}
 
     def valid(self):
         """Checks if file is valid (i.e. open)
@@ -37,7 +50,8 @@ class H5CUDS(object):
         return self._handle is not None and self._handle.isopen
 
     @classmethod
-    def open(cls, filename, mode="a", title='', filters=None):
+    def open(cls, filename, mode="a", title='', filters=None,
+             in_memory=False, backing_store=True, preload=None):
         """ Returns an opened SimPhoNy CUDS-hdf5 file
 
         Parameters
@@ -59,30 +73,68 @@ class H5CUDS(object):
             Title attribute of root node (only applies to a file which
               is being created)
 
-        filters : tables.Filter
-            Filter options used in the HDF5 file. If none is selected
-            default parameters are: complevel=1, complib="zlib" and
-            fletcher32=True. This only applies to newly created files.
+        filters : tables.Filter or str
+            Filter options used in the HDF5 file, or the name of a profile
+            of ``FILTER_PROFILES``:
+
+            - ``default`` -- complevel=1, complib="zlib" and
+              fletcher32=True.
+            - ``fast`` -- the blosc lz4 compressor with byte shuffle,
+              fast to write and read.
+            - ``small`` -- the blosc zstd compressor at the highest level
+              with byte shuffle and fletcher32, for the smallest files.
+            - ``none`` -- no compression, only fletcher32.
+
+            If none is selected the ``default`` profile is used. This
+            only applies to newly created files.
+
+        in_memory : bool
+            Open the file with the HDF5 CORE driver. The whole file is
+            read in memory when opened and all the operations take
+            place in memory. Default is False.
+
+        backing_store : bool
+            When the file is opened in memory with a writable mode,
+            write the modified file back to disk when it is closed.
+            Default is True.
+
+        preload : bool or sequence of str, optional
+            Decode the datasets (all the datasets when True) into the
+            in-memory ``Particles``, ``Mesh`` and ``Lattice`` containers
+            when the file is opened (see :meth:`load_dataset`).
+            :meth:`get_dataset` and :meth:`iter_datasets` return the
+            in-memory containers of the preloaded datasets. Changes to
+            these containers are written to the file only with
+            :meth:`sync_dataset`.
 
         Raises
         ------
         ValueError :
-            If the file has an incompatible version
+            If the file has an incompatible version or the filter profile
+            is unknown.
 
         """
 
         if filters is None:
-            filters = tables.Filters(
-                complevel=1,
-                complib='zlib',
-                fletcher32=True
-            )
+            filters = FILTER_PROFILES['default']
+        elif isinstance(filters, basestring):
+            if filters not in FILTER_PROFILES:
+                raise ValueError(
+                    'Unknown filter profile {!r}'.format(filters))
+            filters = FILTER_PROFILES[filters]
+
+        driver_options = {}
+        if in_memory:
+            driver_options = {
+                'driver': 'H5FD_CORE',
+                'driver_core_backing_store': int(backing_store)}
 
         handle = tables.open_file(
             filename,
             mode,
             title=title,
-            filters=filters
+            filters=filters,
+            **driver_options
         )
 
         if handle.list_nodes("/"):
@@ -95,7 +147,12 @@ class H5CUDS(object):
             for group in ('particle', 'lattice', 'mesh'):
                 if "/" + group not in handle:
                     handle.create_group('/', group, group)
-        return cls(handle)
+        cuds = cls(handle)
+        if preload:
+            names = cuds.get_dataset_names() if preload is True else preload
+            for name in names:
+                cuds._preloaded[name] = cuds.load_dataset(name)
+        return cuds
 
     def close(self):
         """Closes a file
@@ -103,17 +160,35 @@ class H5CUDS(object):
         """
         self._handle.close()
 
-    def add_dataset(self, container, cuba_keys=None):
+    def add_dataset(self, container, cuba_keys=None, precision=None):
         """Add a CUDS container
 
         Parameters
         ----------
         container : {ABCMesh, ABCParticles, ABCLattice}
-            The CUDS container to be added.
+            The CUDS container to be added. The HDF5 datasets of
+            H5CUDS files (e.g. returned by :meth:`get_dataset`) are
+            copied natively without decoding their items.
         cuba_keys : dict of CUBAs (optional)
             Dictionary of CUBAs with lists of CUBA keys that
             are added to the H5CUDS container. All keys in the container
-            are stored by default
+            are stored by default, and for the item types missing from
+            the dictionary.
+        precision : FloatPrecision, optional
+            The storage precision of the coordinates and the item data
+            (see :mod:`~.h5_precision`). Default is full precision, and
+            the precision of the source for the native copies. The HDF5
+            datasets are decoded when a precision is given.
+
+        The uid of the container is recorded with the dataset (see the
+        ``uid`` property of the HDF5 datasets), the native copies keep the
+        uid of their source.
+
+        An in-memory container starts recording its changes (see the
+        ``changes`` attribute), thus a later :meth:`sync_dataset` writes
+        only the new modifications.
+        The chunk shapes of the new tables are chosen by PyTables from
+        the item counts of the container.
 
         Raises
         ------
@@ -133,16 +208,94 @@ class H5CUDS(object):
         if name in self._root.lattice:
             raise ValueError(message.format('Lattice', name))
 
-        if isinstance(container, ABCParticles):
-            self._add_particles(container, cuba_keys)
+        if (isinstance(container, (H5Particles, H5Mesh, H5Lattice)) and
+                precision is None):
+            self._copy_dataset(container, cuba_keys)
+        elif isinstance(container, ABCParticles):
+            self._add_particles(container, cuba_keys, precision)
         elif isinstance(container, ABCMesh):
-            self._add_mesh(container, cuba_keys)
+            self._add_mesh(container, cuba_keys, precision)
         elif isinstance(container, ABCLattice):
-            self._add_lattice(container, cuba_keys)
+            self._add_lattice(container, cuba_keys, precision)
         else:
             raise TypeError(
                 "The type of the container is not supported")
 
+        attrs = self._get_dataset_group(name)._v_attrs
+        if 'uid' not in attrs:
+            uid = getattr(container, 'uid', None) or uuid.uuid4()
+            attrs.uid = uid.hex
+
+        changes = getattr(container, 'changes', None)
+        if changes is not None:
+            changes.start()
+
+    def sync_dataset(self, container):
+        """ Write the changes of an in-memory container to its dataset.
+
+        Only the items added, updated or removed since the last sync of
+        the container (see the ``changes`` attribute of
+        :class:`~.Particles`, :class:`~.Mesh` and :class:`~.Lattice`)
+        are written, in bulk, and only the item tables or the item data
+        tables with changed fields are rewritten. A container without a
+        dataset in the file is added in full, and so is a container that
+        does not record its changes yet, replacing the dataset. The
+        container records its changes after the sync.
+
+        Parameters
+        ----------
+        container : {Particles, Mesh, Lattice}
+            The in-memory container to synchronise with the dataset of
+            the same name.
+
+        Returns
+        -------
+        nbytes : int
+            The size in bytes of the table rows written.
+
+        Raises
+        ------
+        TypeError:
+            If the container does not track its changes.
+        ValueError:
+            If the dataset with the name of the container has a
+            different type.
+
+        """
+        changes = getattr(container, 'changes', None)
+        if changes is None:
+            raise TypeError(
+                "The container does not track its changes")
+        name = container.name
+        dataset = None
+        if name in self.get_dataset_names():
+            if (isinstance(container, ABCParticles) and
+                    name in self._root.particle):
+                dataset = H5Particles(self._root.particle._f_get_child(name))
+            elif isinstance(container, ABCMesh) and name in self._root.mesh:
+                dataset = H5Mesh(
+                    self._root.mesh._f_get_child(name), self._handle)
+            elif (isinstance(container, ABCLattice) and
+                    name in self._root.lattice):
+                dataset = H5Lattice(self._root.lattice._f_get_child(name))
+            else:
+                raise ValueError(
+                    'Container {!r} has a different type'.format(name))
+            if not changes.tracking:
+                self.remove_dataset(name)
+                dataset = None
+        if dataset is None:
+            self.add_dataset(container)
+            group = self._get_dataset_group(name)
+            nbytes = sum(
+                leaf.size_in_memory for leaf in group._f_walknodes('Leaf'))
+        else:
+            nbytes = dataset._apply_changes(container, changes)
+        changes.start()
+        if self._preloaded.get(name) is not container:
+            self._preloaded.pop(name, None)
+        return nbytes
+
     def remove_dataset(self, name):
         """ Remove a dataset from the file
 
@@ -157,6 +310,7 @@ class H5CUDS(object):
             If there is no dataset with the given name
 
         """
+        self._preloaded.pop(name, None)
         if name in self._get_child_names(self._root.particle):
             self._remove_particles(name)
         elif name in self._get_child_names(self._root.mesh):
@@ -167,13 +321,19 @@ class H5CUDS(object):
             raise ValueError(
                 'Container \'{n}\` does not exist'.format(n=name))
 
-    def get_dataset(self, name):
+    def get_dataset(self, name, cache_size=None):
         """ Get the dataset
 
         Parameters
         ----------
         name: str
             name of CUDS container to be retrieved.
+        cache_size: int, optional
+            The number of retrieved items to keep in the read cache of
+            the dataset (for each item type), zero disables the cache.
+            The cache is shared by all the proxies of the dataset.
+            Default is to keep the current size of the cache or use
+            ``DEFAULT_CACHE_SIZE`` (see :mod:`~.h5_item_cache`).
 
         Returns
         -------
@@ -188,15 +348,67 @@ class H5CUDS(object):
 
         """
         if name in self._get_child_names(self._root.particle):
-            return self._get_particles(name)
+            return self._get_particles(name, cache_size)
         elif name in self._get_child_names(self._root.mesh):
-            return self._get_mesh(name)
+            return self._get_mesh(name, cache_size)
         elif name in self._get_child_names(self._root.lattice):
-            return self._get_lattice(name)
+            return self._get_lattice(name, cache_size)
         else:
             raise ValueError(
                 'Container \'{n}\` does not exist'.format(n=name))
 
+    def load_dataset(self, name):
+        """ Decode the dataset into an in-memory container.
+
+        The items are decoded in bulk, reading the item tables and the
+        item data in chunks. The container starts recording its changes,
+        thus :meth:`sync_dataset` writes back only its later
+        modifications.
+
+        Parameters
+        ----------
+        name: str
+            name of CUDS container to be loaded.
+
+        Returns
+        -------
+        container : {Particles, Mesh, Lattice}
+            An in-memory copy of the dataset.
+
+        Raises
+        ------
+        ValueError:
+            If there is no dataset with the given name
+
+        """
+        if name in self._get_child_names(self._root.particle):
+            dataset = H5Particles(self._root.particle._f_get_child(name))
+            container = Particles(name)
+            item_types = (CUBA.PARTICLE, CUBA.BOND)
+        elif name in self._get_child_names(self._root.mesh):
+            dataset = H5Mesh(self._root.mesh._f_get_child(name), self._handle)
+            container = Mesh(name)
+            item_types = (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL)
+        elif name in self._get_child_names(self._root.lattice):
+            dataset = H5Lattice(self._root.lattice._f_get_child(name))
+            container = Lattice(
+                name, dataset.primitive_cell, dataset.size, dataset.origin)
+            for nodes in dataset.iter_chunks(CUBA.NODE):
+                container.update(nodes)
+            container.data = dataset.data
+            container.changes.start()
+            return container
+        else:
+            raise ValueError(
+                'Container \'{n}\` does not exist'.format(n=name))
+
+        container.data = dataset.data
+        for item_type in item_types:
+            for items in dataset.iter_chunks(item_type):
+                container.add(items)
+        container.changes.start()
+        return container
+
     def get_dataset_names(self):
         """ Returns a list of the datasets' names contained in the file.
 
@@ -210,6 +422,91 @@ class H5CUDS(object):
 
         return [i.name for i in iter_list]
 
+    def create_trajectory(self, container, fields=None, quantum=None,
+                          delta=False, keyframe_interval=KEYFRAME_INTERVAL):
+        """ Create a trajectory with the items of the container.
+
+        The container is stored once as the static part of the
+        trajectory, use :meth:`~.H5Trajectory.append_frame` to append
+        the per frame fields (see :class:`~.H5Trajectory`).
+
+        Parameters
+        ----------
+        container : {ABCParticles, ABCMesh, ABCLattice}
+            The container with the items of the trajectory. The name of
+            the container is the name of the trajectory.
+        fields : sequence of {str, CUBA}, optional
+            The fields stored in every frame, ``'coordinates'`` or CUBA
+            keys of numeric item data. Default is the coordinates (for
+            particles and meshes) and the numeric CUBA keys in the data
+            of the first item.
+        quantum : float or dict, optional
+            Store the float fields (or the fields in the dictionary) as
+            integer multiples of the quantum (lossy).
+        delta : bool
+            Delta encode the fields (lossless). Default is False.
+        keyframe_interval : int
+            The number of frames between the keyframes of delta encoded
+            fields.
+
+        Returns
+        -------
+        trajectory : H5Trajectory
+            The new trajectory.
+
+        Raises
+        ------
+        ValueError:
+            If there is already a trajectory with the given name.
+
+        """
+        name = container.name
+        if '/trajectory' not in self._handle:
+            self._handle.create_group('/', 'trajectory', 'trajectory')
+        root = self._root.trajectory
+        if name in root:
+            raise ValueError(
+                'Trajectory {!r} already exists'.format(name))
+        group = tables.Group(root, name=name, new=True)
+        return H5Trajectory.create_new(
+            group, container, fields, quantum, delta, keyframe_interval)
+
+    def get_trajectory(self, name):
+        """ Get the trajectory
+
+        Raises
+        ------
+        ValueError:
+            If there is no trajectory with the given name.
+
+        """
+        if name not in self.get_trajectory_names():
+            raise ValueError(
+                'Trajectory \'{n}\` does not exist'.format(n=name))
+        return H5Trajectory(self._root.trajectory._f_get_child(name))
+
+    def get_trajectory_names(self):
+        """ Returns a list of the trajectories' names contained in the file.
+
+        """
+        if '/trajectory' not in self._handle:
+            return []
+        return self._get_child_names(self._root.trajectory)
+
+    def remove_trajectory(self, name):
+        """ Remove a trajectory from the file
+
+        Raises
+        ------
+        ValueError:
+            If there is no trajectory with the given name.
+
+        """
+        if name not in self.get_trajectory_names():
+            raise ValueError(
+                'Trajectory \'{n}\` does not exist'.format(n=name))
+        self._root.trajectory._f_get_child(name)._f_remove(recursive=True)
+
     def iter_datasets(self, names=None):
         """ Returns an iterator over a subset or all of the containers.
 
@@ -235,10 +532,51 @@ class H5CUDS(object):
         for i in iter_list:
             yield i
 
+    def _get_dataset_group(self, name):
+        for root in (self._root.particle, self._root.mesh, self._root.lattice):
+            if name in root:
+                return root._f_get_child(name)
+        raise ValueError(
+            'Container \'{n}\` does not exist'.format(n=name))
+
     def _get_child_names(self, node):
         return [n._v_name for n in node._f_iter_nodes()]
 
-    def _add_particles(self, particles, cuba_keys):
+    def _copy_dataset(self, dataset, cuba_keys):
+        """Copy an HDF5 backed dataset to the file.
+
+        The group of the dataset is copied by the HDF5 library node by
+        node, without decoding the items. When cuba_keys are given the
+        data tables of the copy are projected in chunks.
+
+        Parameters
+        ----------
+        dataset : {H5Particles, H5Mesh, H5Lattice}
+            The dataset to be copied, from this or another file.
+        cuba_keys : dict
+            Dictionary of CUBAs with their related CUBA keys that
+            are added to the H5CUDS container.
+
+        """
+        dataset._sync()
+        group = dataset._group
+        if isinstance(dataset, H5Particles):
+            copy = group._f_copy(
+                self._root.particle, group._v_name, recursive=True)
+            copied = H5Particles(copy)
+        elif isinstance(dataset, H5Mesh):
+            copy = group._f_copy(
+                self._root.mesh, group._v_name, recursive=True)
+            copied = H5Mesh(copy, self._handle)
+        else:
+            copy = group._f_copy(
+                self._root.lattice, group._v_name, recursive=True)
+            copied = H5Lattice(copy)
+
+        if cuba_keys is not None:
+            copied.project(cuba_keys)
+
+    def _add_particles(self, particles, cuba_keys, precision=None):
         """Add particle container to the file.
 
         Parameters
@@ -248,6 +586,8 @@ class H5CUDS(object):
         cuba_keys : dict
             Dictionary of CUBAs with their related CUBA keys that
             are added to the H5CUDS container.
+        precision : FloatPrecision, optional
+            The storage precision of the float values.
 
         Returns
         -------
@@ -259,25 +599,26 @@ class H5CUDS(object):
         particles_root = self._root.particle
 
         group = tables.Group(particles_root, name=name, new=True)
-        h5_particles = H5Particles(group)
+        h5_particles = H5Particles(
+            group, expected_counts=_expected_counts(
+                particles, (CUBA.PARTICLE, CUBA.BOND)),
+            precision=precision)
         h5_particles.data = particles.data
 
         if cuba_keys is not None:
+            keys = cuba_keys.get(CUBA.PARTICLE)
             for item in particles.iter(item_type=CUBA.PARTICLE):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.PARTICLE]})
+                _select_keys(item, keys)
                 h5_particles.add([item])
 
+            keys = cuba_keys.get(CUBA.BOND)
             for item in particles.iter(item_type=CUBA.BOND):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.BOND]})
+                _select_keys(item, keys)
                 h5_particles.add([item])
         else:
             h5_particles.add(particles.iter())
 
-    def _add_mesh(self, mesh, cuba_keys):
+    def _add_mesh(self, mesh, cuba_keys, precision=None):
         """Add a mesh to the file.
 
         Parameters
@@ -288,6 +629,8 @@ class H5CUDS(object):
         cuba_keys : dict
             Dictionary of CUBAs with their related CUBA keys that
             are added to the H5CUDS container.
+        precision : FloatPrecision, optional
+            The storage precision of the float values.
 
         Returns
         ----------
@@ -299,37 +642,36 @@ class H5CUDS(object):
         mesh_root = self._root.mesh
 
         group = tables.Group(mesh_root, name=name, new=True)
-        h5_mesh = H5Mesh(group, self._handle)
+        h5_mesh = H5Mesh(
+            group, self._handle, expected_counts=_expected_counts(
+                mesh, (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL)),
+            precision=precision)
         h5_mesh.data = mesh.data
 
         if cuba_keys is not None:
+            keys = cuba_keys.get(CUBA.POINT)
             for item in mesh.iter(item_type=CUBA.POINT):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.POINT]})
+                _select_keys(item, keys)
                 h5_mesh.add([item])
 
+            keys = cuba_keys.get(CUBA.EDGE)
             for item in mesh.iter(item_type=CUBA.EDGE):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.EDGE]})
+                _select_keys(item, keys)
                 h5_mesh.add([item])
 
+            keys = cuba_keys.get(CUBA.FACE)
             for item in mesh.iter(item_type=CUBA.FACE):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.FACE]})
+                _select_keys(item, keys)
                 h5_mesh.add([item])
 
+            keys = cuba_keys.get(CUBA.CELL)
             for item in mesh.iter(item_type=CUBA.CELL):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.CELL]})
+                _select_keys(item, keys)
                 h5_mesh.add([item])
         else:
             h5_mesh.add(mesh.iter())
 
-    def _add_lattice(self, lattice, cuba_keys):
+    def _add_lattice(self, lattice, cuba_keys, precision=None):
         """Add lattice to the file.
 
         Parameters
@@ -339,6 +681,8 @@ class H5CUDS(object):
         cuba_keys : dict
             Dictionary of CUBAs with their related CUBA keys that
             are added to the H5CUDS container.
+        precision : FloatPrecision, optional
+            The storage precision of the float values.
 
         Returns
         ----------
@@ -351,19 +695,19 @@ class H5CUDS(object):
 
         group = tables.Group(lattice_root, name=name, new=True)
         h5_lattice = H5Lattice.create_new(
-            group, lattice.primitive_cell, lattice.size, lattice.origin)
+            group, lattice.primitive_cell, lattice.size, lattice.origin,
+            precision=precision)
         h5_lattice.data = lattice.data
 
         if cuba_keys is not None:
+            keys = cuba_keys.get(CUBA.NODE)
             for item in lattice.iter(item_type=CUBA.NODE):
-                item.data = DataContainer(
-                    {key: item.data[key] for key in item.data
-                     if key in cuba_keys[CUBA.NODE]})
+                _select_keys(item, keys)
                 h5_lattice.update([item])
         else:
             h5_lattice.update(lattice.iter(item_type=CUBA.NODE))
 
-    def _get_particles(self, name):
+    def _get_particles(self, name, cache_size=None):
         """Get particle container from file.
         The returned particle container can be used to query
         and change the related data stored in the file. If the
@@ -374,11 +718,15 @@ class H5CUDS(object):
         ----------
         name : str
             name of particle container to return
+        cache_size : int, optional
+            size of the item cache
         """
+        if name in self._preloaded:
+            return self._preloaded[name]
         group = self._root.particle._f_get_child(name)
-        return H5Particles(group)
+        return H5Particles(group, cache_size=cache_size)
 
-    def _get_mesh(self, name):
+    def _get_mesh(self, name, cache_size=None):
         """Get mesh from file.
 
         The returned mesh can be used to query
@@ -389,11 +737,15 @@ class H5CUDS(object):
         ----------
         name : str
             name of the mesh to return
+        cache_size : int, optional
+            size of the item cache
         """
+        if name in self._preloaded:
+            return self._preloaded[name]
         group = self._root.mesh._f_get_child(name)
-        return H5Mesh(group, self._handle)
+        return H5Mesh(group, self._handle, cache_size=cache_size)
 
-    def _get_lattice(self, name):
+    def _get_lattice(self, name, cache_size=None):
         """Get lattice from file.
 
         The returned lattice can be used to query
@@ -405,9 +757,13 @@ class H5CUDS(object):
         ----------
         name : str
             name of lattice to return
+        cache_size : int, optional
+            size of the node cache
         """
+        if name in self._preloaded:
+            return self._preloaded[name]
         group = self._root.lattice._f_get_child(name)
-        return H5Lattice(group)
+        return H5Lattice(group, cache_size=cache_size)
 
     def _remove_particles(self, name):
         """Delete particle container from file.
@@ -501,3 +857,20 @@ class H5CUDS(object):
             for name in names:
                 if name in self._get_child_names(self._root.lattice):
                     yield self._get_lattice(name)
+
+
+def _select_keys(item, keys):
+    """ Keep only the CUBA keys in the item data, all when keys is None.
+
+    """
+    if keys is not None:
+        item.data = DataContainer(
+            {key: item.data[key] for key in item.data if key in keys})
+
+
+def _expected_counts(container, item_types):
+    """ Return the count of each item type in the container.
+
+    """
+    return {
+        item_type: container.count_of(item_type) for item_type in item_types}
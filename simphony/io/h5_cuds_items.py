@@ -1,9 +1,20 @@
 import abc
+import copy
+import uuid
 from collections import MutableMapping
 
-import tables
+import numpy
 
 from .data_container_table import DataContainerTable
+from .h5_batch import find_rows, iter_sorted_rows
+from .h5_free_list import H5FreeList, compact_table
+from .h5_item_cache import item_cache
+from .h5_precision import FloatPrecision
+from .h5_fingerprint import H5ChunkDigests
+from .h5_summary import H5Summary
+
+#: The number of rows read at once when iterating over all the items.
+CHUNK_SIZE = 4096
 
 
 class H5CUDSItems(MutableMapping):
@@ -12,8 +23,25 @@ class H5CUDSItems(MutableMapping):
     The class implements the Mutable-Mapping api where each item instance
     is mapped to uuid.
 
+    Removing an item clears the uid of its row (a tombstone) and deletes
+    its data. The free rows are reused when new items are added and
+    :meth:`compact` rebuilds the tables without them.
+
+    The item data are saved by the class in a separate table, subclasses
+    populate and retrieve the remaining item information.
+
+    Retrieved items are kept in a least recently used cache (see
+    :class:`~.ItemCache`) shared by all the proxies of the same table.
+    Updating or removing an item discards it from the cache.
+
+    The summary statistics of the items (see :class:`~.H5Summary`) are
+    kept in the attributes of the group and updated with the tables.
+
     """
 
+    #: The items have coordinates and their bounds are summarised.
+    _summary_coordinates = False
+
     @property
     def valid(self):
         """ A PyTables table is opened/created and the object is valid.
@@ -21,7 +49,8 @@ class H5CUDSItems(MutableMapping):
         """
         return getattr(self, '_items', None) is not None
 
-    def __init__(self, root, record, name='items'):
+    def __init__(self, root, record, name='items', cache_size=None,
+                 expected_number=None, precision=None):
         """ Create a proxy object for an HDF5 backed items container.
 
         Parameters
@@ -31,24 +60,62 @@ class H5CUDSItems(MutableMapping):
         name : string
             The name of the new group that will be created. Default name is
             'items'.
+        cache_size : int, optional
+            The number of retrieved items to cache, zero disables the
+            cache. Default is to keep the size of an existing cache or
+            use ``DEFAULT_CACHE_SIZE``.
+        expected_number : int, optional
+            The expected number of items of new tables, used by PyTables
+            to choose the chunk shape.
+        precision : FloatPrecision, optional
+            The storage precision of the float values of the item data.
+            Default is full precision.
 
         """
-        if hasattr(root, name):
-            self._group = getattr(root, name)
-            self._items = self._group.items
-        else:
+        if precision is None:
+            precision = FloatPrecision()
+        self._precision = precision
+        new = not hasattr(root, name)
+        if new:
             handle = root._v_file
             self._group = handle.create_group(root, name)
-            self._items = handle.create_table(self._group, 'items', record)
-        self._data = DataContainerTable(self._group, name='data')
+            self._items = handle.create_table(
+                self._group, 'items', record, expectedrows=expected_number)
+        else:
+            self._group = getattr(root, name)
+            self._items = self._group.items
+        self._summary = H5Summary(
+            self._group, precision=precision,
+            coordinates=self._summary_coordinates)
+        if new:
+            self._summary.clear()
+        # the chunk digests of the dataset are kept in the root group
+        self._digests = H5ChunkDigests(root)
+        self._data = DataContainerTable(
+            self._group, name='data', expected_number=expected_number,
+            precision=precision)
+        self._free = H5FreeList(self._group, 'items_free')
+        self._cache = item_cache(self._items, self._copy, cache_size)
+
+    @property
+    def cache(self):
+        """ The cache of the retrieved items.
+
+        """
+        return self._cache
 
     def __getitem__(self, uid):
         """ Return the Particle with the provided id.
 
         """
+        item = self._cache.get(uid)
+        if item is not None:
+            return item
         for row in self._items.where(
                 'uid == value',  condvars={'value': uid.hex}):
-            return self._retrieve(row)
+            item = self._retrieve(row)
+            self._cache.put(uid, item)
+            return item
         else:
             raise KeyError(
                 'Record (id={id}) does not exist'.format(id=uid))
@@ -67,6 +134,7 @@ class H5CUDSItems(MutableMapping):
         if item.uid is None:
             item.uid = uid
 
+        self._cache.discard(uid)
         table = self._items
         for row in table.where(
                 'uid == value', condvars={'value': uid.hex}):
@@ -74,35 +142,34 @@ class H5CUDSItems(MutableMapping):
             row.update()
             # see https://github.com/PyTables/PyTables/issues/11
             row._flush_mod_rows()
+            self._data[uid] = item.data
+            self._summary.update([item])
+            self._digests.changed([uid])
             return
         else:
-            row = table.row
-            row['uid'] = uid.hex
-            self._populate(row, item)
-            row.append()
-            table.flush()
+            self._append(uid, item)
 
     def __delitem__(self, uid):
         """ Delete the row.
 
+        The row is marked as deleted and added to the free rows.
+
         """
         if not hasattr(uid, 'hex'):
             raise KeyError('{} is not a uuid.UUID'.format(uid))
 
+        self._cache.discard(uid)
         table = self._items
         for row in table.where(
                 'uid == value', condvars={'value': uid.hex}):
-            if table.nrows == 1:
-                record = table.description
-                # pytables due to hdf5 limitations does
-                # not support removing the last row of table
-                # so we delete the table and
-                # create new empty table in this situation
-                table.remove()
-                self._items = tables.Table(self._group, 'items', record)
-                del self._data[uid]
-            else:
-                table.remove_row(row.nrow)
+            row['uid'] = ''
+            row.update()
+            # see https://github.com/PyTables/PyTables/issues/11
+            row._flush_mod_rows()
+            self._free.push(row.nrow)
+            del self._data[uid]
+            self._summary.remove(1)
+            self._digests.changed([uid])
             break
         else:
             raise KeyError(
@@ -115,7 +182,7 @@ class H5CUDSItems(MutableMapping):
         tables is not equal.
 
         """
-        nrows = self._items.nrows
+        nrows = self._items.nrows - len(self._free)
         if len(self._data) != nrows:
             message = (
                 "internal items and data tables contain different number of "
@@ -134,8 +201,31 @@ class H5CUDSItems(MutableMapping):
         """ Iterate over all the rows
 
         """
-        for row in self._items:
-            yield self._retrieve(row)
+        for chunk in self.iter_chunks():
+            for item in chunk:
+                yield item
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE, start=0, stop=None):
+        """ Iterate over all the items in lists of up to chunk_size items.
+
+        The item rows and the related data rows of each chunk are read
+        from the tables in bulk, instead of one query per item. Only the
+        items in the table rows from start to stop are returned when
+        given.
+
+        """
+        table = self._items
+        stop = table.nrows if stop is None else min(stop, table.nrows)
+        index = None
+        for first in xrange(start, stop, chunk_size):
+            rows = table.read(first, min(first + chunk_size, stop))
+            rows = rows[rows['uid'] != '']
+            if len(rows) == 0:
+                continue
+            if index is None:
+                index = self._data.uid_index()
+            uids = [uuid.UUID(hex=value, version=4) for value in rows['uid']]
+            yield self._retrieve_many(rows, self._data.read_many(uids, index))
 
     def __contains__(self, uid):
         for row in self._items.where(
@@ -151,12 +241,7 @@ class H5CUDSItems(MutableMapping):
           The item is expected to already have a uid set.
 
         """
-        table = self._items
-        row = table.row
-        row['uid'] = item.uid.hex
-        self._populate(row, item)
-        row.append()
-        table.flush()
+        self._append(item.uid, item)
 
     def add_safe(self, item):
         """ Add item while checking for a unique uid.
@@ -180,6 +265,7 @@ class H5CUDSItems(MutableMapping):
         uid = item.uid
         if not hasattr(uid, 'hex'):
             raise ValueError('{} is not a uuid.UUID'.format(uid))
+        self._cache.discard(uid)
         table = self._items
         for row in table.where(
                 'uid == value', condvars={'value': uid.hex}):
@@ -187,19 +273,220 @@ class H5CUDSItems(MutableMapping):
             row.update()
             # see https://github.com/PyTables/PyTables/issues/11
             row._flush_mod_rows()
+            self._data[uid] = item.data
+            self._summary.update([item])
+            self._digests.changed([uid])
             return
         else:
             message = 'Item with id {} does not exist'
             raise ValueError(message.format(uid))
 
+    def add_many(self, items):
+        """ Add many items while checking for unique uids.
+
+        The rows are written in free rows or appended to the table with
+        a single flush.
+
+        .. note::
+          The items are expected to already have a uid set.
+
+        Raises
+        ------
+        ValueError :
+            If the uid of any item is repeated or already exists. No
+            item is added.
+
+        """
+        items = list(items)
+        seen = set()
+        for item in items:
+            if item.uid in seen:
+                raise ValueError(
+                    'Record (id={id}) already exists'.format(id=item.uid))
+            seen.add(item.uid)
+        rows = find_rows(self._items, 'uid', [item.uid for item in items])
+        existing = numpy.flatnonzero(rows >= 0)
+        if len(existing) > 0:
+            raise ValueError(
+                'Record (id={id}) already exists'.format(
+                    id=items[existing[0]].uid))
+        self._append_rows([(item.uid, item) for item in items])
+        self._data.set_many((item.uid, item.data) for item in items)
+        self._summary.add(items)
+        self._digests.changed(item.uid for item in items)
+
+    def update_many(self, items, attributes=True, data=True):
+        """ Update many existing items.
+
+        The rows are updated in row order with a single flush.
+
+        Parameters
+        ----------
+        items : iterable
+            The items to update.
+        attributes : bool
+            Write the item rows. Default is True.
+        data : bool
+            Write the item data. Default is True.
+
+        Raises
+        ------
+        ValueError :
+            If any of the items does not exist. No item is updated.
+
+        """
+        items = list(items)
+        table = self._items
+        rows = find_rows(table, 'uid', [item.uid for item in items])
+        missing = numpy.flatnonzero(rows < 0)
+        if len(missing) > 0:
+            message = 'Item with id {} does not exist'
+            raise ValueError(message.format(items[missing[0]].uid))
+        self._cache.discard_many(item.uid for item in items)
+        if attributes:
+            for row, position in iter_sorted_rows(table, rows):
+                self._populate(row, items[position])
+                row.update()
+        if data:
+            self._data.set_many((item.uid, item.data) for item in items)
+        self._summary.update(items)
+        self._digests.changed(item.uid for item in items)
+
+    def remove_many(self, uids):
+        """ Remove many items.
+
+        Raises
+        ------
+        KeyError :
+            If any of the uids does not exist. No item is removed.
+
+        """
+        uids = list(uids)
+        table = self._items
+        rows = find_rows(table, 'uid', uids)
+        missing = numpy.flatnonzero(rows < 0)
+        if len(missing) > 0:
+            raise KeyError(
+                'Record (id={id}) does not exist'.format(
+                    id=uids[missing[0]]))
+        self._cache.discard_many(uids)
+        for row, _ in iter_sorted_rows(table, rows):
+            row['uid'] = ''
+            row.update()
+        self._free.push_many(rows)
+        self._data.remove_many(uids)
+        self._summary.remove(len(uids))
+        self._digests.changed(uids)
+
+    def compact(self):
+        """ Rebuild the items and data tables without the deleted rows.
+
+        """
+        if len(self._free) > 0:
+            cache = self._cache
+            self._items = compact_table(self._items, 'uid')
+            self._cache = item_cache(self._items, self._copy, cache.maxsize)
+            self._free.clear()
+        self._data.compact()
+
+    @property
+    def nrows(self):
+        """ The number of table rows, including the unused rows of the
+        removed items.
+
+        """
+        return self._items.nrows
+
+    def row_nbytes(self, attributes=True, data=True):
+        """ The size in bytes of the item row and (or) data row of an item.
+
+        """
+        nbytes = 0
+        if attributes:
+            nbytes += self._items.rowsize
+        if data:
+            nbytes += self._data.rowsize
+        return nbytes
+
+    def project(self, keys):
+        """ Remove the data values of the CUBA keys not in keys.
+
+        """
+        self._data.project(keys)
+        self._cache.clear()
+        self._summary.project(keys)
+        self._digests.clear()
+
+    def summary(self, refresh=False):
+        """ Return the summary statistics of the items.
+
+        The summary is read from the attributes of the group. The tables
+        are scanned only when the summary is not recorded, or when it is
+        not exact and refresh is True.
+
+        Returns
+        -------
+        summary : ItemSummary
+            The summary of the items.
+
+        """
+        return self._summary.read(self.iter_chunks, refresh)
+
+    def _append(self, uid, item):
+        """ Store the item in a free row or at the end of the table.
+
+        """
+        self._append_rows([(uid, item)])
+        self._data[uid] = item.data
+        self._summary.add([item])
+        self._digests.changed([uid])
+
+    def _append_rows(self, items):
+        """ Store the (uid, item) pairs in free rows or at the end of the
+        items table.
+
+        """
+        if len(items) == 0:
+            return
+        table = self._items
+        free = self._free.pop_many(len(items))
+        for row, position in iter_sorted_rows(table, free):
+            uid, item = items[position]
+            row['uid'] = uid.hex
+            self._populate(row, item)
+            row.update()
+        row = table.row
+        for uid, item in items[len(free):]:
+            row['uid'] = uid.hex
+            self._populate(row, item)
+            row.append()
+        table.flush()
+
+    def _copy(self, item):
+        """ Return a copy of the item to store in or return from the cache.
+
+        """
+        return copy.deepcopy(item)
+
     @abc.abstractmethod
     def _populate(self, row, item):
         """ Populate the row from the item.
 
+        The uid column and the item data are saved by the base class.
+
         """
 
     @abc.abstractmethod
-    def _retrieve(self, row):
+    def _retrieve(self, row, data=None):
         """ Return the item instance from a table row instance.
 
+        The item data are read from the data table when ``data`` is None.
+
+        """
+
+    def _retrieve_many(self, rows, datas):
+        """ Return the item instances from the table records and their data.
+
         """
+        retrieve = self._retrieve
+        return [retrieve(row, data) for row, data in zip(rows, datas)]
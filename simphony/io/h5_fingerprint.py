@@ -0,0 +1,161 @@
+""" Content fingerprints of the HDF5 datasets
+
+This module contains the chunk digests of the content hash of a dataset
+(see :mod:`simphony.cuds.fingerprint`) that are kept in the attributes of
+the dataset group. The items that are added, updated or removed mark
+their chunks as stale and only the items of the stale chunks are hashed
+again, thus the fingerprint of a dataset that did not change is read
+without reading its tables.
+
+"""
+import hashlib
+
+import numpy
+
+from ..cuds.fingerprint import FINGERPRINT_CHUNKS, ContentHash, chunk_of
+
+# The states of a chunk
+_EMPTY = 0
+_VALID = 1
+_STALE = 2
+
+# The size of a chunk digest
+_DIGEST_SIZE = hashlib.sha1().digest_size
+
+
+class H5ChunkDigests(object):
+    """ A proxy to the chunk digests of a dataset stored in attributes of
+    an HDF5 node.
+
+    The digests are recorded when the fingerprint of the dataset is first
+    requested, the changes of the items are not recorded before. The
+    digests are not recorded when the file is opened read-only.
+
+    """
+
+    def __init__(self, node, size=None, name='fingerprint'):
+        """ Create a proxy object for the HDF5 backed chunk digests.
+
+        Parameters
+        ----------
+        node : tables.Node
+            The node where the attributes are (or will be) stored.
+        size : tuple, optional
+            The size of the lattice of the dataset.
+        name : string
+            The prefix of the names of the attributes.
+
+        """
+        self._node = node
+        self._size = size
+        self._states_name = '{}_states'.format(name)
+        self._digests_name = '{}_digests'.format(name)
+
+    def load(self):
+        """ Return the states and the digests of the chunks or None when
+        they are not recorded.
+
+        """
+        attrs = self._node._v_attrs
+        if self._states_name not in attrs:
+            return None
+        return (
+            numpy.array(attrs[self._states_name], dtype=numpy.int8),
+            numpy.array(attrs[self._digests_name], dtype=numpy.uint8))
+
+    def store(self, states, digests):
+        """ Record the states and the digests of the chunks.
+
+        """
+        if self._node._v_file.mode != 'r':
+            attrs = self._node._v_attrs
+            attrs[self._states_name] = states
+            attrs[self._digests_name] = digests
+
+    def changed(self, keys):
+        """ Mark the chunks of the items as stale.
+
+        Parameters
+        ----------
+        keys : iterable of {uuid.UUID, tuple}
+            The uids of the items, or the indices of the lattice nodes.
+
+        """
+        state = self.load()
+        if state is None:
+            return
+        states, digests = state
+        size = self._size
+        chunks = [chunk_of(key, size) for key in keys]
+        if len(chunks) > 0:
+            states[chunks] = _STALE
+            self.store(states, digests)
+
+    def clear(self):
+        """ Forget the chunk digests, they are computed again when the
+        fingerprint is requested.
+
+        """
+        attrs = self._node._v_attrs
+        for name in (self._states_name, self._digests_name):
+            if name in attrs:
+                del attrs[name]
+
+
+class H5ContentHash(ContentHash):
+    """ The content hash of an HDF5 dataset with the chunk digests kept
+    in the file (see :class:`H5ChunkDigests`).
+
+    """
+
+    def __init__(self, dataset, node):
+        """ Create the content hash of an HDF5 dataset.
+
+        Parameters
+        ----------
+        dataset : {H5Particles, H5Mesh, H5Lattice}
+            The hashed dataset.
+        node : tables.Group
+            The group of the dataset.
+
+        """
+        super(H5ContentHash, self).__init__(dataset)
+        self._digests = H5ChunkDigests(node, getattr(dataset, 'size', None))
+
+    def changed(self, item_type, key):
+        self._digests.changed([key])
+
+    def clear(self):
+        self._digests.clear()
+
+    def _refresh(self):
+        """ Hash the items of the stale chunks, or all the items when the
+        chunk digests are not recorded.
+
+        """
+        state = self._digests.load()
+        if state is None:
+            states = numpy.zeros(FINGERPRINT_CHUNKS, dtype=numpy.int8)
+            digests = numpy.zeros(
+                (FINGERPRINT_CHUNKS, _DIGEST_SIZE), dtype=numpy.uint8)
+            stale = set(range(FINGERPRINT_CHUNKS))
+        else:
+            states, digests = state
+            stale = set(numpy.flatnonzero(states == _STALE).tolist())
+        if len(stale) > 0:
+            items = {}
+            for chunk, key, digest in self._iter_digests(
+                    None if state is None else stale):
+                items.setdefault(chunk, []).append(digest)
+            for chunk in stale:
+                if chunk in items:
+                    states[chunk] = _VALID
+                    digests[chunk] = numpy.frombuffer(
+                        hashlib.sha1(''.join(sorted(items[chunk]))).digest(),
+                        dtype=numpy.uint8)
+                else:
+                    states[chunk] = _EMPTY
+            self._digests.store(states, digests)
+        self._chunks = {
+            chunk: digests[chunk].tostring()
+            for chunk in numpy.flatnonzero(states == _VALID).tolist()}
@@ -0,0 +1,190 @@
+""" Tombstone bookkeeping for the HDF5 tables
+
+This module contains the persisted list of the free (deleted) rows of a
+table and the helpers that rebuild tables and compressed sparse row
+arrays without their unused rows.
+
+"""
+import numpy
+import tables
+
+#: The number of rows copied at once when compacting a table.
+CHUNK_SIZE = 4096
+
+
+class H5FreeList(object):
+    """ A proxy to an HDF5 array node holding the free rows of a table.
+
+    Deleting an item only marks its row as deleted (a tombstone) and
+    pushes the row number in the free list. Later appends pop the free
+    rows and reuse them before growing the table.
+
+    The array node is created on the first push, thus tables that never
+    had rows deleted do not carry an empty free list.
+
+    """
+
+    def __init__(self, root, name):
+        """ Create a proxy object for an HDF5 backed free list.
+
+        Parameters
+        ----------
+        root : tables.Group
+            The node where the free list array is (or will be) stored.
+        name : string
+            The name of the array node.
+
+        """
+        self._root = root
+        self._name = name
+
+    def __len__(self):
+        array = self._array
+        return 0 if array is None else array.nrows
+
+    def push(self, row):
+        """ Add the row number to the free list.
+
+        """
+        self.push_many([row])
+
+    def push_many(self, rows):
+        """ Add the row numbers to the free list.
+
+        """
+        if len(rows) == 0:
+            return
+        array = self._array
+        if array is None:
+            array = self._root._v_file.create_earray(
+                self._root, self._name, tables.Int64Atom(), shape=(0,))
+        array.append(numpy.asarray(rows, dtype=numpy.int64))
+        array.flush()
+
+    def pop(self):
+        """ Remove and return the last free row or None when empty.
+
+        """
+        rows = self.pop_many(1)
+        return rows[0] if len(rows) > 0 else None
+
+    def pop_many(self, number):
+        """ Remove and return up to number free rows.
+
+        """
+        array = self._array
+        if array is None or array.nrows == 0 or number <= 0:
+            return []
+        nrows = array.nrows
+        start = max(nrows - number, 0)
+        rows = [int(row) for row in array.read(start, nrows)[::-1]]
+        array.truncate(start)
+        return rows
+
+    def clear(self):
+        """ Remove all the rows from the free list.
+
+        """
+        array = self._array
+        if array is not None:
+            array._f_remove()
+
+    @property
+    def _array(self):
+        root = self._root
+        if self._name in root:
+            return root._f_get_child(self._name)
+        return None
+
+
+def compact_table(table, column, chunk_size=CHUNK_SIZE):
+    """ Rebuild the table without the deleted rows.
+
+    The rows are copied in chunks to a new table that replaces the
+    original one.
+
+    Parameters
+    ----------
+    table : tables.Table
+        The table to compact.
+    column : string
+        The name of the uid column. Rows where the column is empty are
+        deleted rows.
+    chunk_size : int
+        The number of rows to copy at once.
+
+    Returns
+    -------
+    table : tables.Table
+        The new table.
+
+    """
+    parent = table._v_parent
+    name = table._v_name
+    new = table._v_file.create_table(
+        parent, '_{}_compact'.format(name), table.description,
+        filters=table.filters, expectedrows=table.nrows)
+    for start in xrange(0, table.nrows, chunk_size):
+        rows = table.read(start, start + chunk_size)
+        rows = rows[rows[column] != '']
+        if len(rows) > 0:
+            new.append(rows)
+    new.flush()
+    table.remove()
+    new._f_rename(name)
+    return new
+
+
+def compact_csr(table, array, count_column, chunk_size=CHUNK_SIZE):
+    """ Rebuild a flat array in compressed sparse row form.
+
+    The members of each table row are stored in the array at
+    ``[offset:offset + count]``. The new array holds only the slots that
+    are referenced by the table rows, in row order, and the ``offset``
+    column of the table is updated to match.
+
+    Parameters
+    ----------
+    table : tables.Table
+        The table with the ``offset`` and count columns.
+    array : tables.EArray
+        The flat array to compact.
+    count_column : string
+        The name of the column with the number of members of each row.
+    chunk_size : int
+        The number of table rows to process at once.
+
+    Returns
+    -------
+    array : tables.EArray
+        The new array.
+
+    """
+    parent = array._v_parent
+    name = array._v_name
+    new = array._v_file.create_earray(
+        parent, '_{}_compact'.format(name), array.atom, shape=(0,),
+        filters=array.filters)
+    for start in xrange(0, table.nrows, chunk_size):
+        rows = table.read(start, start + chunk_size)
+        offsets = rows['offset']
+        counts = rows[count_column].astype(numpy.int64)
+        firsts = numpy.cumsum(counts) - counts
+        total = counts.sum()
+        base = new.nrows
+        if total > 0:
+            used = counts > 0
+            first = offsets[used].min()
+            last = (offsets + counts)[used].max()
+            window = array.read(first, last)
+            positions = (
+                numpy.repeat(offsets - first - firsts, counts) +
+                numpy.arange(total, dtype=numpy.int64))
+            new.append(window[positions])
+        table.modify_column(
+            start, start + len(rows), column=base + firsts, colname='offset')
+    new.flush()
+    table.flush()
+    array.remove()
+    new._f_rename(name)
+    return new
@@ -0,0 +1,96 @@
+import uuid
+
+import numpy
+import tables
+
+from ..cuds.handle_map import HandleMap
+
+
+class H5HandleMap(object):
+    """ A proxy to an HDF5 array node holding a persisted uid -> handle map.
+
+    The handle of a uid is the row of its hex representation in the
+    append-only array node. Handles are never reassigned thus they can be
+    safely used to reference items (e.g. the particles of a bond) that
+    are removed or have not been added to the container.
+
+    The uids are cached in memory and the cache is extended when the array
+    node has been appended to by another proxy of the same group.
+
+    """
+
+    def __init__(self, root, name='handles', expected_number=None):
+        """ Create a proxy object for an HDF5 backed handle map.
+
+        Parameters
+        ----------
+        root : tables.Group
+            The root node where to add the handle array.
+        name : string
+            The name of the array node. Default name is 'handles'.
+        expected_number : int, optional
+            The expected number of uids of a new array.
+
+        """
+        if hasattr(root, name):
+            self._array = getattr(root, name)
+        else:
+            handle = root._v_file
+            self._array = handle.create_earray(
+                root, name, tables.StringAtom(itemsize=32), shape=(0,),
+                expectedrows=expected_number)
+        self._handles = HandleMap()
+
+    def __len__(self):
+        return self._array.nrows
+
+    def __contains__(self, uid):
+        self._refresh()
+        return uid in self._handles
+
+    def handle(self, uid):
+        """ Return the handle of uid.
+
+        Raises
+        ------
+        KeyError :
+            If the uid does not have a handle.
+
+        """
+        self._refresh()
+        return self._handles.handle(uid)
+
+    def acquire_many(self, uids):
+        """ Return the handles of the uids assigning new ones if needed.
+
+        """
+        self._refresh()
+        handles = self._handles
+        new_uids = []
+        for uid in uids:
+            if uid not in handles:
+                new_uids.append(uid.hex)
+            handles.acquire(uid)
+        if new_uids:
+            self._array.append(numpy.array(new_uids, dtype='S32'))
+            self._array.flush()
+        return numpy.array(
+            [handles.handle(uid) for uid in uids], dtype=numpy.int64)
+
+    def uids(self, handles):
+        """ Return the uids of the handles.
+
+        """
+        self._refresh()
+        return self._handles.uids(handles)
+
+    def _refresh(self):
+        """ Load handles appended to the array since the last access.
+
+        """
+        start = len(self._handles)
+        nrows = self._array.nrows
+        if nrows > start:
+            acquire = self._handles.acquire
+            for value in self._array.read(start, nrows):
+                acquire(uuid.UUID(hex=value, version=4))
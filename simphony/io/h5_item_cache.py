@@ -0,0 +1,171 @@
+""" Read cache of the decoded HDF5 items
+
+This module contains the size bounded, least recently used cache of
+the items decoded from the HDF5 tables and the registry sharing one
+cache between all the proxies of the same table node.
+
+"""
+import weakref
+from collections import OrderedDict, namedtuple
+
+#: The default number of items kept in the cache of an item table.
+DEFAULT_CACHE_SIZE = 1024
+
+#: The cache statistics.
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# table node -> ItemCache
+_CACHES = weakref.WeakKeyDictionary()
+
+
+class ItemCache(object):
+    """ A least recently used cache of decoded items.
+
+    The cache holds copies of the items, thus the items returned by
+    :meth:`get` can be modified by the caller without affecting the
+    cache. A cache with zero ``maxsize`` does not keep any items.
+
+    The ``hits`` count the items returned by :meth:`get` and the
+    ``misses`` the decoded items stored with :meth:`put`, thus lookups
+    of keys that are not part of the table are not counted.
+
+    """
+
+    def __init__(self, copy, maxsize=DEFAULT_CACHE_SIZE):
+        """ Create a new cache.
+
+        Parameters
+        ----------
+        copy : callable
+            The function returning a copy of an item.
+        maxsize : int
+            The maximum number of items kept in the cache.
+
+        """
+        self._copy = copy
+        self._items = OrderedDict()
+        self._maxsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.maxsize = maxsize
+
+    @property
+    def maxsize(self):
+        """ The maximum number of items kept in the cache.
+
+        Reducing the size evicts the least recently used items.
+
+        """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        if value < 0:
+            raise ValueError('Cache size should be non negative')
+        self._maxsize = value
+        self._evict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """ Return a copy of the cached item or None on a miss.
+
+        """
+        items = self._items
+        item = items.pop(key, None)
+        if item is None:
+            return None
+        items[key] = item
+        self.hits += 1
+        return self._copy(item)
+
+    def put(self, key, item):
+        """ Store a copy of the item after a cache miss.
+
+        """
+        self.misses += 1
+        if self._maxsize == 0:
+            return
+        items = self._items
+        items.pop(key, None)
+        items[key] = self._copy(item)
+        self._evict()
+
+    def discard(self, key):
+        """ Remove the item from the cache if present.
+
+        """
+        self._items.pop(key, None)
+
+    def discard_many(self, keys):
+        """ Remove the items from the cache if present.
+
+        """
+        pop = self._items.pop
+        for key in keys:
+            pop(key, None)
+
+    def clear(self):
+        """ Remove all the items and reset the statistics.
+
+        """
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """ Return the cache statistics.
+
+        Returns
+        -------
+        info : CacheInfo
+            The number of hits and misses, the maximum and the current
+            number of items.
+
+        """
+        return CacheInfo(self.hits, self.misses, self._maxsize, len(self))
+
+    def _evict(self):
+        items = self._items
+        while len(items) > self._maxsize:
+            items.popitem(last=False)
+
+
+def item_cache(node, copy, maxsize=None):
+    """ Return the item cache of the table node.
+
+    All the proxies of the same table node share the cache, thus
+    modifications through one proxy invalidate the items cached by
+    the others.
+
+    Parameters
+    ----------
+    node : tables.Node
+        The table holding the items.
+    copy : callable
+        The function returning a copy of an item.
+    maxsize : int, optional
+        The maximum number of cached items. When given it also resizes
+        an existing cache. Default is ``DEFAULT_CACHE_SIZE`` for new
+        caches.
+
+    """
+    cache = _CACHES.get(node)
+    if cache is None:
+        if maxsize is None:
+            maxsize = DEFAULT_CACHE_SIZE
+        cache = _CACHES[node] = ItemCache(copy, maxsize)
+    elif maxsize is not None:
+        cache.maxsize = maxsize
+    return cache
+
+
+def sum_info(infos):
+    """ Return the sum of the cache statistics.
+
+    """
+    return CacheInfo(*(sum(values) for values in zip(*infos)))
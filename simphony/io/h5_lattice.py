@@ -1,21 +1,43 @@
 from ..cuds import ABCLattice, LatticeNode
 from ..cuds.primitive_cell import PrimitiveCell, BravaisLattice
+from .h5_batch import UPDATE, H5BatchMixin
+from .h5_fingerprint import H5ChunkDigests, H5ContentHash
+from .h5_item_cache import item_cache
+from .h5_precision import FloatPrecision
+from .h5_prefetch import DEFAULT_DEPTH, prefetch_chunks
+from .h5_summary import H5Summary
 from .indexed_data_container_table import IndexedDataContainerTable
 from .data_container_description import NoUIDRecord
 from ..core.data_container import DataContainer
 from ..core import CUBA
 
+import uuid
+
 import numpy as np
 
 
 LATTICE_CUDS_VERSION = 2
 
+#: The number of nodes read at once when iterating over all the nodes.
+CHUNK_SIZE = 4096
+
 
-class H5Lattice(ABCLattice):
+class H5Lattice(ABCLattice, H5BatchMixin):
     """ H5Lattice object to use H5CUDS lattices.
 
+    Use ``with lattice.batch():`` to buffer a sequence of node updates
+    and write them in bulk (see :meth:`batch`).
+
+    Retrieved nodes are kept in a least recently used cache (see
+    :meth:`cache_info`) shared by all the proxies of the same lattice.
+
+    The summary statistics of the node data (see :meth:`summary`) are
+    kept in the attributes of the lattice group.
+
     """
-    def __init__(self, group):
+    cuba_key = CUBA.LATTICE
+
+    def __init__(self, group, cache_size=None):
         """ Return a reference to existing lattice in a H5CUDS group.
 
         Parameters
@@ -23,6 +45,10 @@ class H5Lattice(ABCLattice):
         group : HDF5 group in PyTables file
             reference to a group (folder) in PyTables file where the tables
             for lattice and data are located
+        cache_size : int, optional
+            The number of retrieved nodes to cache, zero disables the
+            cache. Default is to keep the size of an existing cache or
+            use ``DEFAULT_CACHE_SIZE``.
 
         """
         if group._v_attrs.cuds_version != LATTICE_CUDS_VERSION:
@@ -37,13 +63,21 @@ class H5Lattice(ABCLattice):
         self._size = attrs.size
         self._origin = attrs.origin
 
-        self._table = IndexedDataContainerTable(group, 'lattice')
+        self._precision = FloatPrecision.load(group._v_attrs)
+        self._table = IndexedDataContainerTable(
+            group, 'lattice', precision=self._precision)
         self._data = IndexedDataContainerTable(group, 'data')
+        self._cache = item_cache(
+            self._table._table,
+            lambda node: LatticeNode(node.index, node.data), cache_size)
 
+        self._summary = H5Summary(group, 'node_summary', self._precision)
+        self._digests = H5ChunkDigests(group, tuple(self._size))
         self._items_count = {CUBA.NODE: lambda: self._table}
 
     @classmethod
-    def create_new(cls, group, primitive_cell, size, origin, record=None):
+    def create_new(cls, group, primitive_cell, size, origin, record=None,
+                   precision=None):
         """ Create a new lattice in H5CUDS file.
 
         Parameters
@@ -59,14 +93,19 @@ class H5Lattice(ABCLattice):
             origin of lattice
         record : tables.IsDescription
             A class that describes column types for PyTables table.
+        precision : FloatPrecision, optional
+            The storage precision of the float values of the node data
+            (see :mod:`~.h5_precision`). Default is full precision.
 
         """
         group._v_attrs.cuds_version = LATTICE_CUDS_VERSION
+        if precision is None:
+            precision = FloatPrecision()
+        precision.save(group._v_attrs)
 
-        # If record not specified use NoUIDRecord in table initialization
-        lattice = IndexedDataContainerTable(group, 'lattice',
-                                            record if record is not None
-                                            else NoUIDRecord, np.prod(size))
+        # If record not specified use the NoUIDRecord of the float type
+        lattice = IndexedDataContainerTable(
+            group, 'lattice', record, np.prod(size), precision)
         for i in xrange(np.prod(size)):
             lattice.append(DataContainer())
 
@@ -77,6 +116,7 @@ class H5Lattice(ABCLattice):
         lattice._table.attrs.origin = origin
 
         IndexedDataContainerTable(group, 'data', NoUIDRecord, 1)
+        H5Summary(group, 'node_summary').clear(int(np.prod(size)))
 
         return cls(group)
 
@@ -100,12 +140,43 @@ class H5Lattice(ABCLattice):
             container.
 
         """
+        self._sync()
         try:
             return len(self._items_count[item_type]())
         except KeyError:
             error_str = "Trying to obtain count a of non-supported item: {}"
             raise ValueError(error_str.format(item_type))
 
+    def summary(self, refresh=False):
+        """ Return the summary statistics of the nodes.
+
+        The summary of the node data is kept in the attributes of the
+        lattice group and is updated with every modification, thus it
+        is returned without reading the tables (see
+        :class:`~.H5Summary`). The bounds are the bounds of the node
+        coordinates.
+
+        Parameters
+        ----------
+        refresh : bool
+            Rebuild the summary that is not exact after updates by
+            scanning the node table. Default is False.
+
+        Returns
+        -------
+        summary : dict
+            The ItemSummary of ``CUBA.NODE``.
+
+        """
+        self._sync()
+        summary = self._summary.read(self.iter_chunks, refresh)
+        last = np.subtract(self._size, 1)
+        corners = np.array([
+            self.get_coordinate(np.multiply(corner, last))
+            for corner in np.ndindex(2, 2, 2)])
+        return {CUBA.NODE: summary._replace(bounds=(
+            corners.min(axis=0).tolist(), corners.max(axis=0).tolist()))}
+
     @property
     def size(self):
         return self._size
@@ -114,6 +185,17 @@ class H5Lattice(ABCLattice):
     def origin(self):
         return self._origin
 
+    @property
+    def uid(self):
+        """ The uid of the container, or None for the containers stored
+        without a uid.
+
+        """
+        attrs = self._group._v_attrs
+        if 'uid' not in attrs:
+            return None
+        return uuid.UUID(hex=attrs.uid)
+
     @property
     def name(self):
         return self._group._v_name
@@ -124,6 +206,8 @@ class H5Lattice(ABCLattice):
 
     @property
     def data(self):
+        if self._batch is not None and self._batch.data is not None:
+            return DataContainer(self._batch.data)
         if len(self._data) == 1:
             return self._data[0]
         else:
@@ -131,13 +215,185 @@ class H5Lattice(ABCLattice):
 
     @data.setter
     def data(self, value):
-        if len(self._data) == 0:
+        if self._batch is not None:
+            self._batch.data = DataContainer(value)
+        elif len(self._data) == 0:
             self._data.append(value)
         else:
             self._data[0] = value
 
+    @property
+    def precision(self):
+        """ The storage precision of the float values (see
+        :class:`~.FloatPrecision`).
+
+        """
+        return self._precision
+
+    def iter_chunks(self, item_type=CUBA.NODE, chunk_size=CHUNK_SIZE,
+                    start=0, stop=None):
+        """ Iterate over all the nodes in lists.
+
+        The node data are read in bulk for every chunk.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items, only ``CUBA.NODE`` is supported.
+        chunk_size : int
+            The maximum number of nodes in each list.
+        start : int
+            The first table row, the rows follow the C order of the node
+            indices.
+        stop : int, optional
+            The table row after the last, default is the number of
+            nodes.
+
+        Yields
+        ------
+        nodes : list of LatticeNode
+            The nodes of the next chunk of table rows.
+
+        """
+        if item_type != CUBA.NODE:
+            raise ValueError(
+                "Trying to iterate over a non-supported item: {}"
+                .format(item_type))
+        self._sync()
+        return self._iter_node_chunks(chunk_size, start, stop)
+
+    def row_count(self, item_type=CUBA.NODE):
+        """ Return the number of rows of the node table.
+
+        """
+        if item_type != CUBA.NODE:
+            raise ValueError(
+                "Trying to obtain count a of non-supported item: {}"
+                .format(item_type))
+        return len(self._table)
+
+    def prefetch(self, item_type=CUBA.NODE, depth=DEFAULT_DEPTH,
+                 max_bytes=None, chunk_size=CHUNK_SIZE):
+        """ Read the chunks of nodes ahead in a background thread.
+
+        The chunks are the lists of :meth:`iter_chunks` and their size
+        is estimated from the size of the table rows of their items.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items.
+        depth : int
+            The maximum number of chunks read ahead.
+        max_bytes : int, optional
+            The maximum size of the chunks read ahead.
+        chunk_size : int
+            The maximum number of items in each chunk.
+
+        Returns
+        -------
+        chunks : Prefetcher
+            The iterator over the chunks, which should be closed when
+            the iteration is not exhausted.
+
+        """
+        chunks = self.iter_chunks(item_type, chunk_size)
+        return prefetch_chunks(chunks, self._table.rowsize, depth, max_bytes)
+
+    def cache_info(self):
+        """ Return the statistics of the node cache.
+
+        Returns
+        -------
+        info : CacheInfo
+            The number of hits and misses, the maximum and the current
+            number of cached nodes.
+
+        """
+        return self._cache.info()
+
+    def cache_clear(self):
+        """ Remove all the cached nodes and reset the statistics.
+
+        """
+        self._cache.clear()
+
+    def project(self, cuba_keys):
+        """ Keep only the selected CUBA keys in the data of the nodes.
+
+        The data tables are rewritten in place, in chunks, without
+        decoding the nodes.
+
+        Parameters
+        ----------
+        cuba_keys : dict
+            The CUBA keys to keep for each item type (``CUBA.NODE``). The
+            data of the item types not in the dictionary is not changed.
+
+        """
+        self._sync()
+        if CUBA.NODE in cuba_keys:
+            self._table.project(cuba_keys[CUBA.NODE])
+            self._cache.clear()
+            self._summary.project(cuba_keys[CUBA.NODE])
+            self._digests.clear()
+
+    def vacuum(self):
+        """ Reclaim unused storage.
+
+        The lattice tables have a fixed row for every node and nodes
+        cannot be removed, thus there is no unused storage to reclaim.
+        The method is provided for api compatibility with the other
+        HDF5 backed datasets.
+
+        """
+
     # Private
 
+    def _content_hash(self):
+        """ The chunk digests are kept in the attributes of the group.
+
+        """
+        self._sync()
+        return H5ContentHash(self, self._group)
+
+    def _apply_changes(self, container, changes):
+        """ Write the nodes of the container changed since its last sync.
+
+        Parameters
+        ----------
+        container : ABCLattice
+            The lattice with the changed nodes.
+        changes : ChangeTracker
+            The changes of the lattice.
+
+        Returns
+        -------
+        nbytes : int
+            The size of the table rows written.
+
+        """
+        self._sync()
+        self.data = container.data
+        nbytes = self._data.rowsize
+        for indices in changes.updates(CUBA.NODE).values():
+            self._update_nodes(container.iter(indices, item_type=CUBA.NODE))
+            nbytes += len(indices) * self._table.rowsize
+        return nbytes
+
+    def _apply_batch(self, batch):
+        """ Write the pending modifications of the batch.
+
+        """
+        if batch.data is not None:
+            self.data = batch.data
+        rows = batch.keys(UPDATE)
+        nodes = batch.items(UPDATE, CUBA.NODE)
+        self._cache.discard_many(rows)
+        self._table.set_many(rows, [node.data for node in nodes])
+        self._summary.update(nodes)
+        self._digests.changed(node.index for node in nodes)
+
     def _get_node(self, index):
         """ Get a copy of the node corresponding to the given index.
 
@@ -155,7 +411,12 @@ class H5Lattice(ABCLattice):
             n = np.ravel_multi_index(index, self._size)
         except ValueError:
             raise IndexError('invalid index: {}'.format(index))
-        return LatticeNode(index, self._table[n])
+        self._sync()
+        node = self._cache.get(n)
+        if node is None:
+            node = LatticeNode(index, self._table[n])
+            self._cache.put(n, node)
+        return node
 
     def _update_nodes(self, nodes):
         """ Updates H5Lattice data for a LatticeNode
@@ -167,13 +428,37 @@ class H5Lattice(ABCLattice):
 
         """
         # Find correct row for node
+        rows = []
+        updated = []
         for node in nodes:
             index = node.index
             try:
                 n = np.ravel_multi_index(index, self._size)
             except ValueError:
                 raise IndexError('invalid index: {}'.format(index))
-            self._table[n] = node.data
+            if self._batch is not None:
+                self._batch.update(
+                    CUBA.NODE, LatticeNode(index, node.data), key=n)
+            else:
+                rows.append(n)
+                updated.append(node)
+        self._cache.discard_many(rows)
+        self._table.set_many(rows, [node.data for node in updated])
+        self._summary.update(updated)
+        self._digests.changed(node.index for node in updated)
+
+    def _iter_node_chunks(self, chunk_size, first=0, stop=None):
+        """ Iterate over the nodes in lists of up to chunk_size nodes.
+
+        """
+        table = self._table
+        stop = len(table) if stop is None else min(stop, len(table))
+        for start in xrange(first, stop, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, stop))
+            indices = np.transpose(np.unravel_index(rows, self._size))
+            yield [
+                LatticeNode(index, data) for index, data in
+                zip(indices, table.itersequence(rows))]
 
     def _iter_nodes(self, indices=None):
         """ Get an iterator over the LatticeNodes described by the ids.
@@ -188,6 +473,7 @@ class H5Lattice(ABCLattice):
         A generator for LatticeNode objects
 
         """
+        self._sync()
         if indices is None:
             for row_number, data in enumerate(self._table):
                 index = np.unravel_index(row_number, self._size)
@@ -7,6 +7,9 @@ and modify a file storing mesh data
 import tables
 import uuid
 
+import numpy
+
+from ..cuds.change_tracker import ADDED
 from ..cuds.mesh import ABCMesh
 
 from ..cuds.mesh_items import Edge, Face, Cell, Point
@@ -14,17 +17,28 @@ from ..cuds.mesh_items import Edge, Face, Cell, Point
 from ..core.data_container import DataContainer
 from ..core import CUBA
 
-from .data_container_table import DataContainerTable
+from .h5_batch import ADD, UPDATE, H5BatchMixin, find_rows
+from .h5_fingerprint import H5ChunkDigests, H5ContentHash
+from .h5_free_list import compact_csr
+from .h5_handle_map import H5HandleMap
+from .h5_item_cache import item_cache, sum_info
+from .h5_precision import FloatPrecision
+from .h5_prefetch import DEFAULT_DEPTH, prefetch_chunks
+from .h5_summary import H5Summary
 from .indexed_data_container_table import IndexedDataContainerTable
 
-MAX_POINTS_IN_EDGE = 2
-MAX_POINTS_IN_FACE = 4
-MAX_POINTS_IN_CELL = 8
+MESH_CUDS_VERSION = 3
+
+#: The number of rows read at once when iterating over all the items.
+CHUNK_SIZE = 4096
 
-MESH_CUDS_VERSION = 1
+#: The expected number of points of an element, used to estimate the
+#: size of new connectivity arrays.
+POINTS_PER_ELEMENT = 4
 
 err_add = "Trying to add an already existing {} with uid: {}"
 err_upd = "Trying to update an non existing {} with uid: {}"
+err_get = "Trying to get an non existing {} with uid: {}"
 
 
 class _PointDescriptor(tables.IsDescription):
@@ -36,61 +50,65 @@ class _PointDescriptor(tables.IsDescription):
     """
 
     uid = tables.StringCol(32, pos=0)
-    data = tables.StringCol(32, pos=1)
     coordinates = tables.Float64Col(
-        pos=2, shape=(3,)
+        pos=1, shape=(3,)
         )
 
 
-class _EdgeDescriptor(tables.IsDescription):
-    """ Descriptor for storing Edge information
-
-    Provides the column definition to store Edges
-    forming an edge and its data.
+class _PointDescriptor32(tables.IsDescription):
+    """ Descriptor for storing Point information in single precision
 
     """
 
     uid = tables.StringCol(32, pos=0)
-    data = tables.StringCol(32, pos=1)
-    points_uids = tables.StringCol(
-        32, pos=2, shape=(MAX_POINTS_IN_EDGE,)
-        )
-    n_points = tables.UInt32Col(pos=3)
+    coordinates = tables.Float32Col(pos=1, shape=(3,))
 
 
-class _FaceDescriptor(tables.IsDescription):
-    """ Descriptor for storing Face information
+# float type -> descriptor of the points table
+_POINT_DESCRIPTORS = {
+    'float64': _PointDescriptor,
+    'float32': _PointDescriptor32}
 
-    Provides the column definition to store Faces
-    forming a face and its data.
+
+class _ElementDescriptor(tables.IsDescription):
+    """ Descriptor for storing Edge, Face and Cell information
+
+    Provides the column definition to store the location of
+    the element points in the connectivity array. The handles
+    of the points are stored at ``[offset:offset + n_points]``.
 
     """
 
     uid = tables.StringCol(32, pos=0)
-    data = tables.StringCol(32, pos=1)
-    points_uids = tables.StringCol(
-        32, pos=2, shape=(MAX_POINTS_IN_FACE,)
-        )
-    n_points = tables.UInt32Col(pos=3)
+    offset = tables.Int64Col(pos=1)
+    n_points = tables.Int32Col(pos=2)
 
 
-class _CellDescriptor(tables.IsDescription):
-    """ Descriptor for storing Cell information
+# item type -> (item table, connectivity array, item class)
+_ELEMENTS = {
+    CUBA.EDGE: ('edges', 'edge_points', Edge),
+    CUBA.FACE: ('faces', 'face_points', Face),
+    CUBA.CELL: ('cells', 'cell_points', Cell)
+}
 
-    Provides the column definition to store Cells
-    forming a cell and its data.
+# item type -> item data table, the rows of the data tables are
+# aligned with the rows of the related item tables
+_ITEM_DATA = {
+    CUBA.POINT: 'point_data',
+    CUBA.EDGE: 'edge_data',
+    CUBA.FACE: 'face_data',
+    CUBA.CELL: 'cell_data'
+}
 
-    """
 
-    uid = tables.StringCol(32, pos=0)
-    data = tables.StringCol(32, pos=1)
-    points_uids = tables.StringCol(
-        32, pos=2, shape=(MAX_POINTS_IN_CELL,)
-        )
-    n_points = tables.UInt32Col(pos=3)
+def _copy_element(element):
+    """ Return a copy of the edge, face or cell.
 
+    """
+    return type(element)(element.points, element.uid, element.data)
 
-class H5Mesh(ABCMesh):
+
+class H5Mesh(ABCMesh, H5BatchMixin):
     """ H5Mesh.
 
     Interface of the mesh file driver.
@@ -106,6 +124,16 @@ class H5Mesh(ABCMesh):
     (4) inspection methods to identify if there are any edges,
         faces or cells described in the mesh.
 
+    Use ``with mesh.batch():`` to buffer a sequence of modifications
+    and write them in bulk (see :meth:`batch`).
+
+    Retrieved points and elements are kept in a least recently used
+    cache for each item type (see :meth:`cache_info`). The caches are
+    shared by all the proxies of the same mesh.
+
+    The summary statistics of the items of every type (see
+    :meth:`summary`) are kept in the attributes of the mesh group.
+
     Attributes
     ----------
     data : Data
@@ -120,11 +148,39 @@ class H5Mesh(ABCMesh):
     _create_faces_table, _create_cells_table
 
     """
+    cuba_key = CUBA.MESH
+
+    def __init__(self, group, meshFile, cache_size=None,
+                 expected_counts=None, precision=None):
+        """ Return a proxy to the mesh in a H5CUDS group.
 
-    def __init__(self, group, meshFile):
+        Parameters
+        ----------
+        group : tables.Group
+            The group of the mesh.
+        meshFile : tables.File
+            The file of the group.
+        cache_size : int, optional
+            The number of retrieved items to cache for each item type,
+            zero disables the cache. Default is to keep the size of an
+            existing cache or use ``DEFAULT_CACHE_SIZE``.
+        expected_counts : dict, optional
+            The expected number of items of each item type when the
+            tables are created, used by PyTables to choose the chunk
+            shape of the tables.
+        precision : FloatPrecision, optional
+            The storage precision of the coordinates and the item data
+            of a new mesh (see :mod:`~.h5_precision`). The precision of
+            an existing mesh is read from the attributes of the group.
+            Default is full precision.
 
-        if not ("cuds_version" in group._v_attrs):
+        """
+
+        new = "cuds_version" not in group._v_attrs
+        if new:
             group._v_attrs.cuds_version = MESH_CUDS_VERSION
+            if precision is not None:
+                precision.save(group._v_attrs)
         else:
             if group._v_attrs.cuds_version != MESH_CUDS_VERSION:
                 raise ValueError(
@@ -132,20 +188,46 @@ class H5Mesh(ABCMesh):
 
         self._file = meshFile
         self._group = group
+        self._precision = precision = FloatPrecision.load(group._v_attrs)
+        if expected_counts is None:
+            expected_counts = {}
         self._data = IndexedDataContainerTable(group, 'data')
-        self._uidData = DataContainerTable(self._group, 'item_data')
+        self._item_data = {
+            item_type: IndexedDataContainerTable(
+                group, name, expected_number=expected_counts.get(item_type),
+                precision=precision)
+            for item_type, name in _ITEM_DATA.items()}
+        self._handles = H5HandleMap(
+            group, 'handles', expected_counts.get(CUBA.POINT))
+        self._summaries = {
+            item_type: H5Summary(
+                group, '{}_summary'.format(item_type.name.lower()),
+                precision, coordinates=item_type == CUBA.POINT)
+            for item_type in (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL)}
+        if new:
+            for summary in self._summaries.values():
+                summary.clear()
+        self._digests = H5ChunkDigests(group)
 
         if "points" not in self._group:
-            self._create_points_table()
+            self._create_points_table(expected_counts.get(CUBA.POINT))
 
         if "edges" not in self._group:
-            self._create_edges_table()
+            self._create_edges_table(expected_counts.get(CUBA.EDGE))
 
         if "faces" not in self._group:
-            self._create_faces_table()
+            self._create_faces_table(expected_counts.get(CUBA.FACE))
 
         if "cells" not in self._group:
-            self._create_cells_table()
+            self._create_cells_table(expected_counts.get(CUBA.CELL))
+
+        self._caches = {
+            CUBA.POINT: item_cache(
+                self._group.points, Point.from_point, cache_size)}
+        for item_type, (table_name, _, _) in _ELEMENTS.items():
+            self._caches[item_type] = item_cache(
+                self._group._f_get_child(table_name), _copy_element,
+                cache_size)
 
         self._items_count = {
             CUBA.POINT: lambda: self._group.points,
@@ -154,6 +236,17 @@ class H5Mesh(ABCMesh):
             CUBA.CELL: lambda: self._group.cells
         }
 
+    @property
+    def uid(self):
+        """ The uid of the container, or None for the containers stored
+        without a uid.
+
+        """
+        attrs = self._group._v_attrs
+        if 'uid' not in attrs:
+            return None
+        return uuid.UUID(hex=attrs.uid)
+
     @property
     def name(self):
         return self._group._v_name
@@ -164,6 +257,8 @@ class H5Mesh(ABCMesh):
 
     @property
     def data(self):
+        if self._batch is not None and self._batch.data is not None:
+            return DataContainer(self._batch.data)
         if len(self._data) == 1:
             return self._data[0]
         else:
@@ -171,11 +266,21 @@ class H5Mesh(ABCMesh):
 
     @data.setter
     def data(self, value):
-        if len(self._data) == 0:
+        if self._batch is not None:
+            self._batch.data = DataContainer(value)
+        elif len(self._data) == 0:
             self._data.append(value)
         else:
             self._data[0] = value
 
+    @property
+    def precision(self):
+        """ The storage precision of the float values (see
+        :class:`~.FloatPrecision`).
+
+        """
+        return self._precision
+
     def count_of(self, item_type):
         """ Return the count of item_type in the container.
 
@@ -196,12 +301,189 @@ class H5Mesh(ABCMesh):
             container.
 
         """
+        self._sync()
         try:
             return len(self._items_count[item_type]())
         except KeyError:
             error_str = "Trying to obtain count a of non-supported item: {}"
             raise ValueError(error_str.format(item_type))
 
+    def summary(self, refresh=False):
+        """ Return the summary statistics of the points and elements.
+
+        The summaries are kept in the attributes of the mesh group and
+        are updated with every modification, thus they are returned
+        without reading the tables (see :class:`~.H5Summary`).
+
+        Parameters
+        ----------
+        refresh : bool
+            Rebuild the summaries that are not exact after updates by
+            scanning the tables. Default is False.
+
+        Returns
+        -------
+        summary : dict
+            The ItemSummary of each item type (``CUBA.POINT``,
+            ``CUBA.EDGE``, ``CUBA.FACE`` and ``CUBA.CELL``).
+
+        """
+        self._sync()
+        return {
+            item_type: summary.read(
+                lambda: self.iter_chunks(item_type), refresh)
+            for item_type, summary in self._summaries.items()}
+
+    def prefetch(self, item_type, depth=DEFAULT_DEPTH, max_bytes=None,
+                 chunk_size=CHUNK_SIZE):
+        """ Read the chunks of mesh items ahead in a background thread.
+
+        The chunks are the lists of :meth:`iter_chunks` and their size
+        is estimated from the size of the table rows of their items.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items.
+        depth : int
+            The maximum number of chunks read ahead.
+        max_bytes : int, optional
+            The maximum size of the chunks read ahead.
+        chunk_size : int
+            The maximum number of items in each chunk.
+
+        Returns
+        -------
+        chunks : Prefetcher
+            The iterator over the chunks, which should be closed when
+            the iteration is not exhausted.
+
+        """
+        chunks = self.iter_chunks(item_type, chunk_size)
+        return prefetch_chunks(chunks, (
+                self._items_count[item_type]().rowsize +
+                self._item_data[item_type].rowsize), depth, max_bytes)
+
+    def cache_info(self, item_type=None):
+        """ Return the statistics of the item cache.
+
+        Parameters
+        ----------
+        item_type : CUBA, optional
+            The type of the items. Default is to return the sum over
+            all the item types.
+
+        Returns
+        -------
+        info : CacheInfo
+            The number of hits and misses, the maximum and the current
+            number of cached items.
+
+        """
+        if item_type is None:
+            return sum_info(cache.info() for cache in self._caches.values())
+        try:
+            return self._caches[item_type].info()
+        except KeyError:
+            raise ValueError(
+                "Trying to obtain cache info of a non-supported item: {}"
+                .format(item_type))
+
+    def cache_clear(self):
+        """ Remove all the cached items and reset the statistics.
+
+        """
+        for cache in self._caches.values():
+            cache.clear()
+
+    def iter_chunks(self, item_type, chunk_size=CHUNK_SIZE, start=0,
+                    stop=None):
+        """ Iterate over all the items of item_type in lists.
+
+        The item tables, the connectivity arrays and the item data are
+        read in bulk for every chunk.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items.
+        chunk_size : int
+            The maximum number of items in each list.
+        start : int
+            The first table row.
+        stop : int, optional
+            The table row after the last, default is the number of
+            table rows (see :meth:`row_count`).
+
+        Yields
+        ------
+        items : list
+            The items of the next chunk of table rows.
+
+        """
+        self._sync()
+        if item_type == CUBA.POINT:
+            return self._iter_point_chunks(chunk_size, start, stop)
+        elif item_type in _ELEMENTS:
+            return self._iter_element_chunks(
+                item_type, chunk_size, start, stop)
+        else:
+            raise ValueError(
+                "Trying to iterate over a non-supported item: {}"
+                .format(item_type))
+
+    def row_count(self, item_type):
+        """ Return the number of rows of the item_type table.
+
+        """
+        self._sync()
+        if item_type == CUBA.POINT:
+            return self._group.points.nrows
+        elif item_type in _ELEMENTS:
+            return self._group._f_get_child(_ELEMENTS[item_type][0]).nrows
+        else:
+            raise ValueError(
+                "Trying to obtain count a of non-supported item: {}"
+                .format(item_type))
+
+    def project(self, cuba_keys):
+        """ Keep only the selected CUBA keys in the data of the mesh items.
+
+        The data tables are rewritten in place, in chunks, without
+        decoding the mesh items.
+
+        Parameters
+        ----------
+        cuba_keys : dict
+            The CUBA keys to keep for each item type (``CUBA.POINT``,
+            ``CUBA.EDGE``, ``CUBA.FACE`` and ``CUBA.CELL``). The data of
+            the item types not in the dictionary is not changed.
+
+        """
+        self._sync()
+        for item_type, data in self._item_data.items():
+            if item_type in cuba_keys:
+                data.project(cuba_keys[item_type])
+                self._caches[item_type].clear()
+                self._summaries[item_type].project(cuba_keys[item_type])
+                self._digests.clear()
+
+    def vacuum(self):
+        """ Reclaim the unused storage of the element points.
+
+        Updating an element with more points than it had moves its
+        points to the end of the connectivity array. The method rebuilds
+        the connectivity arrays keeping only the points of the current
+        elements, in a single pass over each element table.
+
+        """
+        self._sync()
+        group = self._group
+        for table_name, array_name, _ in _ELEMENTS.values():
+            compact_csr(
+                group._f_get_child(table_name),
+                group._f_get_child(array_name), 'n_points')
+
     # Private
 
     def _get_point(self, uid):
@@ -227,19 +509,18 @@ class H5Mesh(ABCMesh):
             If the point identified by uid was not found
 
         """
-        if not hasattr(uid, 'hex'):
-            message = 'Expected type for `uid` is uuid.UUID but received {!r}'
-            raise TypeError(message.format(type(uid)))
-
-        for row in self._group.points.where(
-                'uid == value', condvars={'value': uid.hex}):
-            return Point(
-                coordinates=tuple(row['coordinates']),
-                uid=uuid.UUID(hex=row['uid'], version=4),
-                data=self._uidData[uuid.UUID(hex=row['data'], version=4)])
-        else:
-            error_str = "Trying to get an non existing point with uid: {}"
-            raise KeyError(error_str.format(uid))
+        self._sync()
+        cache = self._caches[CUBA.POINT]
+        point = cache.get(uid)
+        if point is not None:
+            return point
+        index, row = self._get_row(self._group.points, uid)
+        point = Point(
+            coordinates=tuple(self._precision.decode(row['coordinates'])),
+            uid=uuid.UUID(hex=row['uid'], version=4),
+            data=self._item_data[CUBA.POINT][index])
+        cache.put(uid, point)
+        return point
 
     def _get_edge(self, uid):
         """ Returns an edge with a given uid.
@@ -264,21 +545,7 @@ class H5Mesh(ABCMesh):
             If the edge identified by uid was not found
 
         """
-        if not hasattr(uid, 'hex'):
-            message = 'Expected type for `uid` is uuid.UUID but received {!r}'
-            raise TypeError(message.format(type(uid)))
-
-        for row in self._group.edges.where(
-                'uid == value', condvars={'value': uid.hex}):
-            return Edge(
-                points=tuple(
-                    uuid.UUID(hex=pb, version=4)
-                    for pb in row['points_uids'][0:row['n_points']]),
-                uid=uuid.UUID(hex=row['uid'], version=4),
-                data=self._uidData[uuid.UUID(hex=row['data'], version=4)])
-        else:
-            error_str = "Trying to get an non existing edge with uid: {}"
-            raise KeyError(error_str.format(uid))
+        return self._get_element(CUBA.EDGE, uid)
 
     def _get_face(self, uid):
         """ Returns an face with a given uid.
@@ -303,21 +570,7 @@ class H5Mesh(ABCMesh):
             If the face identified by uid was not found
 
         """
-        if not hasattr(uid, 'hex'):
-            message = 'Expected type for `uid` is uuid.UUID but received {!r}'
-            raise TypeError(message.format(type(uid)))
-
-        for row in self._group.faces.where(
-                'uid == value', condvars={'value': uid.hex}):
-            return Face(
-                uid=uuid.UUID(hex=row['uid'], version=4),
-                points=tuple(
-                    uuid.UUID(hex=pb, version=4)
-                    for pb in row['points_uids'][:row['n_points']]),
-                data=self._uidData[uuid.UUID(hex=row['data'], version=4)])
-        else:
-            error_str = "Trying to get an non existing face with uid: {}"
-            raise KeyError(error_str.format(uid))
+        return self._get_element(CUBA.FACE, uid)
 
     def _get_cell(self, uid):
         """ Returns an cell with a given uid.
@@ -342,21 +595,7 @@ class H5Mesh(ABCMesh):
             If the cell identified by uid was not found
 
         """
-        if not hasattr(uid, 'hex'):
-            message = 'Expected type for `uid` is uuid.UUID but received {!r}'
-            raise TypeError(message.format(type(uid)))
-
-        for row in self._group.cells.where(
-                'uid == value', condvars={'value': uid.hex}):
-            return Cell(
-                points=tuple(
-                    uuid.UUID(hex=pb, version=4)
-                    for pb in row['points_uids'][0:row['n_points']]),
-                uid=uuid.UUID(hex=row['uid'], version=4),
-                data=self._uidData[uuid.UUID(hex=row['data'], version=4)])
-        else:
-            error_str = "Trying to get an non existing cell with id: {}"
-            raise KeyError(error_str.format(uid))
+        return self._get_element(CUBA.CELL, uid)
 
     def _add_points(self, points):
         """ Adds a new set of points to the mesh container.
@@ -373,25 +612,34 @@ class H5Mesh(ABCMesh):
             in the mesh
 
         """
-        rpoints = []
+        points = list(points)
         for point in points:
             if point.uid is None:
                 point.uid = self._generate_uid()
-
-            for row in self._group.points.where(
-                    'uid == value', condvars={'value': point.uid.hex}):
-                raise ValueError(err_add.format('point', point.uid))
-
-            row = self._group.points.row
-
-            row['uid'] = point.uid.hex
-            row['data'] = self._uidData.append(point.data).hex
-            row['coordinates'] = point.coordinates
-
-            row.append()
-            rpoints.append(point.uid)
-
-        self._group.points.flush()
+        rpoints = [point.uid for point in points]
+        if self._batch is not None:
+            for point in points:
+                self._batch.add(
+                    CUBA.POINT, Point.from_point(point),
+                    key=(CUBA.POINT, point.uid))
+            return rpoints
+
+        table = self._group.points
+        self._check_new(table, 'point', rpoints)
+        if len(points) > 0:
+            # encode all the rows before writing, the data rows are
+            # aligned with the point rows
+            rows = numpy.empty(len(points), dtype=table.dtype)
+            rows['uid'] = [uid.hex for uid in rpoints]
+            rows['coordinates'] = self._precision.encode(
+                [point.coordinates for point in points])
+            self._handles.acquire_many(rpoints)
+            self._item_data[CUBA.POINT].extend(
+                point.data for point in points)
+            table.append(rows)
+            table.flush()
+            self._summaries[CUBA.POINT].add(points)
+            self._digests.changed(rpoints)
         return rpoints
 
     def _add_edges(self, edges):
@@ -409,30 +657,7 @@ class H5Mesh(ABCMesh):
             in the mesh
 
         """
-        redges = []
-        for edge in edges:
-            if edge.uid is None:
-                edge.uid = self._generate_uid()
-            else:
-                for row in self._group.edges.where(
-                        'uid == value', condvars={'value': edge.uid.hex}):
-                    raise ValueError(err_add.format('edge', edge.uid))
-
-            n = len(edge.points)
-
-            row = self._group.edges.row
-
-            row['uid'] = edge.uid.hex
-            row['data'] = self._uidData.append(edge.data).hex
-            row['n_points'] = n
-            row['points_uids'] = [puid.hex for puid in
-                                  edge.points] + [''] * (MAX_POINTS_IN_EDGE-n)
-
-            row.append()
-            redges.append(edge.uid)
-
-        self._group.edges.flush()
-        return redges
+        return self._add_elements(CUBA.EDGE, edges)
 
     def _add_faces(self, faces):
         """ Adds a new set of faces to the mesh container.
@@ -449,30 +674,7 @@ class H5Mesh(ABCMesh):
             in the mesh
 
         """
-        rfaces = []
-        for face in faces:
-            if face.uid is None:
-                face.uid = self._generate_uid()
-            else:
-                for row in self._group.faces.where(
-                        'uid == value', condvars={'value': face.uid.hex}):
-                    raise ValueError(err_add.format('face', face.uid))
-
-            n = len(face.points)
-
-            row = self._group.faces.row
-
-            row['uid'] = face.uid.hex
-            row['data'] = self._uidData.append(face.data).hex
-            row['n_points'] = n
-            row['points_uids'] = [puid.hex for puid in
-                                  face.points] + [''] * (MAX_POINTS_IN_FACE-n)
-
-            row.append()
-            rfaces.append(face.uid)
-
-        self._group.faces.flush()
-        return rfaces
+        return self._add_elements(CUBA.FACE, faces)
 
     def _add_cells(self, cells):
         """ Adds a new set of cells to the mesh container.
@@ -489,32 +691,9 @@ class H5Mesh(ABCMesh):
             in the mesh
 
         """
-        rcells = []
-        for cell in cells:
-            if cell.uid is None:
-                cell.uid = self._generate_uid()
-            else:
-                for row in self._group.cells.where(
-                        'uid == value', condvars={'value': cell.uid.hex}):
-                    raise ValueError(err_add.format('cell', cell.uid))
-
-            n = len(cell.points)
-
-            row = self._group.cells.row
-
-            row['uid'] = cell.uid.hex
-            row['data'] = self._uidData.append(cell.data).hex
-            row['n_points'] = n
-            row['points_uids'] = [puid.hex for puid in
-                                  cell.points] + [''] * (MAX_POINTS_IN_CELL-n)
-
-            row.append()
-            rcells.append(cell.uid)
+        return self._add_elements(CUBA.CELL, cells)
 
-        self._group.cells.flush()
-        return rcells
-
-    def _update_points(self, points):
+    def _update_points(self, points, attributes=True, data=True):
         """ Updates the information of a point.
 
         Gets the mesh points identified by the same
@@ -524,6 +703,10 @@ class H5Mesh(ABCMesh):
         ----------
         points : iterable of Point
             Points to be updated
+        attributes : bool
+            Write the coordinates of the points. Default is True.
+        data : bool
+            Write the data of the points. Default is True.
 
         Raises
         ------
@@ -531,19 +714,31 @@ class H5Mesh(ABCMesh):
             If any point was not found in the mesh container.
 
         """
-
-        for point in points:
-            for row in self._group.points.where(
-                    'uid == value', condvars={'value': point.uid.hex}):
-                row['coordinates'] = list(point.coordinates)
-                self._uidData[
-                    uuid.UUID(hex=row['data'], version=4)
-                    ] = point.data
-                row.update()
-                row._flush_mod_rows()
-                break
-            else:
-                raise ValueError(err_upd.format('point', point.uid))
+        points = list(points)
+        if self._batch is not None:
+            for point in points:
+                self._batch.update(
+                    CUBA.POINT, Point.from_point(point),
+                    key=(CUBA.POINT, point.uid))
+            return
+
+        table = self._group.points
+        indices = self._find_existing(table, 'point', points)
+        self._caches[CUBA.POINT].discard_many(point.uid for point in points)
+        if len(indices) == 0:
+            return
+        if attributes:
+            order = numpy.argsort(indices, kind='mergesort')
+            rows = table.read_coordinates(indices[order])
+            rows['coordinates'] = self._precision.encode(
+                [points[k].coordinates for k in order])
+            table.modify_coordinates(indices[order], rows)
+            table.flush()
+        if data:
+            self._item_data[CUBA.POINT].set_many(
+                indices, [point.data for point in points])
+        self._summaries[CUBA.POINT].update(points)
+        self._digests.changed(point.uid for point in points)
 
     def _update_edges(self, edges):
         """ Updates the information of an edge.
@@ -562,22 +757,7 @@ class H5Mesh(ABCMesh):
             If any edge was not found in the mesh container.
 
         """
-        for edge in edges:
-            for row in self._group.edges.where(
-                    'uid == value', condvars={'value': edge.uid.hex}):
-                n = len(edge.points)
-                row['n_points'] = n
-                row['points_uids'] = [
-                    puid.hex for puid in edge.points
-                    ] + [0] * (MAX_POINTS_IN_EDGE-n)
-                self._uidData[
-                    uuid.UUID(hex=row['data'], version=4)
-                    ] = edge.data
-                row.update()
-                row._flush_mod_rows()
-                break
-            else:
-                raise ValueError(err_upd.format('edge', edge.uid))
+        self._update_elements(CUBA.EDGE, edges)
 
     def _update_faces(self, faces):
         """ Updates the information of a face.
@@ -596,22 +776,7 @@ class H5Mesh(ABCMesh):
             If any face was not found in the mesh container.
 
         """
-        for face in faces:
-            for row in self._group.faces.where(
-                    'uid == value', condvars={'value': face.uid.hex}):
-                n = len(face.points)
-                row['n_points'] = n
-                row['points_uids'] = [
-                    puid.hex for puid in face.points
-                    ] + [0] * (MAX_POINTS_IN_FACE-n)
-                self._uidData[
-                    uuid.UUID(hex=row['data'], version=4)
-                    ] = face.data
-                row.update()
-                row._flush_mod_rows()
-                break
-            else:
-                raise ValueError(err_upd.format('face', face.uid))
+        self._update_elements(CUBA.FACE, faces)
 
     def _update_cells(self, cells):
         """ Updates the information of every cell in cells.
@@ -630,22 +795,7 @@ class H5Mesh(ABCMesh):
             If any cell was not found in the mesh container.
 
         """
-        for cell in cells:
-            for row in self._group.cells.where(
-                    'uid == value', condvars={'value': cell.uid.hex}):
-                n = len(cell.points)
-                row['n_points'] = n
-                row['points_uids'] = [
-                    puid.hex for puid in cell.points
-                    ] + [0] * (MAX_POINTS_IN_CELL-n)
-                self._uidData[
-                    uuid.UUID(hex=row['data'], version=4)
-                    ] = cell.data
-                row.update()
-                row._flush_mod_rows()
-                break
-            else:
-                raise ValueError(err_upd.format('cell', cell.uid))
+        self._update_elements(CUBA.CELL, cells)
 
     def _iter_points(self, uids=None):
         """ Returns an iterator over points.
@@ -664,13 +814,11 @@ class H5Mesh(ABCMesh):
             Iterator over the points
 
         """
+        self._sync()
         if uids is None:
-            for row in self._group.points:
-                yield Point(
-                    tuple(row['coordinates']),
-                    uuid.UUID(hex=row['uid'], version=4),
-                    self._uidData[uuid.UUID(hex=row['data'], version=4)]
-                )
+            for chunk in self._iter_point_chunks(CHUNK_SIZE):
+                for point in chunk:
+                    yield point
         else:
             for uid in uids:
                 yield self._get_point(uid)
@@ -692,17 +840,7 @@ class H5Mesh(ABCMesh):
             Iterator over the selected edges
 
         """
-        if uids is None:
-            for row in self._group.edges:
-                yield Edge(
-                    list(uuid.UUID(hex=pb, version=4) for pb in
-                         row['points_uids'][0:row['n_points']]),
-                    uuid.UUID(hex=row['uid'], version=4),
-                    self._uidData[uuid.UUID(hex=row['data'], version=4)]
-                )
-        else:
-            for uid in uids:
-                yield self._get_edge(uid)
+        return self._iter_elements(CUBA.EDGE, uids)
 
     def _iter_faces(self, uids=None):
         """ Returns an iterator over faces.
@@ -721,17 +859,7 @@ class H5Mesh(ABCMesh):
             Iterator over the faces
 
         """
-        if uids is None:
-            for row in self._group.faces:
-                yield Face(
-                    list(uuid.UUID(hex=pb, version=4) for pb in
-                         row['points_uids'][0:row['n_points']]),
-                    uuid.UUID(hex=row['uid'], version=4),
-                    self._uidData[uuid.UUID(hex=row['data'], version=4)]
-                )
-        else:
-            for uid in uids:
-                yield self._get_face(uid)
+        return self._iter_elements(CUBA.FACE, uids)
 
     def _iter_cells(self, uids=None):
         """ Returns an iterator over cells.
@@ -750,17 +878,7 @@ class H5Mesh(ABCMesh):
             Iterator over the selected cells
 
         """
-        if uids is None:
-            for row in self._group.cells:
-                yield Cell(
-                    list(uuid.UUID(hex=pb, version=4) for pb in
-                         row['points_uids'][0:row['n_points']]),
-                    uuid.UUID(hex=row['uid'], version=4),
-                    self._uidData[uuid.UUID(hex=row['data'], version=4)]
-                )
-        else:
-            for uid in uids:
-                yield self._get_cell(uid)
+        return self._iter_elements(CUBA.CELL, uids)
 
     def _has_points(self):
         """ Check if the mesh container has edges
@@ -772,6 +890,7 @@ class H5Mesh(ABCMesh):
             False otherwise
 
         """
+        self._sync()
         return self._group.points.nrows != 0
 
     def _has_edges(self):
@@ -784,6 +903,7 @@ class H5Mesh(ABCMesh):
             False otherwise
 
         """
+        self._sync()
         return self._group.edges.nrows != 0
 
     def _has_faces(self):
@@ -796,6 +916,7 @@ class H5Mesh(ABCMesh):
             False otherwise
 
         """
+        self._sync()
         return self._group.faces.nrows != 0
 
     def _has_cells(self):
@@ -808,6 +929,7 @@ class H5Mesh(ABCMesh):
             False otherwise
 
         """
+        self._sync()
         return self._group.cells.nrows != 0
 
     def _generate_uid(self):
@@ -818,26 +940,353 @@ class H5Mesh(ABCMesh):
 
         return uuid.uuid4()
 
-    def _create_points_table(self):
+    def _create_points_table(self, expected_number=None):
         """ Generates the table to store points """
 
         self._file.create_table(
-            self._group, "points", _PointDescriptor)
+            self._group, "points",
+            _POINT_DESCRIPTORS[self._precision.float_type],
+            expectedrows=expected_number)
 
-    def _create_edges_table(self):
-        """ Generates the table to store edges """
+    def _create_edges_table(self, expected_number=None):
+        """ Generates the table and connectivity array to store edges """
 
-        self._file.create_table(
-            self._group, "edges", _EdgeDescriptor)
+        self._create_elements_table(CUBA.EDGE, expected_number)
 
-    def _create_faces_table(self):
-        """ Generates the table to store faces """
+    def _create_faces_table(self, expected_number=None):
+        """ Generates the table and connectivity array to store faces """
 
-        self._file.create_table(
-            self._group, "faces", _FaceDescriptor)
+        self._create_elements_table(CUBA.FACE, expected_number)
+
+    def _create_cells_table(self, expected_number=None):
+        """ Generates the table and connectivity array to store cells """
+
+        self._create_elements_table(CUBA.CELL, expected_number)
 
-    def _create_cells_table(self):
-        """ Generates the table to store cells """
+    def _create_elements_table(self, item_type, expected_number=None):
+        """ Generates the table and connectivity array of item_type """
 
+        table_name, array_name, _ = _ELEMENTS[item_type]
         self._file.create_table(
-            self._group, "cells", _CellDescriptor)
+            self._group, table_name, _ElementDescriptor,
+            expectedrows=expected_number)
+        if expected_number is not None:
+            # the elements are expected to have a few points each
+            expected_number *= POINTS_PER_ELEMENT
+        self._file.create_earray(
+            self._group, array_name, tables.Int64Atom(), shape=(0,),
+            expectedrows=expected_number)
+
+    # Element utility methods
+
+    def _find_row(self, table, uid):
+        """ Return the row index of the item with uid or None.
+
+        """
+        indices = table.get_where_list(
+            'uid == value', condvars={'value': uid.hex})
+        if len(indices) == 0:
+            return None
+        return indices[0]
+
+    def _check_new(self, table, kind, uids):
+        """ Check that the uids are unique and not in the table.
+
+        Raises
+        ------
+        ValueError :
+            If any uid is repeated or already in the table.
+
+        """
+        seen = set()
+        for uid in uids:
+            if uid in seen:
+                raise ValueError(err_add.format(kind, uid))
+            seen.add(uid)
+        rows = find_rows(table, 'uid', uids)
+        existing = numpy.flatnonzero(rows >= 0)
+        if len(existing) > 0:
+            raise ValueError(err_add.format(kind, uids[existing[0]]))
+
+    def _find_existing(self, table, kind, items):
+        """ Return the row indices of the items in the table.
+
+        Raises
+        ------
+        ValueError :
+            If any item is not in the table.
+
+        """
+        indices = find_rows(table, 'uid', [item.uid for item in items])
+        missing = numpy.flatnonzero(indices < 0)
+        if len(missing) > 0:
+            raise ValueError(err_upd.format(kind, items[missing[0]].uid))
+        return indices
+
+    def _content_hash(self):
+        """ The chunk digests are kept in the attributes of the group.
+
+        """
+        self._sync()
+        return H5ContentHash(self, self._group)
+
+    def _apply_changes(self, container, changes):
+        """ Write the items of the container changed since its last sync.
+
+        Parameters
+        ----------
+        container : ABCMesh
+            The mesh with the changed items.
+        changes : ChangeTracker
+            The changes of the mesh.
+
+        Returns
+        -------
+        nbytes : int
+            The size of the table rows written.
+
+        """
+        self._sync()
+        self.data = container.data
+        nbytes = self._data.rowsize
+        for item_type in (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL):
+            data_rowsize = self._item_data[item_type].rowsize
+            rowsize = self._items_count[item_type]().rowsize
+            added = changes.keys(ADDED, item_type)
+            items = container.iter(added, item_type=item_type)
+            if item_type == CUBA.POINT:
+                self._add_points(items)
+            else:
+                self._add_elements(item_type, items)
+            nbytes += len(added) * (rowsize + data_rowsize)
+            for fields, uids in changes.updates(item_type).items():
+                items = container.iter(uids, item_type=item_type)
+                if item_type == CUBA.POINT:
+                    self._update_points(items, *fields)
+                else:
+                    self._update_elements(item_type, items, *fields)
+                attributes, data = fields
+                nbytes += len(uids) * (
+                    rowsize * attributes + data_rowsize * data)
+        return nbytes
+
+    def _apply_batch(self, batch):
+        """ Write the pending modifications of the batch.
+
+        """
+        if batch.data is not None:
+            self.data = batch.data
+        self._update_points(batch.items(UPDATE, CUBA.POINT))
+        self._add_points(batch.items(ADD, CUBA.POINT))
+        for item_type in (CUBA.EDGE, CUBA.FACE, CUBA.CELL):
+            self._update_elements(item_type, batch.items(UPDATE, item_type))
+            self._add_elements(item_type, batch.items(ADD, item_type))
+
+    def _get_row(self, table, uid):
+        """ Return the row of the item with uid.
+
+        Returns
+        -------
+        index : int
+            The row index.
+        row : numpy.void
+            The row record.
+
+        Raises
+        ------
+        TypeError :
+            If uid is not a uuid.UUID.
+        KeyError :
+            If the item is not in the table.
+
+        """
+        if not hasattr(uid, 'hex'):
+            message = 'Expected type for `uid` is uuid.UUID but received {!r}'
+            raise TypeError(message.format(type(uid)))
+
+        index = self._find_row(table, uid)
+        if index is None:
+            raise KeyError(err_get.format(table._v_name[:-1], uid))
+        return index, table[index]
+
+    def _get_element(self, item_type, uid):
+        """ Return the element of item_type with uid.
+
+        """
+        self._sync()
+        cache = self._caches[item_type]
+        element = cache.get(uid)
+        if element is not None:
+            return element
+        table_name, array_name, factory = _ELEMENTS[item_type]
+        index, row = self._get_row(
+            self._group._f_get_child(table_name), uid)
+        offset = row['offset']
+        members = self._group._f_get_child(array_name).read(
+            offset, offset + row['n_points'])
+        element = factory(
+            points=tuple(self._handles.uids(members)),
+            uid=uuid.UUID(hex=row['uid'], version=4),
+            data=self._item_data[item_type][index])
+        cache.put(uid, element)
+        return element
+
+    def _add_elements(self, item_type, elements):
+        """ Add the elements of item_type appending their rows at once.
+
+        """
+        table_name, array_name, factory = _ELEMENTS[item_type]
+        elements = list(elements)
+        for element in elements:
+            if element.uid is None:
+                element.uid = self._generate_uid()
+        uids = [element.uid for element in elements]
+        if self._batch is not None:
+            for element in elements:
+                copy = factory(element.points, element.uid, element.data)
+                self._batch.add(
+                    item_type, copy, key=(item_type, element.uid))
+            return uids
+
+        table = self._group._f_get_child(table_name)
+        connectivity = self._group._f_get_child(array_name)
+        self._check_new(table, table_name[:-1], uids)
+        if len(elements) > 0:
+            counts = numpy.array(
+                [len(element.points) for element in elements],
+                dtype=numpy.int64)
+            handles = self._handles.acquire_many(
+                [puid for element in elements for puid in element.points])
+            rows = numpy.empty(len(elements), dtype=table.dtype)
+            rows['uid'] = [uid.hex for uid in uids]
+            rows['offset'] = connectivity.nrows + numpy.cumsum(counts) - counts
+            rows['n_points'] = counts
+            # the data rows are aligned with the element rows
+            self._item_data[item_type].extend(
+                element.data for element in elements)
+            if len(handles) > 0:
+                connectivity.append(handles)
+                connectivity.flush()
+            table.append(rows)
+            table.flush()
+            self._summaries[item_type].add(elements)
+            self._digests.changed(uids)
+        return uids
+
+    def _update_elements(self, item_type, elements, attributes=True,
+                         data=True):
+        """ Update the elements of item_type.
+
+        The points of an element are written in place when they fit in
+        the current slot of the connectivity array, otherwise they are
+        appended to its end. The rows are written in row order with a
+        single flush. The points (``attributes``) or the data can be
+        left unchanged.
+
+        """
+        table_name, array_name, factory = _ELEMENTS[item_type]
+        elements = list(elements)
+        if self._batch is not None:
+            for element in elements:
+                copy = factory(element.points, element.uid, element.data)
+                self._batch.update(
+                    item_type, copy, key=(item_type, element.uid))
+            return
+
+        table = self._group._f_get_child(table_name)
+        connectivity = self._group._f_get_child(array_name)
+        indices = self._find_existing(table, table_name[:-1], elements)
+        self._caches[item_type].discard_many(
+            element.uid for element in elements)
+        if len(indices) == 0:
+            return
+        if data:
+            self._item_data[item_type].set_many(
+                indices, [element.data for element in elements])
+        self._summaries[item_type].update(elements)
+        self._digests.changed(element.uid for element in elements)
+        if not attributes:
+            return
+        order = numpy.argsort(indices, kind='mergesort')
+        rows = table.read_coordinates(indices[order])
+        appended = []
+        end = connectivity.nrows
+        for row, position in zip(rows, order):
+            handles = self._handles.acquire_many(elements[position].points)
+            number_of_points = len(handles)
+            if 0 < number_of_points <= row['n_points']:
+                offset = row['offset']
+                connectivity[offset:offset + number_of_points] = handles
+            elif number_of_points > 0:
+                row['offset'] = end
+                appended.append(handles)
+                end += number_of_points
+            row['n_points'] = number_of_points
+        if len(appended) > 0:
+            connectivity.append(numpy.concatenate(appended))
+        connectivity.flush()
+        table.modify_coordinates(indices[order], rows)
+        table.flush()
+
+    def _iter_elements(self, item_type, uids=None):
+        """ Iterate over the elements of item_type.
+
+        When all the elements are requested the item table and the
+        connectivity array are read in chunks of ``CHUNK_SIZE`` rows.
+
+        """
+        self._sync()
+        if uids is not None:
+            for uid in uids:
+                yield self._get_element(item_type, uid)
+            return
+
+        for chunk in self._iter_element_chunks(item_type, CHUNK_SIZE):
+            for element in chunk:
+                yield element
+
+    def _iter_point_chunks(self, chunk_size, first=0, stop=None):
+        """ Iterate over the points in lists of up to chunk_size points.
+
+        """
+        table = self._group.points
+        stop = table.nrows if stop is None else min(stop, table.nrows)
+        for start in xrange(first, stop, chunk_size):
+            rows = table.read(start, min(start + chunk_size, stop))
+            data = self._item_data[CUBA.POINT].itersequence(
+                numpy.arange(start, start + len(rows)))
+            coordinates = self._precision.decode(rows['coordinates'])
+            yield [
+                Point(
+                    tuple(coordinates[index]),
+                    uuid.UUID(hex=row['uid'], version=4),
+                    next(data))
+                for index, row in enumerate(rows)]
+
+    def _iter_element_chunks(self, item_type, chunk_size, first=0,
+                             stop=None):
+        """ Iterate over the elements of item_type in lists of up to
+        chunk_size elements.
+
+        """
+        table_name, array_name, factory = _ELEMENTS[item_type]
+        table = self._group._f_get_child(table_name)
+        connectivity = self._group._f_get_child(array_name)
+        handles = self._handles
+        stop = table.nrows if stop is None else min(stop, table.nrows)
+        for start in xrange(first, stop, chunk_size):
+            rows = table.read(start, min(start + chunk_size, stop))
+            offsets = rows['offset']
+            lowest = offsets.min()
+            last = (offsets + rows['n_points']).max()
+            points = handles.uids(connectivity.read(lowest, last))
+            data = self._item_data[item_type].itersequence(
+                numpy.arange(start, start + len(rows)))
+            elements = []
+            for row in rows:
+                offset = row['offset'] - lowest
+                elements.append(factory(
+                    points=tuple(points[offset:offset + row['n_points']]),
+                    uid=uuid.UUID(hex=row['uid'], version=4),
+                    data=next(data)))
+            yield elements
@@ -0,0 +1,223 @@
+""" Parallel decoding of the datasets of an H5CUDS file
+
+This module contains a reader that splits the table rows of the datasets
+of an H5CUDS file into ranges decoded by a pool of worker processes.
+Every worker opens the file, read only, when it starts and closes it when
+the reader is closed. The workers return the decoded items of a range,
+which are merged in the order of the table rows as the ranges complete.
+
+The decompression of the HDF5 chunks and the decoding of the items are
+CPU bound, thus loading a large file scales with the number of
+processes. The file should not be modified while it is read, nor be
+open for writing in the process creating the reader.
+
+"""
+import multiprocessing
+from multiprocessing.util import Finalize
+
+from ..core import CUBA
+from ..cuds import Lattice, Mesh, Particles
+from .h5_cuds import H5CUDS
+from .h5_cuds_items import CHUNK_SIZE
+from .h5_lattice import H5Lattice
+from .h5_mesh import H5Mesh
+
+#: The number of ranges per process that the rows of an item type are
+#: split into.
+RANGES_PER_PROCESS = 4
+
+# the H5CUDS file opened by the worker process
+_FILE = None
+
+
+class H5ParallelReader(object):
+    """ Read the datasets of an H5CUDS file with a pool of processes.
+
+    """
+
+    def __init__(self, filename, processes=None, chunk_size=CHUNK_SIZE):
+        """ Start the worker processes and open the file for reading.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the H5CUDS file.
+        processes : int, optional
+            The number of worker processes. Default is the number of
+            CPUs.
+        chunk_size : int
+            The minimum number of table rows of a range and the number of
+            items of the chunks returned by :meth:`iter_chunks`.
+
+        Raises
+        ------
+        ValueError :
+            If the file has an incompatible version.
+
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self._processes = processes
+        self._chunk_size = chunk_size
+        # the workers are started before the file is opened here, thus
+        # they do not share the HDF5 file handle of the parent
+        self._pool = multiprocessing.Pool(
+            processes, _open_file, (filename,))
+        try:
+            self._handle = H5CUDS.open(filename, 'r')
+        except Exception:
+            self._pool.terminate()
+            raise
+
+    @property
+    def processes(self):
+        """ The number of worker processes.
+
+        """
+        return self._processes
+
+    def close(self):
+        """ Close the file and stop the worker processes.
+
+        The workers finish the submitted ranges and close their files.
+
+        """
+        self._pool.close()
+        self._pool.join()
+        self._handle.close()
+
+    def iter_chunks(self, name, item_type):
+        """ Iterate over the items of item_type of a dataset in lists.
+
+        The ranges of table rows are decoded by the worker processes
+        and the lists follow the order of the table rows, as in the
+        ``iter_chunks`` method of the HDF5 datasets.
+
+        Raises
+        ------
+        ValueError:
+            If there is no dataset with the given name or the item type
+            is not supported.
+
+        """
+        dataset = self._handle.get_dataset(name, cache_size=0)
+        return _iter_results(self._submit(dataset, item_type))
+
+    def load_dataset(self, name):
+        """ Decode the dataset into an in-memory container.
+
+        Returns
+        -------
+        container : {Particles, Mesh, Lattice}
+            An in-memory copy of the dataset (see
+            :meth:`~.H5CUDS.load_dataset`).
+
+        Raises
+        ------
+        ValueError:
+            If there is no dataset with the given name
+
+        """
+        return self.load_datasets([name])[0]
+
+    def load_datasets(self, names=None):
+        """ Decode several datasets into in-memory containers.
+
+        The row ranges of all the datasets are submitted to the pool at
+        once and the items are added to the containers in order, as the
+        ranges are decoded.
+
+        Parameters
+        ----------
+        names : sequence of str, optional
+            The names of the datasets. Default is all the datasets.
+
+        Returns
+        -------
+        containers : list
+            The in-memory containers in the order of the names.
+
+        Raises
+        ------
+        ValueError:
+            If there is no dataset with one of the names.
+
+        """
+        if names is None:
+            names = self._handle.get_dataset_names()
+        datasets = [
+            self._handle.get_dataset(name, cache_size=0) for name in names]
+        submitted = []
+        for dataset in datasets:
+            submitted.append([
+                self._submit(dataset, item_type)
+                for item_type in _item_types(dataset)])
+
+        containers = []
+        for dataset, results in zip(datasets, submitted):
+            if isinstance(dataset, H5Lattice):
+                container = Lattice(
+                    dataset.name, dataset.primitive_cell, dataset.size,
+                    dataset.origin)
+                add = container.update
+            elif isinstance(dataset, H5Mesh):
+                container = Mesh(dataset.name)
+                add = container.add
+            else:
+                container = Particles(dataset.name)
+                add = container.add
+            container.data = dataset.data
+            for result in results:
+                for items in _iter_results(result):
+                    add(items)
+            container.changes.start()
+            containers.append(container)
+        return containers
+
+    def _submit(self, dataset, item_type):
+        """ Submit the decoding of the row ranges of the item type.
+
+        """
+        nrows = dataset.row_count(item_type)
+        size = -(-nrows // (self._processes * RANGES_PER_PROCESS))
+        size = max(size, self._chunk_size)
+        tasks = [
+            (dataset.name, item_type, start, min(start + size, nrows),
+             self._chunk_size)
+            for start in xrange(0, nrows, size)]
+        return self._pool.imap(_read_rows, tasks)
+
+
+def _iter_results(result):
+    for chunks in result:
+        for items in chunks:
+            yield items
+
+
+def _item_types(dataset):
+    if isinstance(dataset, H5Lattice):
+        return (CUBA.NODE,)
+    elif isinstance(dataset, H5Mesh):
+        return (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL)
+    else:
+        return (CUBA.PARTICLE, CUBA.BOND)
+
+
+def _open_file(filename):
+    """ Open the file in a worker process and close it on exit.
+
+    """
+    global _FILE
+    _FILE = H5CUDS.open(filename, 'r')
+    Finalize(_FILE, _FILE.close, exitpriority=10)
+
+
+def _read_rows(task):
+    """ Return the chunks of items decoded from a range of table rows.
+
+    This function runs in the worker processes.
+
+    """
+    name, item_type, start, stop, chunk_size = task
+    dataset = _FILE.get_dataset(name, cache_size=0)
+    return list(dataset.iter_chunks(item_type, chunk_size, start, stop))
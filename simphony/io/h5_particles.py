@@ -5,14 +5,20 @@ import numpy
 
 from ..core.data_container import DataContainer
 from ..cuds import ABCParticles
+from ..cuds.change_tracker import ADDED, REMOVED
 from ..cuds.particles_items import Bond, Particle
 from ..core import CUBA
-from .h5_cuds_items import H5CUDSItems
+from .h5_batch import ADD, REMOVE, UPDATE, H5BatchMixin, find_rows
+from .h5_cuds_items import CHUNK_SIZE, H5CUDSItems
+from .h5_fingerprint import H5ContentHash
+from .h5_free_list import compact_csr
+from .h5_handle_map import H5HandleMap
+from .h5_item_cache import sum_info
+from .h5_precision import FloatPrecision
+from .h5_prefetch import DEFAULT_DEPTH, prefetch_chunks
 from .indexed_data_container_table import IndexedDataContainerTable
 
-MAX_NUMBER_PARTICLES_IN_BOND = 20
-
-PARTICLES_CUDS_VERSION = 1
+PARTICLES_CUDS_VERSION = 2
 
 
 class _ParticleDescription(tables.IsDescription):
@@ -20,12 +26,23 @@ class _ParticleDescription(tables.IsDescription):
     coordinates = tables.Float64Col(pos=1, shape=(3,))
 
 
+class _ParticleDescription32(tables.IsDescription):
+    uid = tables.StringCol(32, pos=0)
+    coordinates = tables.Float32Col(pos=1, shape=(3,))
+
+
+# float type -> description of the particle table
+_PARTICLE_DESCRIPTIONS = {
+    'float64': _ParticleDescription,
+    'float32': _ParticleDescription32}
+
+
 class _BondDescription(tables.IsDescription):
     uid = tables.StringCol(32, pos=0)
-    # storing up to fixed number of particles for each bond
-    particles = tables.UInt8Col(
-        shape=(MAX_NUMBER_PARTICLES_IN_BOND, 16), pos=1)
-    n_particles = tables.Int8Col(pos=3)
+    # the handles of the bond particles are stored in the members
+    # array at [offset:offset + n_particles]
+    offset = tables.Int64Col(pos=1)
+    n_particles = tables.Int32Col(pos=2)
 
 
 class H5ParticleItems(H5CUDSItems):
@@ -35,7 +52,10 @@ class H5ParticleItems(H5CUDSItems):
     instance is mapped to uid.
     """
 
-    def __init__(self, root, name='particles'):
+    _summary_coordinates = True
+
+    def __init__(self, root, name='particles', cache_size=None,
+                 expected_number=None, precision=None):
         """ Create a proxy object for an HDF5 backed particle table.
 
         Parameters
@@ -45,25 +65,43 @@ class H5ParticleItems(H5CUDSItems):
         name : string
             The name of the new group that will be created. Default name is
             'particles'
+        cache_size : int, optional
+            The number of retrieved particles to cache.
+        expected_number : int, optional
+            The expected number of particles of new tables.
+        precision : FloatPrecision, optional
+            The storage precision of the coordinates and the particle
+            data. Default is full precision.
 
         """
+        if precision is None:
+            precision = FloatPrecision()
         super(H5ParticleItems, self).__init__(
-            root, name=name, record=_ParticleDescription)
+            root, name=name,
+            record=_PARTICLE_DESCRIPTIONS[precision.float_type],
+            cache_size=cache_size, expected_number=expected_number,
+            precision=precision)
+
+    def _copy(self, item):
+        """ Return a copy of the Particle.
+
+        """
+        return Particle.from_particle(item)
 
     def _populate(self, row, item):
         """ Populate the row from the Particle.
 
         """
-        self._data[item.uid] = item.data
-        row['coordinates'] = list(item.coordinates)
+        row['coordinates'] = self._precision.encode(list(item.coordinates))
 
-    def _retrieve(self, row):
-        """ Return the DataContainer from a table row instance.
+    def _retrieve(self, row, data=None):
+        """ Return the Particle from a table row instance.
 
         """
         uid = uuid.UUID(hex=row['uid'], version=4)
         return Particle(
-            uid=uid, coordinates=row['coordinates'], data=self._data[uid])
+            uid=uid, coordinates=self._precision.decode(row['coordinates']),
+            data=self._data[uid] if data is None else data)
 
 
 class H5BondItems(H5CUDSItems):
@@ -72,72 +110,255 @@ class H5BondItems(H5CUDSItems):
     The class implements the Mutable-Mapping api where each Bond
     instance is mapped to uid.
 
+    The bond particles are stored in compressed sparse row form, each
+    bond row holds the offset and the number of its members in a flat
+    array of particle handles (see :class:`~.H5HandleMap`). The
+    optional reverse (particle -> bonds) index is stored in the same
+    form and is rebuilt on demand after the bonds have been modified.
 
     """
-    def __init__(self, root, name='bonds'):
+    def __init__(self, root, handles, name='bonds', cache_size=None,
+                 expected_number=None, precision=None):
         """ Create a proxy object for an HDF5 backed bond table.
 
         Parameters
         ----------
         root : tables.Group
             The root node where to add the bond table.
+        handles : H5HandleMap
+            The handle map of the particle uids.
         name : string
             The name of the new group that will be created. Default name is
             'bonds'
+        cache_size : int, optional
+            The number of retrieved bonds to cache.
+        expected_number : int, optional
+            The expected number of bonds of new tables, every bond is
+            expected to have two members.
+        precision : FloatPrecision, optional
+            The storage precision of the bond data. Default is full
+            precision.
 
         """
         super(H5BondItems, self).__init__(
-            root, name=name, record=_BondDescription)
+            root, name=name, record=_BondDescription, cache_size=cache_size,
+            expected_number=expected_number, precision=precision)
+        group = self._group
+        if hasattr(group, 'members'):
+            self._members = group.members
+        else:
+            if expected_number is not None:
+                expected_number *= 2
+            self._members = group._v_file.create_earray(
+                group, 'members', tables.Int64Atom(), shape=(0,),
+                expectedrows=expected_number)
+        self._handles = handles
+
+    def iter_bonds_of(self, uid):
+        """ Iterate over the bonds that have the particle uid as member.
+
+        """
+        try:
+            handle = self._handles.handle(uid)
+        except KeyError:
+            return
+        offsets, rows = self._bond_index()
+        if handle + 1 >= len(offsets):
+            return
+        table = self._items
+        for row in rows[offsets[handle]:offsets[handle + 1]]:
+            yield self._retrieve(table[row])
+
+    def invalidate_index(self):
+        """ Remove the persisted particle -> bonds index.
+
+        """
+        group = self._group
+        for name in ('index_offsets', 'index_rows'):
+            if hasattr(group, name):
+                getattr(group, name)._f_remove()
+
+    def _bond_index(self):
+        """ Return the particle -> bonds index building it if necessary.
+
+        Returns
+        -------
+        offsets : numpy.ndarray
+            The bond rows of the particle with handle ``h`` are
+            ``rows[offsets[h]:offsets[h + 1]]``.
+        rows : numpy.ndarray
+            The bond rows of all the particles.
+
+        """
+        group = self._group
+        if hasattr(group, 'index_offsets'):
+            return group.index_offsets.read(), group.index_rows.read()
+
+        table = self._items
+        starts = table.col('offset')
+        counts = table.col('n_particles').astype(numpy.int64)
+        # deleted bonds do not have members
+        counts[table.col('uid') == ''] = 0
+        total = counts.sum()
+        # positions in the members array of all the bond members
+        firsts = numpy.cumsum(counts) - counts
+        positions = (
+            numpy.repeat(starts - firsts, counts) +
+            numpy.arange(total, dtype=numpy.int64))
+        members = self._members.read()[positions]
+        bond_rows = numpy.repeat(
+            numpy.arange(len(counts), dtype=numpy.int64), counts)
+        order = numpy.argsort(members, kind='mergesort')
+        offsets = numpy.searchsorted(
+            members[order],
+            numpy.arange(len(self._handles) + 1, dtype=numpy.int64))
+        rows = bond_rows[order]
+
+        handle = group._v_file
+        if handle.mode != 'r':
+            handle.create_array(group, 'index_offsets', offsets)
+            handle.create_array(group, 'index_rows', rows)
+        return offsets, rows
+
+    def compact(self):
+        """ Rebuild the bond tables and the members array.
+
+        The deleted bonds are removed and the members array keeps only
+        the slots of the remaining bonds.
+
+        """
+        super(H5BondItems, self).compact()
+        self._members = compact_csr(self._items, self._members, 'n_particles')
+        self.invalidate_index()
+
+    def _copy(self, item):
+        """ Return a copy of the Bond.
+
+        """
+        return Bond.from_bond(item)
 
     def _populate(self, row, item):
-        """ Populate the row from the Particle.
+        """ Populate the row from the Bond.
 
         """
-        uid = row['uid']
-        self._data[item.uid] = item.data
-        particles = item.particles
-        number_of_items = len(item.particles)
+        handles = self._handles.acquire_many(item.particles)
+        number_of_items = len(handles)
+        members = self._members
+        if 0 < number_of_items <= row['n_particles']:
+            # reuse the existing slot
+            offset = row['offset']
+            members[offset:offset + number_of_items] = handles
+        else:
+            row['offset'] = members.nrows
+            members.append(handles)
+            members.flush()
         row['n_particles'] = number_of_items
-        ids = row['particles']
-        for index, uid in enumerate(particles):
-            ids[index] = numpy.frombuffer(uid.bytes, dtype=numpy.uint8)
-        row['particles'] = ids
 
-    def _retrieve(self, row):
-        """ Return the DataContainer from a table row instance.
+    def _retrieve(self, row, data=None):
+        """ Return the Bond from a table row instance.
 
         """
         uid = uuid.UUID(hex=row['uid'], version=4)
-        number_of_items = row['n_particles']
-        particles = [
-            uuid.UUID(bytes=buffer(value), version=4)
-            for value in row['particles'][:number_of_items]]
+        offset = row['offset']
+        members = self._members.read(offset, offset + row['n_particles'])
         return Bond(
-            uid=uid, particles=particles, data=self._data[uid])
+            uid=uid,
+            particles=self._handles.uids(members),
+            data=self._data[uid] if data is None else data)
 
+    def _retrieve_many(self, rows, datas):
+        """ Return the Bonds reading the members of all the rows at once.
 
-class H5Particles(ABCParticles):
+        """
+        offsets = rows['offset']
+        counts = rows['n_particles']
+        first = offsets.min()
+        last = (offsets + counts).max()
+        particles = self._handles.uids(self._members.read(first, last))
+        bonds = []
+        for row, offset, count, data in zip(rows, offsets, counts, datas):
+            offset -= first
+            bonds.append(Bond(
+                uid=uuid.UUID(hex=row['uid'], version=4),
+                particles=particles[offset:offset + count],
+                data=data))
+        return bonds
+
+
+class H5Particles(ABCParticles, H5BatchMixin):
     """ An HDF5 backed particle container.
 
+    Use ``with particles.batch():`` to buffer a sequence of
+    modifications and write them in bulk (see :meth:`batch`).
+
+    Retrieved particles and bonds are cached (see :meth:`cache_info`).
+
     """
-    def __init__(self, group):
+    cuba_key = CUBA.PARTICLES
+
+    def __init__(self, group, cache_size=None, expected_counts=None,
+                 precision=None):
+        """ Return a proxy to the particles container in a H5CUDS group.
+
+        Parameters
+        ----------
+        group : tables.Group
+            The group of the container.
+        cache_size : int, optional
+            The number of retrieved particles and bonds to cache (for
+            each item type), zero disables the cache. Default is to keep
+            the size of an existing cache or use ``DEFAULT_CACHE_SIZE``.
+        expected_counts : dict, optional
+            The expected number of particles and bonds (CUBA.PARTICLE
+            and CUBA.BOND keys) when the tables are created, used by
+            PyTables to choose the chunk shape of the tables.
+        precision : FloatPrecision, optional
+            The storage precision of the coordinates and the item data
+            of a new container (see :mod:`~.h5_precision`). The
+            precision of an existing container is read from the
+            attributes of the group. Default is full precision.
+
+        """
         if not ("cuds_version" in group._v_attrs):
             group._v_attrs.cuds_version = PARTICLES_CUDS_VERSION
+            if precision is not None:
+                precision.save(group._v_attrs)
         else:
             if group._v_attrs.cuds_version != PARTICLES_CUDS_VERSION:
                 raise ValueError(
                     "Particles file layout has an incompatible version")
 
         self._group = group
+        self._precision = precision = FloatPrecision.load(group._v_attrs)
         self._data = IndexedDataContainerTable(group, 'data')
-        self._particles = H5ParticleItems(group, 'particles')
-        self._bonds = H5BondItems(group, 'bonds')
+        if expected_counts is None:
+            expected_counts = {}
+        particles = expected_counts.get(CUBA.PARTICLE)
+        self._particles = H5ParticleItems(
+            group, 'particles', cache_size=cache_size,
+            expected_number=particles, precision=precision)
+        self._bonds = H5BondItems(
+            group, H5HandleMap(group, 'handles', particles), 'bonds',
+            cache_size=cache_size,
+            expected_number=expected_counts.get(CUBA.BOND),
+            precision=precision)
 
         self._items_count = {
             CUBA.PARTICLE: lambda: self._particles,
             CUBA.BOND: lambda: self._bonds
         }
 
+    @property
+    def uid(self):
+        """ The uid of the container, or None for the containers stored
+        without a uid.
+
+        """
+        attrs = self._group._v_attrs
+        if 'uid' not in attrs:
+            return None
+        return uuid.UUID(hex=attrs.uid)
+
     @property
     def name(self):
         """ The name of the container
@@ -150,6 +371,8 @@ class H5Particles(ABCParticles):
 
     @property
     def data(self):
+        if self._batch is not None and self._batch.data is not None:
+            return DataContainer(self._batch.data)
         if len(self._data) == 1:
             return self._data[0]
         else:
@@ -157,11 +380,21 @@ class H5Particles(ABCParticles):
 
     @data.setter
     def data(self, value):
-        if len(self._data) == 0:
+        if self._batch is not None:
+            self._batch.data = DataContainer(value)
+        elif len(self._data) == 0:
             self._data.append(value)
         else:
             self._data[0] = value
 
+    @property
+    def precision(self):
+        """ The storage precision of the float values (see
+        :class:`~.FloatPrecision`).
+
+        """
+        return self._precision
+
     def count_of(self, item_type):
         """ Return the count of item_type in the container.
 
@@ -182,12 +415,38 @@ class H5Particles(ABCParticles):
             container.
 
         """
+        self._sync()
         try:
             return len(self._items_count[item_type]())
         except KeyError:
             error_str = "Trying to obtain count a of non-supported item: {}"
             raise ValueError(error_str.format(item_type))
 
+    def summary(self, refresh=False):
+        """ Return the summary statistics of the particles and bonds.
+
+        The summaries are kept in the attributes of the HDF5 groups and
+        are updated with every modification, thus they are returned
+        without reading the tables (see :class:`~.H5Summary`).
+
+        Parameters
+        ----------
+        refresh : bool
+            Rebuild the summaries that are not exact after updates or
+            removals by scanning the tables. Default is False.
+
+        Returns
+        -------
+        summary : dict
+            The ItemSummary of each item type (``CUBA.PARTICLE`` and
+            ``CUBA.BOND``).
+
+        """
+        self._sync()
+        return {
+            item_type: items().summary(refresh)
+            for item_type, items in self._items_count.items()}
+
     # Particle methods ######################################################
 
     def _add_particles(self, iterable):
@@ -218,6 +477,7 @@ class H5Particles(ABCParticles):
             self._update_particle(particle)
 
     def _get_particle(self, uid):
+        self._sync()
         return self._particles[uid]
 
     def _remove_particles(self, uids):
@@ -226,6 +486,7 @@ class H5Particles(ABCParticles):
 
     def _iter_particles(self, ids=None):
         """Get iterator over particles"""
+        self._sync()
         if ids is None:
             return iter(self._particles)
         else:
@@ -233,6 +494,7 @@ class H5Particles(ABCParticles):
 
     def _has_particle(self, uid):
         """Checks if a particle with uid "uid" exists in the container."""
+        self._sync()
         return uid in self._particles
 
     # Bond methods #######################################################
@@ -265,6 +527,7 @@ class H5Particles(ABCParticles):
             self._update_bond(bond)
 
     def _get_bond(self, uid):
+        self._sync()
         return self._bonds[uid]
 
     def _remove_bonds(self, uids):
@@ -273,6 +536,7 @@ class H5Particles(ABCParticles):
 
     def _iter_bonds(self, ids=None):
         """Get iterator over particles"""
+        self._sync()
         if ids is None:
             return iter(self._bonds)
         else:
@@ -280,36 +544,294 @@ class H5Particles(ABCParticles):
 
     def _has_bond(self, uid):
         """Checks if a bond with uid "uid" exists in the container."""
+        self._sync()
         return uid in self._bonds
 
+    def iter_chunks(self, item_type, chunk_size=CHUNK_SIZE, start=0,
+                    stop=None):
+        """ Iterate over all the items of item_type in lists.
+
+        The item table rows and their data are read in bulk for every
+        chunk.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items (``CUBA.PARTICLE`` or ``CUBA.BOND``).
+        chunk_size : int
+            The maximum number of items in each list.
+        start : int
+            The first table row.
+        stop : int, optional
+            The table row after the last, default is the number of
+            table rows (see :meth:`row_count`).
+
+        Yields
+        ------
+        items : list
+            The items of the next chunk of table rows.
+
+        """
+        self._sync()
+        try:
+            items = self._items_count[item_type]()
+        except KeyError:
+            raise ValueError(
+                "Trying to iterate over a non-supported item: {}"
+                .format(item_type))
+        return items.iter_chunks(chunk_size, start, stop)
+
+    def row_count(self, item_type):
+        """ Return the number of rows of the item_type table.
+
+        The rows of the removed items are counted until the table is
+        vacuumed, thus the count can be larger than :meth:`count_of`.
+
+        """
+        self._sync()
+        try:
+            return self._items_count[item_type]().nrows
+        except KeyError:
+            raise ValueError(
+                "Trying to obtain count a of non-supported item: {}"
+                .format(item_type))
+
+    def prefetch(self, item_type, depth=DEFAULT_DEPTH, max_bytes=None,
+                 chunk_size=CHUNK_SIZE):
+        """ Read the chunks of particles or bonds ahead in a background thread.
+
+        The chunks are the lists of :meth:`iter_chunks` and their size
+        is estimated from the size of the table rows of their items.
+
+        Parameters
+        ----------
+        item_type : CUBA
+            The type of the items.
+        depth : int
+            The maximum number of chunks read ahead.
+        max_bytes : int, optional
+            The maximum size of the chunks read ahead.
+        chunk_size : int
+            The maximum number of items in each chunk.
+
+        Returns
+        -------
+        chunks : Prefetcher
+            The iterator over the chunks, which should be closed when
+            the iteration is not exhausted.
+
+        """
+        chunks = self.iter_chunks(item_type, chunk_size)
+        return prefetch_chunks(
+            chunks, self._items_count[item_type]().row_nbytes(), depth,
+            max_bytes)
+
+    def cache_info(self, item_type=None):
+        """ Return the statistics of the item cache.
+
+        Parameters
+        ----------
+        item_type : CUBA, optional
+            The type of the items (``CUBA.PARTICLE`` or ``CUBA.BOND``).
+            Default is to return the sum over both types.
+
+        Returns
+        -------
+        info : CacheInfo
+            The number of hits and misses, the maximum and the current
+            number of cached items.
+
+        """
+        if item_type is None:
+            return sum_info(
+                items.cache.info() for items in (self._particles, self._bonds))
+        try:
+            return self._items_count[item_type]().cache.info()
+        except KeyError:
+            raise ValueError(
+                "Trying to obtain cache info of a non-supported item: {}"
+                .format(item_type))
+
+    def cache_clear(self):
+        """ Remove all the cached items and reset the statistics.
+
+        """
+        self._particles.cache.clear()
+        self._bonds.cache.clear()
+
+    def project(self, cuba_keys):
+        """ Keep only the selected CUBA keys in the data of the particles
+        and bonds.
+
+        The data tables are rewritten in place, in chunks, without
+        decoding the particles and bonds.
+
+        Parameters
+        ----------
+        cuba_keys : dict
+            The CUBA keys to keep for each item type (``CUBA.PARTICLE``
+            and ``CUBA.BOND``). The data of the item types not in the
+            dictionary is not changed.
+
+        """
+        self._sync()
+        for item_type, items in self._items_count.items():
+            if item_type in cuba_keys:
+                items().project(cuba_keys[item_type])
+
+    def vacuum(self):
+        """Reclaim the storage of the removed particles and bonds.
+
+        Removed items are only marked as deleted and their rows are
+        reused by later additions. The method rebuilds the particle and
+        bond tables, their data tables and the bond members array without
+        the unused rows in a single pass over each table.
+
+        """
+        self._sync()
+        self._particles.compact()
+        self._bonds.compact()
+
+    def iter_bonds_of(self, uid):
+        """Iterate over the bonds that have the particle uid as a member.
+
+        The lookup uses a persisted particle -> bonds index that is built
+        on first use and is discarded every time the bonds are modified.
+
+        Parameters
+        ----------
+        uid : uuid.UUID
+            The uid of the particle.
+
+        Yields
+        ------
+        bond : Bond
+            The bonds referencing the particle.
+
+        """
+        self._sync()
+        return self._bonds.iter_bonds_of(uid)
+
     def _add_particle(self, particle):
         uid = particle.uid
         if uid is None:
             uid = uuid.uuid4()
             particle.uid = uid
-            self._particles.add_unsafe(particle)
+            if self._batch is None:
+                self._particles.add_unsafe(particle)
+                return uid
+        if self._batch is not None:
+            self._batch.add(CUBA.PARTICLE, Particle.from_particle(particle))
         else:
             self._particles.add_safe(particle)
         return uid
 
     def _update_particle(self, particle):
-        self._particles.update_existing(particle)
+        if self._batch is not None:
+            self._batch.update(
+                CUBA.PARTICLE, Particle.from_particle(particle))
+        else:
+            self._particles.update_existing(particle)
 
     def _remove_particle(self, uid):
-        del self._particles[uid]
+        if self._batch is not None:
+            # the item type is resolved when the batch is applied
+            self._batch.remove(uid)
+        else:
+            del self._particles[uid]
 
     def _add_bond(self, bond):
         uid = bond.uid
         if uid is None:
             uid = uuid.uuid4()
             bond.uid = uid
-            self._bonds.add_unsafe(bond)
+            if self._batch is None:
+                self._bonds.add_unsafe(bond)
+                self._bonds.invalidate_index()
+                return uid
+        if self._batch is not None:
+            self._batch.add(CUBA.BOND, Bond.from_bond(bond))
         else:
             self._bonds.add_safe(bond)
+            self._bonds.invalidate_index()
         return uid
 
     def _update_bond(self, bond):
-        self._bonds.update_existing(bond)
+        if self._batch is not None:
+            self._batch.update(CUBA.BOND, Bond.from_bond(bond))
+        else:
+            self._bonds.update_existing(bond)
+            self._bonds.invalidate_index()
 
     def _remove_bond(self, uid):
-        del self._bonds[uid]
+        if self._batch is not None:
+            self._batch.remove(uid)
+        else:
+            del self._bonds[uid]
+            self._bonds.invalidate_index()
+
+    def _content_hash(self):
+        """ The chunk digests are kept in the attributes of the group.
+
+        """
+        self._sync()
+        return H5ContentHash(self, self._group)
+
+    def _apply_changes(self, container, changes):
+        """ Write the items of the container changed since its last sync.
+
+        Parameters
+        ----------
+        container : ABCParticles
+            The container with the changed items.
+        changes : ChangeTracker
+            The changes of the container.
+
+        Returns
+        -------
+        nbytes : int
+            The size of the table rows written.
+
+        """
+        self._sync()
+        self.data = container.data
+        nbytes = self._data.rowsize
+        stores = ((CUBA.PARTICLE, self._particles), (CUBA.BOND, self._bonds))
+        for item_type, items in stores:
+            removed = changes.keys(REMOVED, item_type)
+            added = changes.keys(ADDED, item_type)
+            items.remove_many(removed)
+            items.add_many(container.iter(added, item_type=item_type))
+            nbytes += (len(removed) + len(added)) * items.row_nbytes()
+            for fields, uids in changes.updates(item_type).items():
+                items.update_many(
+                    container.iter(uids, item_type=item_type), *fields)
+                nbytes += len(uids) * items.row_nbytes(*fields)
+        if CUBA.BOND in changes.item_types():
+            self._bonds.invalidate_index()
+        return nbytes
+
+    def _apply_batch(self, batch):
+        """ Write the pending modifications of the batch.
+
+        """
+        if batch.data is not None:
+            self.data = batch.data
+
+        # removed uids are either particles or bonds
+        removed = batch.keys(REMOVE)
+        rows = find_rows(self._particles._items, 'uid', removed)
+        self._particles.remove_many(
+            [uid for uid, row in zip(removed, rows) if row >= 0])
+        bonds = [uid for uid, row in zip(removed, rows) if row < 0]
+        self._bonds.remove_many(bonds)
+
+        self._particles.update_many(batch.items(UPDATE, CUBA.PARTICLE))
+        self._particles.add_many(batch.items(ADD, CUBA.PARTICLE))
+
+        updated = batch.items(UPDATE, CUBA.BOND)
+        added = batch.items(ADD, CUBA.BOND)
+        self._bonds.update_many(updated)
+        self._bonds.add_many(added)
+        if len(bonds) + len(updated) + len(added) > 0:
+            self._bonds.invalidate_index()
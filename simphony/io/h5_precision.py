@@ -0,0 +1,157 @@
+""" Storage precision of the float values of the HDF5 datasets
+
+This module contains the description of the precision used to store the
+coordinates and the item data of a dataset. The float values can be
+stored as 32 bit floats and rounded to a quantum that keeps them within
+an absolute error bound (lossy). The precision is recorded in the
+attributes of the dataset group and the values are always read back as
+64 bit floats.
+
+"""
+import math
+
+import numpy
+
+from ..core import CUBA
+from ..core.keywords import KEYWORDS
+
+#: The storage types of the float values.
+FLOAT_TYPES = ('float64', 'float32')
+
+# the CUBA keys with float values
+_FLOAT_CUBA = frozenset(
+    cuba for cuba in CUBA
+    if cuba.name in KEYWORDS and KEYWORDS[cuba.name].dtype is numpy.float64)
+
+
+class FloatPrecision(object):
+    """ The storage precision of the float values of a dataset.
+
+    With an ``absolute_error`` the values are rounded to the closest
+    multiple of the largest power of two ``quantum`` that is not larger
+    than twice the error. The trailing bits of the mantissa of the
+    rounded values are zero, thus they compress well. Storing the values
+    as ``float32`` adds a relative error of about ``6e-8``.
+
+    """
+
+    def __init__(self, float_type='float64', absolute_error=None):
+        """ Describe the storage precision.
+
+        Parameters
+        ----------
+        float_type : str
+            The storage type of the floats, ``float64`` or ``float32``.
+        absolute_error : float, optional
+            The maximum absolute error of the stored values. Default is
+            to store the values without rounding.
+
+        Raises
+        ------
+        ValueError :
+            If the float type is not supported or the error is not
+            positive.
+
+        """
+        if float_type not in FLOAT_TYPES:
+            raise ValueError(
+                'Unsupported float type {!r}'.format(float_type))
+        if absolute_error is not None and not absolute_error > 0:
+            raise ValueError('The absolute error should be positive')
+        self._float_type = float_type
+        self._absolute_error = absolute_error
+        if absolute_error is None:
+            self._quantum = None
+        else:
+            self._quantum = 2.0 ** math.floor(
+                math.log(2.0 * absolute_error, 2))
+
+    @classmethod
+    def load(cls, attrs):
+        """ Return the precision recorded in the attributes of a group.
+
+        Groups without precision attributes store full precision floats.
+
+        """
+        float_type = 'float64'
+        absolute_error = None
+        if 'float_type' in attrs:
+            float_type = attrs.float_type
+        if 'absolute_error' in attrs and attrs.absolute_error > 0:
+            absolute_error = float(attrs.absolute_error)
+        return cls(float_type, absolute_error)
+
+    def save(self, attrs):
+        """ Record the precision in the attributes of a group.
+
+        """
+        attrs.float_type = self._float_type
+        attrs.absolute_error = (
+            0.0 if self._absolute_error is None else self._absolute_error)
+
+    @property
+    def float_type(self):
+        """ The storage type of the floats.
+
+        """
+        return self._float_type
+
+    @property
+    def absolute_error(self):
+        """ The maximum absolute error of the rounded values or None.
+
+        """
+        return self._absolute_error
+
+    @property
+    def quantum(self):
+        """ The quantum the values are rounded to or None.
+
+        """
+        return self._quantum
+
+    @property
+    def lossless(self):
+        """ True when the float values are stored without loss.
+
+        """
+        return self._float_type == 'float64' and self._quantum is None
+
+    def encode(self, values):
+        """ Return the float values rounded to the quantum.
+
+        """
+        quantum = self._quantum
+        if quantum is None:
+            return values
+        values = numpy.asarray(values, numpy.float64)
+        return numpy.rint(values / quantum) * quantum
+
+    def encode_data(self, cuba, value):
+        """ Return the value of a CUBA key rounded to the quantum.
+
+        The values of the CUBA keys that are not floats are returned
+        unchanged.
+
+        """
+        if self._quantum is None or cuba not in _FLOAT_CUBA:
+            return value
+        return self.encode(value)
+
+    def decode(self, values):
+        """ Return the stored float values as 64 bit floats.
+
+        """
+        return numpy.asarray(values, numpy.float64)
+
+    def __eq__(self, other):
+        return (isinstance(other, FloatPrecision) and
+                self._float_type == other._float_type and
+                self._absolute_error == other._absolute_error)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'FloatPrecision({!r}, {!r})'.format(
+            self._float_type, self._absolute_error)
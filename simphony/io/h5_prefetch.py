@@ -0,0 +1,136 @@
+""" Read-ahead of the chunks of the HDF5 datasets
+
+This module contains the iterator that reads (and decompresses) the
+next chunks of items of a dataset in a background thread, while the
+consumer processes the current chunk.
+
+"""
+import sys
+import threading
+from collections import deque
+
+#: The default number of chunks read ahead.
+DEFAULT_DEPTH = 2
+
+
+class Prefetcher(object):
+    """ An iterator over chunks produced ahead by a background thread.
+
+    The thread keeps at most ``depth`` chunks, and at most ``max_bytes``
+    bytes of chunks, waiting to be consumed. A single chunk larger than
+    ``max_bytes`` is still read when no other chunk is waiting. The
+    exceptions of the producer are raised by :meth:`next`.
+
+    The HDF5 library is not thread safe: the file of the dataset should
+    not be accessed by the consumer until the iteration is exhausted or
+    the prefetcher is closed.
+
+    """
+
+    def __init__(self, chunks, depth=DEFAULT_DEPTH, max_bytes=None,
+                 nbytes=None):
+        """ Start reading the chunks in a background thread.
+
+        Parameters
+        ----------
+        chunks : iterable
+            The chunks to read ahead.
+        depth : int
+            The maximum number of chunks waiting to be consumed.
+        max_bytes : int, optional
+            The maximum size of the chunks waiting to be consumed.
+        nbytes : callable, optional
+            The function returning the size in bytes of a chunk. It is
+            required when ``max_bytes`` is given.
+
+        """
+        if depth < 1:
+            raise ValueError('The prefetch depth should be positive')
+        if max_bytes is not None and nbytes is None:
+            raise ValueError('The size of the chunks is required')
+        self._depth = depth
+        self._max_bytes = max_bytes
+        self._nbytes = nbytes
+        # (chunk, size) waiting to be consumed
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._done = False
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._produce, args=(chunks,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """ Return the next chunk, waiting for it to be read.
+
+        """
+        with self._condition:
+            while not self._queue and not self._done:
+                self._condition.wait()
+            if self._queue:
+                chunk, size = self._queue.popleft()
+                self._queued_bytes -= size
+                self._condition.notify_all()
+                return chunk
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error[0], error[1], error[2]
+            raise StopIteration()
+
+    def items(self):
+        """ Iterate over the items of the chunks.
+
+        """
+        for chunk in self:
+            for item in chunk:
+                yield item
+
+    def close(self):
+        """ Stop reading ahead and wait for the background thread.
+
+        """
+        with self._condition:
+            self._closed = True
+            self._queue.clear()
+            self._queued_bytes = 0
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _produce(self, chunks):
+        try:
+            for chunk in chunks:
+                size = 0 if self._nbytes is None else self._nbytes(chunk)
+                with self._condition:
+                    while not self._closed and self._is_full(size):
+                        self._condition.wait()
+                    if self._closed:
+                        return
+                    self._queue.append((chunk, size))
+                    self._queued_bytes += size
+                    self._condition.notify_all()
+        except Exception:
+            self._error = sys.exc_info()
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def _is_full(self, size):
+        if len(self._queue) >= self._depth:
+            return True
+        return (self._max_bytes is not None and len(self._queue) > 0 and
+                self._queued_bytes + size > self._max_bytes)
+
+
+def prefetch_chunks(chunks, item_nbytes, depth=DEFAULT_DEPTH,
+                    max_bytes=None):
+    """ Return a prefetcher of chunks of items of item_nbytes bytes.
+
+    """
+    return Prefetcher(
+        chunks, depth, max_bytes, lambda chunk: len(chunk) * item_nbytes)
@@ -0,0 +1,398 @@
+""" Datasets written to several H5CUDS shard files
+
+This module contains the master file linking the shard files written
+concurrently by several processes, the read only union of the datasets
+with the same name in the shards and the merge of the shards into a
+single H5CUDS file.
+
+Every shard is a complete H5CUDS file owned by one writer, thus the
+items of a shard (e.g. the points of the mesh elements) cannot refer to
+items of the other shards. The uids of the items should be unique across
+the shards.
+
+"""
+import itertools
+import os
+
+import tables
+
+from ..core import CUBA
+from ..cuds import ABCMesh, ABCParticles
+from .h5_cuds import H5CUDS
+from .h5_cuds_items import CHUNK_SIZE
+from .h5_lattice import H5Lattice
+from .h5_mesh import H5Mesh
+from .h5_particles import H5Particles
+
+SHARDED_CUDS_VERSION = 1
+
+
+def shard_filename(filename, shard):
+    """ Return the name of a shard file of the master file.
+
+    >>> shard_filename('results.cuds', 3)
+    'results.shard0003.cuds'
+
+    """
+    base, extension = os.path.splitext(filename)
+    return '{}.shard{:04d}{}'.format(base, shard, extension)
+
+
+def create_master(filename, shards):
+    """ Create the master file linking the shard files.
+
+    The shards are linked with HDF5 external links to their root group,
+    in order, thus the master file can be created before the shard files
+    are written.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the master file, an existing file is overwritten.
+    shards : sequence of str
+        The names of the shard files. Relative names are relative to the
+        directory of the master file.
+
+    """
+    with tables.open_file(filename, 'w') as handle:
+        handle.root._v_attrs.sharded_cuds_version = SHARDED_CUDS_VERSION
+        group = handle.create_group('/', 'shards')
+        for index, shard in enumerate(shards):
+            handle.create_external_link(
+                group, 'shard{:04d}'.format(index), '{}:/'.format(shard))
+
+
+def merge_shards(filename, target):
+    """ Merge the datasets of the shards into a single H5CUDS file.
+
+    The dataset of the first shard holding a name is copied natively
+    (see :meth:`~.H5CUDS.add_dataset`) and the items of the other shards
+    are added in chunks, item type by item type.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the master file.
+    target : str
+        The name of the H5CUDS file with the merged datasets, an
+        existing file is overwritten.
+
+    Raises
+    ------
+    ValueError :
+        If the shards have items with the same uid, datasets of the same
+        name but different types or the same lattice.
+
+    """
+    sharded = H5ShardedCUDS.open(filename)
+    try:
+        merged = H5CUDS.open(target, 'w')
+        try:
+            for name in sharded.get_dataset_names():
+                datasets = sharded._get_datasets(name)
+                merged.add_dataset(datasets[0])
+                if len(datasets) == 1:
+                    continue
+                dataset = merged.get_dataset(name, cache_size=0)
+                for item_type in _ITEM_TYPES[type(dataset)]:
+                    for shard in datasets[1:]:
+                        for items in shard.iter_chunks(item_type):
+                            dataset.add(items)
+        finally:
+            merged.close()
+    finally:
+        sharded.close()
+
+
+class H5ShardedCUDS(object):
+    """ Read only access to the shard files of a master file.
+
+    """
+
+    def __init__(self, handle, shards):
+        """ Create the access to the opened master file and shards.
+
+        Parameters
+        ----------
+        handle : tables.File
+            The master file.
+        shards : list of H5CUDS
+            The opened shard files in the order of the master file.
+
+        """
+        self._handle = handle
+        self._shards = shards
+
+    @classmethod
+    def open(cls, filename):
+        """ Open the master file and its shard files for reading.
+
+        Raises
+        ------
+        ValueError :
+            If the file is not a master file with a compatible version.
+
+        """
+        handle = tables.open_file(filename, 'r')
+        attrs = handle.root._v_attrs
+        if not ('sharded_cuds_version' in attrs and
+                attrs.sharded_cuds_version == SHARDED_CUDS_VERSION):
+            handle.close()
+            raise ValueError("File version is incompatible")
+        directory = os.path.dirname(os.path.abspath(filename))
+        shards = []
+        try:
+            links = sorted(
+                handle.root.shards._f_iter_nodes(), key=lambda x: x._v_name)
+            for link in links:
+                shard = link.target.rsplit(':', 1)[0]
+                shards.append(
+                    H5CUDS.open(os.path.join(directory, shard), 'r'))
+        except Exception:
+            for shard in shards:
+                shard.close()
+            handle.close()
+            raise
+        return cls(handle, shards)
+
+    @property
+    def shards(self):
+        """ The H5CUDS shard files.
+
+        """
+        return list(self._shards)
+
+    def valid(self):
+        """ Checks if the master file is valid (i.e. open)
+
+        """
+        return self._handle.isopen
+
+    def close(self):
+        """ Closes the master file and the shard files.
+
+        """
+        for shard in self._shards:
+            shard.close()
+        self._handle.close()
+
+    def get_dataset_names(self):
+        """ Returns the names of the datasets of all the shards.
+
+        """
+        names = []
+        for shard in self._shards:
+            for name in shard.get_dataset_names():
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def get_dataset(self, name):
+        """ Get the union of the datasets with the given name.
+
+        Returns
+        -------
+        container : {H5ShardedParticles, H5ShardedMesh, H5Lattice}
+            A read only view of the datasets of the shards. A lattice is
+            returned from the single shard holding it.
+
+        Raises
+        ------
+        ValueError:
+            If there is no dataset with the given name, the shards have
+            datasets of different types or the lattice is in more than
+            one shard.
+
+        """
+        datasets = self._get_datasets(name)
+        dataset_type = type(datasets[0])
+        if dataset_type is H5Particles:
+            return H5ShardedParticles(datasets)
+        elif dataset_type is H5Mesh:
+            return H5ShardedMesh(datasets)
+        else:
+            return datasets[0]
+
+    def iter_datasets(self, names=None):
+        """ Returns an iterator over a subset or all of the unions.
+
+        """
+        if names is None:
+            names = self.get_dataset_names()
+        for name in names:
+            yield self.get_dataset(name)
+
+    def _get_datasets(self, name):
+        datasets = [
+            shard.get_dataset(name) for shard in self._shards
+            if name in shard.get_dataset_names()]
+        if len(datasets) == 0:
+            raise ValueError(
+                'Container \'{n}\` does not exist'.format(n=name))
+        if len(set(type(dataset) for dataset in datasets)) > 1:
+            raise ValueError(
+                'Container {!r} has different types in the shards'
+                .format(name))
+        if isinstance(datasets[0], H5Lattice) and len(datasets) > 1:
+            raise ValueError(
+                'Lattice {!r} is in more than one shard'.format(name))
+        return datasets
+
+
+class _ShardedMixin(object):
+    """ The shared implementation of the read only unions.
+
+    """
+
+    def __init__(self, datasets):
+        self._datasets = datasets
+
+    @property
+    def name(self):
+        """ The name of the datasets.
+
+        """
+        return self._datasets[0].name
+
+    @property
+    def data(self):
+        """ The data of the dataset in the first shard.
+
+        """
+        return self._datasets[0].data
+
+    @property
+    def datasets(self):
+        """ The datasets of the shards.
+
+        """
+        return list(self._datasets)
+
+    def count_of(self, item_type):
+        """ Return the count of item_type in all the shards.
+
+        Raises
+        ------
+        ValueError :
+            If the type of the item is not supported in the container.
+
+        """
+        return sum(dataset.count_of(item_type) for dataset in self._datasets)
+
+    def has_type(self, item_type):
+        """ Checks if the item type is present in any shard.
+
+        """
+        return self.count_of(item_type) > 0
+
+    def iter_chunks(self, item_type, chunk_size=CHUNK_SIZE):
+        """ Iterate over the items of item_type in lists, shard by shard.
+
+        """
+        return itertools.chain.from_iterable(
+            dataset.iter_chunks(item_type, chunk_size)
+            for dataset in self._datasets)
+
+    def _get(self, method, uid):
+        for dataset in self._datasets:
+            try:
+                return getattr(dataset, method)(uid)
+            except KeyError:
+                pass
+        raise KeyError("Unknown uid {}".format(uid))
+
+    def _iter(self, method, get, uids):
+        if uids is None:
+            return itertools.chain.from_iterable(
+                getattr(dataset, method)() for dataset in self._datasets)
+        return (get(uid) for uid in uids)
+
+    def _read_only(self, *args):
+        raise TypeError('Sharded datasets are read only')
+
+
+class H5ShardedParticles(_ShardedMixin, ABCParticles):
+    """ The read only union of the particles datasets of the shards.
+
+    """
+
+    _add_particles = _add_bonds = _ShardedMixin._read_only
+    _update_particles = _update_bonds = _ShardedMixin._read_only
+    _remove_particles = _remove_bonds = _ShardedMixin._read_only
+
+    def _get_particle(self, uid):
+        return self._get('_get_particle', uid)
+
+    def _get_bond(self, uid):
+        return self._get('_get_bond', uid)
+
+    def _iter_particles(self, uids=None):
+        return self._iter(
+            '_iter_particles', self._get_particle, uids)
+
+    def _iter_bonds(self, uids=None):
+        return self._iter(
+            '_iter_bonds', self._get_bond, uids)
+
+    def _has_particle(self, uid):
+        return any(dataset._has_particle(uid) for dataset in self._datasets)
+
+    def _has_bond(self, uid):
+        return any(dataset._has_bond(uid) for dataset in self._datasets)
+
+
+class H5ShardedMesh(_ShardedMixin, ABCMesh):
+    """ The read only union of the mesh datasets of the shards.
+
+    """
+
+    _add_points = _add_edges = _ShardedMixin._read_only
+    _add_faces = _add_cells = _ShardedMixin._read_only
+    _update_points = _update_edges = _ShardedMixin._read_only
+    _update_faces = _update_cells = _ShardedMixin._read_only
+
+    def _get_point(self, uid):
+        return self._get('_get_point', uid)
+
+    def _get_edge(self, uid):
+        return self._get('_get_edge', uid)
+
+    def _get_face(self, uid):
+        return self._get('_get_face', uid)
+
+    def _get_cell(self, uid):
+        return self._get('_get_cell', uid)
+
+    def _iter_points(self, uids=None):
+        return self._iter(
+            '_iter_points', self._get_point, uids)
+
+    def _iter_edges(self, uids=None):
+        return self._iter(
+            '_iter_edges', self._get_edge, uids)
+
+    def _iter_faces(self, uids=None):
+        return self._iter(
+            '_iter_faces', self._get_face, uids)
+
+    def _iter_cells(self, uids=None):
+        return self._iter(
+            '_iter_cells', self._get_cell, uids)
+
+    def _has_points(self):
+        return any(dataset._has_points() for dataset in self._datasets)
+
+    def _has_edges(self):
+        return any(dataset._has_edges() for dataset in self._datasets)
+
+    def _has_faces(self):
+        return any(dataset._has_faces() for dataset in self._datasets)
+
+    def _has_cells(self):
+        return any(dataset._has_cells() for dataset in self._datasets)
+
+
+_ITEM_TYPES = {
+    H5Particles: (CUBA.PARTICLE, CUBA.BOND),
+    H5Mesh: (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL),
+    H5Lattice: ()}
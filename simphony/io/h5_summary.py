@@ -0,0 +1,280 @@
+""" Summary statistics of the items of the HDF5 datasets
+
+This module contains the summary of the items of a dataset that is kept
+in the attributes of the dataset groups and is maintained with every
+addition, update and removal. The item counts, the coordinate bounds,
+the CUBA keys present in the item data and the minimum, maximum and sum
+of the numeric values are read without reading the tables.
+
+"""
+from collections import namedtuple
+
+import numpy
+
+from ..core import CUBA
+from ..core.keywords import KEYWORDS
+from .h5_precision import FloatPrecision, _FLOAT_CUBA
+
+#: The statistics of the values of a CUBA key.
+FieldSummary = namedtuple('FieldSummary', ['min', 'max', 'sum'])
+
+#: The summary of the items of a type.
+ItemSummary = namedtuple(
+    'ItemSummary', ['count', 'keys', 'bounds', 'fields', 'exact'])
+
+# the CUBA keys with numeric values
+_NUMERIC_CUBA = frozenset(
+    cuba for cuba in CUBA
+    if cuba.name in KEYWORDS and
+    KEYWORDS[cuba.name].dtype in (numpy.float64, numpy.int32))
+
+
+class H5Summary(object):
+    """ A proxy to the summary of a table of items stored in an attribute
+    of an HDF5 node.
+
+    The summary is exact as long as items are only added. Updating or
+    removing items does not read their previous values, thus the summary
+    is then marked as not exact: the count is still exact, the keys, the
+    bounds and the minimum and maximum of the values enclose the values
+    of the items and the sums are unknown (None). An exact summary is
+    recomputed by :meth:`rebuild`.
+
+    Tables created before summaries were stored have no summary and the
+    modifications are not recorded until the summary is rebuilt.
+
+    """
+
+    def __init__(self, node, name='summary', precision=None,
+                 coordinates=False):
+        """ Create a proxy object for an HDF5 backed summary.
+
+        Parameters
+        ----------
+        node : tables.Node
+            The node where the summary attribute is (or will be) stored.
+        name : string
+            The name of the attribute.
+        precision : FloatPrecision, optional
+            The storage precision of the float values, the statistics are
+            computed on the stored values. Default is full precision.
+        coordinates : bool
+            The items have coordinates and their bounds are recorded.
+
+        """
+        self._node = node
+        self._name = name
+        self._precision = FloatPrecision() if precision is None else precision
+        self._coordinates = coordinates
+
+    def get(self):
+        """ Return the ItemSummary or None when it is not recorded.
+
+        """
+        state = self._load()
+        return None if state is None else _item_summary(state)
+
+    def read(self, chunks, refresh=False):
+        """ Return the ItemSummary, rebuilding it when it is not recorded
+        or when it is not exact and refresh is True.
+
+        Parameters
+        ----------
+        chunks : callable
+            Return the iterator over the lists of all the items.
+        refresh : bool
+            Rebuild a summary that is not exact.
+
+        """
+        summary = self.get()
+        if summary is None or (refresh and not summary.exact):
+            summary = self.rebuild(chunks())
+        return summary
+
+    def clear(self, count=0):
+        """ Record the exact summary of count items without data.
+
+        """
+        self._store({
+            'count': count, 'keys': [], 'bounds': None, 'fields': {},
+            'exact': True})
+
+    def rebuild(self, chunks):
+        """ Recompute and return the exact summary from the lists of all
+        the items.
+
+        The summary is not stored when the file is read only.
+
+        """
+        state = {
+            'count': 0, 'keys': [], 'bounds': None, 'fields': {},
+            'exact': True}
+        for items in chunks:
+            self._merge(state, items, True)
+            state['count'] += len(items)
+        self._store(state)
+        return _item_summary(state)
+
+    def add(self, items):
+        """ Record the addition of the items.
+
+        """
+        state = self._load()
+        if state is None:
+            return
+        items = list(items)
+        self._merge(state, items, state['exact'])
+        state['count'] += len(items)
+        self._store(state)
+
+    def update(self, items):
+        """ Record the update of the items.
+
+        """
+        state = self._load()
+        items = list(items)
+        if state is None or len(items) == 0:
+            return
+        state['exact'] = False
+        for values in state['fields'].values():
+            values[2] = None
+        self._merge(state, items, False)
+        self._store(state)
+
+    def remove(self, count):
+        """ Record the removal of count items.
+
+        """
+        state = self._load()
+        if state is None or count == 0:
+            return
+        state['count'] -= count
+        state['exact'] = False
+        for values in state['fields'].values():
+            values[2] = None
+        self._store(state)
+
+    def project(self, keys):
+        """ Keep only the statistics of the CUBA keys in keys.
+
+        """
+        state = self._load()
+        if state is None:
+            return
+        names = set(key.name for key in keys)
+        state['keys'] = [name for name in state['keys'] if name in names]
+        state['fields'] = {
+            name: values for name, values in state['fields'].items()
+            if name in names}
+        self._store(state)
+
+    def _load(self):
+        attrs = self._node._v_attrs
+        if self._name not in attrs:
+            return None
+        return getattr(attrs, self._name)
+
+    def _store(self, state):
+        if self._node._v_file.mode == 'r':
+            return
+        setattr(self._node._v_attrs, self._name, state)
+
+    def _merge(self, state, items, exact):
+        """ Merge the statistics of the items in the state.
+
+        The sums are merged only when exact is True, otherwise they are
+        set to None.
+
+        """
+        if len(items) == 0:
+            return
+        if self._coordinates:
+            coordinates = self._stored(
+                [item.coordinates for item in items], True)
+            state['bounds'] = _merge_bounds(
+                state['bounds'],
+                (coordinates.min(axis=0).tolist(),
+                 coordinates.max(axis=0).tolist()))
+        values = {}
+        for item in items:
+            for key, value in item.data.items():
+                values.setdefault(key, []).append(value)
+        keys = set(state['keys'])
+        keys.update(key.name for key in values)
+        state['keys'] = sorted(keys)
+        fields = state['fields']
+        for key, key_values in values.items():
+            if key not in _NUMERIC_CUBA:
+                continue
+            key_values = numpy.asarray(
+                [numpy.ravel(value) for value in key_values])
+            if key_values.ndim != 2 or key_values.dtype.kind not in 'fi':
+                # values of different lengths
+                continue
+            key_values = self._stored(key_values, key in _FLOAT_CUBA)
+            new = [
+                _to_list(key_values.min(axis=0)),
+                _to_list(key_values.max(axis=0)),
+                _to_list(key_values.sum(
+                    axis=0, dtype=(
+                        numpy.float64 if key_values.dtype.kind == 'f'
+                        else numpy.int64)))]
+            old = fields.get(key.name)
+            if old is None:
+                # the sum is known when the previous items had no value
+                if not exact:
+                    new[2] = None
+                fields[key.name] = new
+                continue
+            fields[key.name] = [
+                _to_list(numpy.minimum(old[0], new[0])),
+                _to_list(numpy.maximum(old[1], new[1])),
+                _to_list(numpy.add(old[2], new[2]))
+                if exact and old[2] is not None else None]
+
+    def _stored(self, values, floats):
+        """ Return the values as they are stored in the tables.
+
+        """
+        if not floats:
+            return numpy.asarray(values)
+        precision = self._precision
+        values = numpy.asarray(
+            precision.encode(numpy.asarray(values, numpy.float64)),
+            precision.float_type)
+        return values.astype(numpy.float64)
+
+
+def _item_summary(state):
+    """ Return the ItemSummary of the stored state.
+
+    """
+    return ItemSummary(
+        count=state['count'],
+        keys=frozenset(CUBA[name] for name in state['keys']),
+        bounds=state['bounds'],
+        fields={
+            CUBA[name]: FieldSummary(*values)
+            for name, values in state['fields'].items()},
+        exact=state['exact'])
+
+
+def _merge_bounds(old, new):
+    """ Return the bounds enclosing the old and new (min, max) bounds.
+
+    """
+    if old is None:
+        return new
+    return (
+        numpy.minimum(old[0], new[0]).tolist(),
+        numpy.maximum(old[1], new[1]).tolist())
+
+
+def _to_list(value):
+    """ Return the statistic as a float (int) or a list of floats (ints).
+
+    """
+    value = numpy.asarray(value)
+    if value.shape == (1,):
+        value = value[0]
+    return value.tolist()
@@ -0,0 +1,513 @@
+""" Time series of the item fields of a dataset
+
+This module contains the proxy to an HDF5 group holding the frames of a
+trajectory: the static part of a dataset (uids, bonds, connectivity and
+the initial item data) is stored once and the per frame fields are
+appended to extendable arrays with a leading time axis.
+
+"""
+import uuid
+from collections import namedtuple
+
+import numpy
+import tables
+
+from ..core import CUBA
+from ..core.keywords import KEYWORDS
+from ..cuds import (
+    ABCParticles, ABCMesh, ABCLattice, Lattice, Mesh, Particles)
+from .h5_lattice import H5Lattice
+from .h5_mesh import H5Mesh
+from .h5_particles import H5Particles
+
+TRAJECTORY_CUDS_VERSION = 1
+
+#: The number of frames between the keyframes of delta encoded fields.
+KEYFRAME_INTERVAL = 16
+
+#: The number of frames read at once when iterating over the frames.
+CHUNK_SIZE = 64
+
+#: A frame of the trajectory, ``fields`` maps the field names to arrays
+#: with the values of the items in the order of :attr:`H5Trajectory.uids`.
+Frame = namedtuple('Frame', ['index', 'time', 'fields'])
+
+_ITEM_TYPES = (
+    (ABCParticles, CUBA.PARTICLE),
+    (ABCMesh, CUBA.POINT),
+    (ABCLattice, CUBA.NODE))
+
+
+class H5Trajectory(object):
+    """ A proxy to an HDF5 group with the frames of a trajectory.
+
+    The fields of a frame are the ``'coordinates'`` of the particles or
+    mesh points and the CUBA keys of numeric item data. The values of
+    each field are stored in an extendable array of shape
+    ``(frames, items) + value shape``, where the items follow the order
+    of the static dataset.
+
+    Float fields can be stored as integer multiples of a ``quantum``
+    (lossy) and all the fields can be delta encoded: every frame stores
+    the difference of the integer representation of the values to the
+    previous frame, except for the keyframes stored every
+    ``keyframe_interval`` frames. Delta encoding is lossless and makes
+    slowly changing fields compress much better.
+
+    """
+
+    def __init__(self, group):
+        """ Return a proxy to an existing trajectory group.
+
+        Parameters
+        ----------
+        group : tables.Group
+            The group of the trajectory.
+
+        Raises
+        ------
+        ValueError :
+            If the group has an incompatible layout version.
+
+        """
+        if group._v_attrs.cuds_version != TRAJECTORY_CUDS_VERSION:
+            raise ValueError(
+                "Trajectory file layout has an incompatible version")
+        self._group = group
+        attrs = group._v_attrs
+        self._item_type = CUBA(attrs.item_type)
+        self._fields = list(attrs.fields)
+        self._delta = bool(attrs.delta)
+        self._keyframe_interval = int(attrs.keyframe_interval)
+        # (index, stored field values) of the last appended frame
+        self._last = None, {}
+
+    @classmethod
+    def create_new(cls, group, container, fields=None, quantum=None,
+                   delta=False, keyframe_interval=KEYFRAME_INTERVAL):
+        """ Create a new trajectory in the group.
+
+        The container is stored as the static part of the trajectory, no
+        frame is appended.
+
+        Parameters
+        ----------
+        group : tables.Group
+            The (empty) group of the new trajectory.
+        container : {ABCParticles, ABCMesh, ABCLattice}
+            The container with the items of the trajectory.
+        fields : sequence of {str, CUBA}, optional
+            The fields stored in every frame, ``'coordinates'`` or CUBA
+            keys of numeric item data. Default is the coordinates (for
+            particles and meshes) and the numeric CUBA keys in the data
+            of the first item.
+        quantum : float or dict, optional
+            Store the float fields (or the fields in the dictionary) as
+            integer multiples of the quantum.
+        delta : bool
+            Delta encode the fields. Default is False.
+        keyframe_interval : int
+            The number of frames between keyframes of delta encoded
+            fields.
+
+        Raises
+        ------
+        TypeError :
+            If the container type is not supported.
+        ValueError :
+            If a field is not supported.
+
+        """
+        for container_type, item_type in _ITEM_TYPES:
+            if isinstance(container, container_type):
+                break
+        else:
+            raise TypeError("The type of the container is not supported")
+        if keyframe_interval < 1:
+            raise ValueError("The keyframe interval should be positive")
+
+        handle = group._v_file
+        static = handle.create_group(group, 'static')
+        if item_type == CUBA.NODE:
+            dataset = H5Lattice.create_new(
+                static, container.primitive_cell, container.size,
+                container.origin)
+            dataset.update(container.iter(item_type=CUBA.NODE))
+            count = int(numpy.prod(container.size))
+        else:
+            if item_type == CUBA.PARTICLE:
+                dataset = H5Particles(static)
+            else:
+                dataset = H5Mesh(static, handle)
+            dataset.add(container.iter())
+            uids = [
+                item.uid for item in container.iter(item_type=item_type)]
+            handle.create_array(
+                group, 'uids', numpy.array(
+                    [uid.hex for uid in uids], dtype='S32'))
+            count = len(uids)
+        dataset.data = container.data
+
+        if fields is None:
+            fields = _default_fields(container, item_type)
+        names = []
+        arrays = handle.create_group(group, 'fields')
+        handle.create_earray(group, 'times', tables.Float64Atom(), (0,))
+        for field in fields:
+            name, dtype, shape = _field_description(field, item_type)
+            field_quantum = quantum
+            if isinstance(quantum, dict):
+                field_quantum = quantum.get(field)
+            if dtype != numpy.float64:
+                field_quantum = None
+            if field_quantum is not None:
+                if field_quantum <= 0:
+                    raise ValueError("The quantum should be positive")
+                dtype = numpy.int32
+            elif delta and dtype == numpy.float64:
+                # the bit patterns of the floats are delta encoded
+                dtype = numpy.int64
+            array = handle.create_earray(
+                arrays, name.lower(), tables.Atom.from_dtype(
+                    numpy.dtype(dtype)), (0, count) + shape)
+            array.attrs.quantum = (
+                0.0 if field_quantum is None else float(field_quantum))
+            names.append(name)
+
+        attrs = group._v_attrs
+        attrs.cuds_version = TRAJECTORY_CUDS_VERSION
+        attrs.item_type = item_type.name
+        attrs.fields = names
+        attrs.delta = bool(delta)
+        attrs.keyframe_interval = int(keyframe_interval)
+        return cls(group)
+
+    @property
+    def name(self):
+        """ The name of the trajectory.
+
+        """
+        return self._group._v_name
+
+    @property
+    def item_type(self):
+        """ The CUBA type of the items with per frame fields.
+
+        """
+        return self._item_type
+
+    @property
+    def fields(self):
+        """ The names of the per frame fields.
+
+        """
+        return list(self._fields)
+
+    @property
+    def times(self):
+        """ The times of the frames.
+
+        """
+        return self._group.times.read()
+
+    @property
+    def uids(self):
+        """ The uids of the items in the order of the field values.
+
+        For lattices the values follow the C order of the node indices
+        and the uids are None.
+
+        """
+        if self._item_type == CUBA.NODE:
+            return None
+        return [
+            uuid.UUID(hex=value, version=4)
+            for value in self._group.uids.read()]
+
+    @property
+    def static(self):
+        """ The HDF5 dataset with the static part of the trajectory.
+
+        """
+        static = self._group.static
+        if self._item_type == CUBA.PARTICLE:
+            return H5Particles(static)
+        elif self._item_type == CUBA.POINT:
+            return H5Mesh(static, static._v_file)
+        else:
+            return H5Lattice(static)
+
+    def __len__(self):
+        """ The number of frames.
+
+        """
+        return self._group.times.nrows
+
+    def append_frame(self, container, time=None):
+        """ Append the fields of the container items as a new frame.
+
+        Parameters
+        ----------
+        container : {ABCParticles, ABCMesh, ABCLattice}
+            A container with (at least) the items of the trajectory.
+        time : float, optional
+            The time of the frame. Default is the frame index.
+
+        Returns
+        -------
+        index : int
+            The index of the new frame.
+
+        Raises
+        ------
+        KeyError :
+            If an item or the data value of a field is missing. The
+            trajectory is not changed.
+
+        """
+        index = len(self)
+        if self._item_type == CUBA.NODE:
+            keys = list(numpy.ndindex(*self.static.size))
+        else:
+            keys = self.uids
+        items = list(container.iter(keys, item_type=self._item_type))
+        arrays = self._group.fields
+        # all the fields are encoded before any frame is appended
+        stored = {}
+        appended = []
+        for name in self._fields:
+            array = arrays._f_get_child(name.lower())
+            if name == 'coordinates':
+                values = [item.coordinates for item in items]
+                dtype = numpy.float64
+            else:
+                key = CUBA[name]
+                values = [item.data[key] for item in items]
+                dtype = KEYWORDS[name].dtype
+            values = numpy.asarray(values, dtype=dtype).reshape(
+                array.shape[1:])
+            stored[name] = self._encode(array, values)
+            value = stored[name]
+            if self._delta and index % self._keyframe_interval != 0:
+                value = numpy.subtract(
+                    value, self._read_stored(name, index - 1),
+                    dtype=array.dtype)
+            appended.append((array, value[numpy.newaxis]))
+        for array, value in appended:
+            array.append(value)
+            array.flush()
+        self._last = index, stored
+        times = self._group.times
+        times.append([float(index) if time is None else float(time)])
+        times.flush()
+        return index
+
+    def get_field(self, field, index):
+        """ Return the values of a field in a frame.
+
+        Parameters
+        ----------
+        field : {str, CUBA}
+            The field name.
+        index : int
+            The frame index, negative indices count from the end.
+
+        Raises
+        ------
+        IndexError :
+            If the frame does not exist.
+        KeyError :
+            If the field is not stored.
+
+        """
+        index = self._check_index(index)
+        name = field.name if isinstance(field, CUBA) else field
+        if name not in self._fields:
+            raise KeyError('Field {} is not stored'.format(field))
+        array = self._group.fields._f_get_child(name.lower())
+        return self._decode(array, self._read_stored(name, index))
+
+    def get_frame(self, index):
+        """ Return the frame with the given index.
+
+        Raises
+        ------
+        IndexError :
+            If the frame does not exist.
+
+        """
+        index = self._check_index(index)
+        return Frame(
+            index, self._group.times[index],
+            {name: self.get_field(name, index) for name in self._fields})
+
+    def iter_frames(self, start=0, stop=None, chunk_size=CHUNK_SIZE):
+        """ Iterate over the frames reading the fields in chunks of frames.
+
+        Parameters
+        ----------
+        start : int
+            The index of the first frame.
+        stop : int, optional
+            The index after the last frame. Default is the number of
+            frames.
+        chunk_size : int
+            The number of frames read at once.
+
+        """
+        if stop is None or stop > len(self):
+            stop = len(self)
+        if start >= stop:
+            return
+        first = start
+        if self._delta:
+            first = start - start % self._keyframe_interval
+        group = self._group.fields
+        arrays = [
+            (name, group._f_get_child(name.lower())) for name in self._fields]
+        times = self._group.times.read(start, stop)
+        current = {}
+        for chunk in xrange(first, stop, chunk_size):
+            end = min(chunk + chunk_size, stop)
+            stored = {name: array.read(chunk, end) for name, array in arrays}
+            for index in xrange(chunk, end):
+                for name, array in arrays:
+                    value = stored[name][index - chunk]
+                    if self._delta and index % self._keyframe_interval != 0:
+                        value = numpy.add(
+                            current[name], value, dtype=array.dtype)
+                    current[name] = value
+                if index >= start:
+                    yield Frame(index, times[index - start], {
+                        name: self._decode(array, current[name])
+                        for name, array in arrays})
+
+    def load_frame(self, index):
+        """ Return an in-memory container with the state of a frame.
+
+        The items are decoded from the static part of the trajectory
+        and the frame fields replace their values.
+
+        Returns
+        -------
+        container : {Particles, Mesh, Lattice}
+            The state of the frame.
+
+        """
+        frame = self.get_frame(index)
+        static = self.static
+        if self._item_type == CUBA.NODE:
+            container = Lattice(
+                self.name, static.primitive_cell, static.size,
+                static.origin)
+            for nodes in static.iter_chunks(CUBA.NODE):
+                container.update(nodes)
+            keys = list(numpy.ndindex(*static.size))
+        else:
+            if self._item_type == CUBA.PARTICLE:
+                container = Particles(self.name)
+                item_types = (CUBA.PARTICLE, CUBA.BOND)
+            else:
+                container = Mesh(self.name)
+                item_types = (CUBA.POINT, CUBA.EDGE, CUBA.FACE, CUBA.CELL)
+            for item_type in item_types:
+                for items in static.iter_chunks(item_type):
+                    container.add(items)
+            keys = self.uids
+        container.data = static.data
+
+        items = list(container.iter(keys, item_type=self._item_type))
+        for name, values in frame.fields.items():
+            if name == 'coordinates':
+                for item, value in zip(items, values):
+                    item.coordinates = tuple(value)
+            else:
+                key = CUBA[name]
+                for item, value in zip(items, values):
+                    item.data[key] = value
+        container.update(items)
+        container.changes.start()
+        return container
+
+    def _check_index(self, index):
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('invalid frame index: {}'.format(index))
+        return index
+
+    def _encode(self, array, values):
+        """ Return the integer (or float) representation of the values.
+
+        """
+        quantum = array.attrs.quantum
+        if quantum != 0:
+            scaled = numpy.rint(values / quantum)
+            if numpy.any(numpy.abs(scaled) > numpy.iinfo(numpy.int32).max):
+                raise ValueError(
+                    'The values do not fit in int32 multiples of {}'
+                    .format(quantum))
+            return scaled.astype(numpy.int32)
+        elif array.dtype == numpy.int64 and values.dtype == numpy.float64:
+            return values.view(numpy.int64)
+        return values.astype(array.dtype)
+
+    def _read_stored(self, name, index):
+        """ Return the representation of the field values of a frame
+        undoing the delta encoding.
+
+        """
+        last, stored = self._last
+        if last == index:
+            return stored[name]
+        array = self._group.fields._f_get_child(name.lower())
+        if not self._delta:
+            return array[index]
+        start = index - index % self._keyframe_interval
+        return numpy.add.reduce(
+            array.read(start, index + 1), axis=0, dtype=array.dtype)
+
+    def _decode(self, array, value):
+        """ Return the field values from their stored representation.
+
+        """
+        quantum = array.attrs.quantum
+        if quantum != 0:
+            return value * quantum
+        elif array.dtype == numpy.int64 and self._delta:
+            return value.view(numpy.float64)
+        return value
+
+
+def _default_fields(container, item_type):
+    """ Return the coordinates and the numeric CUBA keys of the data of
+    the first item.
+
+    """
+    fields = [] if item_type == CUBA.NODE else ['coordinates']
+    for item in container.iter(item_type=item_type):
+        for key in item.data:
+            if KEYWORDS[key.name].dtype in (numpy.float64, numpy.int32):
+                fields.append(key)
+        break
+    return fields
+
+
+def _field_description(field, item_type):
+    """ Return the name, dtype and value shape of a field.
+
+    """
+    if field == 'coordinates':
+        if item_type == CUBA.NODE:
+            raise ValueError('Lattice nodes do not have coordinates')
+        return 'coordinates', numpy.float64, (3,)
+    if not isinstance(field, CUBA):
+        raise ValueError('Unsupported field: {}'.format(field))
+    keyword = KEYWORDS[field.name]
+    if keyword.dtype not in (numpy.float64, numpy.int32):
+        raise ValueError('Field {} is not numeric'.format(field))
+    shape = tuple(keyword.shape)
+    if shape == (1,):
+        shape = ()
+    return field.name, keyword.dtype, shape
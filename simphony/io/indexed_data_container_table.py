@@ -2,11 +2,13 @@ from collections import Sequence
 
 import numpy
 
-from .data_container_description import NoUIDRecord
+from .data_container_description import NO_UID_RECORDS
+from .data_container_table import project_table
 from .data_conversion import (convert_from_file_type,
                               convert_to_file_type)
 from ..core import CUBA
 from ..core.data_container import DataContainer
+from .h5_precision import FloatPrecision
 
 
 class IndexedDataContainerTable(Sequence):
@@ -24,7 +26,7 @@ class IndexedDataContainerTable(Sequence):
 
     def __init__(
             self, root, name='data_containers',
-            record=None, expected_number=None):
+            record=None, expected_number=None, precision=None):
         """ Create a proxy object for an HDF5 backed data container table.
 
         Parameters
@@ -42,16 +44,25 @@ class IndexedDataContainerTable(Sequence):
 
             .. note:: The record is expected to container only
 
+        expected_number : int, optional
+            The expected number of rows of a new table.
+        precision : FloatPrecision, optional
+            The storage precision of the float values, the default
+            record of a new table has its float type. Default is full
+            precision.
 
         """
         handle = root._v_file
         self._parent = parent = root
+        if precision is None:
+            precision = FloatPrecision()
+        self._precision = precision
 
         if hasattr(parent, name):
             self._table = getattr(parent, name)
         else:
             if record is None:
-                record = NoUIDRecord
+                record = NO_UID_RECORDS[precision.float_type]
             self._table = handle.create_table(
                 parent, name, record, expectedrows=expected_number)
 
@@ -88,6 +99,91 @@ class IndexedDataContainerTable(Sequence):
         table.flush()
         return table.nrows - 1
 
+    def extend(self, iterable):
+        """ Append the data containers to the end of the table.
+
+        All the rows are encoded before any is appended, thus no row is
+        appended when a data container cannot be saved. The table is
+        flushed once after all the rows have been appended.
+
+        Parameters
+        ----------
+        iterable : iterable of DataContainer
+            The DataContainer instances to save.
+
+        Returns
+        -------
+        indices : list of int
+            The indices of the saved rows.
+
+        """
+        table = self._table
+        start = table.nrows
+        rows = [self._create_rec_array(data) for data in iterable]
+        if len(rows) > 0:
+            table.append(numpy.array(rows, dtype=table._v_dtype))
+            table.flush()
+        return range(start, table.nrows)
+
+    def set_many(self, indices, datas):
+        """ Update the data in many indices at once.
+
+        The rows are written in increasing index order with a single
+        flush. When an index is repeated the last data is saved.
+
+        Parameters
+        ----------
+        indices : sequence of int
+            The indices of the rows to update.
+        datas : sequence of DataContainer
+            The DataContainer instances to save.
+
+        Raises
+        ------
+        IndexError :
+            If any of the indices is out of bounds. No row is updated.
+
+        """
+        table = self._table
+        indices = numpy.asarray(indices, dtype=numpy.int64)
+        if len(indices) == 0:
+            return
+        invalid = numpy.flatnonzero(
+            (indices < 0) | (indices >= table.nrows))
+        if len(invalid) > 0:
+            raise IndexError(
+                'Index {} out of bounds'.format(indices[invalid[0]]))
+        # sorted unique indices, the last data of a repeated index is kept
+        unique, last = numpy.unique(indices[::-1], return_index=True)
+        positions = len(indices) - 1 - last
+        rows = numpy.empty(len(unique), dtype=table._v_dtype)
+        for row, position in enumerate(positions):
+            rows[row] = self._create_rec_array(datas[position])
+        table.modify_coordinates(unique, rows)
+        table.flush()
+
+    @property
+    def rowsize(self):
+        """ The size in bytes of a table row.
+
+        """
+        return self._table.rowsize
+
+    def project(self, keys):
+        """ Remove the values of the CUBA keys not in keys from all rows.
+
+        """
+        project_table(self._table, self._cuba_to_position, keys)
+
+    def itersequence(self, indices):
+        """ Iterate over the DataContainers of the rows in indices.
+
+        The rows are read from the table in a single operation.
+
+        """
+        for row in self._table.read_coordinates(indices):
+            yield self._retrieve(row)
+
     def __getitem__(self, index):
         """ Return the DataContainer in index.
 
@@ -124,12 +220,14 @@ class IndexedDataContainerTable(Sequence):
 
         """
         positions = self._cuba_to_position
+        encode = self._precision.encode_data
         mask = numpy.zeros(
             shape=self._table.coldtypes['mask'].shape, dtype=numpy.bool)
         data = list(row['data'])
         for key in value:
             if key in positions:
-                data[positions[key]] = convert_to_file_type(value[key], key)
+                data[positions[key]] = encode(
+                    key, convert_to_file_type(value[key], key))
                 mask[positions[key]] = True
 
         row['mask'] = mask
@@ -140,6 +238,7 @@ class IndexedDataContainerTable(Sequence):
 
         """
         positions = self._cuba_to_position
+        encode = self._precision.encode_data
         rec_array = numpy.zeros(shape=1, dtype=self._table._v_dtype)[0]
         data = rec_array['data']
         mask = rec_array['mask']
@@ -149,9 +248,11 @@ class IndexedDataContainerTable(Sequence):
                 # special case array valued cuba keys
                 # see numpy issue https://github.com/numpy/numpy/issues/3126
                 if numpy.isscalar(data[position]):
-                    data[position] = convert_to_file_type(value[key], key)
+                    data[position] = encode(
+                        key, convert_to_file_type(value[key], key))
                 else:
-                    data[position][:] = convert_from_file_type(value[key], key)
+                    data[position][:] = encode(
+                        key, convert_from_file_type(value[key], key))
                 mask[position] = True
         return rec_array
 
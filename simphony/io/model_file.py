@@ -0,0 +1,177 @@
+""" Model files with the CUDS components and the datasets of a model
+
+This module contains the save and load functions of the CUDS models with
+datasets. The components of the model are saved in the model file (see
+:func:`~.save_CUDS`) and the datasets (particles, meshes and lattices)
+are streamed into a companion H5CUDS file. The model file records the
+name of the companion file and the names and uids of the datasets.
+
+"""
+import os
+from contextlib import closing
+
+from ..cuds.abc_dataset import ABCDataset
+from .h5_cuds import H5CUDS
+from .serialisation import FORMATS, _load_model, _save_model
+
+
+def save_model(filename, model, format='yaml', datasets_filename=None,
+               filters=None):
+    """ Save a CUDS model with its datasets
+
+    The items of the datasets are written in chunks, the HDF5 datasets
+    (e.g. the datasets of a model opened with :class:`ModelFile`) are
+    copied natively (see :meth:`~.H5CUDS.add_dataset`).
+
+    Parameters
+    ----------
+    filename: str
+        The model file, it is overwritten.
+    model: CUDS
+        The computational model.
+    format: str
+        The format of the model file, ``yaml`` (default) or ``jsonl``
+        (see :func:`~.save_CUDS`).
+    datasets_filename: str, optional
+        The companion H5CUDS file of the datasets, it is overwritten.
+        Default is the model file name with the ``.h5`` extension. The
+        file is not created when the model has no datasets.
+    filters: tables.Filters or str, optional
+        The filters of the companion file (see :meth:`~.H5CUDS.open`).
+
+    Raises
+    ------
+    ValueError
+        if the format is not supported, or the companion file is the
+        model file or the file of the HDF5 datasets of the model
+
+    """
+    if format not in FORMATS:
+        raise ValueError('Unsupported CUDS format {!r}'.format(format))
+    if datasets_filename is None:
+        datasets_filename = os.path.splitext(filename)[0] + '.h5'
+    if os.path.abspath(datasets_filename) == os.path.abspath(filename):
+        raise ValueError(
+            'The datasets should be saved in a different file')
+    datasets = [
+        component for component in model.iter()
+        if isinstance(component, ABCDataset)]
+    for dataset in datasets:
+        group = getattr(dataset, '_group', None)
+        if (group is not None and os.path.abspath(group._v_file.filename) ==
+                os.path.abspath(datasets_filename)):
+            raise ValueError(
+                'The datasets should be saved in a different file')
+
+    links = None
+    if datasets:
+        links = []
+        with closing(H5CUDS.open(
+                datasets_filename, 'w', filters=filters)) as handle:
+            for dataset in datasets:
+                handle.add_dataset(dataset)
+                uid = handle.get_dataset(dataset.name, cache_size=0).uid
+                links.append({'name': dataset.name, 'uid': uid.hex})
+        links = {
+            'file': os.path.relpath(
+                datasets_filename, os.path.dirname(os.path.abspath(filename))),
+            'datasets': links}
+
+    with open(filename, 'w') as handle:
+        _save_model(handle, model, format, links)
+
+
+class ModelFile(object):
+    """ A CUDS model opened from a model file with its datasets.
+
+    The datasets of the model are the ``H5Particles``, ``H5Mesh`` and
+    ``H5Lattice`` proxies of the datasets in the companion H5CUDS file,
+    the items are read when they are accessed. The companion file stays
+    open until the model file is closed.
+
+    """
+
+    def __init__(self, model, datasets=None):
+        """ Wrap a model and the file of its datasets.
+
+        Parameters
+        ----------
+        model : CUDS
+            The computational model.
+        datasets : H5CUDS, optional
+            The opened companion file of the datasets of the model.
+
+        """
+        self._model = model
+        self._datasets = datasets
+
+    @classmethod
+    def open(cls, filename, mode='r', cache_size=None):
+        """ Open a model file saved by :func:`save_model`
+
+        Model files saved by :func:`~.save_CUDS` open as models without
+        datasets.
+
+        Parameters
+        ----------
+        filename : str
+            The model file.
+        mode : str
+            The mode of the companion file, ``r`` (default) or ``a`` to
+            modify the datasets in place.
+        cache_size : int, optional
+            The size of the item caches of the datasets (see
+            :meth:`~.H5CUDS.get_dataset`).
+
+        Raises
+        ------
+        ValueError :
+            If the mode is not supported, or a dataset of the model is
+            missing from the companion file or has a different uid.
+
+        """
+        if mode not in ('r', 'a'):
+            raise ValueError('Unsupported mode {!r}'.format(mode))
+        with open(filename, 'r') as handle:
+            model, links = _load_model(handle)
+        if links is None:
+            return cls(model)
+
+        datasets_filename = os.path.join(
+            os.path.dirname(os.path.abspath(filename)), links['file'])
+        datasets = H5CUDS.open(datasets_filename, mode)
+        try:
+            for link in links['datasets']:
+                dataset = datasets.get_dataset(link['name'], cache_size)
+                uid = dataset.uid
+                if uid is None or uid.hex != link['uid']:
+                    raise ValueError(
+                        'Dataset {!r} does not match the model file'.format(
+                            link['name']))
+                model.add([dataset])
+        except Exception:
+            datasets.close()
+            raise
+        return cls(model, datasets)
+
+    @property
+    def model(self):
+        """ The computational model.
+
+        """
+        return self._model
+
+    @property
+    def datasets(self):
+        """ The companion H5CUDS file of the datasets or None.
+
+        """
+        return self._datasets
+
+    def close(self):
+        """ Close the companion file, the datasets of the model should no
+        longer be used.
+
+        """
+        if self._datasets is not None and self._datasets.valid():
+            self._datasets.close()
@@ -0,0 +1,438 @@
+""" Indexed, lazy loading of the CUDS models saved as JSON-lines
+
+This module contains the index of the components of a CUDS model file
+saved with ``format='jsonl'`` (see :func:`~.save_CUDS`) and a ``CUDS``
+model that decodes the components of the file when they are accessed.
+The index records the offset in the file, the class, the uid and the
+name of every component and is kept in a file next to the model file.
+
+"""
+import json
+import os
+from collections import namedtuple
+
+from ..core import CUBA
+from ..cuds import CUDS
+from ..cuds.cuds import type_keys
+from .serialisation import (
+    _component_class, _jsonl_component, _jsonl_header)
+
+#: The extension of the index files.
+INDEX_EXTENSION = '.index'
+
+#: The position of a component in a model file.
+IndexEntry = namedtuple('IndexEntry', ['offset', 'cuba_key', 'uid', 'name'])
+
+# The format tag of the index files
+_INDEX_FORMAT = 'simphony-cuds-index'
+_INDEX_VERSION = 1
+
+
+class ModelIndex(object):
+    """ The index of the components of a CUDS JSON-lines file.
+
+    The components are numbered in the order of their lines, which is the
+    number the components are referenced by in the file.
+
+    """
+
+    def __init__(self, header, offsets, classes, uids, names):
+        """ Create the index of a model file.
+
+        Parameters
+        ----------
+        header : dict
+            The header line of the file.
+        offsets : list of int
+            The offset of the line of every component.
+        classes : list of int
+            The position of the class of every component in the class
+            table of the header.
+        uids : list of str
+            The uid of every component.
+        names : list of str
+            The name of every component, None for unnamed components.
+
+        """
+        self._header = header
+        self._offsets = offsets
+        self._classes = classes
+        self._uids = uids
+        self._names = names
+        self._uid_positions = {uid: i for i, uid in enumerate(uids)}
+        self._name_positions = {
+            name: i for i, name in enumerate(names) if name}
+
+    @classmethod
+    def build(cls, handle):
+        """ Build the index of a CUDS JSON-lines file.
+
+        Every line is decoded but no component is instantiated.
+
+        Parameters
+        ----------
+        handle : file
+            The model file opened in binary mode.
+
+        Raises
+        ------
+        ValueError :
+            If the file is not a CUDS JSON-lines file.
+
+        """
+        handle.seek(0)
+        line = handle.readline()
+        header = _jsonl_header(line)
+        offset = len(line)
+        offsets, classes, uids, names = [], [], [], []
+        for line in iter(handle.readline, ''):
+            if line.strip():
+                position, uid, values = json.loads(line)
+                offsets.append(offset)
+                classes.append(position)
+                uids.append(str(uid))
+                name = values.get('NAME')
+                names.append(None if name is None else str(name))
+            offset += len(line)
+        return cls(header, offsets, classes, uids, names)
+
+    @classmethod
+    def load(cls, filename, model_filename):
+        """ Return the index saved in a file, or None when the file is
+        missing or was not saved for the current model file.
+
+        """
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'rb') as handle:
+            try:
+                state = json.load(handle)
+            except ValueError:
+                return None
+        if (not isinstance(state, dict) or
+                state.get('format') != _INDEX_FORMAT or
+                state.get('version') != _INDEX_VERSION or
+                state.get('model') != _file_stamp(model_filename)):
+            return None
+        header = _jsonl_header(json.dumps(state['header']))
+        return cls(
+            header, state['offsets'], state['classes'],
+            [str(uid) for uid in state['uids']],
+            [None if name is None else str(name) for name in state['names']])
+
+    def save(self, filename, model_filename):
+        """ Save the index to a file.
+
+        The size and the modification time of the model file are
+        recorded, the index is not loaded when they change.
+
+        """
+        state = {
+            'format': _INDEX_FORMAT, 'version': _INDEX_VERSION,
+            'model': _file_stamp(model_filename), 'header': self._header,
+            'offsets': self._offsets, 'classes': self._classes,
+            'uids': self._uids, 'names': self._names}
+        with open(filename, 'wb') as handle:
+            json.dump(state, handle, separators=(',', ':'))
+
+    @property
+    def name(self):
+        """ The name of the model.
+
+        """
+        return self._header['name']
+
+    @property
+    def description(self):
+        """ The description of the model.
+
+        """
+        return self._header['description']
+
+    @property
+    def class_names(self):
+        """ The CUBA key names of the component classes.
+
+        """
+        return self._header['classes']
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, position):
+        """ Return the IndexEntry of a component.
+
+        """
+        return IndexEntry(
+            self._offsets[position],
+            CUBA[self.class_names[self._classes[position]]],
+            self._uids[position], self._names[position])
+
+    def class_of(self, position):
+        """ Return the position of the class of a component in
+        :attr:`class_names`.
+
+        """
+        return self._classes[position]
+
+    def uid_positions(self):
+        """ Return a new dictionary of the positions of the components by
+        uid (str).
+
+        """
+        return dict(self._uid_positions)
+
+    def position_of_uid(self, uid):
+        """ Return the position of the component with the uid or None.
+
+        """
+        return self._uid_positions.get(str(uid))
+
+    def position_of_name(self, name):
+        """ Return the position of the component with the name or None.
+
+        """
+        return self._name_positions.get(name)
+
+
+class LazyCUDS(CUDS):
+    """ A CUDS model that decodes the components of a JSON-lines model
+    file when they are accessed.
+
+    A component is decoded, with the components it references, on the
+    first access by uid, by name or through :meth:`iter` and is then
+    kept in the model. The counts and the membership tests use only the
+    index. The model file stays open until :meth:`close`.
+
+    """
+
+    def __init__(self, handle, index):
+        """ Create a lazy model over an opened model file.
+
+        Parameters
+        ----------
+        handle : file
+            The model file opened in binary mode.
+        index : ModelIndex
+            The index of the model file.
+
+        """
+        self._handle = handle
+        self._index = index
+        # uid -> position of the components that are not decoded yet
+        self._lazy = index.uid_positions()
+        # position -> decoded component
+        self._decoded = {}
+        # class position -> (class, init_params, supp_params)
+        self._classes = {}
+        super(LazyCUDS, self).__init__(
+            name=index.name or '', description=index.description or '')
+
+    @classmethod
+    def open(cls, filename, index_filename=None, save_index=True):
+        """ Open a model file saved with ``format='jsonl'``.
+
+        Parameters
+        ----------
+        filename : str
+            The model file.
+        index_filename : str, optional
+            The index file. Default is the model file name with the
+            ``.index`` extension appended.
+        save_index : bool
+            Save the index when it is built. The index is not saved when
+            the index file cannot be written.
+
+        Raises
+        ------
+        ValueError :
+            If the file is not a CUDS JSON-lines file.
+
+        """
+        if index_filename is None:
+            index_filename = filename + INDEX_EXTENSION
+        handle = open(filename, 'rb')
+        try:
+            index = ModelIndex.load(index_filename, filename)
+            if index is None:
+                index = ModelIndex.build(handle)
+                if save_index:
+                    try:
+                        index.save(index_filename, filename)
+                    except (IOError, OSError):
+                        pass
+        except Exception:
+            handle.close()
+            raise
+        return cls(handle, index)
+
+    @property
+    def index(self):
+        """ The index of the model file.
+
+        """
+        return self._index
+
+    @property
+    def decoded_count(self):
+        """ The number of components decoded from the file.
+
+        """
+        return len(self._decoded)
+
+    def close(self):
+        """ Close the model file, the components that are not decoded yet
+        can no longer be accessed.
+
+        """
+        self._handle.close()
+
+    def add(self, components):
+        for component in components:
+            position = self._index.position_of_name(component.name)
+            if (component.name and position is not None and
+                    self._index[position].uid in self._lazy and
+                    self._index[position].uid != str(component.uid)):
+                raise ValueError('Name clash. Component with uid `%s`'
+                                 ' is already named `%s`'
+                                 % (self._index[position].uid,
+                                    component.name))
+            # the added component replaces the one in the file
+            self._lazy.pop(str(component.uid), None)
+            super(LazyCUDS, self).add([component])
+
+    def update(self, components):
+        components = list(components)
+        for component in components:
+            self._load(str(component.uid))
+        super(LazyCUDS, self).update(components)
+
+    def get_by_name(self, name):
+        position = self._index.position_of_name(name)
+        if position is not None:
+            self._load(self._index[position].uid)
+        return super(LazyCUDS, self).get_by_name(name)
+
+    def get(self, uid):
+        self._load(str(uid))
+        return super(LazyCUDS, self).get(uid)
+
+    def remove(self, uids):
+        stored = []
+        for uid in uids:
+            if self._lazy.pop(str(uid), None) is None:
+                stored.append(uid)
+        super(LazyCUDS, self).remove(stored)
+
+    def iter(self, uids=None, item_type=None):
+        if uids:
+            uids = list(uids)
+            for uid in uids:
+                self._load(str(uid))
+        else:
+            self._load_type(item_type)
+        return super(LazyCUDS, self).iter(uids, item_type)
+
+    def has(self, uid):
+        return (str(uid) in self._lazy or
+                super(LazyCUDS, self).has(uid))
+
+    def has_type(self, item_type):
+        return (len(self._lazy_positions(item_type)) > 0 or
+                super(LazyCUDS, self).has_type(item_type))
+
+    def count_of(self, item_type):
+        return (len(self._lazy_positions(item_type)) +
+                super(LazyCUDS, self).count_of(item_type))
+
+    def __len__(self):
+        return len(self._lazy) + super(LazyCUDS, self).__len__()
+
+    def snapshot(self, name=None, description=None):
+        # the snapshot is an in memory model of all the components
+        self._load_type(None)
+        return super(LazyCUDS, self).snapshot(name, description)
+
+    def _query(self, item_type, predicates):
+        self._load_type(item_type)
+        return super(LazyCUDS, self)._query(item_type, predicates)
+
+    def _load_type(self, item_type):
+        """ Decode the components of the type (all the components when
+        item_type is None) into the model.
+
+        """
+        for position in sorted(self._lazy_positions(item_type)):
+            self._load(self._index[position].uid)
+
+    def _load(self, uid):
+        """ Decode the component with the uid (str) into the model.
+
+        """
+        position = self._lazy.pop(uid, None)
+        if position is not None:
+            super(LazyCUDS, self).add([self._decode(position)])
+
+    def _lazy_positions(self, item_type):
+        """ Return the positions of the components of the type that are
+        not decoded yet.
+
+        """
+        positions = self._lazy.values()
+        if item_type is None:
+            return positions
+        classes = set(
+            i for i in range(len(self._index.class_names))
+            if item_type in type_keys(self._class(i)[0]))
+        return [
+            position for position in positions
+            if self._index.class_of(position) in classes]
+
+    def _class(self, class_position):
+        info = self._classes.get(class_position)
+        if info is None:
+            info = _component_class(self._index.class_names[class_position])
+            self._classes[class_position] = info
+        return info
+
+    def _decode(self, position):
+        """ Return the component at the position, decoding it and the
+        components it references when they are not decoded yet.
+
+        """
+        component = self._decoded.get(position)
+        if component is not None:
+            return component
+        self._handle.seek(self._index[position].offset)
+        item = json.loads(self._handle.readline())
+        for reference in _references(item[2]):
+            self._decode(reference)
+        component = _jsonl_component(
+            item, self._class(item[0]), self._decoded)
+        self._decoded[position] = component
+        return component
+
+
+def _references(value):
+    """ Iterate over the component positions referenced in a JSON value.
+
+    """
+    if isinstance(value, list):
+        for item in value:
+            for reference in _references(item):
+                yield reference
+    elif isinstance(value, dict):
+        if value.keys() == ['ref']:
+            yield value['ref']
+        else:
+            for item in value.values():
+                for reference in _references(item):
+                    yield reference
+
+
+def _file_stamp(filename):
+    """ Return the size and the modification time of a file.
+
+    """
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime]
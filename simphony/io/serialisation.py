@@ -1,7 +1,7 @@
+import json
 import yaml
 import numpy
 import uuid
-from collections import OrderedDict
 from importlib import import_module
 
 from simphony.core import CUBA
@@ -10,23 +10,64 @@ from simphony.cuds import CUDS
 from simphony.cuds.meta.api import CUDSComponent
 from simphony.cuds.meta_validation import to_camel_case
 
-_CUDSREFMAP = OrderedDict()
+#: The formats of the saved CUDS models.
+FORMATS = ('yaml', 'jsonl')
 
+# The format tag in the header line of the JSON-lines files
+_JSONL_FORMAT = 'simphony-cuds-jsonl'
+_JSONL_VERSION = 1
 
-def save_CUDS(handle, model):
-    """ Save CUDS model to a Yaml file
+
+def save_CUDS(handle, model, format='yaml'):
+    """ Save CUDS model to a Yaml (or JSON-lines) file
+
+    The components are written to the handle one at a time. Components
+    referenced by other components are given a numbered anchor and are
+    written before the first component referencing them. The anchors are
+    kept per call, thus models can be saved concurrently.
+
+    The ``jsonl`` format writes a header line with the name and the
+    description of the model and the table of the component classes,
+    followed by a line for every component. The components are referenced
+    by their line number (see :func:`load_CUDS`).
 
     Parameters
     ----------
     handle: file handle
         Yaml file where CUDS model is saved. File will be cleared.
     model: CUDS model
+    format: str
+        The format of the file, ``yaml`` (default) or ``jsonl``.
+
+    Raises
+    ------
+    ValueError
+        if the format is not supported
 
     """
+    _save_model(handle, model, format)
+
+
+def _save_model(handle, model, format='yaml', datasets=None):
+    """ Save the CUDS model and the links to its datasets
+
+    Parameters
+    ----------
+    datasets: dict, optional
+        The links to the datasets of the model stored in a companion
+        file (see :mod:`~.model_file`), written after the description.
+
+    """
+    if format not in FORMATS:
+        raise ValueError('Unsupported CUDS format {!r}'.format(format))
 
     handle.seek(0)
     handle.truncate()
 
+    if format == 'jsonl':
+        _save_jsonl(handle, model, datasets)
+        return
+
     handle.write('- NAME:')
     if model.name:
         handle.write(' "'+model.name+'"')
@@ -39,45 +80,26 @@ def save_CUDS(handle, model):
     else:
         handle.write(' Null')
     handle.write('\n')
+    if datasets is not None:
+        handle.write('\n- DATASETS: ' + json.dumps(datasets, sort_keys=True))
+        handle.write('\n')
 
-    # Construct a map of referenced objects
-    global _CUDSREFMAP
-    _CUDSREFMAP.clear()
+    anchors = _reference_anchors(model)
+    saved = set()
     for comp in model.iter(item_type=CUBA.CUDS_COMPONENT):
-        # Add component to dictionary if it's not there already
-        if comp.uid not in _CUDSREFMAP.keys():
-            _CUDSREFMAP[comp.uid] = []
-        # Check if the component has CUDSComponents in data
-        for data in comp._data.values():
-            # either directly, or
-            if isinstance(data, CUDSComponent):
-                if data.uid not in _CUDSREFMAP.keys():
-                    _CUDSREFMAP[data.uid] = []
-                _CUDSREFMAP[data.uid] += [comp.uid]
-            # as an element of a list
-            if type(data) == list:
-                for elem in data:
-                    if isinstance(elem, CUDSComponent):
-                        if elem.uid not in _CUDSREFMAP.keys():
-                            _CUDSREFMAP[elem.uid] = []
-                        _CUDSREFMAP[elem.uid] += [comp.uid]
-
-    # Save CUDSComponents
-    for comp in model.iter(item_type=CUBA.CUDS_COMPONENT):
-        if _CUDSREFMAP[comp.uid] is not 'saved':
-            stream = ''
-            stream = _CUDSComponent_to_yaml(comp, stream)
-            handle.write(stream)
-            _CUDSREFMAP[comp.uid] = 'saved'
+        if comp.uid not in saved:
+            _write_component(handle, comp, anchors, saved)
 
 
 def load_CUDS(handle):
-    """ Load CUDS model from a Yaml file
+    """ Load CUDS model from a Yaml (or JSON-lines) file
+
+    The format of the file is detected from its first line.
 
     Parameters
     ----------
     handle: file handle
-        yaml file containing CUDSComponents
+        yaml (or JSON-lines) file containing CUDSComponents
 
     Raises
     ------
@@ -90,10 +112,31 @@ def load_CUDS(handle):
         computational model
 
     """
+    return _load_model(handle)[0]
+
+
+def _load_model(handle):
+    """ Load the CUDS model and the links to its datasets
+
+    Returns
+    -------
+    model: CUDS
+        computational model
+    datasets: dict
+        The links to the datasets of the model, or None when the file
+        has no links.
+
+    """
+    position = handle.tell()
+    first_line = handle.readline()
+    handle.seek(position)
+    if first_line.startswith('{'):
+        return _load_jsonl(handle)
 
     cuds_components = {}
     name = None
     desc = None
+    datasets = None
     for data in yaml.safe_load_all(handle):
         # Go through the dictionaries constructed from the Yaml script
         for dict_cuds in data:
@@ -102,6 +145,8 @@ def load_CUDS(handle):
                 name = dict_cuds['NAME']
             elif cubatype == 'DESCRIPTION':
                 desc = dict_cuds['DESCRIPTION']
+            elif cubatype == 'DATASETS':
+                datasets = dict_cuds['DATASETS']
             else:
                 _dict_to_CUDSComponent(cubatype, dict_cuds[cubatype],
                                        cuds_components)
@@ -110,101 +155,303 @@ def load_CUDS(handle):
     for comp in cuds_components.values():
         model.add([comp])
 
-    return model
+    return model, datasets
 
 
-def _CUDSComponent_to_yaml(comp, stream):
-    """ Convert CUDSComponent containing data to Yaml script
+def _reference_anchors(model):
+    """ Return the anchor numbers of the referenced CUDSComponents
+
+    The components of the model and the components in their data are
+    numbered in the order they are found. Only the numbers of the
+    components referenced by other components are returned.
 
     Parameters
     ----------
+    model: CUDS model
+
+    Returns
+    -------
+    dict
+        The anchor number of the uid of every referenced component.
+
+    """
+    numbers = {}
+    referenced = []
+    for comp in model.iter(item_type=CUBA.CUDS_COMPONENT):
+        numbers.setdefault(comp.uid, len(numbers) + 1)
+        # Check if the component has CUDSComponents in data
+        for data in comp._data.values():
+            # either directly, or as an element of a list
+            if isinstance(data, CUDSComponent):
+                items = [data]
+            elif type(data) == list:
+                items = data
+            else:
+                continue
+            for item in items:
+                if isinstance(item, CUDSComponent):
+                    numbers.setdefault(item.uid, len(numbers) + 1)
+                    referenced.append(item.uid)
+    return {uid: numbers[uid] for uid in referenced}
+
+
+def _write_component(handle, comp, anchors, saved):
+    """ Write the Yaml script of a CUDSComponent
+
+    The referenced components that are not saved yet are written before
+    the component.
+
+    Parameters
+    ----------
+    handle: file handle
+        Yaml file where the component is written.
     comp: CUDSComponent
         CUDSComponent that will be converted to Yaml
-    stream: str
-        A string to which new Yaml script is added
+    anchors: dict
+        The anchor numbers of the referenced components.
+    saved: set
+        The uids of the components already written, updated with the
+        written components.
+
+    """
+    saved.add(comp.uid)
+    lines = ['\n', '- ', comp.cuba_key.name, ':']
+
+    # Create an alias if 'comp' is referenced by some other CUDSComponent
+    # in the model
+    if comp.uid in anchors:
+        lines.append(' &' + str(anchors[comp.uid]))
+    lines.append('\n')
+
+    # Go through the keys in the component
+    for key, data in comp._data.items():
+        value = _to_yaml_value(handle, key, data, anchors, saved)
+        # Write only key-value pairs where value is not None
+        if value is not None:
+            lines.append('    ' + key.name + ': ' + value + '\n')
+    handle.write(''.join(lines))
+
+
+def _to_yaml_value(handle, key, data, anchors, saved):
+    """ Return the Yaml script of the value of a CUBA key
+
+    The referenced components that are not saved yet are written to the
+    handle.
 
     Returns
     -------
     str
-        A string containing Yaml script of the added CUDSComponent and it's
-        sub-components
+        The Yaml script of the value or None when the value is None.
+
+    """
+    # Check if the data is a list or numpy types or CUDSComponents
+    if type(data) == list:
+        # List of simple types?
+        if KEYWORDS[key.name].dtype in [numpy.float64, numpy.int32, bool]:
+            return str([item.tolist() for item in data])
+
+        # List of CUDSComponents, referenced by their anchor number
+        references = []
+        for item in data:
+            if isinstance(item, CUDSComponent):
+                references.append('*' + str(anchors[item.uid]))
+                if item.uid not in saved:
+                    _write_component(handle, item, anchors, saved)
+        return '[' + ', '.join(references) + ']'
+
+    # Only one CUDSComponent?
+    elif isinstance(data, CUDSComponent):
+        if data.uid not in saved:
+            _write_component(handle, data, anchors, saved)
+        return '*' + str(anchors[data.uid])
+
+    # Any of the simple data types?
+    elif type(data) == str:
+        return '"' + data + '"'
+    elif type(data) == numpy.ndarray:
+        return str(data.tolist())
+    elif data is None:
+        return None
+    else:
+        return str(data)
+
+
+def _save_jsonl(handle, model, datasets=None):
+    """ Write the CUDS model as JSON-lines
+
+    The header line holds the name and the description of the model,
+    the links to its datasets and the table of the CUBA keys of the
+    component classes. Every following
+    line holds the index of the class of a component, its uid and the
+    values of its parameters, the subcomponents are written before the
+    components referencing them and are referenced by their index
+    ``{"ref": index}`` in the lines of the components.
 
     """
+    components = _components_in_order(model)
+    classes = []
+    class_index = {}
+    for comp in components:
+        name = comp.cuba_key.name
+        if name not in class_index:
+            class_index[name] = len(classes)
+            classes.append(name)
+    header = {
+        'format': _JSONL_FORMAT, 'version': _JSONL_VERSION,
+        'name': model.name or None,
+        'description': model.description or None,
+        'classes': classes, 'count': len(components)}
+    if datasets is not None:
+        header['datasets'] = datasets
+    handle.write(json.dumps(header, sort_keys=True) + '\n')
+
+    index = {}
+    for comp in components:
+        values = {}
+        for key, data in comp._data.items():
+            if key == CUBA.UID or data is None:
+                continue
+            values[key.name] = _to_json_value(data, index)
+        handle.write(json.dumps(
+            [class_index[comp.cuba_key.name], str(comp.uid), values],
+            separators=(',', ':')) + '\n')
+        index[comp.uid] = len(index)
+
+
+def _components_in_order(model):
+    """ Return the components of the model and their subcomponents, the
+    subcomponents before the components referencing them.
 
-    # Use global (at module level) dictionary for bookkeeping of the
-    # references and of the saved components
-    global _CUDSREFMAP
-    yaml_comp = '\n'
-    yaml_comp += '- ' + str(comp.cuba_key).replace('CUBA.', '') + ':'
+    """
+    components = []
+    seen = set()
 
-    # Check if 'comp' is referenced by some other CUDSComponent in the model
-    # and create an alias if needed
-    if _CUDSREFMAP[comp.uid]:
-        refnum = _CUDSREFMAP.keys().index(comp.uid) + 1
-        yaml_comp += ' &' + str(refnum)
-    yaml_comp += '\n'
+    def visit(comp):
+        seen.add(comp.uid)
+        for data in comp._data.values():
+            items = data if type(data) == list else [data]
+            for item in items:
+                if isinstance(item, CUDSComponent) and item.uid not in seen:
+                    visit(item)
+        components.append(comp)
 
-    # Go through the keys in the component
-    cdata = comp._data
-    for key in cdata.keys():
-        # Check if the data is a list or numpy types or CUDSComponents
-        if type(cdata[key]) == list:
-            # List of simple types?
-            if KEYWORDS[key._name_].dtype in [numpy.float64,
-                                              numpy.int32, bool]:
-                items = []
-                for item in cdata[key]:
-                    items.append(item.tolist())
-                value = str(items)
-
-            # List of CUDSComponents
-            else:
-                value = '['
-                for item in cdata[key]:
-                    if isinstance(item, CUDSComponent):
-                        if len(value) > 1:
-                            value += ', '
-                        # CUDSComponent will be referenced by a small int
-                        # number in the Yaml script
-                        refnum = _CUDSREFMAP.keys().index(item.uid) + 1
-                        value += '*' + str(refnum)
-
-                        # Check from _CUDSREFMAP dictionary if the object
-                        # referenced is not already saved
-                        if _CUDSREFMAP[item.uid] is not 'saved' or []:
-                            _CUDSREFMAP[item.uid] = 'saved'
-                            # Generate Yaml script for this component
-                            stream = _CUDSComponent_to_yaml(item, stream)
-                value += ']'
-
-        # Only one CUDSComponent?
-        elif isinstance(cdata[key], CUDSComponent):
-            refnum = _CUDSREFMAP.keys().index(cdata[key].uid) + 1
-            value = '*' + str(refnum)
-
-            # Use _CUDSREFMAP dictionary to mark already saved
-            # referenced objects
-            if _CUDSREFMAP[cdata[key].uid] is not 'saved' or []:
-                _CUDSREFMAP[cdata[key].uid] = 'saved'
-                # Generate Yaml script for this component
-                stream = _CUDSComponent_to_yaml(cdata[key], stream)
-
-        # Any of the simple data types?
-        elif type(cdata[key]) == str:
-            value = '"' + str(cdata[key]) + '"'
-        elif type(cdata[key]) == numpy.ndarray:
-            value = str(cdata[key].tolist())
-        elif cdata[key] is None:
-            value = None
-        else:
-            value = str(cdata[key])
+    for comp in model.iter(item_type=CUBA.CUDS_COMPONENT):
+        if comp.uid not in seen:
+            visit(comp)
+    return components
 
-        # Write only key-value pairs where value is not None
-        if value:
-            yaml_comp += '    ' + str(key).replace('CUBA.', '') + \
-                ': ' + value + '\n'
-    stream = stream + yaml_comp
-    return stream
+
+def _to_json_value(data, index):
+    """ Return the JSON value of a parameter, the CUDSComponents are
+    replaced by their index.
+
+    """
+    if type(data) == list:
+        return [_to_json_value(item, index) for item in data]
+    elif isinstance(data, CUDSComponent):
+        return {'ref': index[data.uid]}
+    elif isinstance(data, (numpy.ndarray, numpy.generic)):
+        return data.tolist()
+    elif isinstance(data, (basestring, bool, int, long, float)):
+        return data
+    else:
+        return str(data)
+
+
+def _load_jsonl(handle):
+    """ Read a CUDS model from JSON-lines
+
+    The component classes are looked up once for every class in the
+    table of the header.
+
+    """
+    header = _jsonl_header(handle.readline())
+    classes = [_component_class(name) for name in header['classes']]
+
+    components = []
+    for line in handle:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        components.append(
+            _jsonl_component(item, classes[item[0]], components))
+
+    model = CUDS(
+        name=header['name'] or '', description=header['description'] or '')
+    for comp in components:
+        model.add([comp])
+    return model, header.get('datasets')
+
+
+def _jsonl_header(line):
+    """ Return the header of a CUDS JSON-lines file
+
+    Raises
+    ------
+    ValueError
+        if the line is not the header of a supported CUDS JSON-lines file
+
+    """
+    try:
+        header = _from_json_value(json.loads(line), None)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('format') != _JSONL_FORMAT:
+        raise ValueError('Not a CUDS JSON-lines file')
+    if header['version'] != _JSONL_VERSION:
+        raise ValueError(
+            'Unsupported CUDS JSON-lines version {}'.format(
+                header['version']))
+    return header
+
+
+def _jsonl_component(item, component_class, components):
+    """ Instantiate the CUDSComponent of a JSON line
+
+    Parameters
+    ----------
+    item: list
+        The decoded line, the index of the class of the component, its
+        uid and the values of its parameters.
+    component_class: tuple
+        The class of the component and its parameters (see
+        :func:`_component_class`).
+    components: sequence or dict
+        The components referenced by their index in the values.
+
+    """
+    uid, values = item[1:]
+    comp_class, init_params, supp_params = component_class
+    for key in values:
+        if key not in supp_params:
+            message = 'Unknown CUDSComponent "{}" as a subcomponent'
+            raise ValueError(message.format(key))
+    values = {
+        str(key): _from_json_value(value, components)
+        for key, value in values.items()}
+    return _new_component(comp_class, init_params, values, uid)
+
+
+def _from_json_value(value, components):
+    """ Return the parameter value of a JSON value, the references are
+    replaced by the components and ascii strings are returned as str,
+    as by the Yaml loader.
+
+    """
+    if isinstance(value, unicode):
+        try:
+            return str(value)
+        except UnicodeEncodeError:
+            return value
+    elif isinstance(value, list):
+        return [_from_json_value(item, components) for item in value]
+    elif isinstance(value, dict):
+        if components is not None and value.keys() == ['ref']:
+            return components[value['ref']]
+        return {
+            _from_json_value(key, None): _from_json_value(item, components)
+            for key, item in value.items()}
+    return value
 
 
 def _dict_to_CUDSComponent(cubatype, comp, comp_dict=None):
@@ -234,18 +481,11 @@ def _dict_to_CUDSComponent(cubatype, comp, comp_dict=None):
     uid = comp.pop('UID')
 
     if cubatype in KEYWORDS.keys():
-        # Find corresponding module and instantiate the class
-        mod = import_module('simphony.cuds.meta.%s' % cubatype.lower())
-        comp_class = getattr(mod, to_camel_case(cubatype))
-        # Get parameter names for __init__ method
-        init_params = comp_class.__init__.func_code.co_varnames
+        comp_class, init_params, supp_params = _component_class(cubatype)
 
         # Go through the keys and values in comp dictionary and
-        # add supported ones to data_dict
-        init_kwargs = {}
-        system_managed_keys = {}
-        supp_params = [str(e).replace('CUBA.', '')
-                       for e in comp_class.supported_parameters()]
+        # add supported ones to values
+        values = {}
 
         for key in comp.keys():
             # Check if the key is supported
@@ -263,37 +503,19 @@ def _dict_to_CUDSComponent(cubatype, comp, comp_dict=None):
                         else:
                             # validation.validate_cuba_keyword(subcomp, key)
                             tmp.append(subcomp)
-                    if key.lower() in init_params:
-                        init_kwargs[key.lower()] = tmp
-                    else:
-                        cubaname = CUBA[key]
-                        system_managed_keys[cubaname] = tmp
                 elif type(value) is dict:
                     _dict_to_CUDSComponent(key, value, comp_dict)
                     tmp = value
                 else:
                     # validation.validate_cuba_keyword(value, key)
                     tmp = value
-
-                if key.lower() in init_params:
-                    init_kwargs[key.lower()] = tmp
-                else:
-                    cubaname = CUBA[key]
-                    system_managed_keys[cubaname] = tmp
+                values[key] = tmp
 
             else:
                 message = 'Unknown CUDSComponent "{}" as a subcomponent'
                 raise ValueError(message.format(key))
 
-        # Instantiate component with its subcomponents
-        comp_inst = comp_class(**init_kwargs)
-        # Add system managed components by updating the DataContainer
-        data = comp_inst.data
-        data.update(system_managed_keys)
-
-        # Set the initial uid
-        data[CUBA.UID] = uuid.UUID(uid)
-        comp_inst.data = data
+        comp_inst = _new_component(comp_class, init_params, values, uid)
     else:
         message = 'Unknown CUDSComponent "{}"'
         raise ValueError(message.format(cubatype))
@@ -303,3 +525,67 @@ def _dict_to_CUDSComponent(cubatype, comp, comp_dict=None):
     comp_dict[id(comp)] = comp_inst
 
     return comp_dict
+
+
+def _component_class(cubatype):
+    """ Return the class of a CUDSComponent and its parameters
+
+    Parameters
+    ----------
+    cubatype: str
+        CUBA key (name) of the CUDSComponent
+
+    Returns
+    -------
+    comp_class: type
+        The class of the component.
+    init_params: tuple
+        The names of the variables of the ``__init__`` method.
+    supp_params: list
+        The CUBA key names of the supported parameters.
+
+    """
+    # Find corresponding module and the class
+    mod = import_module('simphony.cuds.meta.%s' % cubatype.lower())
+    comp_class = getattr(mod, to_camel_case(cubatype))
+    # Get parameter names for __init__ method
+    init_params = comp_class.__init__.func_code.co_varnames
+    supp_params = [str(e).replace('CUBA.', '')
+                   for e in comp_class.supported_parameters()]
+    return comp_class, init_params, supp_params
+
+
+def _new_component(comp_class, init_params, values, uid):
+    """ Instantiate a CUDSComponent
+
+    Parameters
+    ----------
+    comp_class: type
+        The class of the component.
+    init_params: tuple
+        The names of the variables of the ``__init__`` method.
+    values: dict
+        The values of the parameters with the CUBA key names as keys,
+        including the values of the subcomponents.
+    uid: str
+        The uid of the component.
+
+    """
+    init_kwargs = {}
+    system_managed_keys = {}
+    for key, value in values.items():
+        if key.lower() in init_params:
+            init_kwargs[key.lower()] = value
+        else:
+            system_managed_keys[CUBA[key]] = value
+
+    # Instantiate component with its subcomponents
+    comp_inst = comp_class(**init_kwargs)
+    # Add system managed components by updating the DataContainer
+    data = comp_inst.data
+    data.update(system_managed_keys)
+
+    # Set the initial uid
+    data[CUBA.UID] = uuid.UUID(uid)
+    comp_inst.data = data
+    return comp_inst
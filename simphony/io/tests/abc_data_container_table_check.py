@@ -185,6 +185,116 @@ class ABCDataContainerTableCheck(object):
             self.assertEqual(len(table), 1)
             self.assertDataContainersEqual(loaded_data, new_data)
 
+    def test_delete_data_reuses_the_row(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        with self.new_table('my_data_table') as table:
+            uids = [table.append(data) for _ in range(3)]
+        with self.open_table('my_data_table', mode='a') as table:
+            del table[uids[1]]
+            self.assertEqual(len(table), 2)
+            self.assertEqual(len(list(table)), 2)
+            uid = table.append(DataContainer())
+            self.assertEqual(len(table), 3)
+            self.assertEqual(table._table.nrows, 3)
+            self.assertDataContainersEqual(table[uid], DataContainer())
+            self.assertDataContainersEqual(table[uids[2]], data)
+
+    def test_compact(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        with self.new_table('my_data_table') as table:
+            uids = [table.append(data) for _ in range(5)]
+        with self.open_table('my_data_table', mode='a') as table:
+            del table[uids[0]]
+            del table[uids[3]]
+            table.compact()
+            self.assertEqual(len(table), 3)
+            self.assertEqual(table._table.nrows, 3)
+        with self.open_table('my_data_table', mode='a') as table:
+            self.assertEqual(len(table), 3)
+            for uid in (uids[1], uids[2], uids[4]):
+                self.assertDataContainersEqual(table[uid], data)
+            table.append(data)
+            self.assertEqual(table._table.nrows, 4)
+
+    def test_set_many(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        data1 = DataContainer(data)
+        key = saved_keys[0]
+        data1[key] = dummy_cuba_value(key) + dummy_cuba_value(key)
+        with self.new_table('my_data_table') as table:
+            uids = [table.append(data) for _ in range(3)]
+            del table[uids[0]]
+        with self.open_table('my_data_table', mode='a') as table:
+            new_uids = [uuid.uuid4() for _ in range(2)]
+            table.set_many(
+                [(uids[2], data1), (new_uids[0], data1),
+                 (new_uids[1], data)])
+            self.assertEqual(len(table), 4)
+            # the deleted row is reused
+            self.assertEqual(table._table.nrows, 4)
+        with self.open_table('my_data_table') as table:
+            self.assertDataContainersEqual(table[uids[1]], data)
+            self.assertDataContainersEqual(table[uids[2]], data1)
+            self.assertDataContainersEqual(table[new_uids[0]], data1)
+            self.assertDataContainersEqual(table[new_uids[1]], data)
+
+    def test_set_many_with_repeated_uids(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        data1 = DataContainer(data)
+        key = saved_keys[0]
+        data1[key] = dummy_cuba_value(key) + dummy_cuba_value(key)
+        with self.new_table('my_data_table') as table:
+            uid = table.append(data)
+            new_uid = uuid.uuid4()
+            table.set_many(
+                [(new_uid, data), (uid, data1), (new_uid, data1),
+                 (uid, data)])
+            self.assertEqual(len(table), 2)
+            self.assertEqual(table._table.nrows, 2)
+            self.assertItemsEqual(
+                table.uid_index().find([uid, new_uid]), [0, 1])
+            self.assertDataContainersEqual(table[uid], data)
+            self.assertDataContainersEqual(table[new_uid], data1)
+            del table[new_uid]
+            self.assertEqual(len(table), 1)
+            self.assertNotIn(new_uid, table)
+
+    def test_remove_many(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        with self.new_table('my_data_table') as table:
+            uids = [table.append(data) for _ in range(5)]
+        with self.open_table('my_data_table', mode='a') as table:
+            with self.assertRaises(KeyError):
+                table.remove_many([uids[0], uuid.uuid4()])
+            self.assertEqual(len(table), 5)
+            table.remove_many(uids[3:0:-2])
+            self.assertEqual(len(table), 3)
+        with self.open_table('my_data_table') as table:
+            self.assertItemsEqual(
+                [uids[0], uids[2], uids[4]],
+                [uid for uid in uids if uid in table])
+
+    def test_project(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        keys = saved_keys[:2]
+        with self.new_table('my_data_table') as table:
+            uids = [table.append(data) for _ in range(3)]
+            del table[uids[1]]
+        with self.open_table('my_data_table', mode='a') as table:
+            table.project(keys)
+            self.assertEqual(len(table), 2)
+        with self.open_table('my_data_table') as table:
+            for uid in (uids[0], uids[2]):
+                self.assertDataContainersEqual(
+                    table[uid], DataContainer(
+                        {key: data[key] for key in keys}))
+
     def test_delete_data_with_invalid_uid(self):
         saved_keys = self.saved_keys
         data = create_data_container(restrict=saved_keys)
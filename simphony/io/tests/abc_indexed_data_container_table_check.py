@@ -161,6 +161,74 @@ class ABCIndexedDataContainerTableCheck(object):
                             table[index],
                             create_data_container(restrict=self.saved_keys))
 
+    def test_extend_data(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        with self.new_table('my_data_table') as table:
+            table.append(DataContainer())
+            indices = table.extend([data, DataContainer(), data])
+        with self.open_table('my_data_table') as table:
+            self.assertEqual(len(table), 4)
+            self.assertEqual(list(indices), [1, 2, 3])
+            self.assertDataContainersEqual(table[1], data)
+            self.assertDataContainersEqual(table[2], DataContainer())
+            self.assertDataContainersEqual(table[3], data)
+
+    def test_itersequence(self):
+        data = []
+        saved_keys = self.saved_keys
+        for key in saved_keys:
+            data_container = create_data_container(restrict=saved_keys)
+            del data_container[key]
+            data.append(data_container)
+        with self.new_table('my_data_table') as table:
+            table.extend(data)
+
+        with self.open_table('my_data_table') as table:
+            indices = [2, 0, 1]
+            loaded = list(table.itersequence(indices))
+            self.assertEqual(len(loaded), 3)
+            for index, loaded_data in zip(indices, loaded):
+                self.assertDataContainersEqual(loaded_data, data[index])
+
+    def test_set_many(self):
+        data = []
+        saved_keys = self.saved_keys
+        for key in saved_keys:
+            data_container = create_data_container(restrict=saved_keys)
+            del data_container[key]
+            data.append(data_container)
+        with self.new_table('my_data_table') as table:
+            table.extend(data[:3])
+
+        with self.open_table('my_data_table', mode='a') as table:
+            with self.assertRaises(IndexError):
+                table.set_many([0, 3], data[:2])
+            # the last data of a repeated index is saved
+            table.set_many([2, 0, 2], [data[3], data[4], data[5]])
+            self.assertEqual(len(table), 3)
+
+        with self.open_table('my_data_table') as table:
+            self.assertDataContainersEqual(table[0], data[4])
+            self.assertDataContainersEqual(table[1], data[1])
+            self.assertDataContainersEqual(table[2], data[5])
+
+    def test_project(self):
+        saved_keys = self.saved_keys
+        data = create_data_container(restrict=saved_keys)
+        keys = saved_keys[1:3]
+        with self.new_table('my_data_table') as table:
+            table.extend([data] * 3)
+
+        with self.open_table('my_data_table', mode='a') as table:
+            table.project(keys)
+
+        with self.open_table('my_data_table') as table:
+            for index in range(3):
+                self.assertDataContainersEqual(
+                    table[index], DataContainer(
+                        {key: data[key] for key in keys}))
+
     def test_iteration(self):
         # create sample data
         data = []
@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+import tables
+from numpy.testing import assert_array_equal
+
+from simphony.io.h5_batch import (
+    ADD, REMOVE, UPDATE, BatchBuffer, H5BatchMixin, find_rows,
+    iter_sorted_rows)
+
+
+class Record(tables.IsDescription):
+    uid = tables.StringCol(32, pos=0)
+    value = tables.Int64Col(pos=1)
+
+
+class Item(object):
+
+    def __init__(self, uid, value=0):
+        self.uid = uid
+        self.value = value
+
+
+class TestFindRows(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test.h5')
+        self.handle = tables.open_file(self.filename, mode='w')
+        self.addCleanup(self.cleanup)
+        self.table = self.handle.create_table('/', 'items', Record)
+        self.uids = [uuid.uuid4() for _ in range(10)]
+        row = self.table.row
+        for value, uid in enumerate(self.uids):
+            row['uid'] = uid.hex
+            row['value'] = value
+            row.append()
+        self.table.flush()
+
+    def cleanup(self):
+        self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_find_rows(self):
+        # given
+        uids = [self.uids[7], uuid.uuid4(), self.uids[0], self.uids[7]]
+
+        # when
+        rows = find_rows(self.table, 'uid', uids)
+
+        # then
+        assert_array_equal(rows, [7, -1, 0, 7])
+
+    def test_find_rows_with_no_uids(self):
+        self.assertEqual(len(find_rows(self.table, 'uid', [])), 0)
+
+    def test_find_rows_in_empty_table(self):
+        # given
+        table = self.handle.create_table('/', 'empty', Record)
+
+        # when
+        rows = find_rows(table, 'uid', self.uids[:2])
+
+        # then
+        assert_array_equal(rows, [-1, -1])
+
+    def test_iter_sorted_rows(self):
+        # when
+        for row, position in iter_sorted_rows(self.table, [8, 2, 5]):
+            row['value'] = 100 + position
+            row.update()
+
+        # then
+        values = self.table.col('value')
+        self.assertEqual(values[8], 100)
+        self.assertEqual(values[2], 101)
+        self.assertEqual(values[5], 102)
+        self.assertEqual(values[3], 3)
+
+
+class TestBatchBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = BatchBuffer()
+        self.uid = uuid.uuid4()
+
+    def test_empty(self):
+        self.assertEqual(len(self.batch), 0)
+        self.assertIsNone(self.batch.data)
+
+    def test_data_is_pending(self):
+        self.batch.data = {}
+        self.assertEqual(len(self.batch), 1)
+
+    def test_repeated_updates_keep_the_last_item(self):
+        # when
+        self.batch.update('a', Item(self.uid, 1))
+        self.batch.update('a', Item(self.uid, 2))
+
+        # then
+        self.assertEqual(len(self.batch), 1)
+        items = self.batch.items(UPDATE, 'a')
+        self.assertEqual([item.value for item in items], [2])
+
+    def test_add_followed_by_update_is_an_add(self):
+        # when
+        self.batch.add('a', Item(self.uid, 1))
+        self.batch.update('a', Item(self.uid, 2))
+
+        # then
+        self.assertEqual(self.batch.items(UPDATE, 'a'), [])
+        items = self.batch.items(ADD, 'a')
+        self.assertEqual([item.value for item in items], [2])
+
+    def test_add_followed_by_remove_cancels(self):
+        # when
+        self.batch.add('a', Item(self.uid))
+        self.batch.remove(self.uid)
+
+        # then
+        self.assertEqual(len(self.batch), 0)
+
+    def test_update_followed_by_remove_is_a_remove(self):
+        # when
+        self.batch.update('a', Item(self.uid))
+        self.batch.remove(self.uid)
+
+        # then
+        self.assertEqual(self.batch.keys(REMOVE), [self.uid])
+        self.assertEqual(self.batch.keys(REMOVE, 'a'), [self.uid])
+        self.assertEqual(self.batch.items(UPDATE, 'a'), [])
+
+    def test_remove_followed_by_add_is_an_update(self):
+        # when
+        self.batch.remove(self.uid)
+        self.batch.add('a', Item(self.uid, 3))
+
+        # then
+        self.assertEqual(self.batch.keys(REMOVE), [])
+        items = self.batch.items(UPDATE, 'a')
+        self.assertEqual([item.value for item in items], [3])
+
+    def test_invalid_sequences(self):
+        # given
+        self.batch.add('a', Item(self.uid))
+
+        # then
+        with self.assertRaises(ValueError):
+            self.batch.add('a', Item(self.uid))
+
+        # given
+        uid = uuid.uuid4()
+        self.batch.remove(uid)
+
+        # then
+        with self.assertRaises(ValueError):
+            self.batch.update('a', Item(uid))
+        with self.assertRaises(KeyError):
+            self.batch.remove(uid)
+
+    def test_custom_keys(self):
+        # when
+        self.batch.update('a', Item(None, 1), key=(1, 2, 3))
+        self.batch.update('a', Item(None, 2), key=(1, 2, 3))
+        self.batch.update('a', Item(None, 3), key=(0, 0, 0))
+
+        # then
+        self.assertEqual(self.batch.keys(UPDATE), [(1, 2, 3), (0, 0, 0)])
+        self.assertEqual(
+            [item.value for item in self.batch.items(UPDATE, 'a')], [2, 3])
+
+
+class TestH5BatchMixin(unittest.TestCase):
+
+    def test_apply_batch_is_abstract(self):
+        class Dataset(H5BatchMixin):
+            pass
+
+        with self.assertRaises(TypeError):
+            Dataset()
+
+
+if __name__ == '__main__':
+    unittest.main()
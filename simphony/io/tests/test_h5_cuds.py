@@ -3,15 +3,18 @@ import os
 from contextlib import closing
 import shutil
 import tempfile
+import numpy
 import tables
 
 from simphony.core import CUBA
 from simphony.core.data_container import DataContainer
-from simphony.io.h5_cuds import H5CUDS
+from simphony.io.h5_cuds import FILTER_PROFILES, H5CUDS
 from simphony.io.h5_mesh import H5Mesh
 from simphony.io.h5_particles import H5Particles
+from simphony.io.h5_precision import FloatPrecision
 from simphony.io.h5_lattice import H5Lattice
-from simphony.cuds import Mesh, Particles
+from simphony.cuds import Lattice, Mesh, Particles
+from simphony.cuds.particles_items import Bond, Particle
 from simphony.cuds.mesh_items import Edge, Face, Cell, Point
 from simphony.cuds.lattice import make_cubic_lattice
 
@@ -55,6 +58,27 @@ class TestH5CUDS(unittest.TestCase):
         with closing(H5CUDS.open(filename, 'a', filters=filters)) as handle:
             self.assertTrue(handle.valid())
 
+    def test_open_with_filter_profiles(self):
+        particles = Particles('particles')
+        uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(10)])
+        for profile, filters in FILTER_PROFILES.items():
+            # when
+            filename = os.path.join(self.temp_dir, profile + '.cuds')
+            with closing(H5CUDS.open(filename, 'w', filters=profile)) as h:
+                h.add_dataset(particles)
+
+            # then
+            with closing(H5CUDS.open(filename, 'r')) as handle:
+                dataset = handle.get_dataset('particles')
+                self.assertEqual(dataset._group.particles.items.filters,
+                                 filters)
+                self.assertEqual(dataset.get(uids[3]).data[CUBA.MASS], 3)
+        with self.assertRaises(ValueError):
+            H5CUDS.open(
+                os.path.join(self.temp_dir, 'foo.cuds'), 'w', filters='foo')
+
     def test_init_with_non_file(self):
         with self.assertRaises(Exception):
             H5CUDS(None)
@@ -87,6 +111,531 @@ class TestH5CUDS(unittest.TestCase):
         with self.assertRaises(Exception):
             test_h3.name = 'foo'
 
+    def test_get_dataset_with_cache_size(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        with closing(H5CUDS.open(filename)) as handle:
+            handle.add_dataset(Mesh(name="test_1"))
+            handle.add_dataset(Particles(name="test_2"))
+            lattice = make_cubic_lattice("test_3", 1.0, (2, 3, 4))
+            handle.add_dataset(lattice)
+
+            # when
+            mesh = handle.get_dataset("test_1", cache_size=5)
+            particles = handle.get_dataset("test_2", cache_size=0)
+            lattice = handle.get_dataset("test_3", cache_size=7)
+
+            # then
+            self.assertEqual(mesh.cache_info(CUBA.POINT).maxsize, 5)
+            self.assertEqual(mesh.cache_info().maxsize, 20)
+            self.assertEqual(particles.cache_info().maxsize, 0)
+            self.assertEqual(lattice.cache_info().maxsize, 7)
+
+            # the cache is shared by the proxies of the dataset
+            mesh = handle.get_dataset("test_1")
+            self.assertEqual(mesh.cache_info(CUBA.POINT).maxsize, 5)
+
+    def test_open_in_memory(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.add_dataset(Particles(name="test"))
+
+        # when
+        with closing(H5CUDS.open(filename, in_memory=True)) as handle:
+            # then
+            self.assertEqual(handle._handle.params['DRIVER'], 'H5FD_CORE')
+            handle.get_dataset("test").add([Particle()])
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            particles = handle.get_dataset("test")
+            self.assertEqual(particles.count_of(CUBA.PARTICLE), 1)
+
+    def test_open_in_memory_without_backing_store(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.add_dataset(Particles(name="test"))
+
+        # when
+        with closing(H5CUDS.open(
+                filename, in_memory=True, backing_store=False)) as handle:
+            handle.get_dataset("test").add([Particle()])
+            handle.add_dataset(Mesh(name="mesh"))
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            self.assertEqual(handle.get_dataset_names(), ["test"])
+            particles = handle.get_dataset("test")
+            self.assertEqual(particles.count_of(CUBA.PARTICLE), 0)
+
+    def test_load_dataset(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(10)])
+        bond_uids = particles.add([Bond(particles=uids[:3])])
+        particles.data = DataContainer(NAME='foo')
+        mesh = Mesh(name="mesh")
+        points = mesh.add([Point(coordinates=(i, 0, 0)) for i in range(4)])
+        cells = mesh.add([Cell(points=points)])
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+        node = lattice.get((1, 2, 3))
+        node.data[CUBA.DENSITY] = 3.0
+        lattice.update([node])
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            for container in (particles, mesh, lattice):
+                handle.add_dataset(container)
+
+            # when
+            loaded_particles = handle.load_dataset("particles")
+            loaded_mesh = handle.load_dataset("mesh")
+            loaded_lattice = handle.load_dataset("lattice")
+
+            # then
+            self.assertIsInstance(loaded_particles, Particles)
+            self.assertEqual(loaded_particles.name, "particles")
+            self.assertEqual(loaded_particles.data[CUBA.NAME], 'foo')
+            self.assertEqual(loaded_particles.count_of(CUBA.PARTICLE), 10)
+            particle = loaded_particles.get(uids[4])
+            self.assertEqual(particle.coordinates, (4, 0, 0))
+            self.assertEqual(particle.data[CUBA.MASS], 4)
+            self.assertEqual(
+                loaded_particles.get(bond_uids[0]).particles,
+                tuple(uids[:3]))
+
+            self.assertIsInstance(loaded_mesh, Mesh)
+            self.assertEqual(loaded_mesh.count_of(CUBA.POINT), 4)
+            self.assertEqual(
+                tuple(loaded_mesh.get(cells[0]).points), tuple(points))
+
+            self.assertIsInstance(loaded_lattice, Lattice)
+            self.assertEqual(loaded_lattice.size, (2, 3, 4))
+            self.assertEqual(
+                loaded_lattice.get((1, 2, 3)).data[CUBA.DENSITY], 3.0)
+            self.assertEqual(
+                loaded_lattice.count_of(CUBA.NODE), 24)
+
+            with self.assertRaises(ValueError):
+                handle.load_dataset("foo")
+
+    def test_add_dataset_with_precision(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(coordinates=(i + 0.1234, 0, 0),
+                     data=DataContainer(MASS=i + 0.5678, NAME='p'))
+            for i in range(10)])
+        mesh = Mesh(name="mesh")
+        points = mesh.add([
+            Point(coordinates=(0.1234, i, 0),
+                  data=DataContainer(VELOCITY=(i + 0.5678, 0, 0)))
+            for i in range(4)])
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+        node = lattice.get((1, 2, 3))
+        node.data = DataContainer(DENSITY=3.1234)
+        lattice.update([node])
+        precision = FloatPrecision('float32', absolute_error=1e-3)
+
+        # when
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            for container in (particles, mesh, lattice):
+                handle.add_dataset(container, precision=precision)
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            h5_particles = handle.get_dataset("particles")
+            self.assertEqual(h5_particles.precision, precision)
+            group = h5_particles._group
+            self.assertEqual(group.particles.items.coldtypes[
+                'coordinates'].base, numpy.float32)
+            self.assertEqual(
+                group.particles.data.cols.data.mass.dtype, numpy.float32)
+            particle = h5_particles.get(uids[3])
+            self.assertEqual(particle.coordinates[0].dtype, numpy.float64)
+            self.assertAlmostEqual(particle.coordinates[0], 3.1234, delta=1e-3)
+            self.assertEqual(particle.data[CUBA.MASS].dtype, numpy.float64)
+            self.assertAlmostEqual(
+                particle.data[CUBA.MASS], 3.5678, delta=1e-3)
+            self.assertEqual(particle.data[CUBA.NAME], 'p')
+            chunk, = h5_particles.iter_chunks(CUBA.PARTICLE)
+            self.assertAlmostEqual(chunk[9].coordinates[0], 9.1234, delta=1e-3)
+
+            h5_mesh = handle.get_dataset("mesh")
+            self.assertEqual(h5_mesh.precision, precision)
+            point = h5_mesh.get(points[2])
+            self.assertAlmostEqual(point.coordinates[0], 0.1234, delta=1e-3)
+            self.assertEqual(point.coordinates[0].dtype, numpy.float64)
+            velocity = point.data[CUBA.VELOCITY]
+            self.assertEqual(velocity.dtype, numpy.float64)
+            self.assertAlmostEqual(velocity[0], 2.5678, delta=1e-3)
+            loaded = handle.load_dataset("mesh")
+            self.assertAlmostEqual(
+                loaded.get(points[3]).coordinates[0], 0.1234, delta=1e-3)
+
+            h5_lattice = handle.get_dataset("lattice")
+            self.assertEqual(h5_lattice.precision, precision)
+            density = h5_lattice.get((1, 2, 3)).data[CUBA.DENSITY]
+            self.assertEqual(density.dtype, numpy.float64)
+            self.assertAlmostEqual(density, 3.1234, delta=1e-3)
+
+            # the HDF5 datasets are decoded to change their precision
+            copy = os.path.join(self.temp_dir, 'copy.cuds')
+            with closing(H5CUDS.open(copy, 'w')) as copy_handle:
+                copy_handle.add_dataset(h5_particles)
+                copy_handle.add_dataset(
+                    h5_mesh, precision=FloatPrecision('float64', 0.25))
+                self.assertEqual(
+                    copy_handle.get_dataset("particles").precision,
+                    precision)
+                copied = copy_handle.get_dataset("mesh")
+                self.assertEqual(copied.precision.quantum, 0.5)
+                self.assertEqual(
+                    copied.get(points[1]).coordinates, (0.0, 1.0, 0.0))
+
+    def test_add_dataset_copies_h5_datasets(self):
+        source = os.path.join(self.temp_dir, 'source.cuds')
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(coordinates=(i, 0, 0),
+                     data=DataContainer(MASS=i, CHARGE=-i))
+            for i in range(10)])
+        bond_uids = particles.add([
+            Bond(particles=uids[:3], data=DataContainer(MASS=1.0))])
+        particles.data = DataContainer(NAME='foo')
+        mesh = Mesh(name="mesh")
+        points = mesh.add([
+            Point(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(4)])
+        mesh.add([Cell(points=points)])
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+        node = lattice.get((1, 2, 3))
+        node.data = DataContainer(DENSITY=3.0, MASS=1.0)
+        lattice.update([node])
+        with closing(H5CUDS.open(source, 'w')) as source_handle:
+            for container in (particles, mesh, lattice):
+                source_handle.add_dataset(container)
+            source_particles = source_handle.get_dataset("particles")
+            with source_particles.batch():
+                source_particles.remove([uids[9]])
+
+                # when
+                with closing(H5CUDS.open(filename, 'w')) as handle:
+                    handle.add_dataset(source_particles)
+                    for name in ("mesh", "lattice"):
+                        handle.add_dataset(source_handle.get_dataset(name))
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            copied = handle.get_dataset("particles")
+            self.assertIsInstance(copied, H5Particles)
+            self.assertEqual(copied.data[CUBA.NAME], 'foo')
+            # the pending batch of the source was written before copying
+            self.assertEqual(copied.count_of(CUBA.PARTICLE), 9)
+            particle = copied.get(uids[4])
+            self.assertEqual(particle.coordinates, (4, 0, 0))
+            self.assertEqual(
+                particle.data, DataContainer(MASS=4, CHARGE=-4))
+            self.assertEqual(
+                copied.get(bond_uids[0]).particles, tuple(uids[:3]))
+
+            copied = handle.get_dataset("mesh")
+            self.assertEqual(copied.count_of(CUBA.POINT), 4)
+            self.assertEqual(copied.get(points[2]).data[CUBA.MASS], 2)
+            self.assertEqual(copied.count_of(CUBA.CELL), 1)
+
+            copied = handle.get_dataset("lattice")
+            self.assertEqual(copied.size, (2, 3, 4))
+            self.assertEqual(
+                copied.get((1, 2, 3)).data,
+                DataContainer(DENSITY=3.0, MASS=1.0))
+
+    def test_add_dataset_records_uid(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        copy = os.path.join(self.temp_dir, 'copy.cuds')
+        particles = Particles(name="particles")
+        mesh = Mesh(name="mesh")
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+
+        # when
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            for container in (particles, mesh, lattice):
+                handle.add_dataset(container)
+            with closing(H5CUDS.open(copy, 'w')) as copy_handle:
+                copy_handle.add_dataset(handle.get_dataset("particles"))
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            for container in (particles, mesh, lattice):
+                dataset = handle.get_dataset(container.name)
+                self.assertEqual(dataset.uid, container.uid)
+                self.assertEqual(dataset.cuba_key, container.cuba_key)
+        with closing(H5CUDS.open(copy, 'r')) as handle:
+            self.assertEqual(
+                handle.get_dataset("particles").uid, particles.uid)
+
+    def test_add_dataset_copies_h5_datasets_with_cuba_keys(self):
+        source = os.path.join(self.temp_dir, 'source.cuds')
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(data=DataContainer(MASS=i, CHARGE=-i))
+            for i in range(10)])
+        bond_uids = particles.add([
+            Bond(particles=uids[:3], data=DataContainer(MASS=1.0))])
+        mesh = Mesh(name="mesh")
+        points = mesh.add([
+            Point(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(4)])
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+        node = lattice.get((1, 2, 3))
+        node.data = DataContainer(DENSITY=3.0, MASS=1.0)
+        lattice.update([node])
+        with closing(H5CUDS.open(source, 'w')) as source_handle:
+            for container in (particles, mesh, lattice):
+                source_handle.add_dataset(container)
+
+            # when
+            with closing(H5CUDS.open(filename, 'w')) as handle:
+                for name in ("particles", "mesh", "lattice"):
+                    handle.add_dataset(
+                        source_handle.get_dataset(name),
+                        cuba_keys={CUBA.PARTICLE: [CUBA.MASS],
+                                   CUBA.BOND: [],
+                                   CUBA.POINT: [],
+                                   CUBA.NODE: [CUBA.DENSITY]})
+
+            # then the source is not changed
+            source_particles = source_handle.get_dataset("particles")
+            self.assertEqual(
+                source_particles.get(uids[1]).data,
+                DataContainer(MASS=1, CHARGE=-1))
+
+        # then
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            copied = handle.get_dataset("particles")
+            self.assertEqual(
+                copied.get(uids[4]).data, DataContainer(MASS=4))
+            self.assertEqual(copied.get(bond_uids[0]).data, DataContainer())
+            copied = handle.get_dataset("mesh")
+            self.assertEqual(copied.get(points[2]).data, DataContainer())
+            copied = handle.get_dataset("lattice")
+            self.assertEqual(
+                copied.get((1, 2, 3)).data, DataContainer(DENSITY=3.0))
+
+    def test_add_dataset_keeps_item_types_missing_from_cuba_keys(self):
+        source = os.path.join(self.temp_dir, 'source.cuds')
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(data=DataContainer(MASS=i, CHARGE=-i))
+            for i in range(10)])
+        bond_uids = particles.add([
+            Bond(particles=uids[:3], data=DataContainer(MASS=1.0))])
+        cuba_keys = {CUBA.PARTICLE: [CUBA.MASS]}
+        with closing(H5CUDS.open(source, 'w')) as source_handle:
+            source_handle.add_dataset(particles)
+
+            # when
+            with closing(H5CUDS.open(filename, 'w')) as handle:
+                handle.add_dataset(particles, cuba_keys=cuba_keys)
+                copy = source_handle.get_dataset("particles")
+                copy.name = "copy"
+                handle.add_dataset(copy, cuba_keys=cuba_keys)
+
+                # then
+                for name in ("particles", "copy"):
+                    dataset = handle.get_dataset(name)
+                    self.assertEqual(
+                        dataset.get(uids[4]).data, DataContainer(MASS=4))
+                    self.assertEqual(
+                        dataset.get(bond_uids[0]).data,
+                        DataContainer(MASS=1.0))
+
+    def test_sync_dataset_after_add_dataset(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(10)])
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            # when
+            handle.add_dataset(particles)
+
+            # then
+            self.assertEqual(len(particles.changes), 0)
+
+            # given
+            particle = particles.get(uids[2])
+            particle.coordinates = (2, 1, 0)
+            particles.update([particle])
+
+            # when
+            handle.sync_dataset(particles)
+
+            # then
+            dataset = handle.get_dataset("particles")
+            self.assertEqual(dataset.count_of(CUBA.PARTICLE), 10)
+            self.assertEqual(dataset.get(uids[2]).coordinates, (2, 1, 0))
+
+    def test_sync_dataset(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(10)])
+        bond_uids = particles.add([Bond(particles=uids[:3])])
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            # when
+            nbytes = handle.sync_dataset(particles)
+
+            # then
+            self.assertGreater(nbytes, 0)
+            self.assertEqual(len(particles.changes), 0)
+            self.assertEqual(
+                handle.get_dataset("particles").count_of(CUBA.PARTICLE), 10)
+
+            # given
+            moved = []
+            for particle in particles.iter(uids[:4]):
+                particle.coordinates = (0, 1, 0)
+                moved.append(particle)
+            particles.update(moved)
+            new_uids = particles.add([Particle(coordinates=(0, 0, 2))])
+            particles.remove([uids[9], bond_uids[0]])
+
+            # when
+            nbytes = handle.sync_dataset(particles)
+
+            # then
+            dataset = handle.get_dataset("particles")
+            rowsize = (
+                dataset._particles._items.rowsize +
+                dataset._particles._data.rowsize)
+            # the moved particles do not write their data rows
+            self.assertEqual(
+                nbytes,
+                dataset._data.rowsize + 4 * dataset._particles._items.rowsize +
+                2 * rowsize + dataset._bonds.row_nbytes())
+            self.assertEqual(len(particles.changes), 0)
+            self.assertEqual(dataset.count_of(CUBA.PARTICLE), 10)
+            self.assertEqual(dataset.count_of(CUBA.BOND), 0)
+            self.assertEqual(dataset.get(uids[2]).coordinates, (0, 1, 0))
+            self.assertEqual(dataset.get(uids[2]).data[CUBA.MASS], 2)
+            self.assertTrue(dataset.has(new_uids[0]))
+            self.assertFalse(dataset.has(uids[9]))
+
+            # when
+            self.assertEqual(
+                handle.sync_dataset(particles), dataset._data.rowsize)
+
+    def test_sync_mesh_and_lattice(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        mesh = Mesh(name="mesh")
+        points = mesh.add([Point(coordinates=(i, 0, 0)) for i in range(4)])
+        cells = mesh.add([Cell(points=points)])
+        lattice = make_cubic_lattice("lattice", 1.0, (2, 3, 4))
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.sync_dataset(mesh)
+            handle.sync_dataset(lattice)
+
+            # given
+            point = mesh.get(points[0])
+            point.data = DataContainer(MASS=3.0)
+            cell = mesh.get(cells[0])
+            cell.points = points[1:]
+            mesh.update([point, cell])
+            node = lattice.get((1, 2, 3))
+            node.data = DataContainer(DENSITY=2.0)
+            lattice.update([node])
+
+            # when
+            handle.sync_dataset(mesh)
+            handle.sync_dataset(lattice)
+
+            # then
+            dataset = handle.get_dataset("mesh")
+            self.assertEqual(dataset.get(points[0]).data[CUBA.MASS], 3.0)
+            self.assertEqual(dataset.get(points[0]).coordinates, (0, 0, 0))
+            self.assertEqual(
+                tuple(dataset.get(cells[0]).points), tuple(points[1:]))
+            dataset = handle.get_dataset("lattice")
+            self.assertEqual(
+                dataset.get((1, 2, 3)).data, DataContainer(DENSITY=2.0))
+
+            with self.assertRaises(ValueError):
+                handle.sync_dataset(Particles(name="mesh"))
+
+    def test_sync_replaces_the_dataset_of_an_untracked_container(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name="particles")
+        particles.add([Particle(coordinates=(i, 0, 0)) for i in range(3)])
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.add_dataset(particles)
+            self.assertTrue(particles.changes.tracking)
+
+            # given
+            other = Particles(name="particles")
+            uids = other.add([Particle(coordinates=(0, 0, 1))])
+            self.assertFalse(other.changes.tracking)
+
+            # when
+            handle.sync_dataset(other)
+
+            # then
+            dataset = handle.get_dataset("particles")
+            self.assertEqual(dataset.count_of(CUBA.PARTICLE), 1)
+            self.assertTrue(dataset.has(uids[0]))
+            self.assertTrue(other.changes.tracking)
+
+    def test_sync_preloaded_dataset(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.add_dataset(Particles(name="particles"))
+
+        with closing(H5CUDS.open(filename, preload=True)) as handle:
+            particles = handle.get_dataset("particles")
+            self.assertEqual(len(particles.changes), 0)
+
+            # when
+            uids = particles.add([Particle()])
+            handle.sync_dataset(particles)
+
+            # then
+            self.assertIs(handle.get_dataset("particles"), particles)
+
+        with closing(H5CUDS.open(filename, 'r')) as handle:
+            self.assertTrue(handle.get_dataset("particles").has(uids[0]))
+
+    def test_open_with_preload(self):
+        filename = os.path.join(self.temp_dir, 'test.cuds')
+        with closing(H5CUDS.open(filename, 'w')) as handle:
+            handle.add_dataset(Mesh(name="mesh"))
+            handle.add_dataset(Particles(name="particles"))
+
+        # when
+        with closing(H5CUDS.open(filename, 'r', preload=True)) as handle:
+            # then
+            self.assertIsInstance(handle.get_dataset("mesh"), Mesh)
+            self.assertIsInstance(handle.get_dataset("particles"), Particles)
+            self.assertItemsEqual(
+                [type(dataset) for dataset in handle.iter_datasets()],
+                [Mesh, Particles])
+
+        # when
+        with closing(H5CUDS.open(filename, preload=["mesh"])) as handle:
+            # then
+            self.assertIsInstance(handle.get_dataset("mesh"), Mesh)
+            self.assertIsInstance(
+                handle.get_dataset("particles"), H5Particles)
+
+            # when
+            handle.remove_dataset("mesh")
+
+            # then
+            with self.assertRaises(ValueError):
+                handle.get_dataset("mesh")
+
 
 class TestH5CUDSVersions(unittest.TestCase):
 
@@ -34,11 +34,12 @@ class _DummyH5CUDSItems(H5CUDSItems):
 
     def _populate(self, row, item):
         row['value'] = item.value
-        self._data[item.uid] = item.data
 
-    def _retrieve(self, row):
+    def _retrieve(self, row, data=None):
         uid = uuid.UUID(hex=row['uid'], version=4)
-        return _DummyItem(uid=uid, value=row['value'], data=self._data[uid])
+        if data is None:
+            data = self._data[uid]
+        return _DummyItem(uid=uid, value=row['value'], data=data)
 
 
 class TestH5CUDSItems(unittest.TestCase):
@@ -225,6 +226,107 @@ class TestH5CUDSItems(unittest.TestCase):
             self.assertIn('data', root.my_items)
             self.assertTrue(container.valid)
 
+    def test_delete_data_reuses_the_rows(self):
+        with self.new_container('my_items') as container:
+            uids = {uuid.uuid4(): item for item in self.item_list}
+            for uid, item in uids.iteritems():
+                container[uid] = item
+        with self.open_container('my_items', mode='a') as container:
+            removed = uids.keys()[:3]
+            for uid in removed:
+                del container[uid]
+                del uids[uid]
+            self.assertEqual(len(container), 7)
+            self.assertEqual(len(container._data), 7)
+            self.assertItemsEqual(
+                [item.uid for item in container], uids.keys())
+
+            item = self.item_list[0]
+            item.uid = uuid.uuid4()
+            container.add_unsafe(item)
+            uids[item.uid] = item
+
+            self.assertEqual(len(container), 8)
+            self.assertEqual(container._items.nrows, 10)
+            for uid in uids:
+                self.assertEqual(container[uid], uids[uid])
+
+    def test_compact(self):
+        with self.new_container('my_items') as container:
+            uids = {uuid.uuid4(): item for item in self.item_list}
+            for uid, item in uids.iteritems():
+                container[uid] = item
+        with self.open_container('my_items', mode='a') as container:
+            for uid in uids.keys()[:4]:
+                del container[uid]
+                del uids[uid]
+            container.compact()
+            self.assertEqual(container._items.nrows, 6)
+            self.assertEqual(container._data._table.nrows, 6)
+        with self.open_container('my_items') as container:
+            self.assertEqual(len(container), 6)
+            for uid in uids:
+                self.assertEqual(container[uid], uids[uid])
+
+    def test_add_many(self):
+        with self.new_container('my_items') as container:
+            items = self.item_list
+            for item in items:
+                item.uid = uuid.uuid4()
+            container.add_many(items[:5])
+            del container[items[0].uid]
+            with self.assertRaises(ValueError):
+                container.add_many([items[5], items[1]])
+            with self.assertRaises(ValueError):
+                container.add_many([items[5], items[6], items[5]])
+            self.assertEqual(len(container), 4)
+            container.add_many(items[5:])
+            self.assertEqual(len(container), 9)
+            self.assertEqual(container._items.nrows, 9)
+        with self.open_container('my_items') as container:
+            for item in items[1:]:
+                self.assertEqual(container[item.uid], item)
+
+    def test_update_many(self):
+        with self.new_container('my_items') as container:
+            items = self.item_list
+            for item in items:
+                item.uid = uuid.uuid4()
+            container.add_many(items)
+        with self.open_container('my_items', mode='a') as container:
+            updated = [
+                _DummyItem(uid=item.uid, value=item.value + 1)
+                for item in items[::-2]]
+            missing = _DummyItem(uid=uuid.uuid4())
+            with self.assertRaises(ValueError):
+                container.update_many(updated + [missing])
+            self.assertEqual(container[items[-1].uid], items[-1])
+            container.update_many(updated)
+        with self.open_container('my_items') as container:
+            for item in updated:
+                self.assertEqual(container[item.uid], item)
+            for item in items[-2::-2]:
+                self.assertEqual(container[item.uid], item)
+
+    def test_remove_many(self):
+        with self.new_container('my_items') as container:
+            items = self.item_list
+            for item in items:
+                item.uid = uuid.uuid4()
+            container.add_many(items)
+        with self.open_container('my_items', mode='a') as container:
+            with self.assertRaises(KeyError):
+                container.remove_many([items[0].uid, uuid.uuid4()])
+            self.assertEqual(len(container), 10)
+            container.remove_many([item.uid for item in items[5:]])
+            self.assertEqual(len(container), 5)
+            container.add_many(items[7:])
+            self.assertEqual(container._items.nrows, 10)
+        with self.open_container('my_items') as container:
+            self.assertItemsEqual(
+                [item.uid for item in container],
+                [item.uid for item in items[:5] + items[7:]])
+
     def test_iteration(self):
         # add to data container table
         with self.new_container('my_items') as container:
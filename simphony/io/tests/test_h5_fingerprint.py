@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.fingerprint import ContentHash
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.lattice_items import LatticeNode
+from simphony.cuds.mesh import Mesh
+from simphony.cuds.mesh_items import Edge, Point
+from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Bond, Particle
+from simphony.io.h5_cuds import H5CUDS
+
+
+class TestH5Fingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'test.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.close)
+
+    def close(self):
+        if self.handle.valid():
+            self.handle.close()
+
+    def reopen(self, mode='a'):
+        self.handle.close()
+        self.handle = H5CUDS.open(self.filename, mode)
+
+    def add_particles(self):
+        particles = Particles('particles')
+        self.uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(50)])
+        self.bond_uids = particles.add([Bond(particles=self.uids[:2])])
+        self.handle.add_dataset(particles)
+        return self.handle.get_dataset('particles')
+
+    def stored(self, dataset):
+        return 'fingerprint_states' in dataset._group._v_attrs
+
+    def test_digests_are_stored(self):
+        # given
+        particles = self.add_particles()
+        self.assertFalse(self.stored(particles))
+
+        # when
+        fingerprint = particles.fingerprint()
+
+        # then
+        self.assertTrue(self.stored(particles))
+        self.assertEqual(fingerprint, ContentHash(particles).hexdigest())
+        self.reopen()
+        particles = self.handle.get_dataset('particles')
+        self.assertEqual(particles.fingerprint(), fingerprint)
+
+    def test_digests_follow_changes(self):
+        # given
+        particles = self.add_particles()
+        fingerprint = particles.fingerprint()
+
+        # when
+        particle = particles.get(self.uids[3])
+        particle.data[CUBA.MASS] = 10.0
+        particles.update([particle])
+        particles.remove([self.uids[4], self.bond_uids[0]])
+        particles.add([Particle(coordinates=(1, 1, 1))])
+        self.reopen()
+        particles = self.handle.get_dataset('particles')
+
+        # then
+        self.assertNotEqual(particles.fingerprint(), fingerprint)
+        self.assertEqual(
+            particles.fingerprint(), ContentHash(particles).hexdigest())
+        self.assertEqual(
+            particles.chunk_fingerprints(),
+            ContentHash(particles).chunk_digests())
+
+    def test_digests_are_not_stored_in_a_read_only_file(self):
+        # given
+        particles = self.add_particles()
+        fingerprint = ContentHash(particles).hexdigest()
+        self.reopen('r')
+        particles = self.handle.get_dataset('particles')
+
+        # when/then
+        self.assertEqual(particles.fingerprint(), fingerprint)
+        self.assertFalse(self.stored(particles))
+
+    def test_project_clears_the_digests(self):
+        # given
+        particles = self.add_particles()
+        fingerprint = particles.fingerprint()
+
+        # when
+        particles.project({CUBA.PARTICLE: []})
+
+        # then
+        self.assertFalse(self.stored(particles))
+        self.assertNotEqual(particles.fingerprint(), fingerprint)
+        self.assertEqual(
+            particles.fingerprint(), ContentHash(particles).hexdigest())
+
+    def test_mesh_digests(self):
+        # given
+        mesh = Mesh('mesh')
+        points = mesh.add([Point((0, 0, 0)), Point((1, 1, 1))])
+        self.handle.add_dataset(mesh)
+        mesh = self.handle.get_dataset('mesh')
+        fingerprint = mesh.fingerprint()
+
+        # when
+        mesh.add([Edge(points)])
+        point = mesh.get(points[0])
+        point.coordinates = (2, 2, 2)
+        mesh.update([point])
+
+        # then
+        self.assertNotEqual(mesh.fingerprint(), fingerprint)
+        self.assertEqual(mesh.fingerprint(), ContentHash(mesh).hexdigest())
+
+    def test_lattice_digests(self):
+        # given
+        self.handle.add_dataset(
+            make_cubic_lattice('lattice', 1.0, (3, 4, 5)))
+        lattice = self.handle.get_dataset('lattice')
+        fingerprint = lattice.fingerprint()
+
+        # when
+        lattice.update([LatticeNode((1, 2, 3), DataContainer(MASS=1.0))])
+
+        # then
+        self.assertNotEqual(lattice.fingerprint(), fingerprint)
+        self.assertEqual(
+            lattice.fingerprint(), ContentHash(lattice).hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
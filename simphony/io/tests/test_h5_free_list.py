@@ -0,0 +1,112 @@
+import os
+import tempfile
+import shutil
+import unittest
+
+import numpy
+import tables
+from numpy.testing import assert_array_equal
+
+from simphony.io.h5_free_list import H5FreeList, compact_table, compact_csr
+
+
+class _Record(tables.IsDescription):
+    uid = tables.StringCol(32, pos=0)
+    offset = tables.Int64Col(pos=1)
+    count = tables.Int32Col(pos=2)
+
+
+class TestH5FreeList(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = tables.open_file(self.filename, mode='w')
+
+    def tearDown(self):
+        self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_empty_free_list(self):
+        # when
+        free = H5FreeList(self.handle.root, 'free')
+
+        # then
+        self.assertEqual(len(free), 0)
+        self.assertIsNone(free.pop())
+        self.assertNotIn('free', self.handle.root)
+
+    def test_push_and_pop(self):
+        # given
+        free = H5FreeList(self.handle.root, 'free')
+
+        # when
+        free.push(3)
+        free.push(7)
+
+        # then
+        self.assertEqual(len(H5FreeList(self.handle.root, 'free')), 2)
+        self.assertEqual(free.pop(), 7)
+        self.assertEqual(free.pop(), 3)
+        self.assertIsNone(free.pop())
+        self.assertEqual(len(free), 0)
+
+    def test_clear(self):
+        # given
+        free = H5FreeList(self.handle.root, 'free')
+        free.push(3)
+
+        # when
+        free.clear()
+
+        # then
+        self.assertEqual(len(free), 0)
+        self.assertNotIn('free', self.handle.root)
+
+
+class TestCompaction(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = tables.open_file(self.filename, mode='w')
+        self.table = self.handle.create_table(
+            self.handle.root, 'items', _Record)
+        self.array = self.handle.create_earray(
+            self.handle.root, 'members', tables.Int64Atom(), shape=(0,))
+
+    def tearDown(self):
+        self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_compact_table(self):
+        # given
+        self.table.append(
+            [('a', 0, 1), ('', 0, 0), ('b', 0, 2), ('', 0, 0), ('c', 0, 3)])
+
+        # when
+        table = compact_table(self.table, 'uid', chunk_size=2)
+
+        # then
+        self.assertIs(self.handle.root.items, table)
+        self.assertEqual(table.col('uid').tolist(), ['a', 'b', 'c'])
+        self.assertEqual(table.col('count').tolist(), [1, 2, 3])
+        self.assertEqual(len(self.handle.root._f_list_nodes()), 2)
+
+    def test_compact_csr(self):
+        # given
+        self.array.append(numpy.arange(20))
+        self.table.append(
+            [('a', 15, 3), ('b', 2, 2), ('c', 0, 0), ('d', 6, 1)])
+
+        # when
+        array = compact_csr(self.table, self.array, 'count', chunk_size=3)
+
+        # then
+        self.assertIs(self.handle.root.members, array)
+        assert_array_equal(array.read(), [15, 16, 17, 2, 3, 6])
+        self.assertEqual(self.table.col('offset').tolist(), [0, 3, 5, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from simphony.io.h5_item_cache import CacheInfo, ItemCache, sum_info
+
+
+class Item(object):
+
+    def __init__(self, value):
+        self.value = value
+
+
+def copy(item):
+    return Item(item.value)
+
+
+class TestItemCache(unittest.TestCase):
+
+    def test_get_and_put(self):
+        # given
+        cache = ItemCache(copy, maxsize=2)
+        item = Item(1)
+
+        # when
+        miss = cache.get('a')
+        cache.put('a', item)
+        hit = cache.get('a')
+
+        # then
+        self.assertIsNone(miss)
+        self.assertEqual(hit.value, 1)
+        self.assertEqual(cache.info(), CacheInfo(1, 1, 2, 1))
+
+    def test_items_are_copied(self):
+        # given
+        cache = ItemCache(copy)
+        item = Item(1)
+
+        # when
+        cache.put('a', item)
+        item.value = 2
+        retrieved = cache.get('a')
+        retrieved.value = 3
+
+        # then
+        self.assertEqual(cache.get('a').value, 1)
+
+    def test_least_recently_used_items_are_evicted(self):
+        # given
+        cache = ItemCache(copy, maxsize=2)
+        cache.put('a', Item(1))
+        cache.put('b', Item(2))
+
+        # when
+        cache.get('a')
+        cache.put('c', Item(3))
+
+        # then
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_resize(self):
+        # given
+        cache = ItemCache(copy, maxsize=3)
+        for key in 'abc':
+            cache.put(key, Item(key))
+
+        # when
+        cache.maxsize = 1
+
+        # then
+        self.assertEqual(len(cache), 1)
+        self.assertIn('c', cache)
+        with self.assertRaises(ValueError):
+            cache.maxsize = -1
+
+    def test_disabled_cache(self):
+        # given
+        cache = ItemCache(copy, maxsize=0)
+
+        # when
+        cache.put('a', Item(1))
+
+        # then
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get('a'))
+
+    def test_discard_and_clear(self):
+        # given
+        cache = ItemCache(copy)
+        for key in 'abc':
+            cache.put(key, Item(key))
+        cache.get('a')
+
+        # when
+        cache.discard('a')
+        cache.discard('d')
+        cache.discard_many(['b', 'e'])
+
+        # then
+        self.assertEqual(len(cache), 1)
+
+        # when
+        cache.clear()
+
+        # then
+        self.assertEqual(cache.info(), CacheInfo(0, 0, cache.maxsize, 0))
+
+    def test_sum_info(self):
+        self.assertEqual(
+            sum_info([CacheInfo(1, 2, 3, 4), CacheInfo(5, 6, 7, 8)]),
+            CacheInfo(6, 8, 10, 12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -155,6 +155,192 @@ class TestH5LatticeCustomNodeOperations(
         return [CUBA.VELOCITY, CUBA.DENSITY]
 
 
+class TestH5LatticeBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = tables.open_file(self.filename, 'w')
+        self.addCleanup(self.cleanup)
+        group = self.handle.create_group(self.handle.root, 'lattice')
+        self.container = H5Lattice.create_new(
+            group, PrimitiveCell.for_cubic_lattice(0.2),
+            size=(4, 3, 2), origin=(0, 0, 0))
+
+    def cleanup(self):
+        self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_modifications_are_written_on_exit(self):
+        # given
+        nodes = list(self.container.iter())
+
+        # when
+        with self.container.batch():
+            for node in nodes:
+                node.data[CUBA.DENSITY] = sum(node.index)
+                self.container.update([node])
+            nodes[0].data[CUBA.DENSITY] = -1
+            self.container.update([nodes[0]])
+            self.container.data = {CUBA.NAME: 'batched'}
+
+            # then
+            self.assertEqual(len(self.container._batch), len(nodes) + 1)
+            self.assertEqual(self.container.data[CUBA.NAME], 'batched')
+
+        # then
+        for node in self.container.iter():
+            expected = -1 if node.index == (0, 0, 0) else sum(node.index)
+            self.assertEqual(node.data[CUBA.DENSITY], expected)
+        self.assertEqual(self.container.data[CUBA.NAME], 'batched')
+
+    def test_reads_write_the_pending_modifications(self):
+        # given
+        node = self.container.get((1, 2, 1))
+        node.data[CUBA.DENSITY] = 3.0
+
+        # when
+        with self.container.batch():
+            self.container.update([node])
+            retrieved = self.container.get((1, 2, 1))
+
+        # then
+        self.assertEqual(retrieved.data[CUBA.DENSITY], 3.0)
+
+    def test_invalid_index_is_raised_immediately(self):
+        # given
+        node = self.container.get((0, 0, 0))
+        node.index = (5, 5, 5)
+
+        # when/then
+        with self.container.batch():
+            with self.assertRaises(IndexError):
+                self.container.update([node])
+
+
+class TestH5LatticeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = tables.open_file(self.filename, 'w')
+        self.addCleanup(self.cleanup)
+        group = self.handle.create_group(self.handle.root, 'lattice')
+        H5Lattice.create_new(
+            group, PrimitiveCell.for_cubic_lattice(0.2),
+            size=(4, 3, 2), origin=(0, 0, 0))
+        self.container = H5Lattice(group, cache_size=2)
+
+    def cleanup(self):
+        self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_gets_hit_the_cache(self):
+        # when
+        for _ in range(3):
+            node = self.container.get((1, 2, 1))
+
+        # then
+        self.assertEqual(node.index, (1, 2, 1))
+        self.assertEqual(self.container.cache_info(), (2, 1, 2, 1))
+
+    def test_update_invalidates_the_cache(self):
+        # given
+        node = self.container.get((1, 2, 1))
+
+        # when
+        node.data[CUBA.DENSITY] = 2.0
+        self.container.update([node])
+
+        # then
+        self.assertEqual(
+            self.container.get((1, 2, 1)).data[CUBA.DENSITY], 2.0)
+
+        # when
+        node.data[CUBA.DENSITY] = 3.0
+        with self.container.batch():
+            self.container.update([node])
+
+        # then
+        self.assertEqual(
+            self.container.get((1, 2, 1)).data[CUBA.DENSITY], 3.0)
+
+    def test_cache_clear(self):
+        # given
+        self.container.get((0, 0, 0))
+
+        # when
+        self.container.cache_clear()
+
+        # then
+        self.assertEqual(self.container.cache_info(), (0, 0, 2, 0))
+
+    def test_iter_chunks(self):
+        # given
+        node = self.container.get((1, 2, 1))
+        node.data[CUBA.DENSITY] = 2.0
+        self.container.update([node])
+
+        # when
+        chunks = list(self.container.iter_chunks(CUBA.NODE, 5))
+
+        # then
+        self.assertEqual([len(chunk) for chunk in chunks], [5] * 4 + [4])
+        nodes = [item for chunk in chunks for item in chunk]
+        self.assertEqual(
+            [item.index for item in nodes],
+            [item.index for item in self.container.iter()])
+        self.assertEqual(nodes[1 * 6 + 2 * 2 + 1].data[CUBA.DENSITY], 2.0)
+        with self.assertRaises(ValueError):
+            self.container.iter_chunks(CUBA.POINT)
+
+    def test_iter_chunks_of_row_range(self):
+        # when
+        chunks = list(self.container.iter_chunks(CUBA.NODE, 5, 3, 12))
+
+        # then
+        self.assertEqual(self.container.row_count(), 24)
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 4])
+        self.assertEqual(
+            [item.index for chunk in chunks for item in chunk],
+            [item.index for item in self.container.iter()][3:12])
+        with self.assertRaises(ValueError):
+            self.container.row_count(CUBA.POINT)
+
+    def test_summary(self):
+        # given
+        node = self.container.get((1, 2, 1))
+        node.data[CUBA.DENSITY] = 2.0
+
+        # when
+        self.container.update([node])
+        summary = self.container.summary()[CUBA.NODE]
+
+        # then
+        self.assertEqual(summary.count, 24)
+        self.assertFalse(summary.exact)
+        assert_array_almost_equal(
+            summary.bounds, [[0, 0, 0], [0.6, 0.4, 0.2]])
+        self.assertEqual(summary.keys, {CUBA.DENSITY})
+        self.assertEqual(summary.fields[CUBA.DENSITY], (2.0, 2.0, None))
+
+        # when
+        summary = self.container.summary(refresh=True)[CUBA.NODE]
+
+        # then
+        self.assertTrue(summary.exact)
+        self.assertEqual(summary.fields[CUBA.DENSITY], (2.0, 2.0, 2.0))
+
+    def test_prefetch(self):
+        # when
+        chunks = self.container.prefetch(chunk_size=5, max_bytes=1)
+
+        # then
+        self.assertEqual(
+            [item.index for item in chunks.items()],
+            [item.index for item in self.container.iter()])
+
+
 class TestH5LatticeVersions(unittest.TestCase):
 
     def setUp(self):
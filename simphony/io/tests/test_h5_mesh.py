@@ -2,12 +2,18 @@ import os
 import tempfile
 import shutil
 import unittest
+import uuid
+
 import tables
 
 from simphony.testing.abc_check_mesh import (
     CheckMeshPointOperations, CheckMeshEdgeOperations,
     CheckMeshFaceOperations, CheckMeshCellOperations,
     CheckMeshContainer)
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.mesh_items import Point, Edge, Face, Cell
+from simphony.io import h5_mesh
 from simphony.io.h5_mesh import H5Mesh
 from simphony.io.data_container_description import SUPPORTED_CUBA
 
@@ -144,13 +150,20 @@ class TestH5MeshStoredLayout(unittest.TestCase):
         H5Mesh(group, self.handle)
 
         # when
-        self.assertEqual(len(group._f_list_nodes()), 6)
+        self.assertEqual(len(group._f_list_nodes()), 13)
         self.assertIsInstance(group.cells, tables.Table)
         self.assertIsInstance(group.points, tables.Table)
         self.assertIsInstance(group.edges, tables.Table)
         self.assertIsInstance(group.faces, tables.Table)
         self.assertIsInstance(group.data, tables.Table)
-        self.assertIsInstance(group.item_data, tables.Table)
+        self.assertIsInstance(group.point_data, tables.Table)
+        self.assertIsInstance(group.edge_data, tables.Table)
+        self.assertIsInstance(group.face_data, tables.Table)
+        self.assertIsInstance(group.cell_data, tables.Table)
+        self.assertIsInstance(group.handles, tables.EArray)
+        self.assertIsInstance(group.edge_points, tables.EArray)
+        self.assertIsInstance(group.face_points, tables.EArray)
+        self.assertIsInstance(group.cell_points, tables.EArray)
 
     def test_mesh_layout_with_new_proxy(self):
         # when
@@ -161,13 +174,496 @@ class TestH5MeshStoredLayout(unittest.TestCase):
         H5Mesh(group, self.handle)
 
         # then
-        self.assertEqual(len(group._f_list_nodes()), 6)
+        self.assertEqual(len(group._f_list_nodes()), 13)
         self.assertIsInstance(group.cells, tables.Table)
         self.assertIsInstance(group.points, tables.Table)
         self.assertIsInstance(group.edges, tables.Table)
         self.assertIsInstance(group.faces, tables.Table)
         self.assertIsInstance(group.data, tables.Table)
-        self.assertIsInstance(group.item_data, tables.Table)
+        self.assertIsInstance(group.point_data, tables.Table)
+        self.assertIsInstance(group.edge_data, tables.Table)
+        self.assertIsInstance(group.face_data, tables.Table)
+        self.assertIsInstance(group.cell_data, tables.Table)
+        self.assertIsInstance(group.handles, tables.EArray)
+        self.assertIsInstance(group.edge_points, tables.EArray)
+        self.assertIsInstance(group.face_points, tables.EArray)
+        self.assertIsInstance(group.cell_points, tables.EArray)
+
+    def test_new_mesh_layout_with_expected_counts(self):
+        # given
+        default = self.handle.create_group(self.handle.root, 'default')
+        group = self.handle.create_group(self.handle.root, 'test')
+        H5Mesh(default, self.handle)
+
+        # when
+        H5Mesh(group, self.handle, expected_counts={
+            CUBA.POINT: 10 ** 7, CUBA.CELL: 10 ** 7})
+
+        # then
+        for name in ('points', 'point_data', 'handles', 'cells',
+                     'cell_data', 'cell_points'):
+            self.assertGreater(
+                group._f_get_child(name).chunkshape[0],
+                default._f_get_child(name).chunkshape[0])
+        for name in ('edges', 'edge_points'):
+            self.assertEqual(
+                group._f_get_child(name).chunkshape,
+                default._f_get_child(name).chunkshape)
+
+
+class TestH5MeshConnectivityStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.addCleanup(self.cleanup)
+        self.handle = tables.open_file(self.filename, mode='w')
+        group = self.handle.create_group(self.handle.root, 'test')
+        self.group = group
+        self.container = H5Mesh(group, self.handle)
+        self.uids = self.container.add(
+            [Point(coordinates=(i, 0, 0)) for i in range(30)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_polyhedron_cell(self):
+        # given
+        external = uuid.uuid4()
+        cell = Cell(points=self.uids + [external])
+
+        # when
+        uid, = self.container.add([cell])
+
+        # then
+        self.assertEqual(
+            self.container.get(uid).points, tuple(self.uids + [external]))
+
+    def test_connectivity_storage_scales_with_points(self):
+        # when
+        self.container.add([
+            Edge(points=self.uids[i:i + 2]) for i in range(10)])
+        self.container.add([
+            Face(points=self.uids[i:i + 3]) for i in range(5)])
+
+        # then
+        self.assertEqual(self.group.edge_points.nrows, 20)
+        self.assertEqual(self.group.face_points.nrows, 15)
+        self.assertEqual(self.group.cell_points.nrows, 0)
+
+    def test_point_handles_follow_the_points_table(self):
+        # when
+        edges = self.container.add([Edge(points=self.uids[3:5])])
+
+        # then
+        row = self.group.edges[0]
+        self.assertEqual(
+            self.group.edge_points[row['offset']:row['offset'] + 2].tolist(),
+            [3, 4])
+        self.assertEqual(
+            self.container.get(edges[0]).points, tuple(self.uids[3:5]))
+
+    def test_update_cell_with_more_and_fewer_points(self):
+        # given
+        uid, = self.container.add([Cell(points=self.uids[:4])])
+        cell = self.container.get(uid)
+
+        # when
+        cell.points = tuple(self.uids[:12])
+        self.container.update([cell])
+
+        # then
+        self.assertEqual(
+            self.container.get(uid).points, tuple(self.uids[:12]))
+
+        # when
+        cell.points = tuple(self.uids[20:22])
+        cell.data = DataContainer(TEMPERATURE=3.0)
+        self.container.update([cell])
+
+        # then
+        retrieved = self.container.get(uid)
+        self.assertEqual(retrieved.points, tuple(self.uids[20:22]))
+        self.assertEqual(retrieved.data, cell.data)
+        self.assertEqual(len(self.group.cell_data), 1)
+
+    def test_item_data_is_row_aligned(self):
+        # given
+        points = [
+            Point(
+                coordinates=(0, i, 0),
+                data=DataContainer(TEMPERATURE=float(i)))
+            for i in range(3)]
+        edges = [
+            Edge(points=self.uids[:2], data=DataContainer(VELOCITY=(i, 0, 0)))
+            for i in range(2)]
+
+        # when
+        self.container.add(points)
+        self.container.add(edges)
+
+        # then
+        self.assertEqual(len(self.group.point_data), self.group.points.nrows)
+        self.assertEqual(len(self.group.edge_data), self.group.edges.nrows)
+        self.assertEqual(len(self.group.face_data), 0)
+        point_data = self.container._item_data[CUBA.POINT]
+        for index, point in enumerate(points, start=30):
+            self.assertEqual(point_data[index], point.data)
+
+        # when
+        points[1].data = DataContainer(TEMPERATURE=-1.0)
+        self.container.update([points[1]])
+
+        # then
+        self.assertEqual(len(self.group.point_data), 33)
+        self.assertEqual(
+            point_data[31], DataContainer(TEMPERATURE=-1.0))
+        self.assertEqual(
+            self.container.get(points[2].uid).data, points[2].data)
+
+    def test_item_data_is_row_aligned_after_a_failed_add(self):
+        # given
+        invalid = Point(
+            coordinates=('a', 'b', 'c'),
+            data=DataContainer(VELOCITY=(1.0, 1.0, 1.0)))
+        valid = Point(coordinates=(1, 2, 3))
+
+        # when
+        with self.assertRaises(ValueError):
+            self.container.add([invalid])
+        uid, = self.container.add([valid])
+
+        # then
+        self.assertEqual(len(self.group.point_data), self.group.points.nrows)
+        self.assertEqual(self.container.get(uid).data, DataContainer())
+        self.assertFalse(self.container.has(invalid.uid))
+
+        # given
+        invalid = Edge(
+            points=self.uids[:2], data=DataContainer(VELOCITY='fast'))
+        valid = Edge(points=self.uids[:2])
+
+        # when
+        with self.assertRaises(ValueError):
+            self.container.add([invalid])
+        uid, = self.container.add([valid])
+
+        # then
+        self.assertEqual(len(self.group.edge_data), self.group.edges.nrows)
+        self.assertEqual(self.group.edge_points.nrows, 2)
+        self.assertEqual(self.container.get(uid).data, DataContainer())
+
+    def test_vacuum(self):
+        # given
+        cells = [Cell(points=self.uids[i:i + 4]) for i in range(5)]
+        self.container.add(cells)
+        cells[1].points = tuple(self.uids[:10])
+        cells[3].points = tuple(self.uids[10:12])
+        self.container.update([cells[1], cells[3]])
+
+        # when
+        self.container.vacuum()
+
+        # then
+        self.assertEqual(self.group.cell_points.nrows, 24)
+        for cell in cells:
+            self.assertEqual(
+                self.container.get(cell.uid).points, tuple(cell.points))
+        self.assertEqual(
+            [cell.uid for cell in self.container.iter(item_type=CUBA.CELL)],
+            [cell.uid for cell in cells])
+
+    def test_iterate_over_chunks(self):
+        # given
+        self.addCleanup(
+            setattr, h5_mesh, 'CHUNK_SIZE', h5_mesh.CHUNK_SIZE)
+        h5_mesh.CHUNK_SIZE = 4
+        cells = [
+            Cell(
+                points=self.uids[i:i + 1 + i % 9],
+                data=DataContainer(TEMPERATURE=float(i)))
+            for i in range(20)]
+        self.container.add(cells)
+        # move the points of one cell to the end of the array
+        cells[5].points = tuple(self.uids)
+        self.container.update([cells[5]])
+
+        # when
+        retrieved = list(self.container.iter(item_type=CUBA.CELL))
+        points = list(self.container.iter(item_type=CUBA.POINT))
+
+        # then
+        self.assertEqual(len(retrieved), 20)
+        for expected, cell in zip(cells, retrieved):
+            self.assertEqual(cell.uid, expected.uid)
+            self.assertEqual(cell.points, tuple(expected.points))
+            self.assertEqual(cell.data, expected.data)
+        self.assertEqual([point.uid for point in points], self.uids)
+
+    def test_iter_chunks(self):
+        # given
+        cells = self.container.add([
+            Cell(points=self.uids[i:i + 3]) for i in range(5)])
+
+        # when
+        point_chunks = list(self.container.iter_chunks(CUBA.POINT, 8))
+        cell_chunks = list(self.container.iter_chunks(CUBA.CELL, 2))
+
+        # then
+        self.assertEqual(
+            [len(chunk) for chunk in point_chunks], [8, 8, 8, 6])
+        self.assertEqual(
+            [point.uid for chunk in point_chunks for point in chunk],
+            self.uids)
+        self.assertEqual([len(chunk) for chunk in cell_chunks], [2, 2, 1])
+        retrieved = [cell for chunk in cell_chunks for cell in chunk]
+        self.assertEqual([cell.uid for cell in retrieved], cells)
+        self.assertEqual(retrieved[4].points, tuple(self.uids[4:7]))
+        self.assertEqual(list(self.container.iter_chunks(CUBA.EDGE)), [])
+        with self.assertRaises(ValueError):
+            self.container.iter_chunks(CUBA.PARTICLE)
+
+    def test_iter_chunks_of_row_range(self):
+        # given
+        cells = self.container.add([
+            Cell(points=self.uids[i:i + 3]) for i in range(5)])
+
+        # when
+        point_chunks = list(self.container.iter_chunks(CUBA.POINT, 8, 5, 20))
+        cell_chunks = list(self.container.iter_chunks(CUBA.CELL, 2, 3))
+
+        # then
+        self.assertEqual(self.container.row_count(CUBA.POINT), 30)
+        self.assertEqual(self.container.row_count(CUBA.CELL), 5)
+        self.assertEqual(self.container.row_count(CUBA.EDGE), 0)
+        self.assertEqual([len(chunk) for chunk in point_chunks], [8, 7])
+        self.assertEqual(
+            [point.uid for chunk in point_chunks for point in chunk],
+            self.uids[5:20])
+        retrieved = [cell for chunk in cell_chunks for cell in chunk]
+        self.assertEqual([cell.uid for cell in retrieved], cells[3:])
+        self.assertEqual(retrieved[1].points, tuple(self.uids[4:7]))
+        with self.assertRaises(ValueError):
+            self.container.row_count(CUBA.PARTICLE)
+
+    def test_summary(self):
+        # given
+        cells = self.container.add([
+            Cell(
+                points=self.uids[i:i + 3],
+                data=DataContainer(TEMPERATURE=float(i)))
+            for i in range(5)])
+
+        # when
+        summary = self.container.summary()
+
+        # then
+        points = summary[CUBA.POINT]
+        self.assertEqual(points.count, 30)
+        self.assertEqual(points.bounds, ([0, 0, 0], [29, 0, 0]))
+        self.assertEqual(points.keys, set())
+        self.assertEqual(summary[CUBA.EDGE].count, 0)
+        self.assertEqual(
+            summary[CUBA.CELL].fields[CUBA.TEMPERATURE], (0, 4, 10))
+
+        # when
+        cell = self.container.get(cells[4])
+        cell.data = DataContainer(TEMPERATURE=-1.0)
+        self.container.update([cell])
+        summary = self.container.summary()[CUBA.CELL]
+
+        # then
+        self.assertFalse(summary.exact)
+        self.assertEqual(summary.fields[CUBA.TEMPERATURE], (-1, 4, None))
+
+        # when
+        summary = self.container.summary(refresh=True)[CUBA.CELL]
+
+        # then
+        self.assertTrue(summary.exact)
+        self.assertEqual(summary.fields[CUBA.TEMPERATURE], (-1, 3, 5))
+
+    def test_prefetch(self):
+        # when
+        chunks = list(self.container.prefetch(CUBA.POINT, chunk_size=8))
+
+        # then
+        self.assertEqual([len(chunk) for chunk in chunks], [8, 8, 8, 6])
+        self.assertEqual(
+            [point.uid for chunk in chunks for point in chunk], self.uids)
+        with self.assertRaises(ValueError):
+            self.container.prefetch(CUBA.PARTICLE)
+
+
+class TestH5MeshBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.addCleanup(self.cleanup)
+        self.handle = tables.open_file(self.filename, mode='w')
+        group = self.handle.create_group(self.handle.root, 'test')
+        self.group = group
+        self.container = H5Mesh(group, self.handle)
+        self.uids = self.container.add(
+            [Point(coordinates=(i, 0, 0)) for i in range(10)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_modifications_are_written_on_exit(self):
+        # given
+        edge_uid, = self.container.add([Edge(points=self.uids[:2])])
+        points = list(self.container.iter(self.uids[::-1]))
+        edge = self.container.get(edge_uid)
+
+        # when
+        with self.container.batch():
+            for point in points:
+                point.coordinates = (0, point.coordinates[0], 0)
+                point.data[CUBA.MASS] = point.coordinates[1]
+                self.container.update([point])
+            edge.points = self.uids[:5]
+            self.container.update([edge])
+            face = Face(points=self.uids[:3])
+            self.container.add([face])
+            self.container.data = DataContainer(NAME='batched')
+
+            # then
+            self.assertEqual(self.group.faces.nrows, 0)
+            self.assertEqual(self.group.points[3]['coordinates'][0], 3)
+
+        # then
+        for i, uid in enumerate(self.uids):
+            point = self.container.get(uid)
+            self.assertEqual(point.coordinates, (0, i, 0))
+            self.assertEqual(point.data[CUBA.MASS], i)
+        self.assertEqual(
+            self.container.get(edge_uid).points, tuple(self.uids[:5]))
+        self.assertEqual(
+            self.container.get(face.uid).points, tuple(self.uids[:3]))
+        self.assertEqual(self.container.data[CUBA.NAME], 'batched')
+
+    def test_add_followed_by_update(self):
+        # when
+        with self.container.batch():
+            point = Point(coordinates=(1, 1, 1))
+            uid, = self.container.add([point])
+            point.coordinates = (2, 2, 2)
+            self.container.update([point])
+
+            # then
+            self.assertEqual(len(self.container._batch), 1)
+
+        # then
+        self.assertEqual(self.container.get(uid).coordinates, (2, 2, 2))
+        self.assertEqual(self.container.count_of(CUBA.POINT), 11)
+
+    def test_errors_are_raised_on_exit(self):
+        # when/then
+        with self.assertRaises(ValueError):
+            with self.container.batch():
+                self.container.update([Cell(points=[], uid=uuid.uuid4())])
+
+        with self.assertRaises(ValueError):
+            with self.container.batch():
+                self.container.add([Point((0, 0, 0), uid=self.uids[0])])
+
+    def test_bulk_update_with_duplicate_uids_is_rejected(self):
+        # when/then
+        with self.assertRaises(ValueError):
+            self.container.add([
+                Point((0, 0, 0), uid=self.uids[0]),
+                Point((0, 0, 0), uid=self.uids[0])])
+
+
+class TestH5MeshCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.addCleanup(self.cleanup)
+        self.handle = tables.open_file(self.filename, mode='w')
+        group = self.handle.create_group(self.handle.root, 'test')
+        self.group = group
+        self.container = H5Mesh(group, self.handle, cache_size=3)
+        self.uids = self.container.add(
+            [Point(coordinates=(i, 0, 0)) for i in range(10)])
+        self.cells = self.container.add([Cell(points=self.uids[:4])])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_gets_hit_the_cache(self):
+        # when
+        for _ in range(3):
+            self.container.get(self.uids[0])
+            cell = self.container.get(self.cells[0])
+
+        # then
+        self.assertEqual(cell.points, tuple(self.uids[:4]))
+        info = self.container.cache_info(CUBA.POINT)
+        self.assertEqual(info, (2, 1, 3, 1))
+        info = self.container.cache_info(CUBA.CELL)
+        self.assertEqual(info, (2, 1, 3, 1))
+        info = self.container.cache_info()
+        self.assertEqual(info, (4, 2, 12, 2))
+        with self.assertRaises(ValueError):
+            self.container.cache_info(CUBA.NODE)
+
+    def test_returned_items_are_copies(self):
+        # given
+        cell = self.container.get(self.cells[0])
+
+        # when
+        cell.points = self.uids[:2]
+        cell.data[CUBA.MASS] = 1.0
+
+        # then
+        cell = self.container.get(self.cells[0])
+        self.assertEqual(cell.points, tuple(self.uids[:4]))
+        self.assertNotIn(CUBA.MASS, cell.data)
+
+    def test_update_invalidates_the_cache(self):
+        # given
+        point = self.container.get(self.uids[0])
+        cell = self.container.get(self.cells[0])
+
+        # when
+        point.coordinates = (1, 1, 1)
+        self.container.update([point])
+        cell.points = self.uids[4:]
+        self.container.update([cell])
+
+        # then
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (1, 1, 1))
+        self.assertEqual(
+            self.container.get(self.cells[0]).points, tuple(self.uids[4:]))
+
+    def test_cache_size_is_bounded(self):
+        # when
+        for uid in self.uids:
+            self.container.get(uid)
+
+        # then
+        self.assertEqual(self.container.cache_info(CUBA.POINT).currsize, 3)
+
+    def test_cache_clear(self):
+        # given
+        self.container.get(self.uids[0])
+
+        # when
+        self.container.cache_clear()
+
+        # then
+        self.assertEqual(self.container.cache_info(), (0, 0, 12, 0))
 
 
 class TestH5MeshVersions(unittest.TestCase):
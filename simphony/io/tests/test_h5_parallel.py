@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import closing
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import Lattice, Mesh, Particles
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.mesh_items import Cell, Point
+from simphony.cuds.particles_items import Bond, Particle
+from simphony.io.h5_cuds import H5CUDS
+from simphony.io.h5_parallel import H5ParallelReader
+
+
+class TestH5ParallelReader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'test.cuds')
+        particles = Particles(name='particles')
+        particles.data = DataContainer(NAME='particles')
+        self.uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(100)])
+        self.bonds = particles.add([
+            Bond(particles=self.uids[i:i + 2]) for i in range(0, 100, 2)])
+        mesh = Mesh(name='mesh')
+        self.points = mesh.add([
+            Point(coordinates=(i, 0, 0)) for i in range(40)])
+        self.cells = mesh.add([
+            Cell(points=self.points[i:i + 4]) for i in range(10)])
+        lattice = make_cubic_lattice('lattice', 1.0, (4, 5, 6))
+        node = lattice.get((3, 4, 5))
+        node.data[CUBA.DENSITY] = 2.0
+        lattice.update([node])
+        with closing(H5CUDS.open(self.filename, 'w')) as handle:
+            handle.add_dataset(particles)
+            handle.add_dataset(mesh)
+            handle.add_dataset(lattice)
+            dataset = handle.get_dataset('particles')
+            dataset.remove(self.uids[10:20])
+        self.reader = H5ParallelReader(self.filename, 2, chunk_size=8)
+        self.addCleanup(self.reader.close)
+
+    def test_iter_chunks(self):
+        # when
+        chunks = list(self.reader.iter_chunks('particles', CUBA.PARTICLE))
+
+        # then
+        self.assertEqual(self.reader.processes, 2)
+        self.assertTrue(all(len(chunk) <= 8 for chunk in chunks))
+        particles = [item for chunk in chunks for item in chunk]
+        self.assertEqual(
+            [item.uid for item in particles],
+            self.uids[:10] + self.uids[20:])
+        self.assertEqual(particles[-1].data[CUBA.MASS], 99)
+        with self.assertRaises(ValueError):
+            self.reader.iter_chunks('particles', CUBA.POINT)
+        with self.assertRaises(ValueError):
+            self.reader.iter_chunks('foo', CUBA.PARTICLE)
+
+    def test_load_dataset(self):
+        # when
+        particles = self.reader.load_dataset('particles')
+
+        # then
+        self.assertIsInstance(particles, Particles)
+        self.assertEqual(len(particles.changes), 0)
+        self.assertEqual(particles.data[CUBA.NAME], 'particles')
+        self.assertEqual(particles.count_of(CUBA.PARTICLE), 90)
+        self.assertEqual(
+            [item.uid for item in particles.iter(item_type=CUBA.BOND)],
+            self.bonds)
+        self.assertEqual(
+            particles.get(self.bonds[-1]).particles, tuple(self.uids[98:]))
+
+    def test_load_datasets(self):
+        # when
+        mesh, lattice = self.reader.load_datasets(['mesh', 'lattice'])
+
+        # then
+        self.assertIsInstance(mesh, Mesh)
+        self.assertEqual(
+            [item.uid for item in mesh.iter(item_type=CUBA.POINT)],
+            self.points)
+        self.assertEqual(
+            [item.uid for item in mesh.iter(item_type=CUBA.CELL)],
+            self.cells)
+        self.assertEqual(
+            list(mesh.get(self.cells[9]).points), self.points[9:13])
+        self.assertIsInstance(lattice, Lattice)
+        self.assertEqual(lattice.size, (4, 5, 6))
+        self.assertEqual(lattice.get((3, 4, 5)).data[CUBA.DENSITY], 2.0)
+        self.assertEqual(
+            [container.name for container in self.reader.load_datasets()],
+            ['particles', 'mesh', 'lattice'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,14 @@ import os
 import tempfile
 import shutil
 import unittest
+import uuid
 
 import tables
 
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
 from simphony.cuds.particles import Particles
+from simphony.cuds.particles_items import Bond, Particle
 from simphony.io.h5_cuds import H5CUDS
 from simphony.io.h5_particles import H5Particles
 from simphony.io.data_container_description import SUPPORTED_CUBA
@@ -134,5 +138,641 @@ class TestH5ParticlesVersions(unittest.TestCase):
                 H5Particles(handle.get_node("/" + group_name))
 
 
+class TestH5ParticlesBondStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.cleanup)
+        self.handle.add_dataset(Particles(name='foo'))
+        self.container = self.handle.get_dataset('foo')
+        self.uids = self.container.add(
+            [Particle(coordinates=(i, 0, 0)) for i in range(30)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_layout_with_expected_counts(self):
+        # given
+        group = self.handle._handle.create_group('/', 'test')
+
+        # when
+        H5Particles(group, expected_counts={
+            CUBA.PARTICLE: 10 ** 7, CUBA.BOND: 10 ** 7})
+
+        # then
+        default = self.container._group
+        for name in ('particles/items', 'particles/data', 'handles',
+                     'bonds/items', 'bonds/members'):
+            self.assertGreater(
+                group._f_get_child(name).chunkshape[0],
+                default._f_get_child(name).chunkshape[0])
+
+    def test_bond_with_many_particles(self):
+        # given
+        external = uuid.uuid4()
+        bond = Bond(particles=self.uids + [external])
+
+        # when
+        uid, = self.container.add([bond])
+
+        # then
+        self.assertEqual(
+            self.container.get(uid).particles, tuple(self.uids + [external]))
+
+    def test_members_storage_scales_with_members(self):
+        # when
+        self.container.add([
+            Bond(particles=self.uids[i:i + 2]) for i in range(10)])
+
+        # then
+        self.assertEqual(self.container._bonds._members.nrows, 20)
+
+    def test_update_bond_with_more_particles(self):
+        # given
+        uid, = self.container.add([Bond(particles=self.uids[:2])])
+        bond = self.container.get(uid)
+
+        # when
+        bond.particles = tuple(self.uids[:5])
+        self.container.update([bond])
+        bond.particles = tuple(self.uids[3:4])
+        self.container.update([bond])
+
+        # then
+        self.assertEqual(
+            self.container.get(uid).particles, tuple(self.uids[3:4]))
+
+    def test_iter_bonds_of(self):
+        # given
+        uids = self.container.add([
+            Bond(particles=self.uids[:2]),
+            Bond(particles=self.uids[1:3]),
+            Bond(particles=self.uids[5:7])])
+
+        # when
+        bonds = list(self.container.iter_bonds_of(self.uids[1]))
+
+        # then
+        self.assertEqual(
+            sorted(bond.uid for bond in bonds), sorted(uids[:2]))
+        self.assertEqual(list(self.container.iter_bonds_of(self.uids[9])), [])
+        self.assertEqual(list(self.container.iter_bonds_of(uuid.uuid4())), [])
+
+    def test_iter_bonds_of_after_modification(self):
+        # given
+        uids = self.container.add([
+            Bond(particles=self.uids[:2]),
+            Bond(particles=self.uids[1:3])])
+        list(self.container.iter_bonds_of(self.uids[1]))
+
+        # when
+        self.container.remove([uids[0]])
+        new_uid, = self.container.add([Bond(particles=self.uids[1:2])])
+
+        # then
+        bonds = list(self.container.iter_bonds_of(self.uids[1]))
+        self.assertEqual(
+            sorted(bond.uid for bond in bonds), sorted([uids[1], new_uid]))
+
+    def test_handles_are_shared_between_proxies(self):
+        # given
+        other = self.handle.get_dataset('foo')
+        uid, = self.container.add([Bond(particles=self.uids[:3])])
+
+        # when
+        bond = other.get(uid)
+        new_uid, = other.add([Bond(particles=self.uids[3:4])])
+
+        # then
+        self.assertEqual(bond.particles, tuple(self.uids[:3]))
+        self.assertEqual(
+            self.container.get(new_uid).particles, tuple(self.uids[3:4]))
+
+
+class TestH5ParticlesVacuum(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.cleanup)
+        self.handle.add_dataset(Particles(name='foo'))
+        self.container = self.handle.get_dataset('foo')
+        self.uids = self.container.add(
+            [Particle(coordinates=(i, 0, 0)) for i in range(10)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_removed_particle_rows_are_reused(self):
+        # given
+        group = self.container._group
+
+        # when
+        self.container.remove(self.uids[:3])
+        uids = self.container.add(
+            [Particle(coordinates=(0, i, 0)) for i in range(2)])
+
+        # then
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 9)
+        self.assertEqual(group.particles.items.nrows, 10)
+        self.assertEqual(group.particles.data.nrows, 10)
+        self.assertEqual(self.container.get(uids[1]).coordinates, (0, 1, 0))
+        self.assertItemsEqual(
+            [particle.uid for particle in self.container.iter(
+                item_type=CUBA.PARTICLE)],
+            self.uids[3:] + uids)
+
+    def test_iter_bonds_of_skips_removed_bonds(self):
+        # given
+        uids = self.container.add([
+            Bond(particles=self.uids[:2]),
+            Bond(particles=self.uids[1:3])])
+
+        # when
+        self.container.remove([uids[1]])
+
+        # then
+        bonds = list(self.container.iter_bonds_of(self.uids[1]))
+        self.assertEqual([bond.uid for bond in bonds], uids[:1])
+
+    def test_vacuum(self):
+        # given
+        group = self.container._group
+        bonds = self.container.add([
+            Bond(particles=self.uids[i:i + 3]) for i in range(5)])
+        bond = self.container.get(bonds[4])
+        bond.particles = tuple(self.uids)
+        self.container.update([bond])
+        self.container.remove(self.uids[::2])
+        self.container.remove(bonds[:2])
+
+        # when
+        self.container.vacuum()
+
+        # then
+        self.assertEqual(group.particles.items.nrows, 5)
+        self.assertEqual(group.particles.data.nrows, 5)
+        self.assertEqual(group.bonds.items.nrows, 3)
+        self.assertEqual(group.bonds.data.nrows, 3)
+        self.assertEqual(group.bonds.members.nrows, 16)
+        self.assertItemsEqual(
+            [particle.uid for particle in self.container.iter(
+                item_type=CUBA.PARTICLE)],
+            self.uids[1::2])
+        self.assertEqual(
+            self.container.get(bonds[2]).particles, tuple(self.uids[2:5]))
+        self.assertEqual(
+            self.container.get(bonds[4]).particles, tuple(self.uids))
+        self.assertEqual(
+            [item.uid for item in self.container.iter_bonds_of(self.uids[3])],
+            bonds[2:])
+
+        # when
+        uid, = self.container.add([Bond(particles=self.uids[:1])])
+
+        # then
+        self.assertEqual(group.bonds.items.nrows, 4)
+        self.assertEqual(
+            self.container.get(uid).particles, tuple(self.uids[:1]))
+
+
+class TestH5ParticlesBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.cleanup)
+        self.handle.add_dataset(Particles(name='foo'))
+        self.container = self.handle.get_dataset('foo')
+        self.uids = self.container.add(
+            [Particle(coordinates=(i, 0, 0)) for i in range(10)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_modifications_are_written_on_exit(self):
+        # given
+        group = self.container._group
+        particle = self.container.get(self.uids[0])
+
+        # when
+        with self.container.batch():
+            particle.coordinates = (1, 1, 1)
+            self.container.update([particle])
+            new = Particle(coordinates=(2, 2, 2))
+            uids = self.container.add([new])
+            bond = Bond(particles=self.uids[1:3])
+            self.container.add([bond])
+            self.container.remove(self.uids[5:7])
+            self.container.data = DataContainer(NAME='batched')
+
+            # then
+            self.assertIsNotNone(new.uid)
+            self.assertIsNotNone(bond.uid)
+            self.assertEqual(group.particles.items.nrows, 10)
+            self.assertEqual(group.bonds.items.nrows, 0)
+            self.assertEqual(self.container.data[CUBA.NAME], 'batched')
+
+        # then
+        self.assertEqual(uids, [new.uid])
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 9)
+        self.assertEqual(self.container.count_of(CUBA.BOND), 1)
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (1, 1, 1))
+        self.assertEqual(self.container.get(new.uid).coordinates, (2, 2, 2))
+        self.assertEqual(
+            self.container.get(bond.uid).particles, tuple(self.uids[1:3]))
+        self.assertFalse(self.container.has(self.uids[5]))
+        self.assertEqual(self.container.data[CUBA.NAME], 'batched')
+        # the removed rows are reused by the added particle
+        self.assertEqual(group.particles.items.nrows, 10)
+
+    def test_repeated_updates_are_coalesced(self):
+        # given
+        particle = self.container.get(self.uids[0])
+
+        # when
+        with self.container.batch():
+            for i in range(5):
+                particle.coordinates = (i, i, i)
+                particle.data[CUBA.VELOCITY] = (i, 0, 0)
+                self.container.update([particle])
+
+            # then
+            self.assertEqual(len(self.container._batch), 1)
+
+        # then
+        particle = self.container.get(self.uids[0])
+        self.assertEqual(particle.coordinates, (4, 4, 4))
+        self.assertEqual(tuple(particle.data[CUBA.VELOCITY]), (4, 0, 0))
+
+    def test_items_are_copied_when_buffered(self):
+        # given
+        particle = self.container.get(self.uids[0])
+
+        # when
+        with self.container.batch():
+            particle.coordinates = (1, 1, 1)
+            self.container.update([particle])
+            particle.coordinates = (2, 2, 2)
+
+        # then
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (1, 1, 1))
+
+    def test_add_and_remove_in_a_batch(self):
+        # when
+        with self.container.batch():
+            uids = self.container.add([Particle(coordinates=(0, 0, 0))])
+            self.container.remove(uids)
+
+        # then
+        self.assertFalse(self.container.has(uids[0]))
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 10)
+
+    def test_reads_write_the_pending_modifications(self):
+        # given
+        particle = self.container.get(self.uids[0])
+
+        # when
+        with self.container.batch():
+            particle.coordinates = (1, 1, 1)
+            self.container.update([particle])
+            retrieved = self.container.get(self.uids[0])
+            self.container.remove([self.uids[1]])
+            count = self.container.count_of(CUBA.PARTICLE)
+
+        # then
+        self.assertEqual(retrieved.coordinates, (1, 1, 1))
+        self.assertEqual(count, 9)
+
+    def test_errors_are_raised_on_exit(self):
+        # when/then
+        with self.assertRaises(ValueError):
+            with self.container.batch():
+                self.container.update([Particle(uid=uuid.uuid4())])
+
+        with self.assertRaises(KeyError):
+            with self.container.batch():
+                self.container.remove([uuid.uuid4()])
+
+        with self.assertRaises(ValueError):
+            with self.container.batch():
+                self.container.add([Particle(uid=self.uids[0])])
+
+        # then
+        self.assertIsNone(self.container._batch)
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 10)
+
+    def test_modifications_are_discarded_on_error(self):
+        # when
+        with self.assertRaises(RuntimeError):
+            with self.container.batch():
+                self.container.remove(self.uids)
+                raise RuntimeError()
+
+        # then
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 10)
+
+    def test_nested_batches(self):
+        # when
+        with self.container.batch():
+            with self.container.batch():
+                self.container.remove(self.uids[:1])
+            self.container.remove(self.uids[1:2])
+            self.assertEqual(len(self.container._batch), 2)
+
+        # then
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), 8)
+
+    def test_bond_index_is_invalidated(self):
+        # given
+        uids = self.container.add([Bond(particles=self.uids[:2])])
+        bonds = list(self.container.iter_bonds_of(self.uids[0]))
+        self.assertEqual(len(bonds), 1)
+
+        # when
+        with self.container.batch():
+            self.container.add([Bond(particles=self.uids[:1])])
+            self.container.remove(uids)
+
+        # then
+        bonds = list(self.container.iter_bonds_of(self.uids[0]))
+        self.assertEqual(len(bonds), 1)
+        self.assertEqual(bonds[0].particles, tuple(self.uids[:1]))
+
+
+class TestH5ParticlesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.cleanup)
+        self.handle.add_dataset(Particles(name='foo'))
+        self.container = self.handle.get_dataset('foo', cache_size=4)
+        self.uids = self.container.add(
+            [Particle(coordinates=(i, 0, 0)) for i in range(10)])
+        self.bonds = self.container.add([Bond(particles=self.uids[:2])])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_gets_hit_the_cache(self):
+        # when
+        for _ in range(3):
+            particle = self.container.get(self.uids[0])
+        self.container.get(self.bonds[0])
+
+        # then
+        self.assertEqual(particle.coordinates, (0, 0, 0))
+        info = self.container.cache_info(CUBA.PARTICLE)
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 1, 1))
+        info = self.container.cache_info(CUBA.BOND)
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 1, 1))
+        info = self.container.cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize), (2, 2, 8))
+        with self.assertRaises(ValueError):
+            self.container.cache_info(CUBA.NODE)
+
+    def test_returned_items_are_copies(self):
+        # given
+        particle = self.container.get(self.uids[0])
+
+        # when
+        particle.coordinates = (1, 1, 1)
+        particle.data[CUBA.MASS] = 1.0
+
+        # then
+        particle = self.container.get(self.uids[0])
+        self.assertEqual(particle.coordinates, (0, 0, 0))
+        self.assertNotIn(CUBA.MASS, particle.data)
+
+    def test_cache_size_is_bounded(self):
+        # when
+        for uid in self.uids:
+            self.container.get(uid)
+
+        # then
+        self.assertEqual(self.container.cache_info(CUBA.PARTICLE).currsize, 4)
+
+    def test_update_and_remove_invalidate_the_cache(self):
+        # given
+        particle = self.container.get(self.uids[0])
+        bond = self.container.get(self.bonds[0])
+        self.container.get(self.uids[1])
+
+        # when
+        particle.coordinates = (1, 1, 1)
+        self.container.update([particle])
+        bond.particles = tuple(self.uids[2:5])
+        self.container.update([bond])
+        self.container.remove([self.uids[1]])
+
+        # then
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (1, 1, 1))
+        self.assertEqual(
+            self.container.get(self.bonds[0]).particles,
+            tuple(self.uids[2:5]))
+        with self.assertRaises(KeyError):
+            self.container.get(self.uids[1])
+
+    def test_batch_invalidates_the_cache(self):
+        # given
+        particle = self.container.get(self.uids[0])
+
+        # when
+        with self.container.batch():
+            particle.coordinates = (1, 1, 1)
+            self.container.update([particle])
+            self.container.remove([self.uids[1]])
+
+        # then
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (1, 1, 1))
+        self.assertFalse(self.container.has(self.uids[1]))
+
+    def test_cache_is_shared_between_proxies(self):
+        # given
+        other = self.handle.get_dataset('foo')
+        particle = self.container.get(self.uids[0])
+
+        # when
+        particle.coordinates = (2, 2, 2)
+        other.update([particle])
+
+        # then
+        self.assertEqual(
+            self.container.get(self.uids[0]).coordinates, (2, 2, 2))
+        self.assertEqual(other.cache_info(CUBA.PARTICLE).maxsize, 4)
+
+    def test_cache_clear(self):
+        # given
+        self.container.get(self.uids[0])
+
+        # when
+        self.container.cache_clear()
+
+        # then
+        info = self.container.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+
+    def test_disabled_cache(self):
+        # given
+        container = self.handle.get_dataset('foo', cache_size=0)
+
+        # when
+        container.get(self.uids[0])
+
+        # then
+        self.assertEqual(container.cache_info().currsize, 0)
+
+
+class TestH5ParticlesChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test_file.cuds')
+        self.handle = H5CUDS.open(self.filename)
+        self.addCleanup(self.cleanup)
+        self.handle.add_dataset(Particles(name='foo'))
+        self.container = self.handle.get_dataset('foo')
+        self.uids = self.container.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(10)])
+        self.bonds = self.container.add([
+            Bond(particles=self.uids[i:i + 2]) for i in range(5)])
+
+    def cleanup(self):
+        if os.path.exists(self.filename):
+            self.handle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_chunks(self):
+        # given
+        self.container.remove(self.uids[2:5])
+
+        # when
+        chunks = list(self.container.iter_chunks(CUBA.PARTICLE, 4))
+
+        # then
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 3, 2])
+        particles = [particle for chunk in chunks for particle in chunk]
+        self.assertEqual(
+            [particle.uid for particle in particles],
+            self.uids[:2] + self.uids[5:])
+        for particle in particles:
+            self.assertEqual(
+                particle.data[CUBA.MASS], particle.coordinates[0])
+
+    def test_iter_chunks_of_row_range(self):
+        # given
+        self.container.remove(self.uids[2:5])
+        count = len(self.uids)
+
+        # when
+        chunks = list(self.container.iter_chunks(CUBA.PARTICLE, 2, 1, 7))
+
+        # then
+        self.assertEqual(self.container.row_count(CUBA.PARTICLE), count)
+        self.assertEqual(self.container.count_of(CUBA.PARTICLE), count - 3)
+        self.assertEqual(
+            [particle.uid for chunk in chunks for particle in chunk],
+            self.uids[1:2] + self.uids[5:7])
+        self.assertEqual(
+            list(self.container.iter_chunks(CUBA.BOND, start=count)), [])
+        with self.assertRaises(ValueError):
+            self.container.row_count(CUBA.POINT)
+
+    def test_summary(self):
+        # when
+        summary = self.container.summary()
+
+        # then
+        particles = summary[CUBA.PARTICLE]
+        self.assertEqual(particles.count, 10)
+        self.assertTrue(particles.exact)
+        self.assertEqual(particles.bounds, ([0, 0, 0], [9, 0, 0]))
+        self.assertEqual(particles.keys, {CUBA.MASS})
+        self.assertEqual(particles.fields[CUBA.MASS], (0, 9, 45))
+        self.assertEqual(summary[CUBA.BOND].count, 5)
+        self.assertEqual(summary[CUBA.BOND].keys, set())
+
+        # when
+        self.container.remove(self.uids[7:])
+        particles = self.container.summary()[CUBA.PARTICLE]
+
+        # then
+        self.assertEqual(particles.count, 7)
+        self.assertFalse(particles.exact)
+        self.assertEqual(particles.bounds, ([0, 0, 0], [9, 0, 0]))
+        self.assertIsNone(particles.fields[CUBA.MASS].sum)
+
+        # when
+        particles = self.container.summary(refresh=True)[CUBA.PARTICLE]
+
+        # then
+        self.assertTrue(particles.exact)
+        self.assertEqual(particles.bounds, ([0, 0, 0], [6, 0, 0]))
+        self.assertEqual(particles.fields[CUBA.MASS], (0, 6, 21))
+
+    def test_summary_of_batch(self):
+        # when
+        with self.container.batch():
+            self.container.add([
+                Particle(coordinates=(-1, 2, 0), data=DataContainer(MASS=5))])
+
+        # then
+        particles = self.container.summary()[CUBA.PARTICLE]
+        self.assertEqual(particles.count, 11)
+        self.assertTrue(particles.exact)
+        self.assertEqual(particles.bounds, ([-1, 0, 0], [9, 2, 0]))
+        self.assertEqual(particles.fields[CUBA.MASS], (0, 9, 50))
+
+    def test_prefetch(self):
+        # when
+        chunks = self.container.prefetch(CUBA.PARTICLE, chunk_size=3)
+
+        # then
+        self.assertEqual(
+            [particle.uid for particle in chunks.items()], self.uids)
+        bonds = self.container.prefetch(CUBA.BOND, depth=1, max_bytes=1)
+        self.assertEqual([bond.uid for bond in bonds.items()], self.bonds)
+
+    def test_iter_bond_chunks(self):
+        # given
+        bond = self.container.get(self.bonds[1])
+        bond.particles = tuple(self.uids[:5])
+        self.container.update([bond])
+
+        # when
+        chunks = list(self.container.iter_chunks(CUBA.BOND, 2))
+
+        # then
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        bonds = [item for chunk in chunks for item in chunk]
+        self.assertEqual([item.uid for item in bonds], self.bonds)
+        self.assertEqual(bonds[0].particles, tuple(self.uids[:2]))
+        self.assertEqual(bonds[1].particles, tuple(self.uids[:5]))
+        self.assertEqual(bonds[4].particles, tuple(self.uids[4:6]))
+
+    def test_iter_chunks_with_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            self.container.iter_chunks(CUBA.POINT)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import tables
+
+from simphony.core import CUBA
+from simphony.io.h5_precision import FloatPrecision
+
+
+class TestFloatPrecision(unittest.TestCase):
+
+    def test_default_precision(self):
+        precision = FloatPrecision()
+        self.assertTrue(precision.lossless)
+        self.assertIsNone(precision.quantum)
+        values = [0.1, 0.2, 0.3]
+        self.assertIs(precision.encode(values), values)
+        self.assertEqual(precision.encode_data(CUBA.MASS, 0.1), 0.1)
+
+    def test_quantisation(self):
+        # given
+        precision = FloatPrecision('float32', absolute_error=1e-3)
+        values = numpy.random.uniform(-100, 100, size=1000)
+
+        # when
+        encoded = precision.encode(values)
+
+        # then
+        self.assertFalse(precision.lossless)
+        self.assertEqual(precision.quantum, 2.0 ** -9)
+        self.assertLessEqual(abs(encoded - values).max(), 1e-3)
+        self.assertTrue(numpy.all(encoded / precision.quantum % 1 == 0))
+        self.assertEqual(precision.encode_data(CUBA.NAME, 'foo'), 'foo')
+        self.assertEqual(
+            precision.encode_data(CUBA.MASS, 0.1003), 0.099609375)
+
+    def test_decode(self):
+        precision = FloatPrecision('float32')
+        decoded = precision.decode(numpy.ones(3, dtype=numpy.float32))
+        self.assertEqual(decoded.dtype, numpy.float64)
+
+    def test_save_and_load(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        filename = os.path.join(temp_dir, 'test.h5')
+        with tables.open_file(filename, 'w') as handle:
+            group = handle.create_group('/', 'test')
+            self.assertEqual(
+                FloatPrecision.load(group._v_attrs), FloatPrecision())
+            precision = FloatPrecision('float32', 0.5)
+            precision.save(group._v_attrs)
+            self.assertEqual(FloatPrecision.load(group._v_attrs), precision)
+            FloatPrecision().save(group._v_attrs)
+            self.assertEqual(
+                FloatPrecision.load(group._v_attrs), FloatPrecision())
+
+    def test_invalid_precision(self):
+        with self.assertRaises(ValueError):
+            FloatPrecision('float16')
+        with self.assertRaises(ValueError):
+            FloatPrecision(absolute_error=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
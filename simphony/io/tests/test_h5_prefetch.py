@@ -0,0 +1,71 @@
+import unittest
+
+from simphony.io.h5_prefetch import Prefetcher, prefetch_chunks
+
+
+class TestPrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.read = []
+
+    def chunks(self, count, fail=False):
+        for index in range(count):
+            self.read.append(index)
+            yield [index] * (index + 1)
+        if fail:
+            raise RuntimeError('read error')
+
+    def test_iteration_order(self):
+        prefetcher = Prefetcher(self.chunks(5))
+        self.assertEqual(
+            list(prefetcher), [[index] * (index + 1) for index in range(5)])
+        self.assertEqual(
+            list(Prefetcher(self.chunks(3)).items()), [0, 1, 1, 2, 2, 2])
+
+    def test_depth_bound(self):
+        # when
+        prefetcher = Prefetcher(self.chunks(10), depth=3)
+        prefetcher._thread.join(0.2)
+
+        # then
+        self.assertTrue(prefetcher._thread.is_alive())
+        self.assertEqual(len(prefetcher._queue), 3)
+        self.assertEqual(next(prefetcher), [0])
+        prefetcher.close()
+        self.assertFalse(prefetcher._thread.is_alive())
+        self.assertLess(len(self.read), 10)
+
+    def test_max_bytes_bound(self):
+        # when
+        prefetcher = Prefetcher(
+            self.chunks(10), depth=10, max_bytes=4, nbytes=len)
+        prefetcher._thread.join(0.2)
+
+        # then
+        self.assertEqual(
+            [chunk for chunk, size in prefetcher._queue], [[0], [1, 1]])
+        self.assertEqual(prefetcher._queued_bytes, 3)
+        self.assertEqual(len(list(prefetcher)), 10)
+
+    def test_chunk_larger_than_max_bytes(self):
+        prefetcher = prefetch_chunks(self.chunks(4), 8, max_bytes=1)
+        self.assertEqual(len(list(prefetcher)), 4)
+
+    def test_producer_error(self):
+        prefetcher = Prefetcher(self.chunks(2, fail=True))
+        self.assertEqual(next(prefetcher), [0])
+        self.assertEqual(next(prefetcher), [1, 1])
+        with self.assertRaises(RuntimeError):
+            next(prefetcher)
+        with self.assertRaises(StopIteration):
+            next(prefetcher)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Prefetcher(self.chunks(1), depth=0)
+        with self.assertRaises(ValueError):
+            Prefetcher(self.chunks(1), max_bytes=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import closing
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import Mesh, Particles
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.mesh_items import Cell, Point
+from simphony.cuds.particles_items import Bond, Particle
+from simphony.io.h5_cuds import H5CUDS
+from simphony.io.h5_lattice import H5Lattice
+from simphony.io.h5_sharded import (
+    H5ShardedCUDS, H5ShardedMesh, H5ShardedParticles, create_master,
+    merge_shards, shard_filename)
+
+
+class TestH5ShardedCUDS(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'results.cuds')
+        self.shards = [shard_filename('results.cuds', i) for i in range(3)]
+        create_master(self.filename, self.shards)
+        self.particles = []
+        self.points = []
+        for index, shard in enumerate(self.shards):
+            particles = Particles(name='particles')
+            particles.data = DataContainer(NAME='shard{}'.format(index))
+            uids = particles.add([
+                Particle(coordinates=(index, i, 0),
+                         data=DataContainer(MASS=float(index)))
+                for i in range(4)])
+            particles.add([Bond(particles=uids[:2])])
+            self.particles.append(particles)
+            mesh = Mesh(name='mesh')
+            points = mesh.add(
+                [Point(coordinates=(index, i, 0)) for i in range(4)])
+            mesh.add([Cell(points=points)])
+            self.points.extend(points)
+            with closing(H5CUDS.open(
+                    os.path.join(self.temp_dir, shard), 'w')) as handle:
+                handle.add_dataset(particles)
+                if index != 1:
+                    handle.add_dataset(mesh)
+                if index == 2:
+                    handle.add_dataset(
+                        make_cubic_lattice('lattice', 1.0, (2, 2, 2)))
+
+    def test_shard_filename(self):
+        self.assertEqual(
+            shard_filename('/tmp/run.cuds', 12), '/tmp/run.shard0012.cuds')
+
+    def test_get_dataset_names(self):
+        with closing(H5ShardedCUDS.open(self.filename)) as handle:
+            self.assertEqual(len(handle.shards), 3)
+            self.assertItemsEqual(
+                handle.get_dataset_names(), ['particles', 'mesh', 'lattice'])
+
+    def test_get_particles_union(self):
+        with closing(H5ShardedCUDS.open(self.filename)) as handle:
+            # when
+            particles = handle.get_dataset('particles')
+
+            # then
+            self.assertIsInstance(particles, H5ShardedParticles)
+            self.assertEqual(particles.name, 'particles')
+            self.assertEqual(particles.data[CUBA.NAME], 'shard0')
+            self.assertEqual(particles.count_of(CUBA.PARTICLE), 12)
+            self.assertEqual(particles.count_of(CUBA.BOND), 3)
+            self.assertEqual(len(particles), 15)
+            self.assertTrue(particles.has_type(CUBA.BOND))
+            for index, container in enumerate(self.particles):
+                for item in container.iter():
+                    self.assertTrue(particles.has(item.uid))
+                    self.assertEqual(
+                        particles.get(item.uid).uid, item.uid)
+            uids = [item.uid for item in self.particles[2].iter(
+                item_type=CUBA.PARTICLE)]
+            uids.append(
+                next(self.particles[0].iter(item_type=CUBA.PARTICLE)).uid)
+            self.assertEqual(
+                [item.uid for item in particles.iter(uids)], uids)
+            self.assertEqual(
+                len(list(particles.iter(item_type=CUBA.PARTICLE))), 12)
+            chunks = list(particles.iter_chunks(CUBA.BOND))
+            self.assertEqual(sum(len(chunk) for chunk in chunks), 3)
+            with self.assertRaises(TypeError):
+                particles.add([Particle()])
+            with self.assertRaises(TypeError):
+                particles.remove(uids[:1])
+            with self.assertRaises(KeyError):
+                particles.get(self.points[0])
+
+    def test_get_mesh_union(self):
+        with closing(H5ShardedCUDS.open(self.filename)) as handle:
+            # when
+            mesh = handle.get_dataset('mesh')
+
+            # then
+            self.assertIsInstance(mesh, H5ShardedMesh)
+            self.assertEqual(len(mesh.datasets), 2)
+            self.assertEqual(mesh.count_of(CUBA.POINT), 8)
+            self.assertEqual(mesh.count_of(CUBA.CELL), 2)
+            self.assertFalse(mesh.has_type(CUBA.EDGE))
+            self.assertEqual(
+                mesh.get(self.points[-1]).coordinates, (2, 3, 0))
+            self.assertEqual(
+                len(list(mesh.iter(self.points[:4] + self.points[8:]))), 8)
+            with self.assertRaises(KeyError):
+                mesh.get(self.points[4])
+            with self.assertRaises(TypeError):
+                mesh.add([Point(coordinates=(0, 0, 0))])
+
+    def test_get_lattice(self):
+        with closing(H5ShardedCUDS.open(self.filename)) as handle:
+            lattice = handle.get_dataset('lattice')
+            self.assertIsInstance(lattice, H5Lattice)
+            self.assertEqual(len(list(handle.iter_datasets())), 3)
+            with self.assertRaises(ValueError):
+                handle.get_dataset('foo')
+
+    def test_merge_shards(self):
+        target = os.path.join(self.temp_dir, 'merged.cuds')
+
+        # when
+        merge_shards(self.filename, target)
+
+        # then
+        with closing(H5CUDS.open(target, 'r')) as handle:
+            self.assertItemsEqual(
+                handle.get_dataset_names(), ['particles', 'mesh', 'lattice'])
+            particles = handle.get_dataset('particles')
+            self.assertEqual(particles.count_of(CUBA.PARTICLE), 12)
+            self.assertEqual(particles.count_of(CUBA.BOND), 3)
+            self.assertEqual(particles.data[CUBA.NAME], 'shard0')
+            for container in self.particles:
+                for item in container.iter():
+                    self.assertEqual(
+                        particles.get(item.uid).uid, item.uid)
+            mesh = handle.get_dataset('mesh')
+            self.assertEqual(mesh.count_of(CUBA.POINT), 8)
+            self.assertEqual(mesh.count_of(CUBA.CELL), 2)
+
+    def test_open_incompatible_file(self):
+        filename = os.path.join(self.temp_dir, self.shards[0])
+        with self.assertRaises(ValueError):
+            H5ShardedCUDS.open(filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
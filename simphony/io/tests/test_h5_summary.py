@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import tables
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.particles_items import Particle
+from simphony.io.h5_precision import FloatPrecision
+from simphony.io.h5_summary import H5Summary
+
+
+class TestH5Summary(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'test.h5')
+        self.handle = tables.open_file(self.filename, 'w')
+        self.addCleanup(self.close)
+        self.group = self.handle.create_group('/', 'test')
+        self.summary = H5Summary(self.group, coordinates=True)
+        self.summary.clear()
+
+    def close(self):
+        if self.handle.isopen:
+            self.handle.close()
+
+    def particles(self, start, stop):
+        return [
+            Particle(
+                coordinates=(i, -i, 0),
+                data=DataContainer(
+                    MASS=float(i), VELOCITY=(i, 0, 1), NAME='p{}'.format(i)))
+            for i in range(start, stop)]
+
+    def test_add(self):
+        # when
+        self.summary.add(self.particles(0, 3))
+        self.summary.add(self.particles(3, 5))
+        self.summary.add([Particle(coordinates=(0, 0, 1))])
+
+        # then
+        summary = self.summary.get()
+        self.assertEqual(summary.count, 6)
+        self.assertTrue(summary.exact)
+        self.assertEqual(summary.bounds, ([0, -4, 0], [4, 0, 1]))
+        self.assertEqual(
+            summary.keys, {CUBA.MASS, CUBA.VELOCITY, CUBA.NAME})
+        self.assertEqual(summary.fields[CUBA.MASS], (0, 4, 10))
+        self.assertEqual(
+            summary.fields[CUBA.VELOCITY], ([0, 0, 1], [4, 0, 1], [10, 0, 5]))
+        self.assertNotIn(CUBA.NAME, summary.fields)
+
+    def test_update_and_remove(self):
+        # given
+        particles = self.particles(0, 5)
+        self.summary.add(particles)
+
+        # when
+        particles[0].data[CUBA.MASS] = 10.0
+        self.summary.update([particles[0]])
+
+        # then
+        summary = self.summary.get()
+        self.assertEqual(summary.count, 5)
+        self.assertFalse(summary.exact)
+        self.assertEqual(summary.fields[CUBA.MASS], (0, 10, None))
+
+        # when
+        self.summary.remove(2)
+
+        # then
+        summary = self.summary.get()
+        self.assertEqual(summary.count, 3)
+        self.assertFalse(summary.exact)
+
+        # when
+        self.summary.add(self.particles(5, 6))
+
+        # then
+        self.assertEqual(self.summary.get().fields[CUBA.MASS], (0, 10, None))
+
+    def test_rebuild(self):
+        # given
+        self.summary.add(self.particles(0, 5))
+        self.summary.remove(1)
+
+        # when
+        summary = self.summary.read(
+            lambda: iter([self.particles(0, 2), self.particles(2, 4)]),
+            refresh=True)
+
+        # then
+        self.assertEqual(summary, self.summary.get())
+        self.assertTrue(summary.exact)
+        self.assertEqual(summary.count, 4)
+        self.assertEqual(summary.bounds, ([0, -3, 0], [3, 0, 0]))
+        self.assertEqual(summary.fields[CUBA.MASS], (0, 3, 6))
+
+    def test_missing_summary(self):
+        # given
+        summary = H5Summary(self.group, 'other')
+
+        # when
+        summary.add(self.particles(0, 2))
+
+        # then
+        self.assertIsNone(summary.get())
+        self.assertEqual(
+            summary.read(lambda: iter([self.particles(0, 2)])).count, 2)
+        self.assertEqual(summary.get().count, 2)
+
+    def test_read_only_file(self):
+        # given
+        self.handle.close()
+
+        # when
+        with tables.open_file(self.filename, 'r') as handle:
+            summary = H5Summary(handle.root.test, 'other')
+            rebuilt = summary.read(lambda: iter([self.particles(0, 2)]))
+
+            # then
+            self.assertEqual(rebuilt.count, 2)
+            self.assertIsNone(summary.get())
+
+    def test_project(self):
+        # given
+        self.summary.add(self.particles(0, 2))
+
+        # when
+        self.summary.project([CUBA.MASS])
+
+        # then
+        summary = self.summary.get()
+        self.assertEqual(summary.keys, {CUBA.MASS})
+        self.assertEqual(list(summary.fields), [CUBA.MASS])
+        self.assertTrue(summary.exact)
+
+    def test_precision(self):
+        # given
+        summary = H5Summary(
+            self.group, 'other', FloatPrecision('float32', 0.1),
+            coordinates=True)
+        summary.clear()
+
+        # when
+        summary.add([
+            Particle(
+                coordinates=(0.01, 0, 0), data=DataContainer(MASS=1.03))])
+
+        # then
+        summary = summary.get()
+        self.assertEqual(summary.bounds, ([0, 0, 0], [0, 0, 0]))
+        self.assertEqual(summary.fields[CUBA.MASS], (1.0, 1.0, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import closing
+
+import numpy
+from numpy.testing import assert_array_equal, assert_allclose
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import Mesh, Particles
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.mesh_items import Cell, Point
+from simphony.cuds.particles_items import Bond, Particle
+from simphony.io.h5_cuds import H5CUDS
+from simphony.io.h5_particles import H5Particles
+
+
+class TestH5Trajectory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'test.cuds')
+        self.particles = Particles(name='particles')
+        self.uids = self.particles.add([
+            Particle(
+                coordinates=(i, 0, 0),
+                data=DataContainer(VELOCITY=(0, i, 0), MASS=1.0))
+            for i in range(5)])
+        self.bond_uids = self.particles.add([Bond(particles=self.uids[:2])])
+        self.random = numpy.random.RandomState(42)
+
+    def move(self, step):
+        particles = []
+        for particle in self.particles.iter(item_type=CUBA.PARTICLE):
+            particle.coordinates = tuple(
+                numpy.add(particle.coordinates, self.random.rand(3)))
+            particle.data[CUBA.VELOCITY] = self.random.rand(3) * step
+            particles.append(particle)
+        self.particles.update(particles)
+        return (
+            self.particles.get_coordinates(),
+            numpy.array([particle.data[CUBA.VELOCITY]
+                         for particle in particles]))
+
+    def test_create_trajectory(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            # when
+            trajectory = handle.create_trajectory(self.particles)
+
+            # then
+            self.assertEqual(trajectory.name, 'particles')
+            self.assertEqual(trajectory.item_type, CUBA.PARTICLE)
+            self.assertEqual(len(trajectory), 0)
+            self.assertItemsEqual(
+                trajectory.fields, ['coordinates', 'VELOCITY', 'MASS'])
+            self.assertEqual(trajectory.uids, self.uids)
+            self.assertIsInstance(trajectory.static, H5Particles)
+            self.assertEqual(
+                trajectory.static.get(self.bond_uids[0]).particles,
+                tuple(self.uids[:2]))
+            self.assertEqual(handle.get_trajectory_names(), ['particles'])
+            self.assertEqual(handle.get_dataset_names(), [])
+            with self.assertRaises(ValueError):
+                handle.create_trajectory(self.particles)
+
+    def test_append_and_access_frames(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            trajectory = handle.create_trajectory(
+                self.particles, fields=['coordinates', CUBA.VELOCITY])
+            expected = []
+            for step in range(5):
+                expected.append(self.move(step))
+                # when
+                index = trajectory.append_frame(
+                    self.particles, time=0.5 * step)
+                # then
+                self.assertEqual(index, step)
+
+        # then
+        with closing(H5CUDS.open(self.filename, 'r')) as handle:
+            trajectory = handle.get_trajectory('particles')
+            self.assertEqual(len(trajectory), 5)
+            assert_array_equal(trajectory.times, [0, 0.5, 1.0, 1.5, 2.0])
+            assert_array_equal(
+                trajectory.get_field('coordinates', 3), expected[3][0])
+            assert_array_equal(
+                trajectory.get_field(CUBA.VELOCITY, -1), expected[4][1])
+            frame = trajectory.get_frame(2)
+            self.assertEqual(frame.index, 2)
+            self.assertEqual(frame.time, 1.0)
+            assert_array_equal(frame.fields['VELOCITY'], expected[2][1])
+            frames = list(trajectory.iter_frames(1, chunk_size=2))
+            self.assertEqual([item.index for item in frames], [1, 2, 3, 4])
+            for frame in frames:
+                assert_array_equal(
+                    frame.fields['coordinates'], expected[frame.index][0])
+            with self.assertRaises(IndexError):
+                trajectory.get_frame(5)
+            with self.assertRaises(KeyError):
+                trajectory.get_field(CUBA.MASS, 0)
+
+    def test_append_frame_with_missing_value(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            trajectory = handle.create_trajectory(
+                self.particles, fields=['coordinates', CUBA.VELOCITY],
+                delta=True)
+            expected = [self.move(1)]
+            trajectory.append_frame(self.particles)
+            particles = Particles(name='particles')
+            particles.add([
+                Particle(coordinates=(5, 5, 5), uid=uid)
+                for uid in self.uids])
+
+            # when
+            with self.assertRaises(KeyError):
+                trajectory.append_frame(particles)
+
+            # then
+            self.assertEqual(len(trajectory), 1)
+            fields = trajectory._group.fields
+            self.assertEqual(fields.coordinates.nrows, 1)
+            self.assertEqual(fields.velocity.nrows, 1)
+
+            # when
+            expected.append(self.move(2))
+            trajectory.append_frame(self.particles)
+
+        # then
+        with closing(H5CUDS.open(self.filename, 'r')) as handle:
+            trajectory = handle.get_trajectory('particles')
+            self.assertEqual(len(trajectory), 2)
+            for index in range(2):
+                assert_array_equal(
+                    trajectory.get_field('coordinates', index),
+                    expected[index][0])
+                assert_array_equal(
+                    trajectory.get_field(CUBA.VELOCITY, index),
+                    expected[index][1])
+
+    def test_load_frame(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            trajectory = handle.create_trajectory(
+                self.particles, fields=['coordinates'])
+            coordinates, _ = self.move(1)
+            trajectory.append_frame(self.particles)
+            self.move(2)
+            trajectory.append_frame(self.particles)
+
+            # when
+            container = trajectory.load_frame(0)
+
+            # then
+            self.assertIsInstance(container, Particles)
+            self.assertEqual(len(container.changes), 0)
+            assert_array_equal(container.get_coordinates(), coordinates)
+            particle = container.get(self.uids[1])
+            # the data is taken from the static part
+            self.assertEqual(
+                tuple(particle.data[CUBA.VELOCITY]), (0, 1, 0))
+            self.assertEqual(
+                container.get(self.bond_uids[0]).particles,
+                tuple(self.uids[:2]))
+
+    def test_delta_encoding_is_lossless(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            trajectory = handle.create_trajectory(
+                self.particles, fields=['coordinates', CUBA.VELOCITY],
+                delta=True, keyframe_interval=4)
+            expected = []
+            for step in range(10):
+                expected.append(self.move(step))
+                trajectory.append_frame(self.particles)
+
+        with closing(H5CUDS.open(self.filename, 'r')) as handle:
+            trajectory = handle.get_trajectory('particles')
+            for step in (0, 3, 4, 7, 9):
+                assert_array_equal(
+                    trajectory.get_field('coordinates', step),
+                    expected[step][0])
+            for frame in trajectory.iter_frames(5, 9, chunk_size=3):
+                assert_array_equal(
+                    frame.fields['VELOCITY'], expected[frame.index][1])
+
+    def test_quantized_fields(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            # when
+            trajectory = handle.create_trajectory(
+                self.particles, fields=['coordinates', CUBA.VELOCITY],
+                quantum={'coordinates': 1e-3}, delta=True)
+            expected = [self.move(step) for step in range(3)]
+            for step in range(3):
+                self.particles.update([
+                    Particle(uid=uid, coordinates=coordinates,
+                             data=DataContainer(VELOCITY=velocity))
+                    for uid, coordinates, velocity in zip(
+                        self.uids, expected[step][0], expected[step][1])])
+                trajectory.append_frame(self.particles)
+
+            # then
+            array = trajectory._group.fields.coordinates
+            self.assertEqual(array.dtype, numpy.int32)
+            assert_allclose(
+                trajectory.get_field('coordinates', 2), expected[2][0],
+                atol=0.5e-3)
+            assert_array_equal(
+                trajectory.get_field('VELOCITY', 2), expected[2][1])
+
+    def test_lattice_and_mesh_trajectories(self):
+        lattice = make_cubic_lattice('lattice', 1.0, (2, 3, 4))
+        nodes = []
+        for node in lattice.iter(item_type=CUBA.NODE):
+            node.data = DataContainer(DENSITY=sum(node.index))
+            nodes.append(node)
+        lattice.update(nodes)
+        mesh = Mesh(name='mesh')
+        points = mesh.add([Point(coordinates=(i, 0, 0)) for i in range(4)])
+        mesh.add([Cell(points=points)])
+        with closing(H5CUDS.open(self.filename)) as handle:
+            # when
+            lattice_trajectory = handle.create_trajectory(lattice)
+            mesh_trajectory = handle.create_trajectory(mesh)
+            lattice_trajectory.append_frame(lattice)
+            mesh_trajectory.append_frame(mesh)
+
+            # then
+            self.assertEqual(lattice_trajectory.fields, ['DENSITY'])
+            self.assertIsNone(lattice_trajectory.uids)
+            density = lattice_trajectory.get_field(CUBA.DENSITY, 0)
+            self.assertEqual(density.shape, (24,))
+            self.assertEqual(density[-1], 6)
+            loaded = lattice_trajectory.load_frame(0)
+            self.assertEqual(loaded.get((1, 2, 3)).data[CUBA.DENSITY], 6)
+            self.assertEqual(mesh_trajectory.item_type, CUBA.POINT)
+            assert_array_equal(
+                mesh_trajectory.get_field('coordinates', 0)[:, 0],
+                range(4))
+            with self.assertRaises(ValueError):
+                handle.create_trajectory(
+                    make_cubic_lattice('other', 1.0, (2, 2, 2)),
+                    fields=['coordinates'])
+
+    def test_unsupported_fields(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            with self.assertRaises(ValueError):
+                handle.create_trajectory(self.particles, fields=[CUBA.NAME])
+            particles = Particles(name='other')
+            with self.assertRaises(ValueError):
+                handle.create_trajectory(particles, fields=['velocity'])
+
+    def test_remove_trajectory(self):
+        with closing(H5CUDS.open(self.filename)) as handle:
+            handle.create_trajectory(self.particles)
+
+            # when
+            handle.remove_trajectory('particles')
+
+            # then
+            self.assertEqual(handle.get_trajectory_names(), [])
+            with self.assertRaises(ValueError):
+                handle.get_trajectory('particles')
+            with self.assertRaises(ValueError):
+                handle.remove_trajectory('particles')
+
+
+if __name__ == '__main__':
+    unittest.main()
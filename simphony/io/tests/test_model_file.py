@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import closing
+
+from simphony.core import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds import CUDS, Mesh, Particles
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.meta.api import Material
+from simphony.cuds.mesh_items import Point
+from simphony.cuds.particles_items import Particle
+from simphony.io.h5_cuds import H5CUDS
+from simphony.io.h5_lattice import H5Lattice
+from simphony.io.h5_mesh import H5Mesh
+from simphony.io.h5_particles import H5Particles
+from simphony.io.model_file import ModelFile, save_model
+from simphony.io.serialisation import load_CUDS, save_CUDS
+
+
+class TestModelFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'model.yml')
+
+    def create_model(self):
+        model = CUDS(name='model', description='a model with datasets')
+        self.material = Material(name='steel')
+        particles = Particles('particles')
+        self.particle_uids = particles.add([
+            Particle(coordinates=(i, 0, 0), data=DataContainer(MASS=i))
+            for i in range(5)])
+        mesh = Mesh('mesh')
+        self.point_uids = mesh.add([Point(coordinates=(0, 1, 2))])
+        lattice = make_cubic_lattice('lattice', 1.0, (2, 2, 2))
+        model.add([self.material, particles, mesh, lattice])
+        return model
+
+    def test_save_and_open(self):
+        for format in ('yaml', 'jsonl'):
+            # given
+            model = self.create_model()
+
+            # when
+            save_model(self.filename, model, format=format)
+
+            # then
+            model_file = ModelFile.open(self.filename)
+            self.addCleanup(model_file.close)
+            loaded = model_file.model
+            self.assertEqual(loaded.name, 'model')
+            self.assertEqual(loaded.description, 'a model with datasets')
+            self.assertEqual(len(loaded), 4)
+            self.assertEqual(
+                loaded.get(self.material.uid).name, 'steel')
+            particles = loaded.get_by_name('particles')
+            self.assertIsInstance(particles, H5Particles)
+            self.assertEqual(particles.uid, model.get_by_name(
+                'particles').uid)
+            self.assertEqual(
+                particles.get(self.particle_uids[3]).data[CUBA.MASS], 3)
+            mesh = loaded.get_by_name('mesh')
+            self.assertIsInstance(mesh, H5Mesh)
+            self.assertEqual(
+                mesh.get(self.point_uids[0]).coordinates, (0, 1, 2))
+            self.assertIsInstance(loaded.get_by_name('lattice'), H5Lattice)
+            self.assertEqual(
+                len(list(loaded.iter(item_type=CUBA.PARTICLES))), 3)
+            self.assertEqual(loaded.fingerprint(), model.fingerprint())
+            model_file.close()
+
+    def test_model_file_is_a_CUDS_file(self):
+        # given
+        save_model(self.filename, self.create_model())
+
+        # when
+        with open(self.filename, 'r') as handle:
+            model = load_CUDS(handle)
+
+        # then
+        self.assertEqual(
+            [component.uid for component in model.iter()],
+            [self.material.uid])
+
+    def test_open_CUDS_file(self):
+        # given
+        model = CUDS(name='model')
+        model.add([Material(name='steel')])
+        with open(self.filename, 'w') as handle:
+            save_CUDS(handle, model)
+
+        # when
+        model_file = ModelFile.open(self.filename)
+
+        # then
+        self.assertIsNone(model_file.datasets)
+        self.assertEqual(len(model_file.model), 1)
+        model_file.close()
+
+    def test_save_opened_model(self):
+        # given
+        save_model(self.filename, self.create_model())
+        model_file = ModelFile.open(self.filename)
+        self.addCleanup(model_file.close)
+        other = os.path.join(self.temp_dir, 'other.jsonl')
+
+        # when
+        save_model(other, model_file.model, format='jsonl')
+
+        # then
+        with closing(ModelFile.open(other)) as copied:
+            self.assertEqual(
+                sorted(copied.datasets.get_dataset_names()),
+                ['lattice', 'mesh', 'particles'])
+            self.assertEqual(
+                copied.model.get_by_name('particles').count_of(
+                    CUBA.PARTICLE), 5)
+        with self.assertRaises(ValueError):
+            save_model(self.filename, model_file.model)
+
+    def test_modify_datasets(self):
+        # given
+        save_model(self.filename, self.create_model())
+
+        # when
+        with closing(ModelFile.open(self.filename, 'a')) as model_file:
+            particles = model_file.model.get_by_name('particles')
+            particles.remove(self.particle_uids[:2])
+
+        # then
+        with closing(ModelFile.open(self.filename)) as model_file:
+            particles = model_file.model.get_by_name('particles')
+            self.assertEqual(particles.count_of(CUBA.PARTICLE), 3)
+
+    def test_mismatched_datasets(self):
+        # given
+        save_model(self.filename, self.create_model())
+        datasets_filename = os.path.join(self.temp_dir, 'model.h5')
+        with closing(H5CUDS.open(datasets_filename)) as handle:
+            handle.remove_dataset('mesh')
+            handle.add_dataset(Mesh('mesh'))
+
+        # when/then
+        with self.assertRaises(ValueError):
+            ModelFile.open(self.filename)
+
+    def test_datasets_filename(self):
+        # given
+        datasets_filename = os.path.join(self.temp_dir, 'data', 'model.h5')
+        os.mkdir(os.path.dirname(datasets_filename))
+
+        # when
+        save_model(
+            self.filename, self.create_model(),
+            datasets_filename=datasets_filename)
+
+        # then
+        self.assertTrue(os.path.exists(datasets_filename))
+        with closing(ModelFile.open(self.filename)) as model_file:
+            self.assertEqual(
+                sorted(model_file.datasets.get_dataset_names()),
+                ['lattice', 'mesh', 'particles'])
+        with self.assertRaises(ValueError):
+            save_model(
+                self.filename, self.create_model(),
+                datasets_filename=self.filename)
+
+    def test_unsupported_arguments(self):
+        with self.assertRaises(ValueError):
+            save_model(self.filename, self.create_model(), format='xml')
+        self.assertFalse(os.path.exists(self.filename))
+        with self.assertRaises(ValueError):
+            ModelFile.open(self.filename, 'w')
+
+
+if __name__ == '__main__':
+    unittest.main()
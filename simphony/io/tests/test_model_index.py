@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import closing
+
+from simphony.core import CUBA
+from simphony.cuds import CUDS
+from simphony.cuds.meta.api import Material, MaterialRelation
+from simphony.io.model_index import (
+    INDEX_EXTENSION, LazyCUDS, ModelIndex)
+from simphony.io.serialisation import save_CUDS
+
+
+class TestLazyCUDS(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.filename = os.path.join(self.temp_dir, 'model.jsonl')
+        model = CUDS(name='library', description='materials')
+        self.materials = [
+            Material(name='material {}'.format(i)) for i in range(10)]
+        self.relation = MaterialRelation(
+            name='relation', material=self.materials[2:4])
+        model.add(self.materials[:2] + self.materials[4:] + [self.relation])
+        with open(self.filename, 'w') as handle:
+            save_CUDS(handle, model, format='jsonl')
+
+    def open(self, *args, **kwargs):
+        model = LazyCUDS.open(self.filename, *args, **kwargs)
+        self.addCleanup(model.close)
+        return model
+
+    def test_index(self):
+        # when
+        with open(self.filename, 'rb') as handle:
+            index = ModelIndex.build(handle)
+
+        # then
+        self.assertEqual(index.name, 'library')
+        self.assertEqual(index.description, 'materials')
+        self.assertEqual(len(index), 11)
+        position = index.position_of_name('material 3')
+        entry = index[position]
+        self.assertEqual(entry.cuba_key, CUBA.MATERIAL)
+        self.assertEqual(entry.uid, str(self.materials[3].uid))
+        self.assertEqual(entry.name, 'material 3')
+        self.assertEqual(
+            index.position_of_uid(self.materials[3].uid), position)
+        self.assertIsNone(index.position_of_name('steel'))
+
+    def test_get_decodes_on_first_access(self):
+        # given
+        model = self.open()
+
+        # then
+        self.assertEqual(model.name, 'library')
+        self.assertEqual(len(model), 11)
+        self.assertEqual(model.decoded_count, 0)
+        self.assertTrue(model.has(self.materials[5].uid))
+        self.assertIn(self.relation.uid, model)
+        self.assertEqual(model.count_of(CUBA.MATERIAL), 10)
+        self.assertTrue(model.has_type(CUBA.MATERIAL_RELATION))
+        self.assertEqual(model.decoded_count, 0)
+
+        # when
+        material = model.get_by_name('material 5')
+
+        # then
+        self.assertEqual(material.uid, self.materials[5].uid)
+        self.assertEqual(model.decoded_count, 1)
+        self.assertIs(model.get(self.materials[5].uid), material)
+
+        # when
+        relation = model.get(self.relation.uid)
+
+        # then
+        self.assertEqual(model.decoded_count, 4)
+        self.assertEqual(
+            [item.uid for item in relation.data[CUBA.MATERIAL]],
+            [self.materials[2].uid, self.materials[3].uid])
+        self.assertIs(
+            model.get(self.materials[2].uid),
+            relation.data[CUBA.MATERIAL][0])
+        self.assertEqual(len(model), 11)
+
+    def test_iter(self):
+        # given
+        model = self.open()
+
+        # when
+        relations = list(model.iter(item_type=CUBA.MATERIAL_RELATION))
+
+        # then
+        self.assertEqual(
+            [relation.uid for relation in relations], [self.relation.uid])
+        self.assertEqual(model.decoded_count, 3)
+
+        # when
+        uids = set(component.uid for component in model.iter())
+
+        # then
+        self.assertEqual(
+            uids,
+            set(material.uid for material in self.materials) |
+            {self.relation.uid})
+        self.assertEqual(model.decoded_count, 11)
+        self.assertEqual(
+            [component.uid for component in model.iter(
+                uids=[self.materials[1].uid])],
+            [self.materials[1].uid])
+
+    def test_find(self):
+        # given
+        model = self.open()
+
+        # when
+        relations = model.find(
+            CUBA.MATERIAL_RELATION, material=self.materials[3].uid)
+
+        # then
+        self.assertEqual(
+            [relation.uid for relation in relations], [self.relation.uid])
+        self.assertEqual(model.decoded_count, 3)
+        self.assertEqual(
+            model.explain(CUBA.MATERIAL, name='material 8'),
+            (None, 10, 1))
+
+    def test_add_and_remove(self):
+        # given
+        model = self.open()
+
+        # when
+        model.remove([self.materials[0].uid])
+        model.add([Material(name='material 0')])
+
+        # then
+        self.assertEqual(len(model), 11)
+        self.assertEqual(model.decoded_count, 0)
+        self.assertNotEqual(
+            model.get_by_name('material 0').uid, self.materials[0].uid)
+        with self.assertRaises(ValueError):
+            model.add([Material(name='material 1')])
+        with self.assertRaises(KeyError):
+            model.get(self.materials[0].uid)
+
+        # when
+        replaced = Material(name='steel')
+        data = replaced.data
+        data[CUBA.UID] = self.materials[1].uid
+        replaced.data = data
+        model.add([replaced])
+
+        # then
+        self.assertIs(model.get(self.materials[1].uid), replaced)
+        self.assertEqual(model.count_of(CUBA.MATERIAL), 10)
+
+    def test_update(self):
+        # given
+        model = self.open()
+        material = Material(name='material 6', description='updated')
+        data = material.data
+        data[CUBA.UID] = self.materials[6].uid
+        material.data = data
+
+        # when
+        model.update([material])
+
+        # then
+        self.assertIs(model.get(self.materials[6].uid), material)
+        with self.assertRaises(ValueError):
+            model.update([Material(name='new')])
+
+    def test_derive(self):
+        # given
+        model = self.open()
+
+        # when
+        derived = model.derive(
+            {'material 3': {CUBA.DESCRIPTION: 'updated'}})
+        model.close()
+
+        # then
+        self.assertIsInstance(derived, CUDS)
+        self.assertNotIsInstance(derived, LazyCUDS)
+        self.assertEqual(len(derived), 11)
+        self.assertEqual(
+            derived.get_by_name('material 3').description, 'updated')
+        relation = derived.get_by_name('relation')
+        self.assertIs(
+            relation.data[CUBA.MATERIAL][1],
+            derived.get_by_name('material 3'))
+        self.assertNotEqual(
+            model.get_by_name('material 3').description, 'updated')
+
+    def test_saved_index(self):
+        # given
+        index_filename = self.filename + INDEX_EXTENSION
+        model = self.open()
+        model.close()
+        self.assertTrue(os.path.exists(index_filename))
+
+        # when
+        index = ModelIndex.load(index_filename, self.filename)
+
+        # then
+        self.assertEqual(len(index), 11)
+        self.assertEqual(index.name, 'library')
+        self.assertEqual(
+            index[index.position_of_name('relation')].cuba_key,
+            CUBA.MATERIAL_RELATION)
+        with closing(self.open()) as model:
+            self.assertEqual(
+                model.get_by_name('material 7').uid, self.materials[7].uid)
+
+        # when the model file is rewritten
+        model = CUDS(name='other')
+        with open(self.filename, 'w') as handle:
+            save_CUDS(handle, model, format='jsonl')
+
+        # then
+        self.assertIsNone(ModelIndex.load(index_filename, self.filename))
+        with closing(self.open()) as model:
+            self.assertEqual(model.name, 'other')
+            self.assertEqual(len(model), 0)
+
+    def test_not_jsonl_file(self):
+        # given
+        with open(self.filename, 'w') as handle:
+            save_CUDS(handle, CUDS(name='yaml'))
+
+        # when/then
+        with self.assertRaises(ValueError):
+            LazyCUDS.open(self.filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
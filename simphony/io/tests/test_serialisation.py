@@ -2,11 +2,14 @@
     Testing module for CUDS serialization functions.
 """
 import unittest
+import json
 import os
 import shutil
 from contextlib import closing
 import tempfile
+import threading
 import uuid
+from StringIO import StringIO
 
 from simphony.core import CUBA
 from simphony.cuds.meta.api import CUDSComponent
@@ -111,6 +114,125 @@ class TestSerialisation(unittest.TestCase):
                     li = loaded_item.data[key]
                     _compare_components(ci, li, testcase=self)
 
+    def test_save_CUDS_references(self):
+        # given
+        cuds = CUDS(name='refs')
+        M1 = Material(name='steel')
+        M2 = Material(name='epoxy')
+        MR = MaterialRelation(name='steel in epoxy', material=[M1, M2])
+        cuds.add([MR])
+        handle = StringIO()
+
+        # when
+        save_CUDS(handle, cuds)
+
+        # then
+        script = handle.getvalue()
+        self.assertEqual(script.count('- MATERIAL:'), 2)
+        self.assertEqual(script.count('- MATERIAL_RELATION:\n'), 1)
+        self.assertIn('MATERIAL: [*2, *3]', script)
+        self.assertLess(
+            script.index('NAME: "epoxy"'), script.index('- MATERIAL_RELATION'))
+        handle.seek(0)
+        loaded = load_CUDS(handle)
+        relation = loaded.get(MR.uid)
+        self.assertEqual(
+            [material.uid for material in relation.data[CUBA.MATERIAL]],
+            [M1.uid, M2.uid])
+
+    def test_save_CUDS_concurrently(self):
+        # given
+        models = []
+        for i in range(4):
+            cuds = CUDS(name='model {}'.format(i))
+            materials = [Material(name=str(j)) for j in range(20)]
+            cuds.add([
+                MaterialRelation(material=materials[j:j + 2])
+                for j in range(19)])
+            models.append(cuds)
+        expected = []
+        for cuds in models:
+            output = StringIO()
+            save_CUDS(output, cuds)
+            expected.append(output.getvalue())
+        handles = [StringIO() for _ in models]
+
+        # when
+        threads = [
+            threading.Thread(target=save_CUDS, args=(handle, cuds))
+            for handle, cuds in zip(handles, models)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual(
+            [handle.getvalue() for handle in handles], expected)
+
+    def test_save_CUDS_jsonl(self):
+        # given
+        filename = os.path.join(self.temp_dir, 'test_full.jsonl')
+        cuds = CUDS(name='full', description='jsonl model')
+        M1 = Material(name='steel', description='FCC steel')
+        M2 = Material(name='epoxy', description='')
+        MR1 = MaterialRelation(name='steel in epoxy', material=[M1, M2])
+        MR2 = MaterialRelation(name='epoxy only', material=[M2])
+        cuds.add([M2, MR1, MR2])
+
+        # when
+        with closing(open(filename, 'w')) as handle:
+            save_CUDS(handle, cuds, format='jsonl')
+        with closing(open(filename, 'r')) as handle:
+            header = json.loads(handle.readline())
+            handle.seek(0)
+            loaded = load_CUDS(handle)
+
+        # then
+        self.assertEqual(header['count'], 4)
+        self.assertEqual(
+            sorted(header['classes']), ['MATERIAL', 'MATERIAL_RELATION'])
+        self.assertEqual(loaded.name, cuds.name)
+        self.assertEqual(loaded.description, cuds.description)
+        self.assertEqual(
+            loaded.count_of(CUBA.CUDS_COMPONENT),
+            cuds.count_of(CUBA.CUDS_COMPONENT) + 1)
+        for cuds_item in cuds.iter(item_type=CUBA.CUDS_COMPONENT):
+            loaded_item = loaded.get(cuds_item.uid)
+            for key in cuds_item.data.keys():
+                _compare_components(
+                    cuds_item.data[key], loaded_item.data[key], self)
+        materials = [
+            loaded.get(MR1.uid).data[CUBA.MATERIAL],
+            loaded.get(MR2.uid).data[CUBA.MATERIAL]]
+        self.assertIs(materials[0][1], materials[1][0])
+        self.assertIsInstance(loaded.get(M2.uid).name, str)
+
+    def test_formats_are_interchangeable(self):
+        # given
+        cuds = CUDS(name='both')
+        material = Material(name='steel')
+        relation = MaterialRelation(name='relation', material=[material])
+        cuds.add([relation])
+        jsonl = StringIO()
+        save_CUDS(jsonl, cuds, format='jsonl')
+        jsonl.seek(0)
+
+        # when
+        yaml = StringIO()
+        save_CUDS(yaml, load_CUDS(jsonl))
+        yaml.seek(0)
+        loaded = load_CUDS(yaml)
+
+        # then
+        self.assertEqual(
+            set(item.uid for item in loaded.iter()),
+            {material.uid, relation.uid})
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            save_CUDS(StringIO(), CUDS(), format='xml')
+
 
 def _compare_components(comp1, comp2, testcase):
     self = testcase
@@ -227,6 +227,31 @@ class CheckLatticeNodeOperations(object):
             # Check that `new_node` is not the same instance as `node`
             self.assertIsNot(new_node, nodes[n])
 
+    def test_fingerprint(self):
+        # given
+        container = self.container
+        fingerprint = container.fingerprint()
+        chunks = container.chunk_fingerprints()
+        node = container.get((2, 3, 4))
+        node.data = create_data_container(restrict=self.supported_cuba())
+
+        # when
+        container.update([node])
+
+        # then
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+        changed = [
+            chunk for chunk, digest in container.chunk_fingerprints().items()
+            if chunks[chunk] != digest]
+        self.assertEqual(len(changed), 1)
+
+        # when
+        node.data = DataContainer()
+        container.update([node])
+
+        # then
+        self.assertEqual(container.fingerprint(), fingerprint)
+
     def test_update_nodes_with_extra_keywords(self):
         container = self.container
 
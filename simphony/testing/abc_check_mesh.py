@@ -256,6 +256,30 @@ class CheckMeshItemOperations(object):
         self.assertNotEqual(item, self.item_list[2])
         self.assertNotEqual(retrieved, self.item_list[2])
 
+    def test_fingerprint(self):
+        # given
+        container = self.container
+        empty = container.fingerprint()
+        uids = self._add_items(container)
+        fingerprint = container.fingerprint()
+        item = self.get_operation(container, uids[2])
+        data = item.data
+        item.data = DataContainer()
+
+        # when
+        self.update_operation(container, [item])
+
+        # then
+        self.assertNotEqual(fingerprint, empty)
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+
+        # when
+        item.data = data
+        self.update_operation(container, [item])
+
+        # then
+        self.assertEqual(container.fingerprint(), fingerprint)
+
     def test_update_multiple_item_data(self):
         # given
         container = self.container
@@ -417,6 +417,39 @@ class CheckManipulatingParticles(object):
         # then
         self.assertEqual(particle.uid, self.particle_list[-1].uid)
 
+    def test_fingerprint(self):
+        # given
+        container = self.container
+        fingerprint = container.fingerprint()
+        chunks = container.chunk_fingerprints()
+        particle = container.get(self.ids[2])
+        coordinates = particle.coordinates
+        particle.coordinates = (123, 456, 789)
+
+        # when
+        container.update([particle])
+
+        # then
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+        changed = [
+            chunk for chunk, digest in container.chunk_fingerprints().items()
+            if chunks.get(chunk) != digest]
+        self.assertEqual(len(changed), 1)
+
+        # when
+        particle.coordinates = coordinates
+        container.update([particle])
+
+        # then
+        self.assertEqual(container.fingerprint(), fingerprint)
+        self.assertEqual(container.chunk_fingerprints(), chunks)
+
+        # when
+        container.remove([self.ids[2]])
+
+        # then
+        self.assertNotEqual(container.fingerprint(), fingerprint)
+
     def test_count_of_particles(self):
         # given
         container = self.container